@@ -0,0 +1,311 @@
+"""
+离线DOM替身
+用标准库 html.parser 把保存的HTML解析成树，并实现一个CSS选择器子集（标签、#id、.class、
+[attr]、[attr=v]、[attr*=v]、[attr^=v]、[attr$=v]，后代/子代/相邻兄弟组合符，逗号分组），
+对外提供与 Selenium WebDriver/WebElement 相同的 find_element(s)、text、get_attribute 接口，
+使 LinkCollector、PDFProcessor、SelectorRegistry 可以不开浏览器直接在固定页面上运行。
+FakeDriver.execute_script 认得 driver_utils 的页面探测脚本（按传入的选择器字典识别），用Python版本执行。
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from selenium.common.exceptions import NoSuchElementException
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class Node:
+    """DOM节点"""
+
+    __slots__ = ("tag", "attrs", "children", "parent", "texts", "classes")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Node] = []
+        self.parent = parent
+        self.texts: List = []  # 文本与子节点按出现顺序交错存放
+        self.classes = set(attrs.get("class", "").split())
+
+    def iter_descendants(self):
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def text_content(self) -> str:
+        parts = []
+        for item in self.texts:
+            parts.append(item.text_content() if isinstance(item, Node) else item)
+        return "".join(parts)
+
+    def previous_sibling(self) -> Optional["Node"]:
+        if self.parent is None:
+            return None
+        siblings = self.parent.children
+        index = siblings.index(self)
+        return siblings[index - 1] if index > 0 else None
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        self.current.texts.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        self.current.texts.append(node)
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.texts.append(data)
+
+
+def parse_html(html: str) -> Node:
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+# ---- CSS选择器 ----
+
+_TOKEN = re.compile(
+    r"\s*([>+])\s*"                                  # 组合符
+    r"|(\s+)"                                        # 后代组合符
+    r"|([a-zA-Z][\w-]*|\*)"                          # 标签
+    r"|#([\w-]+)"                                    # id
+    r"|\.([\w-]+)"                                   # class
+    r"""|\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(?:"([^"]*)"|'([^']*)'|([^\]\s]+))\s*)?\]"""  # 属性
+)
+
+
+class _Compound:
+    __slots__ = ("tag", "id", "classes", "attrs")
+
+    def __init__(self):
+        self.tag = None
+        self.id = None
+        self.classes = []
+        self.attrs = []
+
+    def matches(self, node: Node) -> bool:
+        if self.tag and self.tag != "*" and node.tag != self.tag:
+            return False
+        if self.id and node.attrs.get("id") != self.id:
+            return False
+        for cls in self.classes:
+            if cls not in node.classes:
+                return False
+        for name, op, value in self.attrs:
+            actual = node.attrs.get(name)
+            if actual is None:
+                return False
+            if op == "=" and actual != value:
+                return False
+            if op == "*=" and value not in actual:
+                return False
+            if op == "^=" and not actual.startswith(value):
+                return False
+            if op == "$=" and not actual.endswith(value):
+                return False
+        return True
+
+
+_compiled: Dict[str, List] = {}
+
+
+def compile_selector(selector: str) -> List[List]:
+    """把选择器编译为 [[compound, 组合符, compound, ...], ...]（逗号分组）"""
+    cached = _compiled.get(selector)
+    if cached is not None:
+        return cached
+    groups = []
+    for part in selector.split(","):
+        part = part.strip()
+        chain = []
+        compound = _Compound()
+        pos = 0
+        while pos < len(part):
+            m = _TOKEN.match(part, pos)
+            if not m or m.end() == pos:
+                raise ValueError(f"不支持的选择器: {selector!r}")
+            pos = m.end()
+            combinator, space, tag, id_, cls, attr, op, v1, v2, v3 = m.groups()
+            if combinator or (space and pos < len(part)):
+                chain += [compound, combinator or " "]
+                compound = _Compound()
+            elif tag:
+                compound.tag = tag.lower()
+            elif id_:
+                compound.id = id_
+            elif cls:
+                compound.classes.append(cls)
+            elif attr:
+                value = next((v for v in (v1, v2, v3) if v is not None), None)
+                compound.attrs.append((attr, op, value))
+        chain.append(compound)
+        groups.append(chain)
+    _compiled[selector] = groups
+    return groups
+
+
+def _match_chain(node: Node, chain: List, index: int) -> bool:
+    if not chain[index].matches(node):
+        return False
+    if index == 0:
+        return True
+    combinator = chain[index - 1]
+    if combinator == ">":
+        return node.parent is not None and _match_chain(node.parent, chain, index - 2)
+    if combinator == "+":
+        sibling = node.previous_sibling()
+        return sibling is not None and _match_chain(sibling, chain, index - 2)
+    ancestor = node.parent
+    while ancestor is not None:
+        if _match_chain(ancestor, chain, index - 2):
+            return True
+        ancestor = ancestor.parent
+    return False
+
+
+def select(scope: Node, selector: str) -> List[Node]:
+    """在scope的后代中按文档顺序查找匹配节点（与 querySelectorAll 语义一致，祖先可在scope之外）"""
+    groups = compile_selector(selector)
+    return [node for node in scope.iter_descendants()
+            if any(_match_chain(node, chain, len(chain) - 1) for chain in groups)]
+
+
+# ---- WebDriver/WebElement 接口 ----
+
+class FakeElement:
+    """WebElement替身"""
+
+    def __init__(self, node: Node, base_url: str):
+        self._node = node
+        self._base_url = base_url
+
+    @property
+    def tag_name(self) -> str:
+        return self._node.tag
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._node.text_content().split())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        value = self._node.attrs.get(name)
+        if value is not None and name in ("href", "src"):
+            return urljoin(self._base_url, value)  # 与浏览器一致，返回绝对URL
+        return value
+
+    def is_enabled(self) -> bool:
+        return "disabled" not in self._node.attrs
+
+    def click(self):
+        pass
+
+    def find_elements(self, by: str, value: str) -> List["FakeElement"]:
+        return [FakeElement(n, self._base_url) for n in _find(self._node, by, value)]
+
+    def find_element(self, by: str, value: str) -> "FakeElement":
+        nodes = _find(self._node, by, value)
+        if not nodes:
+            raise NoSuchElementException(f"{by}={value}")
+        return FakeElement(nodes[0], self._base_url)
+
+
+def _find(scope: Node, by: str, value: str) -> List[Node]:
+    if by == "css selector":
+        return select(scope, value)
+    if by == "tag name":
+        return [n for n in scope.iter_descendants() if n.tag == value.lower()]
+    if by == "xpath":
+        m = re.fullmatch(r"\./ancestor::(\w+)", value)
+        if m:
+            ancestor = scope.parent
+            while ancestor is not None:
+                if ancestor.tag == m.group(1):
+                    return [ancestor]
+                ancestor = ancestor.parent
+            return []
+    raise ValueError(f"不支持的定位方式: {by}={value}")
+
+
+class FakeDriver(FakeElement):
+    """WebDriver替身：固定页面，get() 切换到预先登记的页面"""
+
+    def __init__(self, html: str, url: str = "https://www.science.org/", pages: Optional[Dict[str, str]] = None):
+        super().__init__(parse_html(html), url)
+        self.current_url = url
+        self.pages = pages or {}
+
+    @property
+    def title(self) -> str:
+        nodes = select(self._node, "title")
+        return " ".join(nodes[0].text_content().split()) if nodes else ""
+
+    def get(self, url: str):
+        if url in self.pages:
+            self._node = parse_html(self.pages[url])
+        self.current_url = url
+        self._base_url = url
+
+    def get_cookies(self):
+        return []
+
+    def execute_script(self, script, *args):
+        if args and isinstance(args[0], dict) and "challenge" in args[0]:
+            return self.probe(args[0])
+        return None
+
+    def probe(self, sel: Dict) -> Dict:
+        """driver_utils.PAGE_PROBE_SCRIPT 的Python版本，逐项对应脚本中的检测"""
+        doc = self._node
+        title = self.title.lower()
+        bodies = select(doc, "body")
+        body_text = bodies[0].text_content() if bodies else ""
+        markers = [selector for selector in sel["challenge"] if select(doc, selector)]
+        title_hits = [kw for kw in sel["titleKeywords"] if kw in title]
+        text_hits = []
+        if bodies and len(body_text) < sel["maxScanChars"]:
+            text_hits = [kw for kw in sel["textKeywords"] if kw in body_text.lower()]
+        title_elems = select(doc, sel["articleTitle"])
+        status = {
+            "url": self.current_url,
+            "title": self.title,
+            "cards": len(select(doc, sel["cards"])),
+            "article_title": bool(title_elems and title_elems[0].text_content().strip()),
+            "pdf_icons": len(select(doc, sel["pdfIcon"])),
+            "download_button": bool(select(doc, sel["downloadButton"])),
+            "text_length": len(body_text),
+            "challenge_markers": markers,
+            "keywords": title_hits + text_hits,
+        }
+        status["challenge"] = bool(markers or title_hits or text_hits)
+        status["normal"] = not status["challenge"] and (status["cards"] > 0 or status["article_title"] or
+                                                        status["pdf_icons"] > 0 or status["download_button"] or
+                                                        len(body_text) > 100)
+        return status
+
+    def refresh(self):
+        pass
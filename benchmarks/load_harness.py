@@ -0,0 +1,150 @@
+"""
+端到端压测
+启动本地模拟站点（benchmarks/mock_science.py），依次以子进程运行真实脚本并指向该站点，
+结束后汇总每个脚本的 文章/分钟 与失败类型：
+- 站点侧：各类页面请求数、注入的403/验证码/截断次数
+- 爬虫侧：脚本退出时写出的指标快照（logs/metrics.json）中的链接数、下载成功/失败数、验证码事件数
+
+脚本仍然通过调试端口连接浏览器（与正式运行相同），数据库使用 ScienceConfig.DB_CONFIG，
+压测前请把它指向一个可以清空的测试库。每个脚本在独立的工作目录中运行，断点、下载文件和
+日志都不会写进仓库目录。
+
+用法:
+    python -m benchmarks.load_harness --articles 20000 --max 500 --latency-ms 80 --captcha-rate 0.01
+    python -m benchmarks.load_harness --scripts science_crawler_main --main-args "--pipeline --download-workers 8"
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_science import MockScienceServer, add_server_arguments, build_server
+from src.config import ScienceConfig
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+SCRIPTS = ["collect_meta", "pdf_downloader", "science_crawler_main"]
+
+
+def script_command(name: str, base_url: str, args) -> List[str]:
+    """组装脚本命令行：统一指向模拟站点，关闭 /metrics 端口（快照文件仍会写出）"""
+    cmd = [sys.executable, os.path.join(ROOT_DIR, f"{name}.py"), "--base-url", base_url,
+           "--metrics-port", "0", "--log-level", args.log_level]
+    if name == "collect_meta":
+        query = f"{base_url}/action/doSearch?AllField=load+test&AfterYear=2010&BeforeYear=2025&startPage=0&pageSize=100"
+        cmd += ["--query", query]
+        if args.max:
+            cmd += ["--max", str(args.max)]
+    elif name == "pdf_downloader":
+        if args.max:
+            cmd += ["--max", str(args.max)]
+    else:
+        cmd += shlex.split(args.main_args or "")
+    return cmd
+
+
+def read_snapshot(work_dir: str) -> Dict:
+    path = os.path.join(work_dir, ScienceConfig.METRICS_SNAPSHOT_FILE)
+    if not ScienceConfig.METRICS_SNAPSHOT_FILE or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("metrics", {})
+
+
+def series_value(snapshot: Dict, name: str, labels: str = "total") -> float:
+    value = snapshot.get(name, {}).get("series", {}).get(labels, 0)
+    return value.get("count", 0) if isinstance(value, dict) else value
+
+
+def summarize(name: str, exit_code: int, elapsed: float, server_stats: Dict, snapshot: Dict) -> Dict:
+    """合并站点侧与爬虫侧统计，按脚本类型选取“完成的文章数”"""
+    links = series_value(snapshot, "crawler_links_total", '{result="new"}')
+    downloaded = series_value(snapshot, "crawler_downloads_total", '{result="success"}')
+    failed = series_value(snapshot, "crawler_downloads_total", '{result="failed"}')
+    articles = links if name == "collect_meta" else downloaded
+    return {
+        "script": name,
+        "exit_code": exit_code,
+        "elapsed": round(elapsed, 2),
+        "articles": articles,
+        "articles_per_min": round(articles / elapsed * 60, 2) if elapsed > 0 else 0,
+        "client": {
+            "links_new": links,
+            "downloads_success": downloaded,
+            "downloads_failed": failed,
+            "captcha_events": series_value(snapshot, "crawler_captcha_events_total"),
+        },
+        "server": server_stats,
+    }
+
+
+def run_script(name: str, server: MockScienceServer, args, work_root: str) -> Dict:
+    work_dir = os.path.join(work_root, name)
+    os.makedirs(work_dir, exist_ok=True)
+    cmd = script_command(name, server.base_url, args)
+    env = dict(os.environ, SCIENCE_BASE_URL=server.base_url)  # 集群模式的子进程也指向模拟站点
+    log_path = os.path.join(work_dir, "stdout.log")
+    print(f"[压测] 运行 {name}: {' '.join(cmd[1:])}", flush=True)
+
+    server.stats.reset()
+    start = time.time()
+    with open(log_path, "w", encoding="utf-8") as log:
+        try:
+            exit_code = subprocess.run(cmd, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                       timeout=args.timeout).returncode
+        except subprocess.TimeoutExpired:
+            exit_code = "timeout"
+    elapsed = time.time() - start
+    report = summarize(name, exit_code, elapsed, server.stats.snapshot(), read_snapshot(work_dir))
+    report["log"] = log_path
+    return report
+
+
+def print_report(reports: List[Dict]):
+    print(f"\n{'脚本':<22}{'退出码':>8}{'耗时(s)':>10}{'文章数':>8}{'文章/分钟':>11}{'下载失败':>9}{'验证码':>7}  站点注入故障")
+    for r in reports:
+        faults = ", ".join(f"{k}={v}" for k, v in sorted(r["server"]["faults"].items())) or "-"
+        print(f"{r['script']:<22}{str(r['exit_code']):>8}{r['elapsed']:>10.1f}{r['articles']:>8.0f}"
+              f"{r['articles_per_min']:>11.1f}{r['client']['downloads_failed']:>9.0f}"
+              f"{r['client']['captcha_events']:>7.0f}  {faults}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在本地模拟站点上端到端压测三个脚本")
+    add_server_arguments(parser)
+    parser.add_argument("--scripts", nargs="+", choices=SCRIPTS, default=SCRIPTS,
+                        help="要运行的脚本，按给定顺序执行（默认先收集再下载）")
+    parser.add_argument("--max", type=int, default=200, help="collect_meta/pdf_downloader 的 --max")
+    parser.add_argument("--main-args", type=str, default="", help="传给 science_crawler_main.py 的额外参数")
+    parser.add_argument("--log-level", type=str, default="WARNING", help="脚本日志级别，默认WARNING")
+    parser.add_argument("--timeout", type=float, default=3600, help="单个脚本的超时（秒）")
+    parser.add_argument("--work-dir", type=str, default=None, help="脚本工作目录，默认新建临时目录")
+    parser.add_argument("--output", type=str, default=None, help="报告输出路径，默认 benchmarks/results/load_<时间>.json")
+    args = parser.parse_args(argv)
+
+    work_root = args.work_dir or tempfile.mkdtemp(prefix="s_crawler_load_")
+    with build_server(args) as server:
+        print(f"[压测] 模拟站点 {server.base_url}，语料{args.articles}篇，工作目录 {work_root}")
+        reports = [run_script(name, server, args, work_root) for name in args.scripts]
+
+    print_report(reports)
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"config": vars(args), "reports": reports}, f, ensure_ascii=False, indent=2)
+    print(f"\n[压测] 报告已写入 {output}")
+    return 0 if all(r["exit_code"] == 0 for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
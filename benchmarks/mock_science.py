@@ -0,0 +1,430 @@
+"""
+本地模拟science.org站点
+按合成语料生成搜索结果页、详情页、ePDF阅读页和PDF文件，页面结构与 ScienceConfig.SELECTORS
+及各模块的候选选择器一致，爬虫通过 --base-url（或环境变量 SCIENCE_BASE_URL）指向本站点即可
+在不访问真实网站的情况下跑完整流程。可注入延迟、403、验证码页和截断响应，用于压测并发参数和
+验证各类失败的处理路径。
+
+用法:
+    python -m benchmarks.mock_science --articles 20000 --port 8800 --latency-ms 80 --captcha-rate 0.01
+    python collect_meta.py --base-url http://127.0.0.1:8800 --max 500
+
+统计信息: GET /__stats 返回各类页面的请求数、注入的故障数和发送字节数（JSON）。
+"""
+
+import argparse
+import bisect
+import html
+import json
+import random
+import re
+import socket
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DOI_PREFIX = "10.1126/science.mock"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_WORDS = ("twist angle bilayer graphene moire superlattice correlated insulator quantum material "
+          "phonon exciton heterostructure cell protein genome climate ocean neuron catalyst").split()
+_DOI_PATH = re.compile(r"^/doi/(?:(epdf|pdf|full)/)?(10\.\d+/[^/?#]+)$")
+
+
+class SyntheticCorpus:
+    """
+    合成语料：第i篇文章的DOI、标题、作者、日期都由i确定，不占用按篇存储的内存
+
+    文章按发表日期从旧到新编号，年份/月份过滤只需二分查找得到一个连续区间。
+    """
+
+    def __init__(self, size: int = 10000, start_year: int = 2010, end_year: int = 2025,
+                 pdf_size: int = 256 * 1024, seed: int = 0):
+        self.size = size
+        self.pdf_size = pdf_size
+        self.seed = seed
+        first = date(start_year, 1, 1).toordinal()
+        span = date(end_year, 12, 31).toordinal() - first
+        self._ordinals = [first + (i * span) // max(size - 1, 1) for i in range(size)]
+        filler = random.Random(seed).randbytes(4096)
+        self._pdf_filler = (filler * (pdf_size // len(filler) + 1))[:pdf_size]
+
+    def doi(self, index: int) -> str:
+        return f"{DOI_PREFIX}{index:06d}"
+
+    def index_of(self, doi: str) -> Optional[int]:
+        if not doi.startswith(DOI_PREFIX):
+            return None
+        try:
+            index = int(doi[len(DOI_PREFIX):])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.size else None
+
+    def published(self, index: int) -> date:
+        return date.fromordinal(self._ordinals[index])
+
+    def title(self, index: int) -> str:
+        rng = random.Random(self.seed * 1000003 + index)
+        return " ".join(rng.choice(_WORDS) for _ in range(6)).capitalize() + f" ({index})"
+
+    def authors(self, index: int):
+        return [f"Author {index}-{k}" for k in range(1 + index % 5)]
+
+    def abstract(self, index: int) -> str:
+        rng = random.Random(self.seed * 7919 + index)
+        return " ".join(rng.choice(_WORDS) for _ in range(80))
+
+    def search(self, params: Dict[str, str]) -> range:
+        """按 AfterYear/BeforeYear/AfterMonth/BeforeMonth 过滤，sortBy=EPubDate 时从新到旧"""
+        lo_year = int(params.get("AfterYear") or 1)
+        hi_year = int(params.get("BeforeYear") or 9999)
+        lo = date(lo_year, int(params.get("AfterMonth") or 1), 1).toordinal()
+        hi_month = int(params.get("BeforeMonth") or 12)
+        hi = (date(hi_year + 1, 1, 1) if hi_month == 12 else date(hi_year, hi_month + 1, 1)).toordinal()
+        start = bisect.bisect_left(self._ordinals, lo)
+        end = bisect.bisect_left(self._ordinals, hi)
+        if params.get("sortBy") == "EPubDate":
+            return range(end - 1, start - 1, -1)
+        return range(start, end)
+
+    def pdf_bytes(self, index: int) -> bytes:
+        """每篇文章的PDF内容不同（文件头含DOI），MD5查重不会误判"""
+        header = f"%PDF-1.4\n% {self.doi(index)}\n".encode("ascii")
+        return header + self._pdf_filler + b"\n%%EOF\n"
+
+
+class FaultInjector:
+    """
+    按比例注入故障
+
+    故障类型: forbidden（403）、captcha（人机验证页，只对HTML页面）、truncate（响应体只发一半）。
+    同一URL出现验证码后，下一次请求（刷新）恢复正常，以便验证 handle_captcha 的恢复路径。
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, forbidden_rate: float = 0,
+                 captcha_rate: float = 0, truncate_rate: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.forbidden_rate = forbidden_rate
+        self.captcha_rate = captcha_rate
+        self.truncate_rate = truncate_rate
+        self._rng = random.Random(seed)
+        self._challenged = set()
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000
+
+    def decide(self, kind: str, path: str) -> Optional[str]:
+        with self._lock:
+            if path in self._challenged:
+                self._challenged.discard(path)
+                return None
+            roll = self._rng.random()
+            if roll < self.forbidden_rate:
+                return "forbidden"
+            roll -= self.forbidden_rate
+            if kind != "pdf" and roll < self.captcha_rate:
+                self._challenged.add(path)
+                return "captcha"
+            roll -= self.captcha_rate
+            if roll < self.truncate_rate:
+                return "truncate"
+        return None
+
+
+class MockStats:
+    """按页面类型统计请求结果与字节数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.bytes_sent = 0
+
+    def record(self, kind: str, outcome: str, nbytes: int = 0):
+        with self._lock:
+            kind_counts = self.counts.setdefault(kind, {})
+            kind_counts[outcome] = kind_counts.get(outcome, 0) + 1
+            self.bytes_sent += nbytes
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = {kind: dict(outcomes) for kind, outcomes in self.counts.items()}
+            bytes_sent = self.bytes_sent
+        faults: Dict[str, int] = {}
+        for outcomes in counts.values():
+            for outcome, n in outcomes.items():
+                if outcome not in ("ok", "partial"):
+                    faults[outcome] = faults.get(outcome, 0) + n
+        return {"elapsed": round(time.time() - self.started, 3), "requests": counts,
+                "faults": faults, "bytes_sent": bytes_sent}
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+            self.bytes_sent = 0
+            self.started = time.time()
+
+
+# ---- 页面模板 ----
+
+_CAPTCHA_PAGE = """<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>
+<div id="challenge-running">Checking your browser before accessing the site.</div>
+<form id="challenge-form" action="/" method="POST"><div class="cf-turnstile"></div></form>
+</body></html>"""
+
+_FORBIDDEN_PAGE = "<!DOCTYPE html><html><head><title>403 Forbidden</title></head><body><h1>Access Denied</h1></body></html>"
+
+
+def render_search_page(corpus: SyntheticCorpus, path: str, params: Dict[str, str]) -> str:
+    results = corpus.search(params)
+    page_size = min(int(params.get("pageSize") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    page = int(params.get("startPage") or 0)
+    cards = []
+    for index in results[page * page_size:(page + 1) * page_size]:
+        doi = corpus.doi(index)
+        title = html.escape(corpus.title(index))
+        authors = "".join(f'<li class="list-inline-item"><span class="hlFld-ContribAuthor">{html.escape(a)}</span></li>'
+                          for a in corpus.authors(index))
+        published = corpus.published(index).strftime("%d %b %Y")
+        cards.append(f"""<div class="card pb-3 mb-4 border-bottom">
+  <div class="card-header">
+    <div class="card-meta text-uppercase"><span class="card-meta__item">Research Article</span><span class="card-meta__item bullet-left">Science</span></div>
+    <h2 class="article-title"><a href="/doi/{doi}" title="{title}" class="text-reset animation-underline">{title}</a></h2>
+  </div>
+  <div class="card-body">
+    <ul class="list-inline loa-authors">{authors}</ul>
+    <div class="card-meta"><span class="card-meta__item"><time>{published}</time></span></div>
+  </div>
+  <div class="card-footer"><a href="/doi/epdf/{doi}" class="btn"><i class="icon-pdf"></i> PDF</a></div>
+</div>""")
+    pagination = ""
+    if (page + 1) * page_size < len(results):
+        next_query = urlencode({**params, "startPage": page + 1})
+        pagination = (f'<nav><ul class="pagination"><li class="page-item active"><a class="page-link" href="#">{page + 1}</a></li>'
+                      f'<li class="page-item"><a class="page-link" href="{path}?{html.escape(next_query)}">{page + 2}</a></li></ul></nav>')
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Search results | Science</title></head>
+<body><main id="main"><div class="container">
+<div class="search-result__info"><span class="result__count">{len(results):,} results</span></div>
+{"".join(cards)}
+{pagination}
+</div></main></body></html>"""
+
+
+def render_detail_page(corpus: SyntheticCorpus, index: int) -> str:
+    doi = corpus.doi(index)
+    title = html.escape(corpus.title(index))
+    paragraphs = "".join(f'<div role="paragraph" id="p{k}">{corpus.abstract(index + k)}</div>' for k in range(3))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} | Science</title></head>
+<body><main id="main"><div class="article-container"><article>
+<header><div><h1 class="article-title" property="name">{title}</h1>
+<div class="info-panel"><div class="info-panel__left-content"><span>Research Article</span></div>
+<div class="info-panel__right-content">
+<div class="info-panel__formats info-panel__item"><a href="/doi/epdf/{doi}" aria-label="PDF" title="PDF"><i class="icon-pdf"></i></a></div></div></div>
+</div></header>
+<section id="abstract"><h2>Abstract</h2>{paragraphs}</section>
+</article></div></main></body></html>"""
+
+
+def render_epdf_page(corpus: SyntheticCorpus, index: int) -> str:
+    doi = corpus.doi(index)
+    return f"""<!DOCTYPE html><html><head><title>ePDF</title></head><body>
+<div id="app-navbar"><div class="btn-group navbar-left"><a href="/doi/{doi}">Back</a></div>
+<div class="btn-group navbar-right"><div class="grouped left"><a href="#print">Print</a></div>
+<div class="grouped right"><a href="/doi/pdf/{doi}?download=true" title="Download"><span class="icon material-icons">file_download</span></a></div></div></div>
+<div id="viewer"><div class="page" data-page="0"><canvas></canvas></div></div>
+</body></html>"""
+
+
+class MockScienceServer:
+    """模拟站点，start() 在后台线程中提供服务"""
+
+    def __init__(self, corpus: SyntheticCorpus, faults: Optional[FaultInjector] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.corpus = corpus
+        self.faults = faults or FaultInjector()
+        self.stats = MockStats()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockScienceServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-science", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                self._dispatch(head=True)
+
+            def do_GET(self):
+                self._dispatch(head=False)
+
+            def _dispatch(self, head: bool):
+                parts = urlsplit(self.path)
+                if parts.path == "/__stats":
+                    self._send(200, json.dumps(server.stats.snapshot()).encode("utf-8"), "application/json")
+                    return
+                kind, index = self._route(parts.path)
+                if kind is None:
+                    server.stats.record("other", "not_found")
+                    self._send(404, b"Not Found", "text/plain")
+                    return
+
+                time.sleep(server.faults.delay())
+                fault = server.faults.decide(kind, self.path)
+                if fault == "forbidden":
+                    server.stats.record(kind, "forbidden")
+                    self._send(403, _FORBIDDEN_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+                    return
+                if fault == "captcha":
+                    server.stats.record(kind, "captcha")
+                    self._send(200, _CAPTCHA_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+                    return
+
+                if kind == "search":
+                    body = render_search_page(server.corpus, parts.path, dict(parse_qsl(parts.query))).encode("utf-8")
+                elif kind == "detail":
+                    body = render_detail_page(server.corpus, index).encode("utf-8")
+                elif kind == "epdf":
+                    body = render_epdf_page(server.corpus, index).encode("utf-8")
+                else:
+                    body = server.corpus.pdf_bytes(index)
+                content_type = "application/pdf" if kind == "pdf" else "text/html; charset=utf-8"
+
+                status = 200
+                content_range = None
+                range_header = self.headers.get("Range", "")
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header.strip())
+                if kind == "pdf" and match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+                    content_range = f"bytes {start}-{end}/{len(body)}"
+                    body = body[start:end + 1]
+                    status = 206
+
+                if head:
+                    server.stats.record(kind, "ok")
+                    self._send(status, b"", content_type, content_length=len(body), content_range=content_range)
+                elif fault == "truncate":
+                    server.stats.record(kind, "truncated", len(body) // 2)
+                    self._send(status, body[:len(body) // 2], content_type, content_length=len(body),
+                               content_range=content_range)
+                    self._abort()
+                else:
+                    server.stats.record(kind, "partial" if status == 206 else "ok", len(body))
+                    self._send(status, body, content_type, content_range=content_range)
+
+            def _route(self, path: str):
+                if path == "/action/doSearch":
+                    return "search", None
+                match = _DOI_PATH.match(path)
+                if not match:
+                    return None, None
+                index = server.corpus.index_of(match.group(2))
+                if index is None:
+                    return None, None
+                return {"epdf": "epdf", "pdf": "pdf"}.get(match.group(1), "detail"), index
+
+            def _send(self, status: int, body: bytes, content_type: str, content_length: Optional[int] = None,
+                      content_range: Optional[str] = None):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body) if content_length is None else content_length))
+                    if content_range:
+                        self.send_header("Content-Range", content_range)
+                    self.end_headers()
+                    if body and self.command != "HEAD":  # HEAD响应带body会破坏keep-alive连接上的下一个响应
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _abort(self):
+                """声明的长度没有发完就断开连接，客户端会读到不完整的响应体"""
+                self.close_connection = True
+                try:
+                    self.wfile.flush()
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+            def log_message(self, format, *args):
+                pass  # 压测时请求量大，不打印访问日志
+
+        return Handler
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """语料规模与故障注入参数（load_harness 复用）"""
+    parser.add_argument("--articles", type=int, default=10000, help="合成语料文章数，默认10000")
+    parser.add_argument("--pdf-kb", type=int, default=256, help="每个PDF的大小（KB），默认256")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="在固定延迟之上追加的随机延迟上限（毫秒）")
+    parser.add_argument("--forbidden-rate", type=float, default=0, help="返回403的比例")
+    parser.add_argument("--captcha-rate", type=float, default=0, help="返回验证码页的比例（仅HTML页面）")
+    parser.add_argument("--truncate-rate", type=float, default=0, help="响应体只发送一半的比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，相同参数下故障序列可复现")
+
+
+def build_server(args, host: str = "127.0.0.1", port: int = 0) -> MockScienceServer:
+    corpus = SyntheticCorpus(size=args.articles, pdf_size=args.pdf_kb * 1024, seed=args.seed)
+    faults = FaultInjector(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, forbidden_rate=args.forbidden_rate,
+                           captcha_rate=args.captcha_rate, truncate_rate=args.truncate_rate, seed=args.seed)
+    return MockScienceServer(corpus, faults, host=host, port=port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟science.org站点")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = build_server(args, host=args.host, port=args.port).start()
+    print(f"[模拟站点] {server.base_url} 语料{args.articles}篇，Ctrl+C结束")
+    print(f"[模拟站点] 爬虫参数: --base-url {server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.stats.snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+离线微基准测试
+不开浏览器、不连MySQL，在保存的页面和本地SQLite上测量热点路径：
+- 搜索结果页卡片提取（LinkCollector._collect_page_links）
+- 详情页选择器级联（PDFProcessor._find_pdf_page_url，冷/热注册表）
+- 文件MD5流式哈希吞吐（calculate_file_md5，多种大小的合成PDF）
+- DOI查重（逐条 is_doi_exists 与批量 existing_dois）
+- 批量写入（save_articles_to_database）
+
+结果写入 benchmarks/results/latest.json，并与提交在仓库中的 benchmarks/baseline.json 对比，
+超出容差的退化会标出，便于在代码评审中发现。
+
+用法:
+    python -m benchmarks.run                      # 运行并与基线对比
+    python -m benchmarks.run --quick              # 缩小数据规模，适合快速自查
+    python -m benchmarks.run --save-baseline      # 用本次结果更新基线
+    python -m benchmarks.run --fail-on-regression # 有退化时返回非零退出码（用于CI）
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_dom import FakeDriver
+from benchmarks.sqlite_standin import sqlite_mysql
+from src import selector_registry
+from src.database_manager import DatabaseManager
+from src.link_collector import LinkCollector
+from src.pdf_processor import PDFProcessor
+from src.selector_registry import SelectorRegistry
+from src.utils import calculate_file_md5
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_FILE = os.path.join(BENCH_DIR, "results", "latest.json")
+
+SEARCH_URL = "https://www.science.org/action/doSearch?AllField=cell&startPage=0&pageSize=100"
+DETAIL_URL = "https://www.science.org/doi/10.1126/science.abc1000"
+
+# 改版后的详情页：PDF入口换了容器和href，前5个选择器都会落空，只有 a[data-test='pdf-link'] 命中
+_PDF_ENTRY = ('<div class="info-panel__formats info-panel__item"><a href="/doi/epdf/10.1126/science.abc1000" '
+              'aria-label="PDF" title="PDF"><i class="icon-pdf"></i></a></div>')
+_DRIFTED_PDF_ENTRY = ('<div class="article-tools"><a href="/doi/reader/10.1126/science.abc1000" '
+                      'data-test="pdf-link">Download</a></div>')
+
+MB = 1024 * 1024
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def best_per_call(func: Callable, number: int, repeat: int = 3) -> float:
+    """运行repeat轮、每轮number次，返回最快一轮的平均单次耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def result(value: float, unit: str, higher_is_better: bool) -> Dict:
+    return {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better}
+
+
+class BenchmarkSuite:
+    """基准测试集合，数据规模由quick决定"""
+
+    def __init__(self, quick: bool = False):
+        self.quick = quick
+        self.work_dir = tempfile.mkdtemp(prefix="s_crawler_bench_")
+        self.results: Dict[str, Dict] = {}
+        # 共享注册表的统计文件放到临时目录，避免污染仓库根目录的 selector_stats.json
+        selector_registry._registry = self._new_registry()
+
+    def _new_registry(self) -> SelectorRegistry:
+        path = os.path.join(self.work_dir, "selector_stats.json")
+        if os.path.exists(path):
+            os.remove(path)
+        return SelectorRegistry(stats_file=path, autosave_every=0)
+
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Dict]:
+        benches = {
+            "cards": self.bench_card_extraction,
+            "selectors": self.bench_selector_cascade,
+            "md5": self.bench_md5,
+            "dedup": self.bench_dedup,
+            "insert": self.bench_insert,
+        }
+        try:
+            for name, bench in benches.items():
+                if only and name not in only:
+                    continue
+                print(f"[基准] 运行 {name} ...", flush=True)
+                bench()
+        finally:
+            selector_registry._registry = None
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+        return self.results
+
+    # ---- 页面解析 ----
+
+    def bench_card_extraction(self):
+        driver = FakeDriver(load_fixture("search_page.html"), SEARCH_URL)
+        collector = LinkCollector(driver)
+        links = collector._collect_page_links()
+        if len(links) != 100:
+            raise RuntimeError(f"卡片提取结果异常：期望100条，实际{len(links)}条")
+        seconds = best_per_call(collector._collect_page_links, number=2 if self.quick else 5)
+        self.results["card_extraction_page_ms"] = result(seconds * 1000, "ms/page", False)
+        self.results["card_extraction_cards_per_s"] = result(len(links) / seconds, "cards/s", True)
+
+    def bench_selector_cascade(self):
+        number = 20 if self.quick else 100
+        detail = load_fixture("detail_page.html")
+        drifted = detail.replace(_PDF_ENTRY, _DRIFTED_PDF_ENTRY)
+        if drifted == detail:
+            raise RuntimeError("详情页fixture中未找到PDF入口，无法构造改版页面")
+
+        processor = PDFProcessor(FakeDriver(detail, DETAIL_URL))
+        processor.selectors = self._new_registry()
+        if not processor._find_pdf_page_url():
+            raise RuntimeError("详情页未找到PDF入口")
+        seconds = best_per_call(processor._find_pdf_page_url, number)
+        self.results["selector_cascade_hit_ms"] = result(seconds * 1000, "ms/lookup", False)
+
+        # 冷启动：每次查找都用新的注册表，按原始顺序逐个尝试
+        processor = PDFProcessor(FakeDriver(drifted, DETAIL_URL))
+
+        def cold_lookup():
+            processor.selectors = self._new_registry()
+            processor._find_pdf_page_url()
+
+        seconds = best_per_call(cold_lookup, number)
+        self.results["selector_cascade_drifted_cold_ms"] = result(seconds * 1000, "ms/lookup", False)
+
+        # 热启动：注册表已学到命中的选择器，直接排到最前
+        processor.selectors = self._new_registry()
+        for _ in range(5):
+            processor._find_pdf_page_url()
+        seconds = best_per_call(processor._find_pdf_page_url, number)
+        self.results["selector_cascade_drifted_warm_ms"] = result(seconds * 1000, "ms/lookup", False)
+
+    # ---- 文件哈希 ----
+
+    def _synthetic_pdf(self, size: int) -> str:
+        path = os.path.join(self.work_dir, f"synthetic_{size}.pdf")
+        header = b"%PDF-1.4\n"
+        trailer = b"\n%%EOF\n"
+        with open(path, "wb") as f:
+            f.write(header)
+            remaining = size - len(header) - len(trailer)
+            while remaining > 0:
+                chunk = os.urandom(min(remaining, MB))
+                f.write(chunk)
+                remaining -= len(chunk)
+            f.write(trailer)
+        return path
+
+    def bench_md5(self):
+        sizes = {"256k": 256 * 1024, "4m": 4 * MB} if self.quick else \
+            {"256k": 256 * 1024, "4m": 4 * MB, "32m": 32 * MB}
+        for label, size in sizes.items():
+            path = self._synthetic_pdf(size)
+            number = max(1, (16 * MB) // size) if not self.quick else 1
+            seconds = best_per_call(lambda: calculate_file_md5(path), number)
+            self.results[f"md5_{label}_mb_per_s"] = result(size / MB / seconds, "MB/s", True)
+            os.remove(path)
+
+    # ---- 数据库 ----
+
+    def _seed_database(self, path: str, rows: int):
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO science (doi, title, url, downloaded) VALUES (?, ?, ?, 0)",
+            ((f"10.1126/science.seed{i}", f"Seed article {i}", f"https://www.science.org/doi/10.1126/science.seed{i}")
+             for i in range(rows)),
+        )
+        conn.commit()
+        conn.close()
+
+    def bench_dedup(self):
+        rows = 2000 if self.quick else 20000
+        path = os.path.join(self.work_dir, "dedup.sqlite3")
+        with sqlite_mysql(path):
+            self._seed_database(path, rows)
+            dm = DatabaseManager()
+            # 一半命中一半未命中，与增量抓取时的比例相近
+            dois = [f"10.1126/science.seed{i * (rows // 100)}" for i in range(50)] + \
+                   [f"10.1126/science.new{i}" for i in range(50)]
+            if len(dm.existing_dois(dois)) != 50:
+                raise RuntimeError("批量查重结果异常")
+
+            def single():
+                for doi in dois:
+                    dm.is_doi_exists(doi)
+
+            seconds = best_per_call(single, number=1 if self.quick else 3)
+            self.results["dedup_single_lookups_per_s"] = result(len(dois) / seconds, "lookups/s", True)
+            seconds = best_per_call(lambda: dm.existing_dois(dois), number=5 if self.quick else 20)
+            self.results["dedup_batch_lookups_per_s"] = result(len(dois) / seconds, "lookups/s", True)
+
+    def bench_insert(self):
+        batch = 200 if self.quick else 500
+        repeat = 3
+        path = os.path.join(self.work_dir, "insert.sqlite3")
+
+        def make_articles(tag: int, n: int):
+            return [{
+                "doi": f"10.1126/science.r{tag}a{i}",
+                "title": f"Benchmark article {tag}-{i}",
+                "authors": ["A. Author", "B. Author", "C. Author"],
+                "journal": "Science",
+                "abstract": "Synthetic abstract " * 20,
+                "keywords": ["cell", "biology"],
+                "publication_date": "2024-01-01",
+                "url": f"https://www.science.org/doi/10.1126/science.r{tag}a{i}",
+            } for i in range(n)]
+
+        with sqlite_mysql(path):
+            self._seed_database(path, 2000 if self.quick else 20000)
+            dm = DatabaseManager()
+            # 每轮写入一批新DOI，避免后几轮全部被查重跳过
+            batches = [make_articles(tag, batch) for tag in range(repeat)]
+            seconds = best_per_call(lambda: dm.save_articles_to_database(batches.pop()), number=1, repeat=repeat)
+            self.results["insert_rows_per_s"] = result(batch / seconds, "rows/s", True)
+
+
+# ---- 基线对比 ----
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[Dict]:
+    """逐项对比，返回包含变化比例与是否退化的行"""
+    rows = []
+    for name, entry in current.items():
+        base = baseline.get(name)
+        if not base or not base.get("value"):
+            rows.append({"name": name, "value": entry["value"], "unit": entry["unit"],
+                         "baseline": None, "change": None, "regression": False})
+            continue
+        change = (entry["value"] - base["value"]) / base["value"]
+        worse = -change if entry["higher_is_better"] else change
+        rows.append({"name": name, "value": entry["value"], "unit": entry["unit"], "baseline": base["value"],
+                     "change": change, "regression": worse > tolerance})
+    return rows
+
+
+def print_report(rows: List[Dict]):
+    print(f"\n{'指标':<36}{'本次':>12}{'基线':>12}{'变化':>9}  单位")
+    for row in rows:
+        baseline = f"{row['baseline']:.4g}" if row["baseline"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        flag = "  <-- 退化" if row["regression"] else ""
+        print(f"{row['name']:<36}{row['value']:>12.4g}{baseline:>12}{change:>9}  {row['unit']}{flag}")
+
+
+def write_json(path: str, data: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def run_suite(quick: bool = False, only: Optional[List[str]] = None) -> Dict:
+    results = BenchmarkSuite(quick=quick).run(only)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线微基准测试")
+    parser.add_argument("--quick", action="store_true", help="缩小数据规模快速运行")
+    parser.add_argument("--only", nargs="+", choices=["cards", "selectors", "md5", "dedup", "insert"],
+                        help="只运行指定的基准")
+    parser.add_argument("--output", default=RESULTS_FILE, help="本次结果输出路径")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的退化比例，默认0.25")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有退化时以退出码1结束")
+    args = parser.parse_args(argv)
+
+    report = run_suite(quick=args.quick, only=args.only)
+    write_json(args.output, report)
+    print(f"[基准] 结果已写入 {args.output}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    rows = compare(report["results"], baseline, args.tolerance)
+    print_report(rows)
+
+    if args.save_baseline:
+        write_json(args.baseline, report)
+        print(f"\n[基准] 基线已更新: {args.baseline}")
+        return 0
+
+    regressions = [row["name"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n[基准] {len(regressions)}项超出容差{args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+MySQL的SQLite替身
+提供与 pymysql.connect 相同调用方式的连接工厂，把 %s 占位符转换为 ?，
+让 DatabaseManager 的原始代码在本地SQLite文件上运行，用于离线基准测试。
+"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from unittest import mock
+
+import pymysql
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS science (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doi VARCHAR(100) UNIQUE,
+    title VARCHAR(500) NOT NULL,
+    authors TEXT,
+    journal VARCHAR(100) DEFAULT 'Science',
+    journal_info VARCHAR(255),
+    abstract TEXT,
+    keywords TEXT,
+    publication_date DATETIME,
+    url VARCHAR(500) NOT NULL,
+    pdf_url VARCHAR(500),
+    download_path VARCHAR(500),
+    pdf_md5 VARCHAR(32),
+    downloaded INTEGER DEFAULT 0,
+    dl_attempts INTEGER DEFAULT 0,
+    dl_last_error TEXT,
+    pdf_page_url VARCHAR(500),
+    pdf_resolved_at DATETIME,
+    next_attempt_at DATETIME,
+    dl_error_class VARCHAR(16),
+    dl_dead INTEGER DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_science_title ON science(title);
+CREATE INDEX IF NOT EXISTS idx_science_pdf_md5 ON science(pdf_md5);
+CREATE INDEX IF NOT EXISTS idx_pending ON science(downloaded, dl_dead, next_attempt_at);
+"""
+
+
+_COLUMN_COMMENT = re.compile(r" COMMENT '[^']*'")
+
+
+class _Cursor:
+    def __init__(self, cursor: sqlite3.Cursor, as_dict: bool):
+        self._cursor = cursor
+        self._as_dict = as_dict
+
+    def execute(self, sql, params=()):
+        sql = sql.replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP").replace("DROP TEMPORARY", "DROP")
+        sql = _COLUMN_COMMENT.sub("", sql)  # SQLite不支持列注释（ALTER TABLE ... COMMENT '...'）
+        return self._cursor.execute(sql, tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        sql = sql.replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP")
+        return self._cursor.executemany(sql, [tuple(params) for params in seq_params])
+
+    def _convert(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path)
+
+    def cursor(self, cursor_class=None):
+        as_dict = cursor_class is not None and issubclass(cursor_class, pymysql.cursors.DictCursorMixin)
+        return _Cursor(self._conn.cursor(), as_dict)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def create_database(path: str, schema: str = SCHEMA):
+    """在path创建science表"""
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    conn.commit()
+    conn.close()
+
+
+@contextmanager
+def sqlite_mysql(path: str, schema: str = SCHEMA):
+    """在with块内把 pymysql.connect 替换为连接到SQLite文件path（schema 可换成旧版表结构）"""
+    create_database(path, schema)
+    with mock.patch.object(pymysql, "connect", lambda **kwargs: _Connection(path)):
+        yield path
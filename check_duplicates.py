@@ -1,60 +1,168 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-检查文章标题是否有重复
+check_duplicates.py
+
+基于 MinHash + LSH 的标题近似重复检查（索引见 src/near_dup.py）。
+
+使用方法：
+    python check_duplicates.py build [--workers 4] [--abstract] [--rebuild]
+    python check_duplicates.py update [--workers 4]
+    python check_duplicates.py query "Ferromagnetism in magic-angle graphene"
+    python check_duplicates.py report [--output duplicates.json]
+
+# 全表构建索引（进程池并行计算签名）；--abstract 把摘要也并入签名
+python check_duplicates.py build --workers 8
+
+# 只把上次构建之后新入库的文章加入索引
+python check_duplicates.py update
+
+# 查询一个标题的近似重复（大小写、标点、Erratum:/Correction: 前缀都不影响）
+python check_duplicates.py query "Erratum: Ferromagnetism in Magic-Angle Graphene"
+
+# 列出全部近似重复簇，写成JSON
+python check_duplicates.py report --output duplicates.json
 """
 
-def check_duplicates():
-    """检查文章标题是否有重复"""
-    
-    # 从日志中提取的文章标题
-    titles = [
-        "In situ manipulation of van der Waals heterostructures for twistronics",
-        "Mapping twist-tuned multiband topology in bilayer WSe2",
-        "Ferromagnetism in magic-angle graphene",
-        "Moiré photonics and optoelectronics",
-        "Programming twist angle and strain profiles in 2D materials",
-        "Time-reversal symmetry breaking superconductivity between twisted cuprate superconductors",
-        "Direct visualization of magnetic domains and moiré magnetism in twisted 2D magnets",
-        "Abnormal conductivity in low-angle twisted bilayer graphene",
-        "Anomalous superconductivity in twisted MoTe2 nanojunctions",
-        "A quantum ruler for orbital magnetism in moiré quantum matter"
-    ]
-    
-    print(f"总文章数: {len(titles)}")
-    print()
-    
-    # 检查重复
-    duplicates = []
-    seen = set()
-    for title in titles:
-        if title in seen:
-            duplicates.append(title)
-        else:
-            seen.add(title)
-    
-    print(f"重复文章数: {len(duplicates)}")
-    if duplicates:
-        print(f"重复文章: {duplicates}")
-    else:
-        print("没有重复文章")
-    
-    print()
-    print("所有文章标题:")
-    for i, title in enumerate(titles, 1):
-        print(f"{i:2d}. {title}")
-    
-    # 检查是否有相似标题
-    print()
-    print("检查相似标题:")
-    for i, title1 in enumerate(titles):
-        for j, title2 in enumerate(titles[i+1:], i+1):
-            # 计算相似度（简单方法）
-            words1 = set(title1.lower().split())
-            words2 = set(title2.lower().split())
-            similarity = len(words1.intersection(words2)) / len(words1.union(words2))
-            if similarity > 0.5:  # 相似度超过50%
-                print(f"相似度 {similarity:.2f}: '{title1}' vs '{title2}'")
+import argparse
+import json
+import os
+import sys
+import time
+
+import pymysql
+
+from src.config import ScienceConfig
+from src.near_dup import NearDupIndex, build_index
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="标题近似重复索引与检查")
+    p.add_argument("--index", type=str, default=None,
+                   help=f"索引文件（默认 {ScienceConfig.NEAR_DUP_INDEX_FILE}）")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="读取整张 science 表构建索引")
+    b.add_argument("--workers", type=int, default=None, help="计算签名的进程数（默认CPU核数）")
+    b.add_argument("--abstract", action="store_true", help="把摘要的词3-gram并入签名")
+    b.add_argument("--rebuild", action="store_true", help="删除已有索引后重建（可改变 --abstract 等参数）")
+    b.add_argument("--chunk-rows", type=int, default=2000, help="每个进程池任务的行数")
+
+    u = sub.add_parser("update", help="把索引中最大id之后的新文章加入索引")
+    u.add_argument("--workers", type=int, default=None, help="计算签名的进程数（默认CPU核数）")
+    u.add_argument("--chunk-rows", type=int, default=2000, help="每个进程池任务的行数")
+
+    q = sub.add_parser("query", help="查询一个标题的近似重复")
+    q.add_argument("title", help="文章标题")
+    q.add_argument("--abstract", type=str, default=None, help="摘要（索引以 --abstract 构建时才参与比较）")
+    q.add_argument("--threshold", type=float, default=None,
+                   help=f"相似度阈值（默认 {ScienceConfig.NEAR_DUP_THRESHOLD}）")
+    q.add_argument("--limit", type=int, default=5, help="最多返回条数")
+
+    r = sub.add_parser("report", help="列出全部近似重复簇")
+    r.add_argument("--threshold", type=float, default=None,
+                   help=f"相似度阈值（默认 {ScienceConfig.NEAR_DUP_THRESHOLD}）")
+    r.add_argument("--min-size", type=int, default=2, help="只列出至少这么多篇的簇")
+    r.add_argument("--output", type=str, default=None, help="把簇写成JSON文件，不指定则打印")
+    return p.parse_args(argv)
+
+
+def _remove_index(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def run_build(args, path: str) -> int:
+    if args.rebuild:
+        _remove_index(path)
+    index = NearDupIndex(path, use_abstract=args.abstract)
+    try:
+        if len(index):
+            print(f"[near_dup] 索引 {path} 已有 {len(index)} 篇，增量追加请用 update，重建请加 --rebuild")
+            return 2
+        start = time.time()
+        added = build_index(index, workers=args.workers, chunk_rows=args.chunk_rows)
+        print(f"[near_dup] 已索引 {added} 篇，耗时 {time.time() - start:.1f} 秒 -> {path}")
+    finally:
+        index.close()
+    return 0
+
+
+def run_update(args, path: str) -> int:
+    if not os.path.exists(path):
+        print(f"[near_dup] 索引 {path} 不存在，请先运行 build")
+        return 2
+    index = NearDupIndex(path)
+    try:
+        since = index.max_id()
+        start = time.time()
+        added = build_index(index, workers=args.workers, since_id=since, chunk_rows=args.chunk_rows)
+        print(f"[near_dup] id>{since} 新增 {added} 篇，索引共 {len(index)} 篇，耗时 {time.time() - start:.1f} 秒")
+    finally:
+        index.close()
+    return 0
+
+
+def run_query(args, path: str) -> int:
+    if not os.path.exists(path):
+        print(f"[near_dup] 索引 {path} 不存在，请先运行 build")
+        return 2
+    index = NearDupIndex(path)
+    try:
+        start = time.perf_counter()
+        matches = index.query(args.title, args.abstract, threshold=args.threshold, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        index.close()
+    if not matches:
+        print(f"没有近似重复（{elapsed:.2f} ms）")
+        return 0
+    print(f"找到 {len(matches)} 篇近似重复（{elapsed:.2f} ms）:")
+    for m in matches:
+        print(f"  {m['score']:.3f}  id={m['id']}  doi={m['doi'] or '-'}  {m['title']}")
+    return 0
+
+
+def run_report(args, path: str) -> int:
+    if not os.path.exists(path):
+        print(f"[near_dup] 索引 {path} 不存在，请先运行 build")
+        return 2
+    index = NearDupIndex(path)
+    try:
+        total = len(index)
+        clusters = index.clusters(threshold=args.threshold, min_size=args.min_size)
+    finally:
+        index.close()
+    duplicates = sum(len(c) - 1 for c in clusters)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"indexed": total, "clusters": clusters}, f, ensure_ascii=False, indent=2)
+        print(f"[near_dup] {total} 篇中有 {len(clusters)} 个近似重复簇（多余 {duplicates} 篇），已写入 {args.output}")
+        return 0
+    print(f"总文章数: {total}")
+    print(f"近似重复簇: {len(clusters)}（多余 {duplicates} 篇）")
+    for i, cluster in enumerate(clusters, 1):
+        print()
+        print(f"簇 {i}（{len(cluster)} 篇）:")
+        for doc in cluster:
+            print(f"  id={doc['id']}  doi={doc['doi'] or '-'}  {doc['title']}")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    path = args.index or ScienceConfig.NEAR_DUP_INDEX_FILE
+    handlers = {"build": run_build, "update": run_update, "query": run_query, "report": run_report}
+    try:
+        return handlers[args.command](args, path)
+    except pymysql.MySQLError as e:
+        print(f"[near_dup] 数据库错误: {e}")
+        return 1
+
 
 if __name__ == "__main__":
-    check_duplicates() 
\ No newline at end of file
+    sys.exit(main())
@@ -7,41 +7,83 @@ collect_meta.py
 并写入数据库，字段 downloaded 默认 0。该脚本不下载 PDF，只负责元数据采集。
 
 使用方法：
-    python collect_meta.py [--max N] [--query SEARCH_URL]
+    python collect_meta.py [--max N] [--query SEARCH_URL] [--resume] [--incremental] [--profile]
 
 如果不提供 --query，则使用 config.ScienceConfig.SEARCH_URL。
+每抓完一页都会写入断点（checkpoints/），中途崩溃后加 --resume 可从上次停下的页继续。
+--incremental 按发表时间从新到旧抓取，按DOI跳过已入库文章，翻过高水位回看窗口即停止，适合每日刷新。
 # 默认配置
 python collect_meta.py
 
 # 指定最大 500 条、改用自定义搜索 URL
 python collect_meta.py --max 500 --query "https://www.science.org/action/doSearch?AllField=quantum"
+
+# 每日增量刷新
+python collect_meta.py --incremental
+
+# 按年份分片，3 个浏览器（端口 9222~9224）并发抓取
+python collect_meta.py --shard --shard-workers 3
+
+# 按阶段剖析CPU与内存，报告写入 profiles/collect_meta_<时间>/
+python collect_meta.py --profile --profile-memory
 """
 
 import argparse
 import sys
-from typing import List, Dict
+from typing import List, Optional
 
 from src.driver_manager import DriverManager
 from src.link_collector import LinkCollector
 from src.database_manager import DatabaseManager
+from src.models.article import Article
 from src.config import ScienceConfig
+from src.checkpoint import CrawlCheckpoint
+from src.query_planner import QueryPlanner, crawl_shards
+from src.watermark import QueryWatermark, newest_first_url
+from src.utils.log_utils import setup_logging
+from src.metrics import start_metrics
+from src.profiling import get_profiler, start_profiling
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Collect metadata from Science search pages")
     parser.add_argument("--max", type=int, default=None, help="Maximum records to collect (override config.MAX_COUNT)")
     parser.add_argument("--query", type=str, default=None, help="Search url to start with")
-    return parser.parse_args()
+    parser.add_argument("--resume", action="store_true", help="Resume from the last checkpoint of this query")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Local /metrics port (override config.METRICS_PORT, 0 disables)")
+    parser.add_argument("--log-level", type=str, default=None, help="Log level DEBUG/INFO/WARNING (override config.LOG_LEVEL)")
+    parser.add_argument("--base-url", type=str, default=None, help="Site root, e.g. a local mock server (override config.BASE_URL)")
+    parser.add_argument("--profile", action="store_true", help="Profile each stage with cProfile, reports go to config.PROFILE_DIR")
+    parser.add_argument("--profile-memory", action="store_true", help="Also take tracemalloc snapshots at stage boundaries (implies --profile)")
+    parser.add_argument("--incremental", action="store_true", help="Newest-first crawl that stops at the first fully known page")
+    parser.add_argument("--shard", action="store_true", help="Split the query into year/month shards and crawl them concurrently")
+    parser.add_argument("--shard-threshold", type=int, default=None, help="Max results per shard (override config.SHARD_MAX_RESULTS)")
+    parser.add_argument("--shard-workers", type=int, default=1, help="Browsers used for shards (debug ports CHROME_DEBUG_PORT+i)")
+    args = parser.parse_args()
+    if args.incremental and args.shard:
+        parser.error("--incremental cannot be combined with --shard")
+    return args
 
 
 def main():
     args = parse_args()
+    setup_logging(args.log_level)
+    metrics = start_metrics(port=args.metrics_port)
+    if args.profile or args.profile_memory:
+        start_profiling("collect_meta", memory=args.profile_memory)
+    profiler = get_profiler()
 
     # Override config if CLI provides values
     if args.max:
         ScienceConfig.MAX_COUNT = args.max
     if args.query:
         ScienceConfig.SEARCH_URL = args.query
+    if args.base_url:
+        ScienceConfig.set_base_url(args.base_url)
+
+    if not DatabaseManager().check_schema():
+        print("[collect_meta] 数据库表结构需要升级（python migrate_db.py），退出")
+        sys.exit(1)
 
     # Create driver
     dm = DriverManager()
@@ -49,24 +91,132 @@ def main():
         print("[collect_meta] 无法创建浏览器 driver，退出")
         sys.exit(1)
 
-    # 打开搜索页
-    dm.driver.get(ScienceConfig.SEARCH_URL)
+    exit_code = 0
+    if args.shard:
+        articles, clear_progress, extra_managers, failed_shards = collect_sharded(args, dm)
+        print(f"[collect_meta] 共采集到 {len(articles)} 条元数据")
+        if not articles:
+            clear_progress()
+            if not failed_shards:
+                print("[collect_meta] 未采集到任何新文章")
+        else:
+            with profiler.stage("persist"):
+                saved = save_batch(DatabaseManager(), articles)
+            if saved:
+                clear_progress()
+            else:
+                print("[collect_meta] 部分文章入库失败，保留断点，可用 --resume 重试")
+                exit_code = 1
+        if failed_shards:
+            print(f"[collect_meta] {len(failed_shards)} 个分片抓取失败（{'、'.join(failed_shards)}），"
+                  f"已保留其断点和分片计划，请用 --resume 重新运行")
+            exit_code = 1
+        for manager in extra_managers:
+            manager.close_driver()
+    else:
+        collect_streaming(args, dm)
 
+    dm.close_driver()
+    profiler.finish()
+    metrics.stop(snapshot_path=ScienceConfig.METRICS_SNAPSHOT_FILE or None)
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def save_batch(dbm: DatabaseManager, articles: List[Article], failed_articles: Optional[List[Article]] = None) -> bool:
+    """标记为未下载并写入数据库，有文章写入失败时返回False（失败的文章追加到 failed_articles）"""
+    for art in articles:
+        art.downloaded = False
+        art.dl_attempts = 0
+    return dbm.save_articles_to_database(articles, failed_articles)
+
+
+def collect_streaming(args, dm):
+    """
+    逐页收集并逐页入库：内存占用与抓取总量无关，中途中断时已入库的页不会重抓
+    """
+    watermark = QueryWatermark(ScienceConfig.SEARCH_URL) if args.incremental else None
+    search_url = newest_first_url(ScienceConfig.SEARCH_URL) if watermark else ScienceConfig.SEARCH_URL
+    if watermark and watermark.empty:
+        print("[collect_meta] 该查询尚无高水位，本次按完整抓取处理")
+    # 新高水位单独累积，本次结束后才生效
+    new_watermark = QueryWatermark(ScienceConfig.SEARCH_URL) if watermark else None
+    checkpoint = CrawlCheckpoint(search_url)
+    resume = args.resume and checkpoint.load() is not None
+
+    # 打开搜索页（续爬时由collector直接打开断点记录的页）
+    if not resume:
+        dm.driver.get(search_url)
+
+    dbm = DatabaseManager()
     collector = LinkCollector(dm.driver)
-    articles: List[Dict] = collector.collect_all_links()
-    print(f"[collect_meta] 共采集到 {len(articles)} 条元数据")
-
-    # 入库
-    if articles:
-        dbm = DatabaseManager()
-        for art in articles:
-            art["downloaded"] = 0
-            art["dl_attempts"] = 0
-        dbm.save_articles_to_database(articles)
-    else:
+    profiler = get_profiler()
+    total = 0
+    all_saved = True
+    pages = collector.iter_links(checkpoint=checkpoint, resume=resume, watermark=watermark, batch=True)
+    for page in profiler.iter_stage("collect", pages):
+        failed = []
+        with profiler.stage("persist"):
+            saved = save_batch(dbm, page, failed)
+        # 之前有页入库失败时不再标记，保留失败页的记录供 --resume 重试
+        if saved and all_saved:
+            checkpoint.mark_saved()
+        all_saved = all_saved and saved
+        # 只用新增或已存在的文章推进高水位，写入失败的文章下次不会被当作已知跳过
+        failed_ids = {id(art) for art in failed}
+        stored = [art for art in page if id(art) not in failed_ids]
+        total += len(stored)
+        if new_watermark:
+            new_watermark.update(stored)
+    print(f"[collect_meta] 共采集并入库 {total} 条元数据")
+    if total == 0 and all_saved:
         print("[collect_meta] 未采集到任何新文章")
 
-    dm.close_driver()
+    if new_watermark:
+        # 因 MAX_COUNT 截断或中途取消时只保存DOI，最新日期等翻到结果末尾的运行再推进
+        new_watermark.save(reached_end=all_saved and collector.reached_end)
+    if all_saved:
+        checkpoint.clear()
+    else:
+        print("[collect_meta] 部分文章入库失败，保留断点，可用 --resume 重试")
+
+
+def collect_sharded(args, dm):
+    """
+    分片模式：规划年份/月份分片并用多个浏览器并发抓取
+
+    Returns:
+        (合并去重后的文章, 入库成功后清理断点的函数, 额外创建的DriverManager列表, 抓取失败的分片label)
+    """
+    planner = QueryPlanner(dm.driver, threshold=args.shard_threshold)
+    with get_profiler().stage("plan"):
+        shards = planner.load_or_plan(ScienceConfig.SEARCH_URL, reuse=args.resume)
+
+    drivers = [dm.driver]
+    extra_managers = []
+    for i in range(1, max(1, args.shard_workers)):
+        port = ScienceConfig.CHROME_DEBUG_PORT + i
+        manager = DriverManager()
+        if manager.create_driver(debug_port=port):
+            extra_managers.append(manager)
+            drivers.append(manager.driver)
+        else:
+            print(f"[collect_meta] 端口 {port} 的浏览器不可用，少用一个并发")
+
+    failed_shards: List[str] = []
+    articles = crawl_shards(shards, drivers, resume=args.resume, failed_shards=failed_shards)
+
+    def clear_progress():
+        """只清理抓取完成的分片的断点；有分片失败时分片计划只保留失败的分片，--resume 时只续爬这些分片"""
+        for shard in shards:
+            if shard["label"] not in failed_shards:
+                CrawlCheckpoint(shard["url"]).clear()
+        if failed_shards:
+            planner.save_plan(ScienceConfig.SEARCH_URL, [s for s in shards if s["label"] in failed_shards])
+        else:
+            planner.clear_plan(ScienceConfig.SEARCH_URL)
+
+    return articles, clear_progress, extra_managers, failed_shards
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+corpus.py
+
+science 表语料的批量导出/导入工具。
+
+使用方法：
+    python corpus.py export OUTPUT [--columns doi,title,...] [--since 2020-01-01] [--until 2025-01-01]
+                                   [--journal Science] [--downloaded 1] [--compression gzip]
+    python corpus.py import INPUT [--batch-rows 5000] [--load-data] [--rejects rejects.jsonl] [--dry-run]
+
+# 全量导出为压缩CSV（格式与压缩方式按扩展名推断）
+python corpus.py export exports/science.csv.gz
+
+# 只导出已下载的2024年文章的部分列，JSON Lines
+python corpus.py export exports/2024.jsonl --columns doi,title,authors,abstract --since 2024-01-01 --until 2025-01-01 --downloaded 1
+
+# 列式Parquet（需要 pip install pyarrow），zstd压缩，每个行组5万行
+python corpus.py export exports/science.parquet --compression zstd --chunk-rows 50000
+
+# 导入元数据转储（CSV/JSONL，可带压缩），拒绝的行写入报告
+python corpus.py import 1.csv --rejects rejects.jsonl
+
+# 只检查规范化与去重结果，不写库
+python corpus.py import dump.jsonl.gz --dry-run
+"""
+
+import argparse
+import sys
+
+import pymysql
+
+from src.config import ScienceConfig
+from src.exporter import FORMATS, export_corpus
+from src.importer import CorpusImporter
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="science 表语料导出/导入")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="用服务端游标流式导出为 CSV/JSONL/Parquet")
+    exp.add_argument("output", help="输出文件，如 exports/science.csv.gz、exports/science.parquet")
+    exp.add_argument("--format", choices=FORMATS, default=None, help="导出格式（默认按扩展名推断）")
+    exp.add_argument("--columns", type=str, default=None, help="逗号分隔的列名（默认全部列）")
+    exp.add_argument("--since", type=str, default=None, help="发表日期下限（含），YYYY-MM-DD")
+    exp.add_argument("--until", type=str, default=None, help="发表日期上限（不含），YYYY-MM-DD")
+    exp.add_argument("--journal", type=str, default=None, help="只导出该期刊")
+    exp.add_argument("--downloaded", type=int, choices=(0, 1), default=None, help="1只导出已下载，0只导出未下载")
+    exp.add_argument("--compression", type=str, default=None,
+                     help="CSV/JSONL: gzip/bz2/xz；Parquet: snappy/zstd/gzip/brotli；none表示不压缩（默认按扩展名）")
+    exp.add_argument("--chunk-rows", type=int, default=None,
+                     help=f"每次从游标读取的行数，也是Parquet行组大小（默认 {ScienceConfig.EXPORT_CHUNK_ROWS}）")
+
+    imp = sub.add_parser("import", help="流式规范化、去重后经暂存表批量合并进 science 表")
+    imp.add_argument("input", help="CSV 或 JSONL 文件（可带 .gz/.bz2/.xz）")
+    imp.add_argument("--format", choices=("csv", "jsonl"), default=None, help="文件格式（默认按扩展名推断）")
+    imp.add_argument("--batch-rows", type=int, default=None,
+                     help=f"每次写入暂存表的行数（默认 {ScienceConfig.IMPORT_BATCH_ROWS}）")
+    imp.add_argument("--load-data", action="store_true",
+                     help="用 LOAD DATA LOCAL INFILE 写入暂存表（需要MySQL开启 local_infile）")
+    imp.add_argument("--rejects", type=str, default=None, help="拒绝行报告路径（JSONL）")
+    imp.add_argument("--dry-run", action="store_true", help="只读取、规范化和去重，不写数据库")
+    return p.parse_args(argv)
+
+
+def run_export(args) -> int:
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+    downloaded = None if args.downloaded is None else bool(args.downloaded)
+    try:
+        stats = export_corpus(args.output, fmt=args.format, columns=columns, since=args.since, until=args.until,
+                              journal=args.journal, downloaded=downloaded, compression=args.compression,
+                              chunk_rows=args.chunk_rows)
+    except (ValueError, RuntimeError) as e:
+        print(f"[corpus] 导出失败: {e}")
+        return 2
+    except pymysql.MySQLError as e:
+        print(f"[corpus] 数据库错误: {e}")
+        return 1
+    print(f"[corpus] 导出 {stats['rows']} 行到 {stats['output']}，{stats['bytes'] / 1048576:.1f} MB，"
+          f"耗时 {stats['elapsed']:.1f} 秒（{stats['rows_per_s']:.0f} 行/秒）")
+    return 0
+
+
+def run_import(args) -> int:
+    importer = CorpusImporter(batch_rows=args.batch_rows, load_data=args.load_data,
+                              rejects_path=args.rejects, dry_run=args.dry_run)
+    try:
+        stats = importer.run(args.input, fmt=args.format)
+    except (ValueError, OSError) as e:
+        print(f"[corpus] 导入失败: {e}")
+        return 2
+    except pymysql.MySQLError as e:
+        print(f"[corpus] 数据库错误: {e}")
+        return 1
+    action = "检查" if args.dry_run else "导入"
+    print(f"[corpus] {action}完成：读取 {stats['read']} 行，新增 {stats['inserted']}，库中已存在 {stats['existing']}，"
+          f"文件内重复 {stats['duplicates']}，拒绝 {stats['rejected']}；"
+          f"耗时 {stats['elapsed']:.1f} 秒（{stats['rows_per_s']:.0f} 行/秒）")
+    for reason, count in sorted(stats["reasons"].items(), key=lambda item: -item[1]):
+        print(f"  拒绝原因 {reason}: {count}")
+    if stats["rejected"] and args.rejects:
+        print(f"  拒绝行明细见 {args.rejects}")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    if args.command == "export":
+        return run_export(args)
+    if args.command == "import":
+        return run_import(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
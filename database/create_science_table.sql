@@ -13,6 +13,14 @@ CREATE TABLE IF NOT EXISTS `science` (
   `pdf_url` varchar(500) DEFAULT NULL COMMENT 'PDF下载链接',
   `download_path` varchar(500) DEFAULT NULL COMMENT '本地下载路径',
   `pdf_md5` varchar(32) DEFAULT NULL COMMENT 'PDF文件MD5值',
+  `downloaded` tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否已下载PDF',
+  `dl_attempts` int(11) NOT NULL DEFAULT 0 COMMENT '下载失败次数',
+  `dl_last_error` text COMMENT '最后一次下载失败的错误信息',
+  `pdf_page_url` varchar(500) DEFAULT NULL COMMENT 'ePDF阅读页URL',
+  `pdf_resolved_at` datetime DEFAULT NULL COMMENT 'pdf_url/pdf_page_url 解析时间',
+  `next_attempt_at` datetime DEFAULT NULL COMMENT '下载失败后的下次尝试时间，NULL表示立即',
+  `dl_error_class` varchar(16) DEFAULT NULL COMMENT '最后一次下载失败的类别（transient/throttled/fatal/no_link）',
+  `dl_dead` tinyint(1) NOT NULL DEFAULT 0 COMMENT '失败次数用尽，不再自动重试',
   `created_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
   PRIMARY KEY (`id`),
@@ -20,10 +28,13 @@ CREATE TABLE IF NOT EXISTS `science` (
   KEY `idx_title` (`title`(255)),
   KEY `idx_publication_date` (`publication_date`),
   KEY `idx_created_at` (`created_at`),
-  KEY `idx_pdf_md5` (`pdf_md5`)
+  KEY `idx_pdf_md5` (`pdf_md5`),
+  KEY `idx_pending` (`downloaded`, `dl_dead`, `next_attempt_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Science期刊文章表';
 
 -- 创建索引优化查询性能
 CREATE INDEX idx_science_doi ON science(doi);
 CREATE INDEX idx_science_title ON science(title(255));
 CREATE INDEX idx_science_pdf_md5 ON science(pdf_md5);
+
+-- 已有表升级：运行 python migrate_db.py 补齐新增的列和索引（可重复执行，已存在的列会跳过）
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+dead_letter.py
+
+下载死信管理：pdf_downloader 对同一篇文章的失败次数达到该失败类别的上限（见 config.DL_RETRY_SCHEDULE）
+后标记 dl_dead=1，不再出现在待下载队列中。这里查看死信，并按条件把它们放回队列。
+
+使用方法：
+    python dead_letter.py list [--error-class fatal] [--error-like 403] [--ids 1 2 3] [--limit 50]
+    python dead_letter.py requeue [--error-class no_link] [--error-like 403] [--ids 1 2 3] [--all]
+
+# 各失败类别的死信数量及前50条
+python dead_letter.py list
+
+# 解析器修好后，把“没有解析出PDF链接”的死信放回队列（立即到期，失败次数清零）
+python dead_letter.py requeue --error-class no_link
+
+# 买了订阅之后重试403的记录
+python dead_letter.py requeue --error-like "HTTP 403"
+"""
+
+import argparse
+import sys
+
+import pymysql
+
+from src.database_manager import DatabaseManager
+from src.retry_policy import FATAL, NO_LINK, THROTTLED, TRANSIENT
+from src.utils.log_utils import setup_logging
+
+ERROR_CLASSES = (TRANSIENT, THROTTLED, FATAL, NO_LINK)
+
+
+def _add_filters(p):
+    p.add_argument("--error-class", choices=ERROR_CLASSES, default=None, help="只处理该失败类别")
+    p.add_argument("--error-like", type=str, default=None, help="只处理最后错误信息包含该子串的记录")
+    p.add_argument("--ids", type=int, nargs="+", default=None, help="只处理这些id")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="下载死信查看与重新排队")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    ls = sub.add_parser("list", help="按失败类别统计死信并列出符合条件的记录")
+    _add_filters(ls)
+    ls.add_argument("--limit", type=int, default=50, help="最多列出的条数")
+
+    rq = sub.add_parser("requeue", help="把符合条件的死信放回待下载队列")
+    _add_filters(rq)
+    rq.add_argument("--all", action="store_true", help="不加任何条件，重新排队全部死信")
+    return p.parse_args(argv)
+
+
+def run_list(args, dbm: DatabaseManager) -> int:
+    summary = dbm.dead_letter_summary()
+    if not summary:
+        print("[dead_letter] 没有死信")
+        return 0
+    print("死信数量：" + "，".join(f"{error_class} {count}" for error_class, count in sorted(summary.items())))
+    for row in dbm.fetch_dead_articles(args.error_class, args.error_like, args.ids, args.limit):
+        print(f"ID={row['id']} [{row['dl_error_class'] or '-'} x{row['dl_attempts']}] {row['doi'] or '-'} "
+              f"{row['title']}")
+        print(f"    {row['dl_last_error'] or '-'}")
+    return 0
+
+
+def run_requeue(args, dbm: DatabaseManager) -> int:
+    if not (args.error_class or args.error_like or args.ids or args.all):
+        print("[dead_letter] 请指定 --error-class/--error-like/--ids 之一，或用 --all 重新排队全部死信")
+        return 2
+    count = dbm.requeue_dead_articles(args.error_class, args.error_like, args.ids)
+    print(f"[dead_letter] 已重新排队 {count} 条，下次运行 pdf_downloader.py 时处理")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    dbm = DatabaseManager()
+    if not dbm.check_schema():
+        print("[dead_letter] 数据库表结构需要升级（python migrate_db.py），退出")
+        return 1
+    try:
+        if args.command == "list":
+            return run_list(args, dbm)
+        return run_requeue(args, dbm)
+    except pymysql.MySQLError as e:
+        print(f"[dead_letter] 数据库错误: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+extract_text.py
+
+把已下载文章的PDF提取成逐页文本，写入按 pdf_md5 为键的文本库（见 src/text_extractor.py）。
+只处理库中还没有的文件，可以在每次下载后重复运行。
+
+使用方法：
+    python extract_text.py [--workers 4] [--backend pymupdf|pdfminer] [--limit 1000] [--retry-failed]
+    python extract_text.py --stats
+
+# 用全部CPU核并行提取新下载的PDF（需要 pip install pymupdf 或 pip install pdfminer.six）
+python extract_text.py
+
+# 重试之前解析失败的文件
+python extract_text.py --retry-failed --workers 2
+
+# 查看文本库统计
+python extract_text.py --stats
+"""
+
+import argparse
+import sys
+
+import pymysql
+
+from src.config import ScienceConfig
+from src.text_extractor import BACKENDS, TextStore, extract_texts
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="PDF全文提取")
+    p.add_argument("--store", type=str, default=None, help=f"文本库文件（默认 {ScienceConfig.TEXT_STORE_FILE}）")
+    p.add_argument("--workers", type=int, default=None, help="提取进程数（默认CPU核数）")
+    p.add_argument("--backend", choices=("auto",) + tuple(BACKENDS), default=None,
+                   help=f"PDF解析库（默认 {ScienceConfig.TEXT_EXTRACT_BACKEND}）")
+    p.add_argument("--limit", type=int, default=None, help="本次最多提取的文件数")
+    p.add_argument("--retry-failed", action="store_true", help="重试之前解析失败的文件")
+    p.add_argument("--stats", action="store_true", help="只打印文本库统计")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    store = TextStore(args.store)
+    try:
+        if not args.stats:
+            try:
+                stats = extract_texts(store, workers=args.workers, backend=args.backend,
+                                      retry_failed=args.retry_failed, limit=args.limit)
+            except (ValueError, RuntimeError) as e:
+                print(f"[extract] 提取失败: {e}")
+                return 2
+            except pymysql.MySQLError as e:
+                print(f"[extract] 数据库错误: {e}")
+                return 1
+            print(f"[extract] 使用 {stats['backend']} 提取 {stats['extracted']} 个PDF（{stats['pages']} 页），"
+                  f"失败 {stats['failed']}，已提取跳过 {stats['skipped']}，文件缺失 {stats['missing']}；"
+                  f"耗时 {stats['elapsed']:.1f} 秒（{stats['files_per_s']:.1f} 个/秒，解析累计 {stats['seconds']:.1f} 秒）")
+        total = store.stats()
+    finally:
+        store.close()
+    print(f"[extract] 文本库 {store.path}: {total['files']} 个文件，{total['pages']} 页，{total['chars']} 字符，"
+          f"压缩后 {total['stored_bytes'] / 1048576:.1f} MB，解析失败 {total['failed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
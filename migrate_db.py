@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+migrate_db.py
+
+升级已有的 science 表：补齐 database/create_science_table.sql 中后来新增的列和索引
+（下载状态、PDF链接缓存、下载重新调度与死信）。可重复执行，已存在的列会跳过。
+新建库直接执行 create_science_table.sql 即可，不需要本脚本。
+
+collect_meta.py、science_crawler_main.py、pdf_downloader.py 等启动时会检查表结构，
+缺列时提示先运行本脚本。
+
+使用方法：
+    python migrate_db.py [--check]
+
+# 只检查，缺列时退出码为1
+python migrate_db.py --check
+"""
+
+import argparse
+import sys
+
+import pymysql
+
+from src.database_manager import DatabaseManager
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="升级science表结构（补齐新增列和索引）")
+    p.add_argument("--check", action="store_true", help="只检查缺少的列，不修改表")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    dbm = DatabaseManager()
+    try:
+        if args.check:
+            missing = dbm.missing_columns()
+            if missing:
+                print(f"[migrate_db] 表 {dbm.table_name} 缺少列：{', '.join(missing)}")
+                return 1
+            print(f"[migrate_db] 表 {dbm.table_name} 结构已是最新")
+            return 0
+        added = dbm.migrate_schema()
+    except pymysql.MySQLError as e:
+        print(f"[migrate_db] 数据库错误: {e}")
+        return 1
+    if added:
+        print(f"[migrate_db] 已新增列：{', '.join(added)}")
+    else:
+        print(f"[migrate_db] 表 {dbm.table_name} 结构已是最新，无需升级")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,53 +3,62 @@
 """
 pdf_downloader.py
 
-从数据库中读取 downloaded = 0 的 Science 文章记录，
+从数据库中读取已到期的待下载 Science 文章记录（downloaded = 0、未转入死信、next_attempt_at 已到），
 拼接详情页 URL（https://www.science.org/doi/{doi}），
 调用 PDFProcessor 下载 PDF 并更新下载状态。
+失败的记录按失败类别推迟 next_attempt_at，次数用尽后转入死信，用 dead_letter.py 查看和重新排队。
 
 使用：
     python pdf_downloader.py [--batch 20]
     # 每批 30 条，一共处理 100 条
 python pdf_downloader.py --batch 30 --max 100
+    # 按阶段剖析（解析/下载/MD5/入库），报告写入 profiles/pdf_downloader_<时间>/
+python pdf_downloader.py --profile
 """
 
 import argparse
 import os
 import traceback
-from typing import List, Dict
+from typing import List
 
+from src.browser_session import get_browser_session
 from src.driver_manager import DriverManager
 from src.pdf_processor import PDFProcessor
 from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.config import ScienceConfig
 from src.utils import calculate_file_md5
+from src.utils.log_utils import setup_logging
+from src.metrics import start_metrics
+from src.profiling import get_profiler, start_profiling
 
 
 def parse_args():
     p = argparse.ArgumentParser(description="Download pending PDFs recorded in DB")
     p.add_argument("--batch", type=int, default=20, help="一次处理的记录数")
     p.add_argument("--max", type=int, default=None, help="最多处理多少条（None 表示全部）")
+    p.add_argument("--metrics-port", type=int, default=None, help="本地 /metrics 端口（默认 config.METRICS_PORT，0 表示关闭）")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    p.add_argument("--base-url", type=str, default=None, help="站点根地址，如本地模拟站点（默认 config.BASE_URL）")
+    p.add_argument("--profile", action="store_true", help="按阶段cProfile剖析，报告写入 config.PROFILE_DIR")
+    p.add_argument("--profile-memory", action="store_true", help="同时在阶段边界拍tracemalloc快照（包含 --profile）")
     return p.parse_args()
 
 
-def build_article_dict(row: Dict) -> Dict:
-    """根据数据库行构造 PDFProcessor 需要的 article_info"""
-    url = row.get("url")
-    if not url and row.get("doi"):
-        url = f"https://www.science.org/doi/{row['doi']}"
-    return {
-        "title": row.get("title"),
-        "url": url,
-        "doi": row.get("doi"),
-        "journal": row.get("journal"),
-        "publication_date": row.get("publication_date"),
-        "authors": row.get("authors", "").split(", ") if row.get("authors") else [],
-    }
-
-
 def main():
     args = parse_args()
+    setup_logging(args.log_level)
+    metrics = start_metrics(port=args.metrics_port)
+    if args.base_url:
+        ScienceConfig.set_base_url(args.base_url)
+    if args.profile or args.profile_memory:
+        start_profiling("pdf_downloader", memory=args.profile_memory)
+    profiler = get_profiler()
 
     dbm = DatabaseManager()
+    if not dbm.check_schema():
+        print("[pdf_downloader] 数据库表结构需要升级（python migrate_db.py），退出")
+        return
     total_processed = 0
 
     dm = DriverManager()
@@ -57,32 +66,41 @@ def main():
         print("[pdf_downloader] 无法创建浏览器 driver，退出")
         return
 
+    get_browser_session().attach(dm.driver)
     processor = PDFProcessor(dm.driver)
 
     while True:
-        pending_rows: List[Dict] = dbm.fetch_pending_articles(limit=args.batch)
-        if not pending_rows:
+        with profiler.stage("fetch_pending"):
+            pending: List[Article] = dbm.fetch_pending_articles(limit=args.batch)
+        if not pending:
             print("[pdf_downloader] 没有待下载记录，任务结束")
             break
 
-        for row in pending_rows:
+        for article in pending:
             if args.max and total_processed >= args.max:
                 break
-            article_id = row["id"]
+            article_id = article.id
             try:
-                article_info = build_article_dict(row)
-                print(f"\n=== 开始下载 ID={article_id} DOI={row.get('doi')} ===")
-                result = processor.process_article(article_info)
-                if result and result.get("downloaded"):
-                    pdf_path = result.get("download_path")
+                print(f"\n=== 开始下载 ID={article_id} DOI={article.doi} ===")
+                resolved_at = article.pdf_resolved_at
+                result = processor.process_article(article)
+                if article.pdf_resolved_at != resolved_at:
+                    # 保存新解析（或清除已失效）的链接，下次重试先直接下载，不再渲染详情页和ePDF页
+                    with profiler.stage("persist"):
+                        dbm.save_pdf_link(article_id, article.pdf_url, article.pdf_page_url, article.pdf_resolved_at)
+                if result and result.downloaded:
+                    pdf_path = result.download_path
                     pdf_md5 = None
                     if pdf_path and os.path.exists(pdf_path):
-                        pdf_md5 = calculate_file_md5(pdf_path)
-                    dbm.update_download_status(article_id, True, pdf_path, pdf_md5, None)
+                        with profiler.stage("md5"):
+                            pdf_md5 = calculate_file_md5(pdf_path)
+                    with profiler.stage("persist"):
+                        dbm.update_download_status(article_id, True, pdf_path, pdf_md5, None)
                     print(f"[成功] ID={article_id} 下载完成")
                 else:
-                    dbm.update_download_status(article_id, False, last_error="下载失败或未找到链接")
-                    print(f"[失败] ID={article_id} 下载失败")
+                    error_class, message = processor.failure_of(result)
+                    dbm.update_download_status(article_id, False, last_error=message, error_class=error_class)
+                    print(f"[失败] ID={article_id} {message}（{error_class}）")
             except Exception as e:
                 print(f"[异常] ID={article_id} 处理出错: {e}")
                 traceback.print_exc()
@@ -96,6 +114,8 @@ def main():
             break
 
     dm.close_driver()
+    profiler.finish()
+    metrics.stop(snapshot_path=ScienceConfig.METRICS_SNAPSHOT_FILE or None)
     print(f"[pdf_downloader] 本次共处理 {total_processed} 条记录")
 
 
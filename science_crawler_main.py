@@ -5,6 +5,7 @@ Science期刊爬虫主程序
 使用新的表结构，去掉original_url字段
 """
 
+import argparse
 import time
 import sys
 import os
@@ -20,30 +21,163 @@ from src.driver_manager import DriverManager
 from src.download_manager import DownloadManager
 from src.database_manager import DatabaseManager
 from src.utils.download_utils import download_file  # 新增
+from src.browser_session import get_browser_session
+from src.checkpoint import CrawlCheckpoint
+from src.pdf_processor import PDFProcessor
+from src.pipeline import Pipeline, Stage
+from src.utils.log_utils import get_logger, setup_logging
+from src.metrics import StepTimes, start_metrics
+from src.profiling import get_profiler, start_profiling
+
+import threading
 
 import hashlib
 import random
 
+logger = get_logger(__name__)
+
 # 用户自定义cookie和user-agent
 COOKIES = "MACHINE_LAST_SEEN=2025-07-16T03%3A44%3A40.172-07%3A00;__gads=ID=cfa66b58f227b128:T=1752401220:RT=1752662996:S=ALNI_MaerjnUjKibf-S0HYOSBFPDJEhwcg;cookiePolicy=iaccept;consent={\"Marketing\":true,\"created_time\":\"2025-07-13T10:07:24.745Z\"};MAID=zV5gW1r5p3ESCgsZ80tePw==;__gpi=UID=0000115ee5b17a1d:T=1752401220:RT=1752662996:S=ALNI_MaiLSSFYJFT1hHFVuUaNaaXcOOXdQ;weby_location_cookie={\"location_requires_cookie_consent\":\"true\",\"location_requires_cookie_paywall\":\"false\",\"int\":\"22fb890f-1b07-4380-a472-c8bbb1157f5c\"};s_pltp=www.science.org%2Fdoi%2Fepdf%2F10.1126%2Fscience.abl8371;__cf_bm=DD9RtTzPm8KTr3DXCDw6SRfiWGLFgYQXhNgGKp8ob_Y-1752662680-1.0.1.1-P_DE_N_Pme6b5nBCyDOjHpPRsz2Ek4bq5mbDTJ8YqbBf32rOuM2hbDp9A9w1HhZxsbT5rk47MEO44R4FMSk1Spa_T7g42MasjGzpdQOoPac;__eoi=ID=afe440858526065e:T=1752401220:RT=1752662996:S=AA-AfjaBDP0vNp5CQzIuSJT_0DFS;JSESSIONID=04685CEEF358FA4A0AFAFEF7511AAEB2;s_plt=1.55"
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36"
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Science期刊爬虫：收集链接、下载PDF并入库")
+    parser.add_argument("--resume", action="store_true", help="从上次运行的断点继续收集链接")
+    parser.add_argument("--pipeline", action="store_true", help="流水线模式：收集、解析、下载、入库各阶段并发运行")
+    parser.add_argument("--resolve-workers", type=int, default=None, help="流水线解析阶段并发数（每个worker需要一个调试端口浏览器）")
+    parser.add_argument("--download-workers", type=int, default=None, help="流水线下载阶段并发数")
+    parser.add_argument("--queue-size", type=int, default=None, help="流水线阶段间队列容量")
+    parser.add_argument("--metrics-port", type=int, default=None, help="本地 /metrics 端口（默认 config.METRICS_PORT，0 表示关闭）")
+    parser.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    parser.add_argument("--base-url", type=str, default=None, help="站点根地址，如本地模拟站点（默认 config.BASE_URL）")
+    parser.add_argument("--profile", action="store_true", help="按阶段cProfile剖析，报告写入 config.PROFILE_DIR")
+    parser.add_argument("--profile-memory", action="store_true", help="同时在阶段边界拍tracemalloc快照（包含 --profile）")
+    return parser.parse_args()
+
+def run_pipeline(args, config, driver_manager, checkpoint, resume):
+    """
+    流水线模式：搜索页收集 → 详情页解析 → PDF下载 → 数据库写入
+    
+    各阶段用有界队列连接并发运行，收集使用主浏览器，
+    解析阶段每个worker连接一个独立的调试端口浏览器。
+    
+    Returns:
+        (成功入库的文章数, 收集到的每一篇是否都已入库)
+    """
+    db_manager = DatabaseManager()
+    workers = dict(config.PIPELINE_WORKERS)
+    if args.resolve_workers:
+        workers['resolve'] = args.resolve_workers
+    if args.download_workers:
+        workers['download'] = args.download_workers
+    queue_size = args.queue_size or config.PIPELINE_QUEUE_SIZE
+    
+    path_lock = threading.Lock()
+    
+    def collect():
+        # 逐页产出（已按DOI查重），第1页解析完下游就开始工作
+        # 主浏览器只在收集线程中使用：下载线程遇到401/403时提交刷新请求，由本线程在两条之间执行
+        browser_session = get_browser_session().attach(driver_manager.driver)
+        links = LinkCollector(driver_manager.driver).iter_links(checkpoint=checkpoint, resume=resume)
+        try:
+            for article in links:
+                browser_session.serve_refresh()
+                yield article
+        finally:
+            links.close()
+            browser_session.release()
+    
+    def open_resolver(index):
+        port = config.CHROME_DEBUG_PORT + 1 + index
+        dm = DriverManager()
+        if not dm.create_driver(debug_port=port):
+            raise RuntimeError(f"无法连接端口{port}的浏览器")
+        return dm, PDFProcessor(dm.driver)
+    
+    def close_resolver(context):
+        context[0].close_driver()
+    
+    def resolve(article, context):
+        return context[1].resolve_article(article)
+    
+    def reserve_filepath(title):
+        """在锁内选定不重复的文件名并占位，避免并发下载写同一个文件"""
+        filename = utils.sanitize_filename(title) + ".pdf"
+        name, ext = os.path.splitext(filename)
+        with path_lock:
+            filepath = os.path.join(config.DOWNLOAD_DIR, filename)
+            counter = 1
+            while os.path.exists(filepath):
+                filepath = os.path.join(config.DOWNLOAD_DIR, f"{name}_{counter}{ext}")
+                counter += 1
+            open(filepath, "wb").close()
+        return filepath
+    
+    def download(result, context):
+        time.sleep(random.uniform(config.DOWNLOAD_DELAY_MIN, config.DOWNLOAD_DELAY_MAX))
+        filepath = reserve_filepath(result.title)
+        success = download_file(result.pdf_url, filepath, timeout=30)
+        if success:
+            result.download_path = filepath
+        elif os.path.exists(filepath) and os.path.getsize(filepath) == 0:
+            os.remove(filepath)
+        result.downloaded = success
+        return result
+    
+    def persist(result, context):
+        if result.download_path:
+            result.pdf_md5 = utils.calculate_file_md5(result.download_path)
+        if not result.url:
+            result.url = config.BASE_URL
+        if db_manager.save_articles_to_database([result]):
+            return result
+        return None
+    
+    pipeline = Pipeline(
+        source=collect,
+        stages=[
+            Stage('resolve', resolve, workers=workers['resolve'], queue_size=queue_size,
+                  worker_init=open_resolver, worker_close=close_resolver),
+            Stage('download', download, workers=workers['download'], queue_size=queue_size),
+            Stage('persist', persist, workers=workers['persist'], queue_size=queue_size),
+        ],
+        source_name='collect',
+        report_interval=config.PIPELINE_REPORT_INTERVAL,
+    )
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pipeline.cancel()
+        raise
+    print(pipeline.format_stats())
+    return len(pipeline.results), pipeline.complete
+
 def main():
     """主函数"""
-    import collections
+    args = parse_args()
+    setup_logging(args.log_level)
+    metrics = start_metrics(port=args.metrics_port)
+    if args.profile or args.profile_memory:
+        start_profiling("science_crawler_main", memory=args.profile_memory)
+    profiler = get_profiler()
     print("=" * 60)
     print("Science期刊爬虫 - 新表结构版本")
     print("=" * 60)
     
-    # 记录所有步骤耗时
-    step_times = collections.OrderedDict()
+    # 记录所有步骤耗时（同步到 /metrics 的 crawler_step_seconds）
+    step_times = StepTimes()
     total_start_time = time.time()
     
     # 创建配置
     t0 = time.time()
+    if args.base_url:
+        ScienceConfig.set_base_url(args.base_url)
     config = ScienceConfig()
     config.create_download_dir()
     step_times['配置初始化'] = time.time() - t0
+    if not DatabaseManager().check_schema():
+        print("数据库表结构需要升级（python migrate_db.py），程序退出")
+        return
     
     # 创建driver管理器
     t0 = time.time()
@@ -65,36 +199,64 @@ def main():
         print("\n第一步：收集详情页链接")
         print("-" * 40)
         
-        # 使用driver访问搜索页面
+        checkpoint = CrawlCheckpoint(config.SEARCH_URL)
+        resume = args.resume and checkpoint.load() is not None
+        
+        # 使用driver访问搜索页面（续爬时由collector直接打开断点记录的页）
         t0 = time.time()
-        if driver_manager.driver:
-            driver_manager.driver.get(config.SEARCH_URL)
-            time.sleep(config.SLEEP_TIME)
-        else:
+        if not driver_manager.driver:
             print("Driver未创建成功，程序退出")
             return
+        if not resume:
+            driver_manager.driver.get(config.SEARCH_URL)
+            time.sleep(config.SLEEP_TIME)
         step_times['页面加载'] = time.time() - t0
         
+        if args.pipeline:
+            print("\n流水线模式：收集 → 解析 → 下载 → 入库 并发运行")
+            print("-" * 40)
+            # 不在主线程套一层剖析：cProfile在 Python 3.12+ 同一时刻只能启用一个，外层阶段会挤掉各worker线程的
+            # collect/resolve/download/persist 剖析；流水线总耗时只记墙钟时间
+            t0 = time.time()
+            saved_count, complete = run_pipeline(args, config, driver_manager, checkpoint, resume)
+            step_times['流水线'] = time.time() - t0
+            if complete:
+                checkpoint.clear()
+            else:
+                # 解析/下载/入库失败或某阶段没有可用worker时，未入库的记录只在断点里，保留供 --resume 重试
+                print("部分文章未能入库，保留断点，可用 --resume 重试")
+            print(f"\n成功入库: {saved_count}篇")
+            print(f"数据库中的文章总数：{DatabaseManager().get_article_count()}")
+            total_time = time.time() - total_start_time
+            for k, v in step_times.items():
+                print(f"{k:<20}: {v:.3f} 秒 ({v/total_time*100:.1f}%)")
+            return
+        
+        # 下载共享的浏览器会话：加载上次保存的cookie，过期时才从浏览器重新获取（本线程持有浏览器）
+        get_browser_session().attach(driver_manager.driver)
+        
         # 收集链接
         t0 = time.time()
         collector = LinkCollector(driver_manager.driver)
-        all_articles = collector.collect_all_links()
+        with profiler.stage("collect"):
+            all_articles = collector.collect_all_links(checkpoint=checkpoint, resume=resume)
         step_times['收集详情页链接'] = time.time() - t0
         
         if not all_articles:
             print("没有收集到任何文章链接，程序退出")
+            checkpoint.clear()
             return
         print(f"成功收集到{len(all_articles)}篇文章")
         
         # === 新增：下载前DOI查重 ===
         db_manager = DatabaseManager()
         unique_articles = []
-        for article in all_articles:
-            doi = article.get('doi')
-            if doi and db_manager.is_doi_exists(doi):
-                print(f"已存在（DOI查重）: {article['title']}")
-                continue
-            unique_articles.append(article)
+        with profiler.stage("dedup"):
+            for article in all_articles:
+                if article.doi and db_manager.is_doi_exists(article.doi):
+                    logger.debug("已存在（DOI查重）: %s", article.title, extra={"stage": "collect"})
+                    continue
+                unique_articles.append(article)
         print(f"查重后剩余{len(unique_articles)}篇文章")
         
         # 第二步和第三步合并：逐条处理文章获取PDF链接并立即下载入库
@@ -105,15 +267,13 @@ def main():
         success_count = 0
         
         def process_single_article(result, current_idx, total_count):
-            """处理单篇文章的回调函数"""
+            """处理单篇文章的回调函数：每篇一行INFO日志，字段明细在DEBUG级别"""
             nonlocal success_count
-            print(f"\n=== 处理第 {current_idx}/{total_count} 条 ===")
-            print(f"文章: {result['title']}")
-            print(f"DOI: {result.get('doi', '无')}")
+            extra = {"stage": "download", "doi": result.doi}
             
             # 1. 下载PDF阶段
             try:
-                filename = utils.sanitize_filename(result['title']) + ".pdf"
+                filename = utils.sanitize_filename(result.title) + ".pdf"
                 filepath = os.path.join(config.DOWNLOAD_DIR, filename)
                 
                 # 防止文件名重复
@@ -146,34 +306,28 @@ def main():
                             break
                 
                 if pdf_exists and actual_filepath:
-                    print(f"> 发现已下载的PDF文件: {os.path.basename(actual_filepath)}")
+                    logger.debug("发现已下载的PDF文件: %s", os.path.basename(actual_filepath), extra=extra)
                     download_success = True
                 else:
-                    # 尝试下载
-                    print(f"> 未找到已下载的PDF文件，尝试下载...")
-                    # 检查两个可能的键名
-                    download_link = result.get('pdf_url') or result.get('download_link')
+                    download_link = result.pdf_url
                     if not download_link:
-                        print(f"! 没有PDF下载链接，但将继续处理文章信息")
-                        # 即使没有下载链接，也继续处理
+                        # 即使没有下载链接，也继续处理文章信息
+                        logger.debug("没有PDF下载链接，继续保存文章信息", extra=extra)
                         actual_filepath = None
                         download_success = False
                     else:
-                        # 保存PDF下载链接到结果字典
-                        result['pdf_url'] = download_link
+                        # 重试由共享的重试引擎处理（src/retry_policy.py），这里不再套一层循环
                         download_success = False
-                        for attempt in range(3):
-                            try:
+                        try:
+                            with profiler.stage("download"):
                                 download_success = utils.download_file(download_link, filepath, timeout=30)
-                                if download_success:
-                                    actual_filepath = filepath
-                                    break
-                            except Exception as e:
-                                print(f"下载失败: {str(e)}")
+                            if download_success:
+                                actual_filepath = filepath
+                        except Exception as e:
+                            logger.warning("下载失败: %s", e, extra=extra)
                         
                         if not download_success:
-                            print(f"下载最终失败: {download_link}")
-                            print(f"! PDF下载失败，但将继续处理文章信息")
+                            logger.warning("PDF下载失败，继续保存文章信息: %s", download_link, extra=extra)
                             actual_filepath = None
                 
                 # 2. PDF处理阶段
@@ -183,64 +337,63 @@ def main():
                         import hashlib
                         with open(actual_filepath, "rb") as f:
                             pdf_md5 = hashlib.md5(f.read()).hexdigest()
-                        result['pdf_md5'] = pdf_md5
-                        result['download_path'] = actual_filepath
+                        result.pdf_md5 = pdf_md5
+                        result.download_path = actual_filepath
                     
-                    result['download_success'] = download_success
-                    
-                    # 确保pdf_url键存在（可能是从download_link复制）
-                    if result.get('download_link') and not result.get('pdf_url'):
-                        result['pdf_url'] = result['download_link']
+                    result.downloaded = download_success
                     
                     # 确保必需的URL字段存在
-                    if not result.get('url'):
-                        result['url'] = result.get('detail_url') or result.get('url', 'https://www.science.org')
+                    if not result.url:
+                        result.url = config.BASE_URL
                     
                     # 3. 数据库入库阶段
+                    extra = {"stage": "persist", "doi": result.doi}
                     try:
-                        # 打印完整的文章数据用于调试
-                        print("\n--- 准备保存到数据库的文章数据 ---")
-                        print(f"标题: {result.get('title')}")
-                        print(f"DOI: {result.get('doi')}")
-                        print(f"URL: {result.get('url')}")
-                        print(f"PDF URL: {result.get('pdf_url')}")
-                        print(f"下载路径: {result.get('download_path')}")
-                        print(f"PDF MD5: {result.get('pdf_md5')}")
-                        print(f"作者: {result.get('authors')}")
-                        print(f"摘要: {result.get('abstract', '')[:50]}...")
-                        print("-----------------------------------\n")
+                        logger.debug("准备入库: 标题=%s, DOI=%s, URL=%s, PDF URL=%s, 下载路径=%s, PDF MD5=%s, "
+                                     "作者=%s, 摘要=%s...", result.title, result.doi, result.url, result.pdf_url,
+                                     result.download_path, result.pdf_md5, result.authors,
+                                     (result.abstract or '')[:50], extra=extra)
                         
                         # 确保必要字段存在
-                        if not result.get('title'):
-                            print("× 文章缺少标题，无法保存到数据库")
+                        if not result.title:
+                            logger.error("[%d/%d] 文章缺少标题，无法保存到数据库", current_idx, total_count,
+                                         extra=extra)
                             return
                             
-                        if not result.get('url'):
-                            print("× 文章缺少URL，无法保存到数据库")
+                        if not result.url:
+                            logger.error("[%d/%d] 文章缺少URL，无法保存到数据库", current_idx, total_count,
+                                         extra=extra)
                             return
                         
                         # 保存到数据库
                         from src.database_manager import DatabaseManager
                         db_manager = DatabaseManager()
-                        saved = db_manager.save_articles_to_database([result])
+                        with profiler.stage("persist"):
+                            saved = db_manager.save_articles_to_database([result])
                         if saved:
                             success_count += 1
-                            print(f"√ 文章信息已成功保存到数据库")
+                            logger.info("[%d/%d] 已入库%s: %s", current_idx, total_count,
+                                        "（含PDF）" if download_success else "（无PDF）", result.title, extra=extra)
                         else:
-                            print(f"× 文章信息保存到数据库失败")
+                            logger.error("[%d/%d] 文章保存到数据库失败: %s", current_idx, total_count, result.title,
+                                         extra=extra)
                     except Exception as e:
-                        print(f"数据库保存异常: {str(e)}")
+                        logger.exception("数据库保存异常: %s", e, extra=extra)
                 except Exception as e:
-                    print(f"PDF处理异常: {str(e)}")
+                    logger.exception("PDF处理异常: %s", e, extra=extra)
             except Exception as e:
-                print(f"处理异常: {str(e)}")
-            
-            print(f"第{current_idx}篇文章处理成功")
-            print(f"进度: {current_idx}/{total_count}")
+                logger.exception("处理异常: %s", e, extra=extra)
         
-        # 使用回调函数逐条处理
-        driver_manager.process_articles(unique_articles, callback=process_single_article)
+        # 使用回调函数逐条处理（解析耗时计入process，下载和入库分别计入download/persist）
+        with profiler.stage("process"):
+            driver_manager.process_articles(unique_articles, callback=process_single_article)
         step_times['逐条处理文章'] = time.time() - t0
+        # 只有每一篇都已入库时才清除断点（入库的文章下次会被DOI查重跳过）；
+        # 解析失败、缺少字段或入库失败的文章只在断点里，保留供 --resume 重试
+        if success_count == len(unique_articles):
+            checkpoint.clear()
+        else:
+            print(f"{len(unique_articles) - success_count}篇文章未能入库，保留断点，可用 --resume 重试")
         
         # 第四步：保存到数据库
         print("\n第四步：保存到数据库")
@@ -288,6 +441,8 @@ def main():
         return
     finally:
         driver_manager.close_driver()
+        profiler.finish()
+        metrics.stop(snapshot_path=config.METRICS_SNAPSHOT_FILE or None)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+search_fulltext.py
+
+基于 SQLite FTS5 的本地全文检索（见 src/fulltext_search.py）。正文来自 extract_text.py 写入的文本库。
+
+使用方法：
+    python search_fulltext.py update [--rebuild] [--optimize]
+    python search_fulltext.py query "twisted bilayer graphene" [--limit 10] [--raw]
+    python search_fulltext.py stats
+
+# 提取新下载的PDF后增量更新索引
+python extract_text.py && python search_fulltext.py update
+
+# 检索（词间为AND，结尾*为前缀匹配）
+python search_fulltext.py query "moire superconduct*"
+
+# 直接使用FTS5语法：短语、OR/NOT、NEAR、限定列
+python search_fulltext.py query 'title:graphene AND ("magic angle" OR NEAR(twist strain, 5))' --raw
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pymysql
+
+from src.config import ScienceConfig
+from src.fulltext_search import FullTextIndex, update_index
+from src.text_extractor import TextStore
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="PDF全文检索（SQLite FTS5）")
+    p.add_argument("--index", type=str, default=None,
+                   help=f"全文索引文件（默认 {ScienceConfig.FULLTEXT_INDEX_FILE}）")
+    p.add_argument("--store", type=str, default=None, help=f"文本库文件（默认 {ScienceConfig.TEXT_STORE_FILE}）")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    u = sub.add_parser("update", help="把新提取正文的文章加入索引")
+    u.add_argument("--rebuild", action="store_true", help="清空索引后重建")
+    u.add_argument("--optimize", action="store_true", help="写入后合并索引段")
+
+    q = sub.add_parser("query", help="检索并打印命中文章")
+    q.add_argument("text", help="检索词")
+    q.add_argument("--limit", type=int, default=10, help="返回条数")
+    q.add_argument("--raw", action="store_true", help="按FTS5查询语法原样使用检索词")
+
+    sub.add_parser("stats", help="打印索引规模")
+    return p.parse_args(argv)
+
+
+def run_update(args, index: FullTextIndex) -> int:
+    store_path = args.store or ScienceConfig.TEXT_STORE_FILE
+    if not os.path.exists(store_path):
+        print(f"[fulltext] 文本库 {store_path} 不存在，请先运行 extract_text.py")
+        return 2
+    if args.rebuild:
+        index.clear()
+    store = TextStore(store_path)
+    try:
+        stats = update_index(index, store)
+    finally:
+        store.close()
+    if args.optimize or args.rebuild:
+        index.optimize()
+    print(f"[fulltext] 新索引 {stats['indexed']} 篇，未变化 {stats['unchanged']}，正文未提取 {stats['no_text']}；"
+          f"索引共 {len(index)} 篇，耗时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+def run_query(args, index: FullTextIndex) -> int:
+    start = time.perf_counter()
+    try:
+        results = index.search(args.text, limit=args.limit, raw=args.raw)
+    except ValueError as e:
+        print(f"[fulltext] {e}")
+        return 2
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"命中 {len(results)} 篇（{elapsed:.1f} ms）")
+    for i, row in enumerate(results, 1):
+        print()
+        print(f"{i:2d}. [{row['score']:.2f}] {row['title']}")
+        print(f"    doi={row.get('doi') or '-'}  {row.get('publication_date') or ''}")
+        print(f"    {' '.join(row['snippet'].split())}")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    index = FullTextIndex(args.index)
+    try:
+        if args.command == "update":
+            return run_update(args, index)
+        if args.command == "query":
+            return run_query(args, index)
+        print(f"[fulltext] 索引 {index.path}: {len(index)} 篇")
+        return 0
+    except pymysql.MySQLError as e:
+        print(f"[fulltext] 数据库错误: {e}")
+        return 1
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
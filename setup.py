@@ -41,6 +41,16 @@ setup(
     python_requires=">=3.8",
     install_requires=read_requirements(),
     extras_require={
+        "parquet": [
+            "pyarrow>=12.0.0",
+        ],
+        "pdf": [
+            "pymupdf>=1.23.0",
+        ],
+        "similarity": [
+            "numpy>=1.22.0",
+            "scipy>=1.8.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+similar.py
+
+相似文章查找：TF-IDF稀疏矩阵 + 余弦相似度（见 src/similarity.py，需要 pip install numpy scipy）。
+
+使用方法：
+    python similar.py build [--fulltext] [--rebuild]
+    python similar.py doi 10.1126/science.abc1234 [-k 10]
+    python similar.py text "twist angle disorder in magic-angle graphene" [-k 10]
+
+# 首次全量拟合（标题+摘要）；之后再运行只追加新入库的文章
+python similar.py build
+
+# 把 extract_text.py 提取的正文也并入向量（改变该设置需要 --rebuild）；
+# 之后再运行 build --fulltext 会重新切分后来才下载、提取了正文的文章
+python similar.py build --fulltext --rebuild
+
+# 与某篇文章最相似的10篇
+python similar.py doi 10.1126/science.adf1234
+"""
+
+import argparse
+import sys
+import time
+
+import pymysql
+
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.similarity import SimilarityIndex, build_similarity_index
+from src.utils.log_utils import setup_logging
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="TF-IDF相似文章查找")
+    p.add_argument("--index", type=str, default=None, help=f"索引目录（默认 {ScienceConfig.SIMILARITY_DIR}）")
+    p.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="增量拟合：追加索引中最大id之后的文章")
+    b.add_argument("--fulltext", action="store_true", help="并入文本库中的PDF正文（正文有变化的已索引文章也会更新）")
+    b.add_argument("--rebuild", action="store_true", help="清空后全量拟合（旧文章被删除或修改后使用）")
+
+    d = sub.add_parser("doi", help="与指定DOI最相似的文章")
+    d.add_argument("doi", help="文章DOI")
+    d.add_argument("-k", type=int, default=10, help="返回条数")
+
+    t = sub.add_parser("text", help="与一段文本最相似的文章")
+    t.add_argument("text", help="查询文本，如标题或摘要")
+    t.add_argument("-k", type=int, default=10, help="返回条数")
+    return p.parse_args(argv)
+
+
+def _print_hits(hits, rows):
+    for i, (doc_id, score) in enumerate(hits, 1):
+        row = rows.get(doc_id, {})
+        print(f"{i:2d}. [{score:.3f}] {row.get('title') or '-'}")
+        print(f"    id={doc_id}  doi={row.get('doi') or '-'}")
+
+
+def run_build(args, index: SimilarityIndex) -> int:
+    if index.meta["n_docs"] and not args.rebuild and args.fulltext != index.use_fulltext:
+        print("[similar] 索引的 --fulltext 设置与本次不同，请加 --rebuild 重新拟合")
+        return 2
+    start = time.time()
+    added = build_similarity_index(index, use_fulltext=args.fulltext, rebuild=args.rebuild)
+    print(f"[similar] 新增或更新 {added} 篇，索引共 {len(index)} 篇，词表 {len(index.terms)}，"
+          f"耗时 {time.time() - start:.1f} 秒 -> {index.path}")
+    return 0
+
+
+def run_query(args, index: SimilarityIndex) -> int:
+    if not len(index):
+        print("[similar] 索引为空，请先运行 python similar.py build")
+        return 2
+    manager = DatabaseManager()
+    start = time.perf_counter()
+    if args.command == "doi":
+        results = manager.get_similar_articles(args.doi, args.k)
+        hits = [(row["id"], row["score"]) for row in results]
+        rows = {row["id"]: row for row in results}
+    else:
+        hits = index.similar_to_text(args.text, args.k)
+        rows = manager.get_articles_by_ids([doc_id for doc_id, _ in hits])
+    print(f"找到 {len(hits)} 篇（{(time.perf_counter() - start) * 1000:.1f} ms）")
+    _print_hits(hits, rows)
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    if args.index:
+        ScienceConfig.SIMILARITY_DIR = args.index
+    try:
+        index = SimilarityIndex()
+        if args.command == "build":
+            return run_build(args, index)
+        return run_query(args, index)
+    except RuntimeError as e:
+        print(f"[similar] {e}")
+        return 2
+    except pymysql.MySQLError as e:
+        print(f"[similar] 数据库错误: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+浏览器会话缓存
+下载和直链验证需要带上浏览器的cookie和User-Agent。以前每篇文章都调用一次 driver.get_cookies() 和
+navigator.userAgent（两次WebDriver往返），每次下载新建 requests.Session，keep-alive连接从未复用，
+每次运行还要重新预热会话。这里：
+- 从driver取一次cookie和UA的快照，所有下载线程共享一个带连接池的 requests.Session
+- 只在收到401/403（有最短间隔限制）或快照超过 SESSION_MAX_AGE 时才回浏览器刷新
+- cookie jar 与UA持久化到 SESSION_FILE，下次运行直接加载，无需预热
+- WebDriver不是线程安全的：attach() 的调用线程是浏览器的所有者，只有它直接操作浏览器；
+  其他线程（如流水线下载线程）需要刷新时只提交请求，由所有者在 serve_refresh() 中执行
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import ScienceConfig
+from .metrics import get_metrics
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "session"}
+
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/120.0.0.0 Safari/537.36")
+REFRESH_STATUS = (401, 403)
+
+
+class BrowserSession:
+    """共享的requests会话，cookie与UA来自浏览器快照，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[float] = None,
+                 pool_size: Optional[int] = None):
+        """
+        Args:
+            path: 持久化文件，None表示 SESSION_FILE，空字符串表示不持久化
+            max_age: 快照有效期（秒），None表示 SESSION_MAX_AGE
+            pool_size: 每个主机的keep-alive连接数，None表示 SESSION_POOL_SIZE
+        """
+        self.path = ScienceConfig.SESSION_FILE if path is None else path
+        self.max_age = max_age if max_age is not None else ScienceConfig.SESSION_MAX_AGE
+        pool_size = pool_size or ScienceConfig.SESSION_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = DEFAULT_USER_AGENT
+        self.snapshot_at = 0.0
+        self._driver = None
+        self._owner: Optional[int] = None  # 浏览器所有者线程，None表示没有线程在操作浏览器
+        self._pending: Optional[str] = None  # 其他线程提交、等待所有者执行的刷新原因
+        self._generation = 0  # 每完成一次刷新加1，等待中的线程据此判断请求已被处理
+        self._last_ok = False
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+        self._done = threading.Condition(self._lock)
+        self.refreshes = get_metrics().counter("crawler_session_refresh_total", "从浏览器刷新cookie/UA快照的次数")
+        self.load()
+
+    @property
+    def user_agent(self) -> str:
+        return self.session.headers["User-Agent"]
+
+    def expired(self) -> bool:
+        return not self.snapshot_at or time.time() - self.snapshot_at > self.max_age
+
+    def attach(self, driver) -> "BrowserSession":
+        """
+        登记用于刷新的浏览器，调用线程成为它的所有者；没有可用的快照时立即从它取一次
+
+        每个进程只应在操作该浏览器的线程里调用一次
+        """
+        with self._lock:
+            self._driver = driver
+            self._owner = threading.get_ident()
+            if self.expired():
+                self.refresh("initial")
+        return self
+
+    def release(self):
+        """所有者线程不再操作浏览器时调用：先执行挂起的刷新请求，之后任何线程都可以直接刷新"""
+        with self._lock:
+            if self._owner == threading.get_ident():
+                self.serve_refresh()
+                self._owner = None
+
+    def serve_refresh(self) -> bool:
+        """所有者线程在两次浏览器操作之间调用，执行其他线程提交的刷新请求；没有请求时立即返回"""
+        with self._lock:
+            if self._pending is None or self._owner != threading.get_ident():
+                return False
+            reason, self._pending = self._pending, None
+            return self._refresh_locked(reason)
+
+    def refresh(self, reason: str) -> bool:
+        """
+        从已登记的浏览器重新取cookie和UA（一次get_cookies + 一次执行脚本），成功后写盘
+
+        在非所有者线程中调用时只提交请求，等待所有者执行，最多等 SESSION_REFRESH_WAIT 秒
+        """
+        with self._lock:
+            if self._driver is None:
+                return False
+            if self._owner is None or self._owner == threading.get_ident():
+                return self._refresh_locked(reason)
+            self._last_refresh = time.time()
+            self._pending = self._pending or reason
+            generation = self._generation
+            if not self._done.wait_for(lambda: self._generation != generation,
+                                       timeout=ScienceConfig.SESSION_REFRESH_WAIT):
+                logger.warning("等待浏览器所有者线程刷新会话超时（%s）", reason, extra=_STAGE)
+                return False
+            return self._last_ok
+
+    def _refresh_locked(self, reason: str) -> bool:
+        """在持有锁、且当前线程可以操作浏览器时刷新，并唤醒等待中的线程"""
+        self._last_refresh = time.time()
+        self._pending = None
+        try:
+            cookies = self._driver.get_cookies()
+            user_agent = self._driver.execute_script("return navigator.userAgent;")
+        except Exception as e:
+            logger.warning("从浏览器获取cookie/UA失败: %s", e, extra=_STAGE)
+            ok = False
+        else:
+            self.session.cookies.clear()
+            for c in cookies:
+                self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"),
+                                         expires=c.get("expiry"), secure=c.get("secure", False))
+            if user_agent:
+                self.session.headers["User-Agent"] = user_agent
+            self.snapshot_at = time.time()
+            self.refreshes.inc(reason=reason)
+            logger.info("已从浏览器刷新会话（%s）：%d个cookie", reason, len(cookies),
+                        extra={"stage": "session", "reason": reason, "cookies": len(cookies)})
+            self.save()
+            ok = True
+        self._last_ok = ok
+        self._generation += 1
+        self._done.notify_all()
+        return ok
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        用共享会话发请求：快照过期时先刷新；收到401/403且距上次刷新超过
+        SESSION_REFRESH_MIN_INTERVAL 时刷新后重试一次
+        """
+        if self._driver is not None and self.expired():
+            self.refresh("expired")
+        response = self.session.request(method, url, **kwargs)
+        if (response.status_code in REFRESH_STATUS and self._driver is not None
+                and time.time() - self._last_refresh > ScienceConfig.SESSION_REFRESH_MIN_INTERVAL):
+            if self.refresh(f"http_{response.status_code}"):
+                response.close()
+                response = self.session.request(method, url, **kwargs)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def cookie_dict(self) -> Dict[str, str]:
+        return {c.name: c.value for c in self.session.cookies}
+
+    def load(self) -> bool:
+        """从持久化文件加载cookie与UA，跳过已过期的cookie"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取会话文件失败 %s: %s", self.path, e, extra=_STAGE)
+            return False
+        now = time.time()
+        with self._lock:
+            for c in data.get("cookies", []):
+                if c.get("expires") and c["expires"] < now:
+                    continue
+                self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"),
+                                         expires=c.get("expires"), secure=c.get("secure", False))
+            if data.get("user_agent"):
+                self.session.headers["User-Agent"] = data["user_agent"]
+            self.snapshot_at = data.get("snapshot_at", 0.0)
+        logger.debug("已加载会话文件 %s（%d个cookie）", self.path, len(self.session.cookies), extra=_STAGE)
+        return True
+
+    def save(self):
+        """写入持久化文件（先写临时文件再替换，多进程同时保存也不会留下半个文件）"""
+        if not self.path or not (self.snapshot_at or len(self.session.cookies)):
+            return
+        with self._lock:
+            data = {
+                "user_agent": self.user_agent,
+                "snapshot_at": self.snapshot_at,
+                "cookies": [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+                             "expires": c.expires, "secure": bool(c.secure)} for c in self.session.cookies],
+            }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("保存会话文件失败 %s: %s", self.path, e, extra=_STAGE)
+
+    def close(self):
+        self.save()
+        self.session.close()
+
+
+_session: Optional[BrowserSession] = None
+_session_lock = threading.Lock()
+
+
+def get_browser_session() -> BrowserSession:
+    """进程内共享的浏览器会话；退出时把服务端更新过的cookie写回磁盘"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = BrowserSession()
+            atexit.register(_session.save)
+        return _session
@@ -0,0 +1,97 @@
+"""
+抓取断点记录
+每抓完一页就向JSONL文件追加一条记录（页码、下一页URL、本页新收集的文章），
+浏览器崩溃或卡在验证码时，下次运行可以从上次停下的页继续，不必从第1页重爬。
+"""
+
+import hashlib
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config import ScienceConfig
+from .models.article import Article, dumps, loads
+
+
+class CrawlCheckpoint:
+    """抓取断点，按查询URL区分，追加写入保证崩溃时不损坏已有记录"""
+
+    def __init__(self, query_url: str, checkpoint_dir: Optional[str] = None):
+        """
+        Args:
+            query_url: 搜索查询URL，同一查询共用一个断点文件
+            checkpoint_dir: 断点文件目录，None表示使用配置中的目录
+        """
+        self.query_url = query_url
+        directory = checkpoint_dir or ScienceConfig.CHECKPOINT_DIR
+        os.makedirs(directory, exist_ok=True)
+        key = hashlib.md5(query_url.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, f"crawl_{key}.jsonl")
+
+    def _append(self, entry: Dict):
+        """追加一条记录并落盘"""
+        with open(self.path, "ab") as f:
+            f.write(dumps(entry) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_page(self, page_num: int, next_url: Optional[str], records: List[Article]):
+        """
+        记录一页的抓取结果
+
+        Args:
+            page_num: 刚处理完的页码
+            next_url: 下一页的URL，没有下一页时为None
+            records: 本页新收集（尚未入库）的文章
+        """
+        self._append({
+            "event": "page",
+            "query": self.query_url,
+            "page_num": page_num,
+            "next_url": next_url,
+            "records": [Article.coerce(r).to_dict() for r in records],
+            "time": datetime.now().isoformat(),
+        })
+
+    def mark_done(self):
+        """标记链接收集已结束（之后的记录可直接入库，无需再翻页）"""
+        self._append({"event": "done", "time": datetime.now().isoformat()})
+
+    def mark_saved(self):
+        """标记此前收集的记录都已入库"""
+        self._append({"event": "saved", "time": datetime.now().isoformat()})
+
+    def load(self) -> Optional[Dict]:
+        """
+        读取断点状态
+
+        Returns:
+            {"page_num", "next_url", "records", "done"}，records为Article列表，没有可恢复的进度时返回None
+        """
+        if not os.path.exists(self.path):
+            return None
+        state = {"page_num": 0, "next_url": None, "records": [], "done": False}
+        has_page = False
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    # 崩溃时最后一行可能只写了一半，忽略即可
+                    continue
+                event = entry.get("event")
+                if event == "page":
+                    has_page = True
+                    state["page_num"] = entry["page_num"]
+                    state["next_url"] = entry.get("next_url")
+                    state["records"].extend(Article.from_dict(r) for r in entry.get("records", []))
+                elif event == "saved":
+                    state["records"] = []
+                elif event == "done":
+                    state["done"] = True
+        return state if has_page else None
+
+    def clear(self):
+        """删除断点文件，下次从头开始"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,383 @@
+"""
+多进程集群启动器
+每个worker进程独占一个无头Chrome（独立调试端口和用户目录），主进程负责
+分发待下载记录、监控并重启崩溃的Chrome/worker、汇总结果与日志，并统一写数据库。
+
+用法：
+    python -m src.cluster run --workers 4 [--max 200] [--batch 100]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .config import ScienceConfig
+from .models.article import Article
+from .retry_policy import TRANSIENT
+from .utils.log_utils import forward_logs, get_logger, setup_logging, setup_process_logging
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "cluster"}
+
+
+class ChromeProcess:
+    """单个无头Chrome进程，负责启动、存活检测与重启"""
+
+    def __init__(self, index: int, port: int, profile_dir: str, headless: bool = True):
+        self.index = index
+        self.port = port
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+
+    def start(self, timeout: float = 30) -> bool:
+        """启动Chrome并等待调试端口可连接"""
+        binary = find_chrome_binary()
+        if not binary:
+            logger.error("未找到Chrome可执行文件，请在ScienceConfig.CHROME_BINARY中配置", extra=_STAGE)
+            return False
+        os.makedirs(self.profile_dir, exist_ok=True)
+        cmd = [
+            binary,
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={os.path.abspath(self.profile_dir)}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-gpu",
+            "--disable-dev-shm-usage",
+            "about:blank",
+        ]
+        if self.headless:
+            cmd.insert(1, "--headless=new")
+        if sys.platform.startswith("linux"):
+            cmd.insert(1, "--no-sandbox")
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                logger.error("Chrome[%d] 启动后立即退出，返回码 %s", self.index, self.process.returncode,
+                             extra=_STAGE)
+                return False
+            if _port_open(self.port):
+                logger.info("Chrome[%d] 已启动，端口 %d", self.index, self.port, extra=_STAGE)
+                return True
+            time.sleep(0.2)
+        logger.error("Chrome[%d] 等待调试端口 %d 超时", self.index, self.port, extra=_STAGE)
+        self.stop()
+        return False
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def restart(self) -> bool:
+        self.stop()
+        self.restarts += 1
+        return self.start()
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+def find_chrome_binary() -> Optional[str]:
+    """按配置和常见安装位置查找Chrome"""
+    candidates = [ScienceConfig.CHROME_BINARY] if ScienceConfig.CHROME_BINARY else []
+    candidates += [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    ]
+    for name in candidates:
+        if os.path.isfile(name):
+            return name
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        found = shutil.which(name)
+        if found:
+            return found
+    return None
+
+
+def _port_open(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def _worker_main(index: int, port: int, task_queue, result_queue, log_queue):
+    """
+    worker进程入口：连接本worker的Chrome，逐条解析并下载PDF，计算MD5后回报结果
+
+    结果消息：("start", index, row_id) 表示开始处理；("done", index, result_dict) 表示处理结束
+    """
+    setup_process_logging(log_queue)
+    extra = {"stage": "cluster", "worker": index}
+
+    from .browser_session import get_browser_session
+    from .driver_manager import DriverManager
+    from .pdf_processor import PDFProcessor
+    from .utils import calculate_file_md5
+
+    dm = DriverManager()
+    if not dm.create_driver(debug_port=port):
+        logger.error("无法连接端口 %d 的Chrome，worker退出", port, extra=extra)
+        sys.exit(2)
+    get_browser_session().attach(dm.driver)
+    processor = PDFProcessor(dm.driver)
+    logger.info("worker[%d] 已连接Chrome，端口 %d", index, port, extra=extra)
+
+    try:
+        while True:
+            payload = task_queue.get()
+            if payload is None:
+                break
+            article = Article.from_bytes(payload)
+            resolved_at = article.pdf_resolved_at
+            result_queue.put(("start", index, article.id))
+            start = time.time()
+            result = {"id": article.id, "success": False, "download_path": None,
+                      "pdf_md5": None, "error": None, "elapsed": 0.0}
+            try:
+                processed = processor.process_article(article)
+                if processed and processed.downloaded:
+                    path = processed.download_path
+                    result["success"] = True
+                    result["download_path"] = path
+                    if path and os.path.exists(path):
+                        result["pdf_md5"] = calculate_file_md5(path)
+                else:
+                    result["error_class"], result["error"] = processor.failure_of(processed)
+            except Exception as e:
+                result["error"] = str(e)
+            if article.pdf_resolved_at != resolved_at:  # 新解析或已清除的PDF链接，由主进程保存
+                result["pdf_link"] = (article.pdf_url, article.pdf_page_url, article.pdf_resolved_at)
+            result["elapsed"] = time.time() - start
+            logger.info("worker[%d] ID=%s %s (%.1f秒)", index, article.id, "成功" if result["success"] else "失败",
+                        result["elapsed"], extra=extra)
+            result_queue.put(("done", index, result))
+    finally:
+        dm.close_driver()
+
+
+class Cluster:
+    """集群主进程：管理Chrome与worker进程、分发任务、汇总结果"""
+
+    def __init__(self, workers: int, base_port: Optional[int] = None, profile_dir: Optional[str] = None,
+                 headless: bool = True, max_restarts: int = 5):
+        self.config = ScienceConfig()
+        self.worker_count = workers
+        self.base_port = base_port or self.config.CLUSTER_BASE_PORT
+        self.profile_dir = profile_dir or self.config.CLUSTER_PROFILE_DIR
+        self.headless = headless
+        self.max_restarts = max_restarts
+        ctx = mp.get_context("spawn")
+        self.ctx = ctx
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        self.log_queue = ctx.Queue()
+        self.chromes: List[ChromeProcess] = []
+        self.workers: List[Optional[mp.Process]] = []
+        self.in_flight: Dict[int, Dict] = {}  # worker序号 -> 正在处理的记录
+        self.retried = set()  # 因worker崩溃重新入队过的记录ID
+        self.stats = {"success": 0, "failed": 0, "worker_restarts": 0, "chrome_restarts": 0}
+
+    def _start_worker(self, index: int):
+        p = self.ctx.Process(
+            target=_worker_main,
+            args=(index, self.chromes[index].port, self.task_queue, self.result_queue, self.log_queue),
+            name=f"cluster-worker-{index}",
+            daemon=True,
+        )
+        p.start()
+        self.workers[index] = p
+
+    def start(self) -> bool:
+        """启动全部Chrome与worker，至少一个成功即返回True"""
+        for i in range(self.worker_count):
+            chrome = ChromeProcess(i, self.base_port + i, os.path.join(self.profile_dir, f"worker_{i}"),
+                                   headless=self.headless)
+            self.chromes.append(chrome)
+            self.workers.append(None)
+            if chrome.start():
+                self._start_worker(i)
+        return any(w is not None for w in self.workers)
+
+    def _supervise(self, rows_by_id: Dict[int, Article]) -> List[int]:
+        """
+        检查Chrome和worker存活情况，崩溃时重启，并把未完成的记录重新入队一次
+
+        Returns:
+            第二次仍因崩溃丢失、已直接记为失败的记录ID
+        """
+        given_up = []
+        for i, chrome in enumerate(self.chromes):
+            worker = self.workers[i]
+            chrome_dead = not chrome.is_alive()
+            worker_dead = worker is None or not worker.is_alive()
+            if not (chrome_dead or worker_dead):
+                continue
+            # 先处理崩溃时正在处理的记录，即使这个worker不再重启，记录也不会一直挂在in_flight里
+            lost = self.in_flight.pop(i, None)
+            if lost is not None:
+                row_id = lost["id"]
+                if row_id in self.retried or row_id not in rows_by_id:
+                    self._record({"id": row_id, "success": False, "error": "worker崩溃（已重试）"})
+                    given_up.append(row_id)
+                else:
+                    self.retried.add(row_id)
+                    self.task_queue.put(rows_by_id[row_id].to_bytes())
+            if worker is not None and worker.is_alive():
+                worker.terminate()
+            if chrome.restarts >= self.max_restarts:
+                if worker is not None:
+                    logger.error("worker[%d] 重启次数已达上限%d，不再重启", i, self.max_restarts, extra=_STAGE)
+                    self.workers[i] = None
+                continue
+            if chrome_dead:
+                logger.warning("Chrome[%d] 已退出，正在重启", i, extra=_STAGE)
+                self.stats["chrome_restarts"] += 1
+                if not chrome.restart():
+                    self.workers[i] = None
+                    continue
+            else:
+                logger.warning("worker[%d] 已退出，正在重启", i, extra=_STAGE)
+                chrome.restarts += 1
+            self.stats["worker_restarts"] += 1
+            self._start_worker(i)
+        return given_up
+
+    def _record(self, result: Dict):
+        """主进程统一写入下载结果"""
+        from .database_manager import DatabaseManager
+        dbm = DatabaseManager()
+        if result.get("pdf_link"):
+            dbm.save_pdf_link(result["id"], *result["pdf_link"])
+        if result["success"]:
+            self.stats["success"] += 1
+            dbm.update_download_status(result["id"], True, result.get("download_path"), result.get("pdf_md5"), None)
+        else:
+            self.stats["failed"] += 1
+            dbm.update_download_status(result["id"], False, last_error=result.get("error"),
+                                       error_class=result.get("error_class") or TRANSIENT)
+
+    def run(self, rows: List[Article]) -> Dict:
+        """分发记录（序列化为紧凑字节串）并等待全部完成，返回汇总统计"""
+        rows_by_id = {row.id: row for row in rows}
+        self.stats["success"] = self.stats["failed"] = 0
+        for row in rows:
+            self.task_queue.put(row.to_bytes())
+        remaining = set(rows_by_id)
+        start = time.time()
+        last_check = 0.0
+        last_progress = time.time()
+        while remaining:
+            if not any(w is not None and w.is_alive() for w in self.workers) and \
+                    all(c.restarts >= self.max_restarts for c in self.chromes):
+                logger.error("没有可用的worker，提前结束", extra=_STAGE)
+                break
+            try:
+                kind, index, payload = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                kind = None
+            if kind is not None:
+                last_progress = time.time()
+            elif time.time() - last_progress > self.config.CLUSTER_STALL_TIMEOUT:
+                logger.error("超过%s秒没有任何进展，提前结束", self.config.CLUSTER_STALL_TIMEOUT, extra=_STAGE)
+                break
+            if kind == "start":
+                self.in_flight[index] = {"id": payload}
+            elif kind == "done":
+                self.in_flight.pop(index, None)
+                if payload["id"] in remaining:
+                    remaining.discard(payload["id"])
+                    self._record(payload)
+            if time.time() - last_check > 2:
+                last_check = time.time()
+                remaining.difference_update(self._supervise(rows_by_id))
+        self.stats["elapsed"] = time.time() - start
+        self.stats["unfinished"] = len(remaining)
+        return self.stats
+
+    def stop(self):
+        """通知worker退出并关闭全部Chrome"""
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            if worker is not None:
+                worker.join(timeout=30)
+                if worker.is_alive():
+                    worker.terminate()
+        for chrome in self.chromes:
+            chrome.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.cluster", description="多进程PDF下载集群（每个worker一个无头Chrome）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="启动集群处理数据库中待下载的记录")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="worker进程数（每个一个Chrome）")
+    run.add_argument("--max", type=int, default=None, help="最多处理多少条记录")
+    run.add_argument("--batch", type=int, default=200, help="每次从数据库读取的记录数")
+    run.add_argument("--base-port", type=int, default=None, help="第一个Chrome的调试端口")
+    run.add_argument("--headful", action="store_true", help="显示浏览器窗口（默认无头）")
+    run.add_argument("--log-level", type=str, default=None, help="日志级别 DEBUG/INFO/WARNING（默认 config.LOG_LEVEL）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    from .database_manager import DatabaseManager
+
+    dbm = DatabaseManager()
+    if not dbm.check_schema():
+        return 1
+    cluster = Cluster(args.workers, base_port=args.base_port, headless=not args.headful)
+    listener = forward_logs(cluster.log_queue)
+    total = {"success": 0, "failed": 0, "worker_restarts": 0, "chrome_restarts": 0, "elapsed": 0.0}
+    try:
+        if not cluster.start():
+            logger.error("没有任何worker启动成功，退出", extra=_STAGE)
+            return 1
+        processed = 0
+        seen = set()  # 本次运行已处理过的记录，失败的不在同一次运行中反复处理
+        while args.max is None or processed < args.max:
+            limit = args.batch if args.max is None else min(args.batch, args.max - processed)
+            rows = [row for row in dbm.fetch_pending_articles(limit=limit + len(seen)) if row.id not in seen][:limit]
+            if not rows:
+                logger.info("没有待下载记录，任务结束", extra=_STAGE)
+                break
+            seen.update(row.id for row in rows)
+            stats = cluster.run(rows)
+            for key in ("success", "failed", "elapsed"):
+                total[key] += stats[key]
+            total["worker_restarts"] = stats["worker_restarts"]
+            total["chrome_restarts"] = stats["chrome_restarts"]
+            processed += len(rows)
+            if stats["unfinished"]:
+                break
+    finally:
+        cluster.stop()
+        done = total["success"] + total["failed"]
+        rate = done / total["elapsed"] * 60 if total["elapsed"] else 0.0
+        logger.info("集群结束：成功 %d，失败 %d，worker重启 %d，Chrome重启 %d，吞吐 %.1f 篇/分钟",
+                    total["success"], total["failed"], total["worker_restarts"], total["chrome_restarts"], rate,
+                    extra=_STAGE)
+        listener.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
 import os
+from urllib.parse import urlsplit, urlunsplit
 
 # Science期刊爬虫配置
 class ScienceConfig:
     # 基础配置
+    # 站点根地址：可用环境变量 SCIENCE_BASE_URL 或脚本的 --base-url 指向本地模拟站点（benchmarks/mock_science.py）
+    BASE_URL = "https://www.science.org"
     SEARCH_URL = "https://www.science.org/action/doSearch?AllField=twist+angle+2D+materials&AfterYear=2010&BeforeYear=2025&queryID=54%2F8297718952&startPage=0&pageSize=100"
     DOWNLOAD_DIR = "science_downloads"
     MAX_COUNT = 100  # 最大抓取数量
@@ -24,6 +27,23 @@ class ScienceConfig:
     # Chrome配置
     CHROME_DEBUG_PORT = 9222  # Chrome调试端口
     
+    # 流水线模式配置（science_crawler_main.py --pipeline）
+    # 收集阶段使用CHROME_DEBUG_PORT的浏览器，解析阶段第i个worker连接 CHROME_DEBUG_PORT+1+i
+    # （与 start_chrome_browsers.bat 启动的 9223~9226 端口对应）
+    PIPELINE_WORKERS = {
+        'resolve': 1,  # 详情页解析（每个worker一个浏览器）
+        'download': 5,  # PDF下载线程
+        'persist': 1,  # 数据库写入
+    }
+    PIPELINE_QUEUE_SIZE = 50  # 阶段间队列容量（背压上限）
+    PIPELINE_REPORT_INTERVAL = 30  # 运行中打印各阶段统计的间隔（秒）
+    
+    # 多进程集群配置（python -m src.cluster run --workers N）
+    CHROME_BINARY = None  # Chrome可执行文件路径，None表示自动查找
+    CLUSTER_BASE_PORT = 9300  # 第i个worker的Chrome使用 CLUSTER_BASE_PORT+i
+    CLUSTER_PROFILE_DIR = "chrome_profiles"  # 每个worker独立的用户数据目录
+    CLUSTER_STALL_TIMEOUT = 900  # 超过该秒数没有任何进展时结束本批
+    
     # 数据库配置
     DB_CONFIG = {
         'host': 'localhost',
@@ -34,9 +54,103 @@ class ScienceConfig:
         'port': 3306
     }
     
+    # 断点目录：链接收集每页追加进度，支持 --resume 续爬
+    CHECKPOINT_DIR = "checkpoints"
+    
+    # 查询分片配置（collect_meta.py --shard）
+    SHARD_MAX_RESULTS = 1000  # 单个分片结果数超过该值时继续按年份/月份拆分
+    
+    # 增量抓取配置（collect_meta.py --incremental）
+    WATERMARK_DIR = "watermarks"  # 每个查询的高水位（最新发表日期与最近见过的DOI）
+    WATERMARK_MAX_DOIS = 2000  # 高水位中保留的最近DOI数量
+    WATERMARK_LOOKBACK_DAYS = 30  # 翻到早于 最新发表日期 - 该天数 的整页才停止，覆盖晚收录的文章
+    INCREMENTAL_SORT = ("sortBy", "EPubDate")  # 按发表时间从新到旧排序的URL参数
+    
+    # 日志配置（src/utils/log_utils.setup_logging）
+    LOG_LEVEL = "INFO"  # 逐卡片/逐选择器的耗时明细为DEBUG级别
+    LOG_FILE = "logs/crawler.jsonl"  # JSON-lines结构化日志
+    
+    # 运行指标（src/metrics.py）
+    METRICS_PORT = 9108  # 本地 /metrics 端点端口，0表示不启动
+    METRICS_SNAPSHOT_FILE = "logs/metrics.json"  # 周期性JSON快照，空字符串表示不写
+    METRICS_SNAPSHOT_INTERVAL = 30  # 快照间隔（秒）
+    
+    # 按阶段剖析（src/profiling.py，脚本 --profile / --profile-memory）
+    PROFILE_DIR = "profiles"  # 每次运行写入 profiles/<脚本>_<时间>/
+    PROFILE_TOP_N = 30  # 文本报告列出的函数/分配位置数
+    PROFILE_TRACEMALLOC_FRAMES = 1  # tracemalloc每个分配记录的栈深度，越大开销越高
+    PROFILE_SAMPLE_SECONDS = 10  # 收到SIGUSR1后实时采样的时长（秒）
+    PROFILE_SAMPLE_INTERVAL = 0.005  # 实时采样间隔（秒）
+    
+    # 语料导出/导入（python corpus.py export|import）
+    EXPORT_CHUNK_ROWS = 10000  # 每次从服务端游标取的行数，也是Parquet的行组大小
+    IMPORT_BATCH_ROWS = 5000  # 导入时每次executemany写入暂存表的行数
+    IMPORT_STAGING_TABLE = "science_import_stage"  # 导入暂存表（临时表，连接关闭后自动删除）
+    
+    # 标题近似重复索引（python check_duplicates.py build|update|query|report）
+    NEAR_DUP_INDEX_FILE = "indexes/near_dup.sqlite"
+    NEAR_DUP_NUM_PERM = 64  # MinHash签名长度
+    NEAR_DUP_BANDS = 8  # LSH分段数，命中阈值约为 (1/BANDS)^(BANDS/NUM_PERM)≈0.77
+    NEAR_DUP_SHINGLE = 4  # 标题字符n-gram长度
+    NEAR_DUP_THRESHOLD = 0.8  # 估计Jaccard相似度不低于该值视为近似重复
+    NEAR_DUP_CHECK_ON_SAVE = True  # 索引文件存在时，入库前查询近似重复并把新文章加入索引
+    
+    # PDF全文提取（python extract_text.py）
+    TEXT_STORE_FILE = "indexes/fulltext.sqlite"  # 按pdf_md5存放压缩页文本的文本库
+    TEXT_EXTRACT_BACKEND = "auto"  # pymupdf / pdfminer / auto（优先PyMuPDF）
+    
+    # 全文检索（python search_fulltext.py update|query）
+    FULLTEXT_INDEX_FILE = "indexes/fulltext_fts.sqlite"  # SQLite FTS5索引，行号即science.id
+    FULLTEXT_WEIGHTS = (10.0, 5.0, 1.0)  # BM25中标题、摘要、正文的权重
+    
+    # 相似文章索引（python similar.py build|doi|text，需要 numpy、scipy）
+    SIMILARITY_DIR = "indexes/similarity"  # TF-IDF稀疏矩阵（.npy，查询时内存映射）
+    SIMILARITY_MAX_DF = 0.5  # 出现在超过该比例文章中的词查询时忽略
+    SIMILARITY_QUERY_TERMS = 32  # 每个查询只用权重最高的词数，0表示不限
+    
+    # 浏览器会话缓存（下载共享cookie/UA，跨运行持久化）
+    SESSION_FILE = "sessions/browser_session.json"  # 含cookie，勿提交
+    SESSION_MAX_AGE = 6 * 3600  # 快照超过该秒数后回浏览器刷新
+    SESSION_REFRESH_MIN_INTERVAL = 60  # 因401/403刷新的最短间隔（秒）
+    SESSION_REFRESH_WAIT = 30  # 其他线程等待浏览器所有者线程执行刷新的最长秒数
+    SESSION_POOL_SIZE = 10  # 每个主机的keep-alive连接数
+    
     # 表名
     TABLE_NAME = 'science'
     
+    # 选择器命中率统计文件（跨运行持久化，用于优先尝试历史命中的选择器）
+    SELECTOR_STATS_FILE = "selector_stats.json"
+    SELECTOR_PROBE_EVERY = 20  # 每个分组每命中该次数，额外试一次排在后面的选择器，让死选择器报告有数据（0表示关闭）
+    
+    # PDF直链配置：按DOI拼接PDF地址并验证，命中时跳过详情页和ePDF页
+    DIRECT_PDF_URL = True
+    PDF_URL_TEMPLATES = [
+        "https://www.science.org/doi/pdf/{doi}?download=true",
+        "https://www.science.org/doi/pdf/{doi}",
+    ]
+    PDF_TEMPLATE_STATS_FILE = "pdf_template_stats.json"
+    PDF_VERIFY_TIMEOUT = 15  # 直链验证请求超时（秒）
+    PDF_LINK_TTL = 24 * 3600  # 已保存的PDF链接有效期（秒），重试时在有效期内直接下载，0表示总是重新解析
+    
+    # 下载重试策略（src/retry_policy.py，所有下载共用）
+    RETRY_MAX_ATTEMPTS = 3  # 单次下载最多尝试次数（含首次）
+    RETRY_BASE_DELAY = 1.0  # 退避基数（秒）
+    RETRY_MAX_DELAY = 30.0  # 单次退避上限（秒），Retry-After 超过它时不再等待
+    BREAKER_FAILURE_THRESHOLD = 5  # 同一主机连续可重试失败达到该次数后熔断
+    BREAKER_COOLDOWN = 60  # 熔断冷却时间（秒），之后放行一个探测请求
+    RETRY_BUDGET_RATIO = 0.2  # 重试量最多为首次请求量的该比例
+    RETRY_BUDGET_RESERVE = 10  # 预算令牌上限（允许短时集中重试的次数）
+    
+    # 跨运行的下载重新调度（pdf_downloader 失败后写入 next_attempt_at，次数用尽转为 dead）
+    DL_RETRY_SCHEDULE = {  # 失败类别: (首次重排延迟秒数, 最多尝试次数)
+        "transient": (15 * 60, 8),  # 超时、连接中断、5xx
+        "throttled": (60 * 60, 8),  # 429/503
+        "no_link": (6 * 3600, 4),  # 没有解析出PDF链接
+        "fatal": (24 * 3600, 3),  # 403付费墙、404、响应不是PDF
+    }
+    DL_RETRY_BACKOFF = 4  # 每多失败一次，延迟乘以该倍数
+    DL_RETRY_MAX_DELAY = 7 * 24 * 3600  # 重排延迟上限（秒）
+    
     # 选择器配置
     SELECTORS = {
         'search_cards': ".card.pb-3.mb-4.border-bottom",
@@ -50,4 +164,23 @@ class ScienceConfig:
     @classmethod
     def create_download_dir(cls):
         """创建下载目录"""
-        os.makedirs(cls.DOWNLOAD_DIR, exist_ok=True) 
\ No newline at end of file
+        os.makedirs(cls.DOWNLOAD_DIR, exist_ok=True)
+    
+    @classmethod
+    def rebase_url(cls, url, base_url=None):
+        """把URL的协议和主机换成base_url（默认当前BASE_URL）的，路径和查询参数不变"""
+        base = urlsplit(base_url or cls.BASE_URL)
+        parts = urlsplit(url)
+        return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+    
+    @classmethod
+    def set_base_url(cls, base_url):
+        """切换站点根地址，同时改写搜索URL和PDF直链模板中的站点部分"""
+        base_url = base_url.rstrip("/")
+        cls.SEARCH_URL = cls.rebase_url(cls.SEARCH_URL, base_url)
+        cls.PDF_URL_TEMPLATES = [cls.rebase_url(t, base_url) for t in cls.PDF_URL_TEMPLATES]
+        cls.BASE_URL = base_url
+
+
+if os.environ.get("SCIENCE_BASE_URL"):
+    ScienceConfig.set_base_url(os.environ["SCIENCE_BASE_URL"])
@@ -7,7 +7,7 @@ Science期刊爬虫
 import time
 import random
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -21,6 +21,8 @@ import os
 from pathlib import Path
 import pymysql
 
+from ..config import ScienceConfig
+
 
 class ScienceCrawler:
     """Science期刊爬虫类"""
@@ -47,7 +49,7 @@ class ScienceCrawler:
         self._setup_driver()
         
         # Science基础URL
-        self.base_url = "https://www.science.org"
+        self.base_url = ScienceConfig.BASE_URL
         
     def _setup_logging(self):
         """设置日志"""
@@ -56,6 +58,9 @@ class ScienceCrawler:
         
         self.logger = logging.getLogger('ScienceCrawler')
         self.logger.setLevel(logging.INFO)
+        # logger是全局单例，多次实例化时不重复添加handler（否则每条日志会输出多遍）
+        if self.logger.handlers:
+            return
         
         # 文件处理器
         fh = logging.FileHandler('logs/science_crawler.log', encoding='utf-8')
@@ -165,16 +170,31 @@ class ScienceCrawler:
         Returns:
             文章信息列表
         """
+        return list(self.iter_articles(start_url, max_results=max_results, db_config=db_config))
+    
+    def iter_articles(self, start_url: str, max_results: int = 10, db_config: dict = None,
+                      cancel_event=None) -> Iterator[Dict]:
+        """
+        从指定的搜索结果页开始抓取，每提取到一篇文章就产出，调用方可边抓边处理
+        
+        Args:
+            start_url: 搜索结果页URL
+            max_results: 最大抓取数量
+            db_config: 数据库配置，用于去重
+            cancel_event: threading.Event，被设置后在下一篇文章之前停止
+            
+        Yields:
+            文章信息
+        """
+        count = 0
         try:
             self.logger.info(f"开始从URL抓取: {start_url}")
             self.driver.get(start_url)
             self.random_delay(2.0, 3.0)
             
-            articles = []
-            current_url = start_url
             page = 1
             
-            while len(articles) < max_results:
+            while count < max_results:
                 self.logger.info(f"正在处理第{page}页...")
                 
                 # 等待页面加载
@@ -198,8 +218,11 @@ class ScienceCrawler:
                 
                 # 提取每篇文章的信息
                 for article_elem in article_elements:
-                    if len(articles) >= max_results:
+                    if count >= max_results:
                         break
+                    if cancel_event is not None and cancel_event.is_set():
+                        self.logger.info("抓取已取消")
+                        return
                     
                     try:
                         article_info = self._extract_article_info(article_elem)
@@ -209,8 +232,9 @@ class ScienceCrawler:
                                 self.logger.info(f"文章已存在，跳过: {article_info['title']}")
                                 continue
                             
-                            articles.append(article_info)
-                            self.logger.info(f"成功提取文章 {len(articles)}: {article_info['title']}")
+                            count += 1
+                            self.logger.info(f"成功提取文章 {count}: {article_info['title']}")
+                            yield article_info
                         
                         self.random_delay(0.5, 1.5)
                         
@@ -219,19 +243,17 @@ class ScienceCrawler:
                         continue
                 
                 # 尝试进入下一页
-                if len(articles) < max_results:
+                if count < max_results:
                     if not self._go_to_next_page():
                         self.logger.info("没有更多页面，结束抓取")
                         break
                     page += 1
                     self.random_delay(2.0, 3.0)
             
-            self.logger.info(f"抓取完成，共获取{len(articles)}篇文章")
-            return articles
+            self.logger.info(f"抓取完成，共获取{count}篇文章")
             
         except Exception as e:
             self.logger.error(f"抓取过程出错: {e}")
-            return []
     
     def _extract_article_info(self, article_element) -> Optional[Dict]:
         """提取单篇文章的信息"""
@@ -1,6 +1,35 @@
+import os
+from datetime import datetime, timedelta
 import pymysql
 from typing import List, Dict, Optional
+from functools import partial
+
 from .config import ScienceConfig
+from .metrics import get_metrics
+from .models.article import Article, to_articles
+from .near_dup import get_near_dup_index
+from .retry_policy import TRANSIENT, reschedule_delay
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "persist"}
+_db_timed = partial(get_metrics().timed, "crawler_db_query_seconds", "数据库操作耗时")
+
+# 旧版建表语句之后新增的列（列名, 列定义），按顺序补齐；与 database/create_science_table.sql 保持一致
+UPGRADE_COLUMNS = [
+    ("downloaded", "tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否已下载PDF'"),
+    ("dl_attempts", "int(11) NOT NULL DEFAULT 0 COMMENT '下载失败次数'"),
+    ("dl_last_error", "text COMMENT '最后一次下载失败的错误信息'"),
+    ("pdf_page_url", "varchar(500) DEFAULT NULL COMMENT 'ePDF阅读页URL'"),
+    ("pdf_resolved_at", "datetime DEFAULT NULL COMMENT 'pdf_url/pdf_page_url 解析时间'"),
+    ("next_attempt_at", "datetime DEFAULT NULL COMMENT '下载失败后的下次尝试时间，NULL表示立即'"),
+    ("dl_error_class", "varchar(16) DEFAULT NULL COMMENT '最后一次下载失败的类别（transient/throttled/fatal/no_link）'"),
+    ("dl_dead", "tinyint(1) NOT NULL DEFAULT 0 COMMENT '失败次数用尽，不再自动重试'"),
+]
+# 依赖升级列的索引：其中任一列由本次迁移新增时创建
+UPGRADE_INDEXES = [
+    ("idx_pending", ("downloaded", "dl_dead", "next_attempt_at")),
+]
 
 class DatabaseManager:
     """数据库管理器，负责Science文章数据的存储"""
@@ -9,102 +38,183 @@ class DatabaseManager:
         self.config = ScienceConfig()
         self.table_name = self.config.TABLE_NAME
     
-    def save_articles_to_database(self, articles: List[Dict]) -> bool:
-        """保存文章数据到数据库"""
+    def _columns(self, cursor) -> set:
+        """读取表的列名（LIMIT 0 的结果集描述，MySQL与SQLite通用）"""
+        cursor.execute(f"SELECT * FROM {self.table_name} LIMIT 0")
+        columns = {col[0] for col in cursor.description}
+        cursor.fetchall()
+        return columns
+    
+    def missing_columns(self) -> List[str]:
+        """表中缺少的升级列"""
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor()
+            columns = self._columns(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+        return [name for name, _ in UPGRADE_COLUMNS if name not in columns]
+    
+    def migrate_schema(self) -> List[str]:
+        """
+        为已有的表补齐升级列和索引，可重复执行（已存在的列跳过）
+
+        Returns:
+            本次新增的列名
+        """
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor()
+            columns = self._columns(cursor)
+            added = []
+            for name, definition in UPGRADE_COLUMNS:
+                if name in columns:
+                    continue
+                cursor.execute(f"ALTER TABLE {self.table_name} ADD COLUMN `{name}` {definition}")
+                added.append(name)
+                logger.info("表 %s 已新增列 %s", self.table_name, name, extra=_STAGE)
+            for index, index_columns in UPGRADE_INDEXES:
+                if set(index_columns) & set(added):
+                    cursor.execute(f"CREATE INDEX {index} ON {self.table_name} ({', '.join(index_columns)})")
+                    logger.info("表 %s 已新增索引 %s", self.table_name, index, extra=_STAGE)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        return added
+    
+    def check_schema(self) -> bool:
+        """启动检查：表缺少升级列时记录错误并返回False（否则INSERT全部失败、待下载查询为空）"""
+        try:
+            missing = self.missing_columns()
+        except Exception:
+            logger.exception("读取表 %s 结构失败", self.table_name, extra=_STAGE)
+            return False
+        if missing:
+            logger.error("表 %s 缺少列 %s，请先运行 python migrate_db.py 升级表结构",
+                         self.table_name, ", ".join(missing), extra=_STAGE)
+            return False
+        return True
+    
+    @_db_timed(op="save")
+    def save_articles_to_database(self, articles: List[Article], failed_articles: Optional[List[Article]] = None) -> bool:
+        """
+        保存文章数据到数据库（也接受旧式字典）
+
+        Args:
+            articles: 待保存的文章
+            failed_articles: 传入列表时，写入失败的文章会追加到其中（新增和已存在的不算失败）
+
+        Returns:
+            所有文章都已新增或已存在时返回True，有任何一篇写入失败时返回False
+        """
         if not articles:
-            print("没有文章数据需要保存")
+            logger.debug("没有文章数据需要保存", extra=_STAGE)
             return True
+        articles = to_articles(articles)
+        failures = []
         
         try:
             conn = pymysql.connect(**self.config.DB_CONFIG)
             cursor = conn.cursor()
             
-            print(f"开始保存{len(articles)}篇文章到数据库表 {self.table_name}")
+            logger.debug("开始保存%d篇文章到数据库表 %s", len(articles), self.table_name, extra=_STAGE)
+            saved = skipped = failed = 0
+            near_dup = get_near_dup_index()
+            indexed = []
+            sql = f"""
+            INSERT INTO {self.table_name}
+            ({", ".join(Article.ROW_COLUMNS)})
+            VALUES ({", ".join(["%s"] * len(Article.ROW_COLUMNS))})
+            """
             
             for i, article in enumerate(articles):
                 try:
                     # 检查是否已存在（优先 DOI）
                     # 1. 先按 DOI 去重（只要 DOI 不重复，就允许写入）
-                    if article.get('doi'):
-                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE doi=%s", (article['doi'],))
+                    if article.doi:
+                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE doi=%s", (article.doi,))
                         if cursor.fetchone():
-                            print(f"已存在（DOI）: {article['title']}")
+                            logger.debug("已存在（DOI）: %s", article.title, extra=_STAGE)
+                            skipped += 1
                             continue
                     
                     # 2. 当 DOI 为空时，再按 MD5 查重
-                    if (not article.get('doi')) and article.get('pdf_md5'):
-                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE pdf_md5=%s", (article['pdf_md5'],))
+                    if (not article.doi) and article.pdf_md5:
+                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE pdf_md5=%s", (article.pdf_md5,))
                         if cursor.fetchone():
-                            print(f"已存在（MD5）(无DOI): {article['title']}")
+                            logger.debug("已存在（MD5）(无DOI): %s", article.title, extra=_STAGE)
+                            skipped += 1
                             continue
                     
                     # 3. 若 DOI、MD5 均为空，再按标题查重
-                    if (not article.get('doi')) and (not article.get('pdf_md5')) and article.get('title'):
-                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE title=%s", (article['title'],))
+                    if (not article.doi) and (not article.pdf_md5) and article.title:
+                        cursor.execute(f"SELECT id FROM {self.table_name} WHERE title=%s", (article.title,))
                         if cursor.fetchone():
-                            print(f"已存在（标题）(无DOI/MD5): {article['title']}")
+                            logger.debug("已存在（标题）(无DOI/MD5): %s", article.title, extra=_STAGE)
+                            skipped += 1
                             continue
                     
-                    # 插入新文章
-                    sql = f"""
-                    INSERT INTO {self.table_name}
-                    (doi, title, authors, journal, abstract, keywords, publication_date, 
-                     url, pdf_url, download_path, pdf_md5,
-                     downloaded, dl_attempts, dl_last_error)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                            %s, %s, %s)
-                    """
-                    
-                    # 打印完整的参数值，便于调试
-                    print(f"准备插入文章: {article.get('title')}")
-                    print(f"DOI: {article.get('doi')}")
-                    print(f"URL: {article.get('url')}")
-                    print(f"PDF URL: {article.get('pdf_url')}")
-                    print(f"下载路径: {article.get('download_path')}")
-                    print(f"PDF MD5: {article.get('pdf_md5')}")
+                    # 4. 标题近似重复（大小写、标点、勘误前缀不同）：无DOI/MD5时跳过，有DOI时只记录
+                    if near_dup is not None and article.title:
+                        matches = near_dup.query(article.title, article.abstract, limit=1)
+                        if matches and not article.doi and not article.pdf_md5:
+                            logger.debug("已存在（近似标题 %.2f，id=%s）(无DOI/MD5): %s", matches[0]["score"],
+                                         matches[0]["id"], article.title, extra=_STAGE)
+                            skipped += 1
+                            continue
+                        if matches:
+                            logger.info("疑似重复（近似标题 %.2f）: %s ~ id=%s %s", matches[0]["score"], article.title,
+                                        matches[0]["id"], matches[0]["title"],
+                                        extra={"stage": "persist", "doi": article.doi,
+                                               "near_dup_id": matches[0]["id"]})
                     
-                    cursor.execute(sql, (
-                        article.get('doi'),
-                        article.get('title'),
-                        ', '.join(article.get('authors', [])) if article.get('authors') else None,
-                        article.get('journal', 'Science'),
-                        article.get('abstract'),
-                        ', '.join(article.get('keywords', [])) if article.get('keywords') else None,
-                        article.get('publication_date'),
-                        article.get('url'),
-                        article.get('pdf_url'),
-                        article.get('download_path'),
-                        article.get('pdf_md5'),
-                        article.get('downloaded', 0),
-                        article.get('dl_attempts', 0),
-                        article.get('dl_last_error')
-                    ))
+                    # 插入新文章
+                    cursor.execute(sql, article.to_row())
+                    if near_dup is not None and article.title:
+                        indexed.append((cursor.lastrowid, article))
                     
-                    print(f"保存成功 ({i+1}/{len(articles)}): {article['title']}")
+                    saved += 1
+                    logger.debug("保存成功 (%d/%d): %s", i + 1, len(articles), article.title,
+                                 extra={"stage": "persist", "doi": article.doi, "url": article.url,
+                                        "pdf_url": article.pdf_url, "download_path": article.download_path,
+                                        "pdf_md5": article.pdf_md5})
                     
-                except Exception as e:
-                    print(f"保存文章失败: {article.get('title', 'Unknown')} - {e}")
-                    # 打印更详细的错误信息
-                    import traceback
-                    traceback.print_exc()
+                except Exception:
+                    failed += 1
+                    failures.append(article)
+                    logger.exception("保存文章失败: %s", article.title or 'Unknown', extra=_STAGE)
                     continue
             
             conn.commit()
             cursor.close()
             conn.close()
+            for row_id, article in indexed:
+                near_dup.add(row_id, article.title, article.doi, article.abstract)
             
-            print(f"数据库保存完成，共处理{len(articles)}篇文章")
-            return True
+            logger.info("数据库保存完成，共处理%d篇文章：新增%d，已存在%d，失败%d",
+                        len(articles), saved, skipped, failed,
+                        extra={"stage": "persist", "saved": saved, "skipped": skipped, "failed": failed})
             
-        except Exception as e:
-            print(f"数据库操作失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        except Exception:
+            logger.exception("数据库操作失败", extra=_STAGE)
+            failures = articles
+        
+        if failed_articles is not None:
+            failed_articles.extend(failures)
+        return not failures
 
+    @_db_timed(op="update_status")
     def update_download_status(self, article_id: int, success: bool, download_path: Optional[str] = None,
-                               pdf_md5: Optional[str] = None, last_error: Optional[str] = None):
-        """更新单篇文章的下载状态、路径、MD5 和错误信息"""
+                               pdf_md5: Optional[str] = None, last_error: Optional[str] = None,
+                               error_class: str = TRANSIENT):
+        """
+        更新单篇文章的下载状态、路径、MD5 和错误信息
+
+        失败时按失败类别（retry_policy 的 transient/throttled/fatal/no_link）和累计次数
+        计算 next_attempt_at，该类别次数用尽时标记 dl_dead=1，不再出现在待下载队列中
+        """
         try:
             conn = pymysql.connect(**self.config.DB_CONFIG)
             cursor = conn.cursor()
@@ -112,24 +222,55 @@ class DatabaseManager:
             if success:
                 sql = f"""
                 UPDATE {self.table_name}
-                SET downloaded = 1, download_path = %s, pdf_md5 = %s, dl_last_error = NULL
+                SET downloaded = 1, download_path = %s, pdf_md5 = %s, dl_last_error = NULL,
+                    dl_error_class = NULL, next_attempt_at = NULL
                 WHERE id = %s
                 """
                 cursor.execute(sql, (download_path, pdf_md5, article_id))
             else:
+                cursor.execute(f"SELECT dl_attempts FROM {self.table_name} WHERE id = %s", (article_id,))
+                row = cursor.fetchone()
+                attempts = ((row[0] or 0) if row else 0) + 1
+                delay = reschedule_delay(attempts, error_class)
+                next_attempt_at = datetime.now() + timedelta(seconds=delay) if delay is not None else None
                 sql = f"""
                 UPDATE {self.table_name}
-                SET dl_attempts = dl_attempts + 1, dl_last_error = %s
+                SET dl_attempts = %s, dl_last_error = %s, dl_error_class = %s, next_attempt_at = %s, dl_dead = %s
                 WHERE id = %s
                 """
-                cursor.execute(sql, (last_error[:1000] if last_error else None, article_id))
+                cursor.execute(sql, (attempts, last_error[:1000] if last_error else None, error_class,
+                                     next_attempt_at.replace(microsecond=0) if next_attempt_at else None,
+                                     int(delay is None), article_id))
+                if delay is None:
+                    logger.info("ID=%s 已失败%d次（%s），转入死信", article_id, attempts, error_class,
+                                extra={"stage": "persist", "error_class": error_class, "attempts": attempts})
 
             conn.commit()
             cursor.close()
             conn.close()
         except Exception as e:
             print(f"更新下载状态失败: {e}")
+
+    @_db_timed(op="save_link")
+    def save_pdf_link(self, article_id: int, pdf_url: Optional[str], pdf_page_url: Optional[str] = None,
+                      resolved_at: Optional[datetime] = None):
+        """保存解析出的PDF链接和解析时间（下载失败也保存，重试时先用它）；pdf_url为None表示清除失效链接"""
+        try:
+            conn = pymysql.connect(**self.config.DB_CONFIG)
+            cursor = conn.cursor()
+            sql = f"""
+            UPDATE {self.table_name}
+            SET pdf_url = %s, pdf_page_url = %s, pdf_resolved_at = %s
+            WHERE id = %s
+            """
+            cursor.execute(sql, (pdf_url, pdf_page_url, resolved_at if pdf_url else None, article_id))
+            conn.commit()
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            print(f"保存PDF链接失败: {e}")
     
+    @_db_timed(op="count")
     def get_article_count(self) -> int:
         """获取数据库中的文章总数"""
         try:
@@ -148,6 +289,7 @@ class DatabaseManager:
             print(f"获取文章数量失败: {e}")
             return 0
     
+    @_db_timed(op="search")
     def get_articles_by_keyword(self, keyword: str, limit: int = 10) -> List[Dict]:
         """根据关键词搜索文章"""
         try:
@@ -174,6 +316,64 @@ class DatabaseManager:
             print(f"搜索文章失败: {e}")
             return [] 
 
+    def search_fulltext(self, query: str, limit: int = 10) -> List[Dict]:
+        """全文检索（BM25排序，带高亮片段）；全文索引尚未构建时退回 get_articles_by_keyword"""
+        if not os.path.exists(self.config.FULLTEXT_INDEX_FILE):
+            return self.get_articles_by_keyword(query, limit)
+        from .fulltext_search import FullTextIndex
+        index = FullTextIndex(self.config.FULLTEXT_INDEX_FILE)
+        try:
+            return index.search(query, limit=limit)
+        except Exception as e:
+            print(f"全文检索失败: {e}")
+            return []
+        finally:
+            index.close()
+
+    def get_articles_by_ids(self, ids: List[int]) -> Dict[int, Dict]:
+        """按id批量取文章行，返回 {id: 文章字典}"""
+        if not ids:
+            return {}
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(f"SELECT * FROM {self.table_name} WHERE id IN ({', '.join(['%s'] * len(ids))})", list(ids))
+            rows = {row["id"]: row for row in cursor.fetchall()}
+            cursor.close()
+        finally:
+            conn.close()
+        return rows
+
+    def get_similar_articles(self, doi: str, limit: int = 10) -> List[Dict]:
+        """与指定DOI最相似的文章（TF-IDF余弦相似度，每行另加 score），需要先运行 similar.py build"""
+        from .similarity import document_text, get_similarity_index
+        try:
+            index = get_similarity_index()
+            if index is None:
+                print("相似文章索引尚未构建，请先运行 python similar.py build")
+                return []
+            conn = pymysql.connect(**self.config.DB_CONFIG)
+            try:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                cursor.execute(f"SELECT id, title, abstract FROM {self.table_name} WHERE doi=%s", (doi,))
+                article = cursor.fetchone()
+                cursor.close()
+            finally:
+                conn.close()
+            if not article:
+                return []
+            if index.row_of(article["id"]) is not None:
+                hits = index.similar_to_ids([article["id"]], limit)[0]
+            else:  # 索引之后才入库的文章，用标题+摘要查询
+                hits = index.similar_to_text(document_text(article["title"], article["abstract"]), limit,
+                                             exclude_id=article["id"])
+            rows = self.get_articles_by_ids([doc_id for doc_id, _ in hits])
+            return [dict(rows[doc_id], score=score) for doc_id, score in hits if doc_id in rows]
+        except Exception as e:
+            print(f"查找相似文章失败: {e}")
+            return []
+
+    @_db_timed(op="doi_exists")
     def is_doi_exists(self, doi: str) -> bool:
         """判断指定DOI是否已存在于数据库"""
         try:
@@ -188,22 +388,120 @@ class DatabaseManager:
             print(f"DOI查重失败: {e}")
             return False 
 
-    def fetch_pending_articles(self, limit: int = 20):
-        """获取待下载（downloaded=0）的文章列表"""
+    @_db_timed(op="doi_batch")
+    def existing_dois(self, dois: List[str]) -> set:
+        """批量查重：一次查询返回已存在于数据库的DOI集合"""
+        dois = [d for d in dict.fromkeys(dois) if d]
+        if not dois:
+            return set()
+        try:
+            conn = pymysql.connect(**self.config.DB_CONFIG)
+            cursor = conn.cursor()
+            placeholders = ", ".join(["%s"] * len(dois))
+            cursor.execute(f"SELECT doi FROM {self.table_name} WHERE doi IN ({placeholders})", dois)
+            found = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+            conn.close()
+            return found
+        except Exception as e:
+            print(f"DOI批量查重失败: {e}")
+            return set()
+
+    @_db_timed(op="fetch_pending")
+    def fetch_pending_articles(self, limit: int = 20) -> List[Article]:
+        """
+        获取已到期的待下载文章（downloaded=0、未转入死信、next_attempt_at 为空或已到），
+        从未失败过的文章（next_attempt_at 为空）排在最前，其余按到期时间排序；走 idx_pending 索引
+        """
         try:
             conn = pymysql.connect(**self.config.DB_CONFIG)
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             sql = f"""
             SELECT * FROM {self.table_name}
-            WHERE downloaded = 0
-            ORDER BY id ASC
+            WHERE downloaded = 0 AND dl_dead = 0
+              AND (next_attempt_at IS NULL OR next_attempt_at <= %s)
+            ORDER BY next_attempt_at ASC, id ASC
             LIMIT %s
             """
-            cursor.execute(sql, (limit,))
-            rows = cursor.fetchall()
+            cursor.execute(sql, (datetime.now().replace(microsecond=0), limit))
+            articles = [Article.from_row(row) for row in cursor.fetchall()]
             cursor.close()
             conn.close()
+            return articles
+        except Exception:
+            logger.exception("获取待下载文章失败", extra={"stage": "download"})
+            return []
+
+    def _dead_filter(self, error_class: Optional[str] = None, error_like: Optional[str] = None,
+                     ids: Optional[List[int]] = None) -> tuple:
+        """死信查询条件：失败类别、错误信息子串、id 列表（条件之间为AND）"""
+        where = ["downloaded = 0", "dl_dead = 1"]
+        params: List = []
+        if error_class:
+            where.append("dl_error_class = %s")
+            params.append(error_class)
+        if error_like:
+            where.append("dl_last_error LIKE %s")
+            params.append(f"%{error_like}%")
+        if ids:
+            where.append(f"id IN ({', '.join(['%s'] * len(ids))})")
+            params.extend(ids)
+        return " AND ".join(where), params
+
+    @_db_timed(op="dead_letter")
+    def dead_letter_summary(self) -> Dict[str, int]:
+        """按失败类别统计死信数量"""
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            SELECT dl_error_class, COUNT(*) FROM {self.table_name}
+            WHERE downloaded = 0 AND dl_dead = 1
+            GROUP BY dl_error_class
+            """)
+            summary = {error_class or "unknown": count for error_class, count in cursor.fetchall()}
+            cursor.close()
+            return summary
+        finally:
+            conn.close()
+
+    @_db_timed(op="dead_letter")
+    def fetch_dead_articles(self, error_class: Optional[str] = None, error_like: Optional[str] = None,
+                            ids: Optional[List[int]] = None, limit: int = 50) -> List[Dict]:
+        """列出死信记录（id、DOI、标题、次数、类别、最后错误）"""
+        where, params = self._dead_filter(error_class, error_like, ids)
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(f"""
+            SELECT id, doi, title, dl_attempts, dl_error_class, dl_last_error FROM {self.table_name}
+            WHERE {where}
+            ORDER BY id ASC
+            LIMIT %s
+            """, (*params, limit))
+            rows = cursor.fetchall()
+            cursor.close()
             return rows
-        except Exception as e:
-            print(f"获取待下载文章失败: {e}")
-            return [] 
\ No newline at end of file
+        finally:
+            conn.close()
+
+    @_db_timed(op="dead_letter")
+    def requeue_dead_articles(self, error_class: Optional[str] = None, error_like: Optional[str] = None,
+                              ids: Optional[List[int]] = None) -> int:
+        """把符合条件的死信放回待下载队列（立即到期，失败次数清零），返回记录数"""
+        where, params = self._dead_filter(error_class, error_like, ids)
+        conn = pymysql.connect(**self.config.DB_CONFIG)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            UPDATE {self.table_name}
+            SET dl_dead = 0, dl_attempts = 0, next_attempt_at = NULL
+            WHERE {where}
+            """, params)
+            count = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        logger.info("已重新排队%d条死信", count, extra={"stage": "persist", "requeued": count})
+        return count
@@ -32,8 +32,7 @@ class DownloadManager:
                     download_file,
                     task["download_link"],
                     filepath,
-                    30,  # timeout
-                    3    # max_retries
+                    30  # timeout；重试次数见 RETRY_MAX_ATTEMPTS
                 )
                 future_to_task[future] = task
             
@@ -2,6 +2,10 @@ import time
 from .config import ScienceConfig
 from .utils import create_driver
 from .pdf_processor import PDFProcessor
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "resolve"}
 
 class DriverManager:
     """Driver管理器，负责管理单个driver实例"""
@@ -10,13 +14,13 @@ class DriverManager:
         self.config = ScienceConfig()
         self.driver = None
     
-    def create_driver(self):
-        """创建单个driver实例"""
+    def create_driver(self, debug_port=None):
+        """创建单个driver实例，debug_port为None时使用配置中的端口"""
         print("正在创建driver实例...")
         
         try:
             # 连接到现有浏览器
-            debug_port = self.config.CHROME_DEBUG_PORT
+            debug_port = debug_port or self.config.CHROME_DEBUG_PORT
             print(f"Driver 连接到端口: {debug_port}")
             self.driver = create_driver(debug_port=debug_port)
             
@@ -48,7 +52,7 @@ class DriverManager:
         
         for i, article in enumerate(articles):
             try:
-                print(f"处理第{i+1}篇文章: {article['title']}")
+                logger.debug("处理第%d/%d篇文章: %s", i + 1, len(articles), article['title'], extra=_STAGE)
                 result = processor.process_article(article)
                 if result:
                     # 如果有回调函数，立即处理
@@ -56,17 +60,14 @@ class DriverManager:
                         callback(result, i+1, len(articles))
                     else:
                         results.append(result)
-                    print(f"第{i+1}篇文章处理成功")
                 else:
-                    print(f"第{i+1}篇文章处理失败")
-                
-                print(f"进度: {i+1}/{len(articles)}")
+                    logger.warning("第%d/%d篇文章处理失败: %s", i + 1, len(articles), article['title'], extra=_STAGE)
                 
                 # 减少延迟，避免请求过于频繁
                 time.sleep(0.3)  # 从SLEEP_TIME减少到0.3秒
                 
             except Exception as e:
-                print(f"处理文章异常：{e}")
+                logger.exception("处理文章异常：%s", e, extra=_STAGE)
                 continue
         
         if callback:
@@ -0,0 +1,226 @@
+"""
+语料流式导出
+用 pymysql 的服务端游标（SSCursor）逐块读取 science 表，边读边写 CSV / JSONL / Parquet。
+任何时刻内存中只有一块（EXPORT_CHUNK_ROWS 行），带摘要的全量导出也是常数内存，速度受磁盘I/O限制。
+
+- CSV/JSONL 支持 gzip/bz2/xz 压缩（默认按输出文件扩展名识别）
+- Parquet 每块写一个行组，支持 snappy/zstd/gzip/brotli 压缩，需要安装 pyarrow（可选依赖）
+- 支持选择列，按发表日期区间、期刊、下载状态过滤
+"""
+
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import os
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .models.article import dumps
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "export"}
+
+FORMATS = ("csv", "jsonl", "parquet")
+TEXT_COMPRESSIONS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+PARQUET_COMPRESSIONS = ("snappy", "zstd", "gzip", "brotli")
+_SUFFIX_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+_SUFFIX_FORMAT = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+_COLUMN_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_INT_COLUMNS = {"id", "downloaded", "dl_attempts", "dl_dead"}
+
+
+def infer_format(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """按扩展名推断 (格式, 压缩方式)，如 science.jsonl.gz -> ("jsonl", "gzip")"""
+    root, ext = os.path.splitext(path.lower())
+    compression = _SUFFIX_COMPRESSION.get(ext)
+    if compression:
+        root, ext = os.path.splitext(root)
+    return _SUFFIX_FORMAT.get(ext), compression
+
+
+def build_query(table: str, columns: Optional[Sequence[str]] = None, since: Optional[str] = None,
+                until: Optional[str] = None, journal: Optional[str] = None,
+                downloaded: Optional[bool] = None) -> Tuple[str, List]:
+    """
+    组装导出SQL与参数
+
+    Args:
+        columns: 导出的列，None表示全部列
+        since/until: 发表日期区间 [since, until)，格式 YYYY-MM-DD
+        journal: 只导出该期刊
+        downloaded: True/False 只导出已下载/未下载的记录
+    """
+    if columns:
+        invalid = [c for c in columns if not _COLUMN_NAME.match(c)]
+        if invalid:
+            raise ValueError(f"非法列名: {', '.join(invalid)}")
+        select = ", ".join(columns)
+    else:
+        select = "*"
+    where, params = [], []
+    if since:
+        where.append("publication_date >= %s")
+        params.append(since)
+    if until:
+        where.append("publication_date < %s")
+        params.append(until)
+    if journal:
+        where.append("journal = %s")
+        params.append(journal)
+    if downloaded is not None:
+        where.append("downloaded = %s")
+        params.append(1 if downloaded else 0)
+    sql = f"SELECT {select} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY id", params
+
+
+def _open_binary(path: str, compression: Optional[str]):
+    opener = TEXT_COMPRESSIONS.get(compression) if compression else None
+    return opener(path, "wb") if opener else open(path, "wb")
+
+
+class CsvWriter:
+    """CSV：首行为列名，NULL写为空串，日期写为 YYYY-MM-DD HH:MM:SS"""
+
+    def __init__(self, path: str, columns: List[str], compression: Optional[str] = None):
+        self.file = io.TextIOWrapper(_open_binary(path, compression), encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows: Sequence[tuple]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    """JSON Lines：每行一个对象，日期为ISO格式"""
+
+    def __init__(self, path: str, columns: List[str], compression: Optional[str] = None):
+        self.file = _open_binary(path, compression)
+        self.columns = columns
+
+    def write(self, rows: Sequence[tuple]):
+        columns = self.columns
+        self.file.write(b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Parquet：每次 write 写一个行组；整数列与 *_at/*_date 时间列使用原生类型，其余为字符串"""
+
+    def __init__(self, path: str, columns: List[str], compression: Optional[str] = None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("导出Parquet需要安装pyarrow：pip install pyarrow") from None
+        self.pa = pa
+        fields = []
+        for name in columns:
+            if name in _INT_COLUMNS:
+                fields.append(pa.field(name, pa.int64()))
+            elif name.endswith(("_at", "_date")):
+                fields.append(pa.field(name, pa.timestamp("s")))
+            else:
+                fields.append(pa.field(name, pa.string()))
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression or "snappy")
+
+    def write(self, rows: Sequence[tuple]):
+        pa = self.pa
+        arrays = []
+        for values, field in zip(zip(*rows), self.schema):
+            if pa.types.is_string(field.type):
+                values = [None if v is None else v if isinstance(v, str) else str(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def _check_compression(fmt: str, compression: Optional[str]) -> Optional[str]:
+    if compression in (None, "none"):
+        return None
+    allowed = PARQUET_COMPRESSIONS if fmt == "parquet" else tuple(TEXT_COMPRESSIONS)
+    if compression not in allowed:
+        raise ValueError(f"{fmt} 不支持压缩方式 {compression}，可选: {', '.join(allowed)}")
+    return compression
+
+
+def export_corpus(output: str, fmt: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+                  since: Optional[str] = None, until: Optional[str] = None, journal: Optional[str] = None,
+                  downloaded: Optional[bool] = None, compression: Optional[str] = None,
+                  chunk_rows: Optional[int] = None) -> Dict:
+    """
+    把 science 表流式导出到文件
+
+    Args:
+        output: 输出路径，格式和压缩方式默认按扩展名推断（.csv/.jsonl/.parquet，可加 .gz/.bz2/.xz）
+        fmt: csv/jsonl/parquet，None表示按扩展名推断
+        compression: 压缩方式，None表示按扩展名推断（Parquet默认snappy），"none"表示不压缩
+        chunk_rows: 每块行数（Parquet行组大小），None表示 EXPORT_CHUNK_ROWS
+        其余参数见 build_query
+
+    Returns:
+        {"rows", "chunks", "bytes", "elapsed", "rows_per_s", "output"}
+    """
+    inferred_fmt, inferred_compression = infer_format(output)
+    fmt = fmt or inferred_fmt
+    if fmt not in FORMATS:
+        raise ValueError(f"无法确定导出格式，请用 --format 指定: {', '.join(FORMATS)}")
+    compression = _check_compression(fmt, compression if compression is not None else inferred_compression)
+    chunk_rows = chunk_rows or ScienceConfig.EXPORT_CHUNK_ROWS
+    sql, params = build_query(ScienceConfig.TABLE_NAME, columns, since, until, journal, downloaded)
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.time()
+    rows = chunks = 0
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        # 服务端游标：结果集留在MySQL端，fetchmany 每次只把一块读入内存
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        writer = WRITERS[fmt](output, names, compression)
+        try:
+            while True:
+                chunk = cursor.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                rows += len(chunk)
+                chunks += 1
+                logger.debug("已导出%d行", rows, extra={"stage": "export", "rows": rows, "chunks": chunks})
+        finally:
+            writer.close()
+        cursor.close()
+    finally:
+        conn.close()
+
+    elapsed = time.time() - start
+    size = os.path.getsize(output)
+    stats = {"rows": rows, "chunks": chunks, "bytes": size, "elapsed": round(elapsed, 3),
+             "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else 0.0, "output": output}
+    logger.info("导出完成：%d行写入 %s（%s，%.1f MB），耗时%.2f秒，%.0f行/秒",
+                rows, output, fmt + (f"+{compression}" if compression else ""), size / 1048576, elapsed,
+                stats["rows_per_s"], extra=dict(_STAGE, **stats))
+    return stats
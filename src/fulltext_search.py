@@ -0,0 +1,228 @@
+"""
+本地全文检索（SQLite FTS5）
+get_articles_by_keyword 只能用 LIKE 扫标题、摘要和关键词。这里把文本库（src/text_extractor.py）中提取出的
+PDF正文连同标题、摘要建成FTS5索引（FULLTEXT_INDEX_FILE），行号即 science.id：
+- BM25排序，标题/摘要/正文按 FULLTEXT_WEIGHTS 加权，权重写入索引的rank配置，ORDER BY rank 走索引内排序
+- snippet() 高亮命中片段
+- 增量更新：只索引新下载或PDF（pdf_md5）变化了的文章，重复运行代价只与新增量相关
+- 查询结果回 science 表取完整文章行，按相关度顺序返回
+数万篇全文的查询在单机毫秒级完成，不依赖外部检索服务。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .text_extractor import TextStore
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "fulltext"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, doi TEXT, md5 TEXT NOT NULL, indexed_at TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(
+    title, abstract, body, tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+HIGHLIGHT = ("[", "]")
+
+
+def to_match_query(text: str) -> str:
+    """把用户输入转成FTS5查询：每个词加引号（避免连字符、冒号等被当成语法），词间为AND，结尾*保留为前缀匹配"""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class FullTextIndex:
+    """FTS5全文索引，线程安全"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or ScienceConfig.FULLTEXT_INDEX_FILE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        weights = ", ".join(f"{w:.1f}" for w in ScienceConfig.FULLTEXT_WEIGHTS)
+        self.conn.execute("INSERT INTO fts (fts, rank) VALUES ('rank', ?)", (f"bm25({weights})",))
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def indexed_md5(self, ids: Iterable[int]) -> Dict[int, str]:
+        """返回其中已索引文章的 {id: 索引时的pdf_md5}"""
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                part = ids[i:i + 500]
+                found.update(self.conn.execute(
+                    f"SELECT id, md5 FROM docs WHERE id IN ({','.join('?' * len(part))})", part))
+        return found
+
+    def add_many(self, docs: Iterable[Tuple]):
+        """写入 (id, doi, md5, title, abstract, body)，同一id覆盖"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            for doc_id, doi, md5, title, abstract, body in docs:
+                self.conn.execute("DELETE FROM fts WHERE rowid = ?", (doc_id,))
+                self.conn.execute("INSERT INTO fts (rowid, title, abstract, body) VALUES (?, ?, ?, ?)",
+                                  (doc_id, title or "", abstract or "", body or ""))
+                self.conn.execute("INSERT OR REPLACE INTO docs (id, doi, md5, indexed_at) VALUES (?, ?, ?, ?)",
+                                  (doc_id, doi, md5, now))
+            self.conn.commit()
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self.conn.execute("DELETE FROM fts WHERE rowid = ?", (doc_id,))
+            self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+            self.conn.commit()
+
+    def optimize(self):
+        """合并FTS5段（大批量写入后执行，查询更快）"""
+        with self._lock:
+            self.conn.execute("INSERT INTO fts (fts) VALUES ('optimize')")
+            self.conn.commit()
+
+    def match(self, query: str, limit: int = 10, offset: int = 0, raw: bool = False,
+              snippet_tokens: int = 16) -> List[Dict]:
+        """
+        只查索引，不回表
+
+        Args:
+            query: 检索词；raw=True时按FTS5查询语法原样使用（AND/OR/NOT、"短语"、NEAR、title:…）
+            snippet_tokens: 高亮片段的词数
+
+        Returns:
+            [{"id", "doi", "score", "snippet"}]，按BM25相关度从高到低；score越大越相关
+        """
+        expression = query if raw else to_match_query(query)
+        if not expression.strip():
+            return []
+        sql = f"""
+            SELECT fts.rowid, docs.doi, -rank,
+                   snippet(fts, -1, ?, ?, '…', {int(snippet_tokens)})
+            FROM fts JOIN docs ON docs.id = fts.rowid
+            WHERE fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?
+        """
+        try:
+            with self._lock:
+                rows = self.conn.execute(sql, (*HIGHLIGHT, expression, limit, offset)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"检索语法错误: {e}") from None
+        return [{"id": r[0], "doi": r[1], "score": round(r[2], 4), "snippet": r[3]} for r in rows]
+
+    def search(self, query: str, limit: int = 10, offset: int = 0, raw: bool = False) -> List[Dict]:
+        """检索并回 science 表取文章行：每行是完整的文章字典，另加 score 与 snippet"""
+        hits = self.match(query, limit=limit, offset=offset, raw=raw)
+        if not hits:
+            return []
+        ids = [hit["id"] for hit in hits]
+        conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+        try:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(f"SELECT * FROM {ScienceConfig.TABLE_NAME} WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                           ids)
+            rows = {row["id"]: row for row in cursor.fetchall()}
+            cursor.close()
+        finally:
+            conn.close()
+        results = []
+        for hit in hits:
+            row = rows.get(hit["id"])
+            if row is None:  # 文章已从库中删除，索引尚未更新
+                continue
+            row.update(score=hit["score"], snippet=hit["snippet"])
+            results.append(row)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM fts")
+            self.conn.execute("DELETE FROM docs")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _iter_downloaded_ids(chunk_rows: int) -> Iterator[List[Tuple[int, str]]]:
+    """用服务端游标按id顺序分块读取已下载文章的 (id, pdf_md5)"""
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(f"SELECT id, pdf_md5 FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE downloaded = 1 AND pdf_md5 IS NOT NULL ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield list(rows)
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _fetch_meta(ids: List[int]) -> Dict[int, Tuple]:
+    """按id取 (doi, title, abstract)"""
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, doi, title, abstract FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        meta = {row[0]: row[1:] for row in cursor.fetchall()}
+        cursor.close()
+    finally:
+        conn.close()
+    return meta
+
+
+def update_index(index: FullTextIndex, store: TextStore, chunk_rows: int = 500) -> Dict:
+    """
+    把已下载、正文已提取、但尚未索引（或PDF已变化）的文章加入索引
+
+    Returns:
+        统计字典：indexed/unchanged/no_text/elapsed
+    """
+    stats = {"indexed": 0, "unchanged": 0, "no_text": 0}
+    start = time.time()
+    for rows in _iter_downloaded_ids(chunk_rows):
+        indexed = index.indexed_md5(row[0] for row in rows)
+        changed = [(doc_id, md5) for doc_id, md5 in rows if indexed.get(doc_id) != md5]
+        stats["unchanged"] += len(rows) - len(changed)
+        if not changed:
+            continue
+        extracted = store.known({md5 for _, md5 in changed}, include_failed=False)
+        todo = [(doc_id, md5) for doc_id, md5 in changed if md5 in extracted]
+        stats["no_text"] += len(changed) - len(todo)
+        if not todo:
+            continue
+        meta = _fetch_meta([doc_id for doc_id, _ in todo])
+        docs = []
+        for doc_id, md5 in todo:
+            doi, title, abstract = meta.get(doc_id, (None, None, None))
+            docs.append((doc_id, doi, md5, title, abstract, store.get_text(md5)))
+        index.add_many(docs)
+        stats["indexed"] += len(docs)
+        logger.info("全文索引已加入%d篇", stats["indexed"], extra={"stage": "fulltext", "indexed": stats["indexed"]})
+    stats["elapsed"] = round(time.time() - start, 2)
+    return stats
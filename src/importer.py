@@ -0,0 +1,331 @@
+"""
+元数据批量导入
+把 CSV / JSONL 元数据转储（如 1.csv，或 corpus.py export 的输出）导入 science 表：
+
+1. 流式读取文件，逐行规范化：DOI（去掉 https://doi.org/、doi: 前缀并转小写）、作者/关键词
+   （统一为逗号分隔、去空白和重复）、日期；缺标题、缺URL且缺DOI、格式错误或超长的行记为拒绝
+2. 在内存中按 DOI → MD5 → 标题 的优先级去重（与 save_articles_to_database 的查重规则一致）
+3. 大批量 executemany（或 LOAD DATA LOCAL INFILE）写入临时暂存表
+4. 一条 INSERT ... SELECT ... WHERE NOT EXISTS 把库中尚不存在的记录合并进 science 表
+
+逐行 save_articles_to_database 每行要三次SELECT加一次INSERT；这里每批只有一次往返，
+合并是一条集合操作，百万行量级的导入只需几分钟。
+"""
+
+import csv
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .exporter import TEXT_COMPRESSIONS, infer_format
+from .models.article import dumps, loads
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "import"}
+
+# 导入的列（文件中的 id、created_at、original_url 等列忽略）及暂存表列类型
+IMPORT_COLUMNS = (
+    ("doi", "varchar(100)"),
+    ("title", "varchar(500)"),
+    ("authors", "text"),
+    ("journal", "varchar(100)"),
+    ("abstract", "text"),
+    ("keywords", "text"),
+    ("publication_date", "datetime"),
+    ("url", "varchar(500)"),
+    ("pdf_url", "varchar(500)"),
+    ("download_path", "varchar(500)"),
+    ("pdf_md5", "varchar(32)"),
+    ("downloaded", "tinyint"),
+)
+COLUMN_NAMES = tuple(name for name, _ in IMPORT_COLUMNS)
+_LIMITS = {name: int(kind[8:-1]) for name, kind in IMPORT_COLUMNS if kind.startswith("varchar")}
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+_LIST_SEPARATOR = re.compile(r"\s*[;,]\s*")
+_CSV_NULLS = ("NULL", "\\N")  # mysqldump/SELECT ... INTO OUTFILE 导出的空值
+
+
+class RejectedRow(ValueError):
+    """无法导入的行，reason写入拒绝报告"""
+
+
+def normalize_doi(value) -> Optional[str]:
+    if not value:
+        return None
+    doi = _DOI_PREFIX.sub("", str(value).strip()).strip().lower()
+    if not doi:
+        return None
+    if not doi.startswith("10.") or "/" not in doi:
+        raise RejectedRow(f"DOI格式错误: {value}")
+    return doi
+
+
+def normalize_list(value) -> Optional[str]:
+    """作者/关键词：列表或逗号/分号分隔的字符串 → 去空白、去重后以', '拼接"""
+    if not value:
+        return None
+    parts = value if isinstance(value, (list, tuple)) else _LIST_SEPARATOR.split(str(value))
+    seen, names = set(), []
+    for part in parts:
+        name = " ".join(str(part).split())
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return ", ".join(names) or None
+
+
+def normalize_date(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise RejectedRow(f"日期格式错误: {value}") from None
+    return parsed.replace(tzinfo=None)
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def normalize_record(raw: Dict) -> tuple:
+    """把文件中的一行转换为按 COLUMN_NAMES 排列的元组，无法导入时抛出 RejectedRow"""
+    title = _text(raw.get("title"))
+    if not title:
+        raise RejectedRow("缺少标题")
+    doi = normalize_doi(raw.get("doi"))
+    url = (raw.get("url") or "").strip() or None
+    if not url:
+        if not doi:
+            raise RejectedRow("缺少URL和DOI")
+        url = f"{ScienceConfig.BASE_URL}/doi/{doi}"
+    md5 = (raw.get("pdf_md5") or "").strip().lower() or None
+    downloaded = raw.get("downloaded")
+    record = (
+        doi,
+        title,
+        normalize_list(raw.get("authors")),
+        _text(raw.get("journal")) or "Science",
+        (raw.get("abstract") or "").strip() or None,
+        normalize_list(raw.get("keywords")),
+        normalize_date(raw.get("publication_date")),
+        url,
+        (raw.get("pdf_url") or "").strip() or None,
+        (raw.get("download_path") or "").strip() or None,
+        md5,
+        1 if str(downloaded).strip().lower() in ("1", "true") else 0,
+    )
+    for name, value in zip(COLUMN_NAMES, record):
+        limit = _LIMITS.get(name)
+        if limit and value and len(value) > limit:
+            raise RejectedRow(f"{name}超过{limit}字符")
+    return record
+
+
+def dedup_key(record: tuple):
+    """与 save_articles_to_database 一致：有DOI按DOI，否则按MD5，再否则按标题"""
+    if record[0]:
+        return record[0]
+    if record[10]:
+        return ("md5", record[10])
+    return ("title", record[1].lower())
+
+
+def iter_raw_records(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """流式读取文件，产出 (行号, 原始记录)；CSV行号为记录起始的物理行"""
+    inferred_fmt, compression = infer_format(path)
+    fmt = fmt or inferred_fmt
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError("只支持导入 CSV 或 JSONL（可带 .gz/.bz2/.xz 压缩）")
+    opener = TEXT_COMPRESSIONS.get(compression, open)
+    with opener(path, "rt", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f, restkey="_extra")
+            reader.fieldnames  # 先读表头，line_num 指向表头行
+            line = reader.line_num + 1
+            for row in reader:
+                yield line, {k: (None if v in _CSV_NULLS else v) for k, v in row.items()}
+                line = reader.line_num + 1
+        else:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, loads(text)
+                except ValueError:
+                    yield line, {"_error": "JSON解析失败"}
+
+
+def _tsv_field(value) -> str:
+    """LOAD DATA默认转义规则：NULL为\\N，反斜杠、制表符、换行加反斜杠转义"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class CorpusImporter:
+    """流式规范化 → 内存去重 → 暂存表批量写入 → 集合合并"""
+
+    def __init__(self, batch_rows: Optional[int] = None, load_data: bool = False,
+                 rejects_path: Optional[str] = None, dry_run: bool = False):
+        """
+        Args:
+            batch_rows: 每次executemany的行数，None表示 IMPORT_BATCH_ROWS
+            load_data: 用 LOAD DATA LOCAL INFILE 写入暂存表（需要服务端开启 local_infile）
+            rejects_path: 拒绝行报告（JSONL：行号、原因、原始内容），None表示不写
+            dry_run: 只读取和规范化，不连接数据库
+        """
+        self.batch_rows = batch_rows or ScienceConfig.IMPORT_BATCH_ROWS
+        self.load_data = load_data
+        self.rejects_path = rejects_path
+        self.dry_run = dry_run
+        self.table = ScienceConfig.TABLE_NAME
+        self.stage = ScienceConfig.IMPORT_STAGING_TABLE
+        self.stats = {"read": 0, "staged": 0, "duplicates": 0, "rejected": 0, "inserted": 0, "existing": 0}
+        self.reasons: Counter = Counter()
+
+    def _records(self, path: str, fmt: Optional[str]) -> Iterator[tuple]:
+        """规范化并去重后的记录；拒绝行计数并写入报告"""
+        seen = set()
+        rejects = open(self.rejects_path, "wb") if self.rejects_path else None
+        try:
+            for line, raw in iter_raw_records(path, fmt):
+                self.stats["read"] += 1
+                try:
+                    if "_error" in raw:
+                        raise RejectedRow(raw["_error"])
+                    record = normalize_record(raw)
+                except RejectedRow as e:
+                    reason = str(e)
+                    self.stats["rejected"] += 1
+                    self.reasons[reason.split(":")[0]] += 1
+                    if rejects:
+                        rejects.write(dumps({"line": line, "reason": reason, "row": raw}) + b"\n")
+                    continue
+                key = dedup_key(record)
+                if key in seen:
+                    self.stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+                yield record
+        finally:
+            if rejects:
+                rejects.close()
+
+    def _create_stage(self, cursor):
+        columns = ", ".join(f"{name} {kind}" for name, kind in IMPORT_COLUMNS)
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {self.stage}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {self.stage} ({columns})")
+
+    def _stage_executemany(self, cursor, records: Iterator[tuple], start: float):
+        sql = f"INSERT INTO {self.stage} ({', '.join(COLUMN_NAMES)}) VALUES ({', '.join(['%s'] * len(COLUMN_NAMES))})"
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_rows:
+                self._flush(cursor, sql, batch, start)
+                batch = []
+        if batch:
+            self._flush(cursor, sql, batch, start)
+
+    def _flush(self, cursor, sql, batch, start):
+        # pymysql 把 INSERT ... VALUES 的 executemany 改写为多行INSERT，每批一次往返
+        cursor.executemany(sql, batch)
+        self.stats["staged"] += len(batch)
+        elapsed = time.time() - start
+        logger.info("已写入暂存表%d行（读取%d行，%.0f行/秒）", self.stats["staged"], self.stats["read"],
+                    self.stats["read"] / elapsed if elapsed else 0.0,
+                    extra={"stage": "import", "staged": self.stats["staged"], "read": self.stats["read"]})
+
+    def _stage_load_data(self, cursor, records: Iterator[tuple]):
+        fd, tmp_path = tempfile.mkstemp(suffix=".tsv")
+        try:
+            with open(fd, "w", encoding="utf-8", newline="\n") as f:
+                for record in records:
+                    f.write("\t".join(_tsv_field(v) for v in record) + "\n")
+                    self.stats["staged"] += 1
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.stage} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(COLUMN_NAMES)})",
+                (tmp_path,)
+            )
+        finally:
+            os.remove(tmp_path)
+
+    def _merge(self, cursor) -> int:
+        """把暂存表中库里还没有的记录插入正式表，返回插入行数"""
+        columns = ", ".join(COLUMN_NAMES)
+        selected = ", ".join(f"s.{name}" for name in COLUMN_NAMES)
+        cursor.execute(f"""
+            INSERT INTO {self.table} ({columns})
+            SELECT {selected} FROM {self.stage} s
+            WHERE (s.doi IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM {self.table} t WHERE t.doi = s.doi))
+               OR (s.doi IS NULL AND s.pdf_md5 IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM {self.table} t WHERE t.pdf_md5 = s.pdf_md5))
+               OR (s.doi IS NULL AND s.pdf_md5 IS NULL
+                   AND NOT EXISTS (SELECT 1 FROM {self.table} t WHERE t.title = s.title))
+        """)
+        return cursor.rowcount
+
+    def run(self, path: str, fmt: Optional[str] = None) -> Dict:
+        """
+        导入文件path
+
+        Returns:
+            统计：read/staged/duplicates/rejected/inserted/existing/elapsed/rows_per_s/reasons
+        """
+        start = time.time()
+        records = self._records(path, fmt)
+        if self.dry_run:
+            for _ in records:
+                self.stats["staged"] += 1
+        else:
+            config = dict(ScienceConfig.DB_CONFIG, local_infile=True) if self.load_data else ScienceConfig.DB_CONFIG
+            conn = pymysql.connect(**config)
+            try:
+                cursor = conn.cursor()
+                self._create_stage(cursor)
+                if self.load_data:
+                    self._stage_load_data(cursor, records)
+                else:
+                    self._stage_executemany(cursor, records, start)
+                self.stats["inserted"] = self._merge(cursor)
+                self.stats["existing"] = self.stats["staged"] - self.stats["inserted"]
+                conn.commit()
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {self.stage}")
+                cursor.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+        elapsed = time.time() - start
+        self.stats["elapsed"] = round(elapsed, 3)
+        self.stats["rows_per_s"] = round(self.stats["read"] / elapsed, 1) if elapsed > 0 else 0.0
+        self.stats["reasons"] = dict(self.reasons)
+        logger.info("导入完成：读取%d行，新增%d，库中已存在%d，文件内重复%d，拒绝%d，耗时%.2f秒（%.0f行/秒）",
+                    self.stats["read"], self.stats["inserted"], self.stats["existing"], self.stats["duplicates"],
+                    self.stats["rejected"], elapsed, self.stats["rows_per_s"],
+                    extra={"stage": "import", **{k: v for k, v in self.stats.items() if k != "reasons"}})
+        return self.stats
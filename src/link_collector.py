@@ -1,3 +1,4 @@
+import threading
 import time
 import re
 from datetime import datetime
@@ -7,100 +8,222 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
 from .config import ScienceConfig
 from .database_manager import DatabaseManager
+from .selector_registry import get_selector_registry
+from .metrics import get_metrics
+from .models.article import Article
+from .utils import handle_captcha, is_captcha_or_abnormal
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "collect"}
 
 class LinkCollector:
     """链接收集器，负责从Science搜索页收集详情页链接"""
     
-    def __init__(self, driver):
+    def __init__(self, driver, max_count=None):
         self.driver = driver
         self.config = ScienceConfig()
-        self.performance_stats = {}  # 性能统计
+        self.max_count = max_count or self.config.MAX_COUNT  # 最大收集数量
+        self.performance_stats = {}  # 性能统计：页数、收集条数、耗时，每页更新
+        metrics = get_metrics()
+        self._page_seconds = metrics.histogram("crawler_search_page_seconds", "搜索结果页处理耗时（解析+查重）")
+        self._parse_seconds = metrics.histogram("crawler_search_parse_seconds", "搜索结果页卡片解析耗时")
+        self._cards_total = metrics.counter("crawler_cards_total", "解析的搜索结果卡片数")
+        self._links_total = metrics.counter("crawler_links_total", "收集的详情页链接数")
+        self.selectors = get_selector_registry()  # 选择器命中率统计与排序
+        self._cancel = threading.Event()  # cancel() 设置后 iter_links 在页与页之间停止
+        self.reached_end = False  # 上次 iter_links 是否翻到了结果末尾（增量模式下含越过高水位回看窗口）
+    
+    def collect_all_links(self, checkpoint=None, resume=False, watermark=None):
+        """
+        收集所有详情页链接，动态查重，直到达到MAX_COUNT或无更多新文章
+        
+        iter_links 的列表版本，参数含义相同。
+        """
+        return list(self.iter_links(checkpoint=checkpoint, resume=resume, watermark=watermark))
     
-    def collect_all_links(self):
-        """收集所有详情页链接，动态查重，直到达到MAX_COUNT或无更多新文章"""
-        print("开始收集详情页链接...")
+    def cancel(self):
+        """请求停止收集：当前页处理完后生成器结束"""
+        self._cancel.set()
+    
+    def iter_links(self, checkpoint=None, resume=False, watermark=None, cancel_event=None, batch=False):
+        """
+        逐页收集详情页链接的生成器，每解析完一页就产出该页的新文章，内存占用与总条数无关
+        
+        Args:
+            checkpoint: CrawlCheckpoint实例，传入时每处理完一页追加记录进度（在产出该页之前写入）
+            resume: 是否从checkpoint记录的位置继续收集
+            watermark: QueryWatermark实例，传入时为增量模式（结果需按发表时间从新到旧排序），
+                       按DOI跳过已知文章，整页都早于高水位回看窗口时停止翻页
+            cancel_event: threading.Event，被设置后在页与页之间停止；也可调用 cancel()
+            batch: True时每页产出一个文章列表，False时逐条产出文章
+        """
+        logger.info("开始收集详情页链接...", extra=_STAGE)
         start_time = time.time()
-        links = []
+        collected = 0
         page_num = 1
         db_manager = DatabaseManager()
+        self._cancel.clear()
+        self.reached_end = False
+        
+        state = checkpoint.load() if (checkpoint and resume) else None
+        if state:
+            restored = state["records"][:self.max_count]
+            collected = len(restored)
+            # 流水线模式不逐条标记入库，断点里可能有上次已入库的记录，恢复时跳过
+            existing = db_manager.existing_dois([a.doi for a in restored])
+            restored = [a for a in restored if not (a.doi and a.doi in existing)]
+            logger.info("从断点恢复：已处理%d页，已收集%d条未入库记录", state['page_num'], len(restored), extra=_STAGE)
+            if restored:
+                yield from ([restored] if batch else restored)
+            if state["done"] or not state["next_url"] or collected >= self.max_count:
+                logger.info("断点显示链接收集已结束，直接使用已收集的记录", extra=_STAGE)
+                return
+            page_num = state["page_num"] + 1
+            self.driver.get(state["next_url"])
+            time.sleep(self.config.SLEEP_TIME)
+        elif checkpoint:
+            checkpoint.clear()
+        first_page = page_num
         
         while True:
+            if self._cancel.is_set() or (cancel_event and cancel_event.is_set()):
+                logger.info("收集已取消，停在第%d页之前", page_num, extra=_STAGE)
+                break
+            
             page_start_time = time.time()
-            print(f"\n正在处理第{page_num}页...")
+            logger.info("正在处理第%d页...", page_num, extra={"stage": "collect", "page": page_num})
             
             # 只在第一页检查页面元素，后续页面跳过检查以提高速度
-            if page_num == 1:
+            if page_num == first_page:
                 element_check_start = time.time()
                 try:
                     # 检测搜索页目标元素（文章卡片）
                     self.driver.find_element(By.CSS_SELECTOR, ".card.pb-3.mb-4.border-bottom")
-                    print("搜索页目标元素已加载")
+                    logger.debug("搜索页目标元素已加载", extra=_STAGE)
                 except Exception as e:
-                    print(f"搜索页目标元素未找到: {e}")
+                    logger.error("搜索页目标元素未找到: %s", e, extra=_STAGE)
                     raise
                 element_check_time = time.time() - element_check_start
-                print(f"[性能] 页面元素检测耗时: {element_check_time:.3f}秒")
+                logger.debug("页面元素检测耗时: %.3f秒", element_check_time, extra=_STAGE)
             
             # 收集当前页面的链接
             collection_start = time.time()
             page_links = self._collect_page_links()
             collection_time = time.time() - collection_start
             
-            # === 新增：动态查重 ===
-            for article in page_links:
-                doi = article.get('doi')
-                if doi and db_manager.is_doi_exists(doi):
-                    print(f"已存在（DOI查重）: {article['title']}")
+            # === 动态查重：每页一次批量查询 ===
+            page_new = []
+            known_count = 0
+            if watermark:
+                # DOI在高水位中的文章之前的运行已经入库，不再查库
+                unseen = [a for a in page_links if not watermark.is_known(a)]
+                known_count = len(page_links) - len(unseen)
+            else:
+                unseen = page_links
+            existing = db_manager.existing_dois([a.doi for a in unseen])
+            for article in unseen:
+                if article.doi and article.doi in existing:
+                    known_count += 1
+                    logger.debug("已存在（DOI查重）: %s", article.title, extra=_STAGE)
                     continue
-                links.append(article)
-                if len(links) >= self.config.MAX_COUNT:
+                page_new.append(article)
+                if collected + len(page_new) >= self.max_count:
                     break
+            collected += len(page_new)
             
             page_total_time = time.time() - page_start_time
-            print(f"第{page_num}页收集到{len(page_links)}条链接，总计{len(links)}条（不重复）")
-            print(f"[性能] 第{page_num}页总耗时: {page_total_time:.3f}秒")
-            print(f"[性能] 链接收集耗时: {collection_time:.3f}秒")
-            print(f"[性能] 平均每个链接耗时: {collection_time/len(page_links):.3f}秒" if page_links else "无链接")
+            self._record_page(page_num, len(page_links), len(page_new), known_count, collected,
+                              page_total_time, collection_time, time.time() - start_time)
+            logger.info(
+                "第%d页收集到%d条链接，总计%d条（不重复），耗时%.3f秒（解析%.3f秒）",
+                page_num, len(page_links), collected, page_total_time, collection_time,
+                extra={"stage": "collect", "page": page_num, "cards": len(page_links), "new": len(page_new),
+                       "elapsed": round(page_total_time, 3)}
+            )
             
-            # 检查是否达到最大数量
-            if len(links) >= self.config.MAX_COUNT:
-                links = links[:self.config.MAX_COUNT]
-                break
+            # 判断是否结束：增量模式整页早于回看窗口 / 达到最大数量 / 没有下一页
+            finished = True
+            if watermark and page_links and all(watermark.before_lookback(a) for a in page_links):
+                logger.info("第%d页已早于高水位回看窗口，增量收集结束", page_num, extra=_STAGE)
+                self.reached_end = True
+            elif collected >= self.max_count:
+                pass
+            elif not self._go_to_next_page():
+                logger.info("没有下一页，结束收集", extra=_STAGE)
+                self.reached_end = True
+            else:
+                finished = False
             
-            # 尝试翻页
-            if not self._go_to_next_page():
-                print("没有下一页，结束收集")
-                break
+            if finished:
+                self._save_progress(checkpoint, page_num, None, page_new)
+            else:
+                # 减少翻页后的等待时间
+                time.sleep(0.5)  # 从SLEEP_TIME减少到0.5秒
+                self._save_progress(checkpoint, page_num, self.driver.current_url, page_new)
             
+            if page_new:
+                yield from ([page_new] if batch else page_new)
+            if finished:
+                break
             page_num += 1
-            # 减少翻页后的等待时间
-            time.sleep(0.5)  # 从SLEEP_TIME减少到0.5秒
+            
+            # 翻页后用页面探测脚本检查验证码/异常页
+            if is_captcha_or_abnormal(self.driver):
+                logger.warning("第%d页检测到验证码/异常页面，等待处理...", page_num, extra=_STAGE)
+                handle_captcha(self.driver)
         
         total_time = time.time() - start_time
-        print(f"\n" + "=" * 60)
-        print(f"收集完成！共收集到{len(links)}条详情页链接（不重复）")
-        print(f"[性能] 总耗时: {total_time:.3f}秒")
-        print(f"[性能] 平均每页耗时: {total_time/page_num:.3f}秒")
-        print(f"[性能] 平均每个链接耗时: {total_time/len(links):.3f}秒" if links else "无链接")
-        print("=" * 60 + "\n")
-        
-        return links
+        logger.info(
+            "收集完成！共收集到%d条详情页链接（不重复），总耗时%.3f秒，平均每页%.3f秒",
+            collected, total_time, total_time / page_num,
+            extra={"stage": "collect", "pages": page_num, "collected": collected, "elapsed": round(total_time, 3)}
+        )
+    
+    def _record_page(self, page_num, cards, new, known, collected, page_time, parse_time, elapsed):
+        """更新 performance_stats 与运行指标"""
+        self._page_seconds.observe(page_time)
+        self._parse_seconds.observe(parse_time)
+        self._cards_total.inc(cards)
+        self._links_total.inc(new, result="new")
+        self._links_total.inc(cards - new, result="known")
+        stats = self.performance_stats
+        stats["pages"] = stats.get("pages", 0) + 1
+        stats["cards"] = stats.get("cards", 0) + cards
+        stats["known"] = stats.get("known", 0) + known
+        stats["collected"] = collected
+        stats["last_page"] = page_num
+        stats["last_page_time"] = page_time
+        stats["total_time"] = elapsed
+        stats["avg_page_time"] = elapsed / stats["pages"]
+        stats["avg_link_time"] = elapsed / collected if collected else None
+    
+    def _save_progress(self, checkpoint, page_num, next_url, page_records):
+        """向断点追加本页进度；next_url为None表示收集已结束"""
+        if not checkpoint:
+            return
+        try:
+            checkpoint.record_page(page_num, next_url, page_records)
+            if next_url is None:
+                checkpoint.mark_done()
+        except Exception as e:
+            logger.warning("写入断点失败: %s", e, extra=_STAGE)
     
     def _collect_page_links(self):
         """收集当前页面的详情页链接 - 带详细性能调试"""
         links = []
         
         try:
-            print("[性能] 开始收集当前页面链接...")
+            logger.debug("开始收集当前页面链接...", extra=_STAGE)
             
             # 1. 获取所有卡片 - 这是第一个可能的瓶颈
             cards_start = time.time()
             cards = self.driver.find_elements(By.CSS_SELECTOR, self.config.SELECTORS['search_cards'])
             cards_time = time.time() - cards_start
-            print(f"[性能] 获取{len(cards)}个文章卡片耗时: {cards_time:.3f}秒")
+            logger.debug("获取%d个文章卡片耗时: %.3f秒", len(cards), cards_time, extra=_STAGE)
             
             if not cards:
-                print("[性能] 警告：未找到任何文章卡片，可能是选择器问题")
+                logger.warning("未找到任何文章卡片，可能是选择器问题", extra=_STAGE)
                 return links
             
             # 2. 处理每个卡片
@@ -115,27 +238,25 @@ class LinkCollector:
                     
                     card_time = time.time() - card_start
                     
-                    # 每处理5个卡片显示一次进度和性能
+                    # 每处理5个卡片记录一次进度和性能
                     if (i + 1) % 5 == 0:
-                        avg_card_time = (time.time() - processing_start) / (i + 1)
-                        print(f"[性能] 已处理 {i + 1}/{len(cards)} 个卡片")
-                        print(f"[性能] 当前卡片耗时: {card_time:.3f}秒")
-                        print(f"[性能] 平均每个卡片耗时: {avg_card_time:.3f}秒")
+                        logger.debug("已处理 %d/%d 个卡片，当前卡片耗时%.3f秒，平均%.3f秒",
+                                     i + 1, len(cards), card_time, (time.time() - processing_start) / (i + 1),
+                                     extra=_STAGE)
                     
                 except Exception as e:
                     card_time = time.time() - card_start
-                    print(f"[性能] 处理第{i+1}个卡片时异常，耗时: {card_time:.3f}秒，错误: {e}")
+                    logger.warning("处理第%d个卡片时异常，耗时: %.3f秒，错误: %s", i + 1, card_time, e, extra=_STAGE)
                     continue
             
             total_processing_time = time.time() - processing_start
-            print(f"[性能] 当前页面处理完成，收集到{len(links)}条链接")
-            print(f"[性能] 卡片处理总耗时: {total_processing_time:.3f}秒")
-            print(f"[性能] 平均每个卡片处理耗时: {total_processing_time/len(cards):.3f}秒" if cards else "无卡片")
+            logger.debug("当前页面处理完成，收集到%d条链接，卡片处理总耗时%.3f秒，平均每个卡片%.3f秒",
+                         len(links), total_processing_time, total_processing_time / len(cards), extra=_STAGE)
             
             return links
                     
         except Exception as e:
-            print(f"[性能] 收集页面链接时发生异常：{e}")
+            logger.error("收集页面链接时发生异常：%s", e, extra=_STAGE)
             return []
 
     def _extract_card_info(self, card):
@@ -152,40 +273,29 @@ class LinkCollector:
                 "a[data-test='article-title']"
             ]
             
-            title_elem = None
-            title_selector_used = None
-            for selector in title_selectors:
-                try:
-                    title_elem = card.find_element(By.CSS_SELECTOR, selector)
-                    if title_elem and title_elem.text.strip():
-                        title_selector_used = selector
-                        break
-                except:
-                    continue
+            title_elem, title_selector_used = self.selectors.find(
+                card, "card.title", title_selectors,
+                extract=lambda elem: elem if elem.text.strip() else None
+            )
             
             title_time = time.time() - title_start
             
             if not title_elem:
-                print(f"[性能] 标题提取失败，耗时: {title_time:.3f}秒")
+                logger.debug("标题提取失败，耗时: %.3f秒", title_time, extra=_STAGE)
                 return None
             
             title = title_elem.text.strip()
             detail_href = title_elem.get_attribute("href")
             
             if not detail_href:
-                print(f"[性能] 标题链接为空，耗时: {title_time:.3f}秒")
+                logger.debug("标题链接为空，耗时: %.3f秒", title_time, extra=_STAGE)
                 return None
             
             # 确保URL是完整的
-            detail_url = detail_href if detail_href.startswith("http") else "https://www.science.org" + detail_href
+            detail_url = detail_href if detail_href.startswith("http") else self.config.BASE_URL + detail_href
             
             # 基础信息
-            article_info = {
-                "title": title,
-                "url": detail_url,
-                "doi": self._extract_doi_from_url(detail_url),
-                "journal": "Science"  # 默认值
-            }
+            article_info = Article(title=title, url=detail_url, doi=self._extract_doi_from_url(detail_url))
             
             # 2. 期刊信息提取
             journal_start = time.time()
@@ -196,16 +306,13 @@ class LinkCollector:
                 "span[data-test='journal']"
             ]
             
-            journal_found = False
-            for selector in journal_selectors:
-                try:
-                    journal_elem = card.find_element(By.CSS_SELECTOR, selector)
-                    if journal_elem and journal_elem.text.strip():
-                        article_info["journal"] = journal_elem.text.strip()
-                        journal_found = True
-                        break
-                except:
-                    continue
+            journal_text, _ = self.selectors.find(
+                card, "card.journal", journal_selectors,
+                extract=lambda elem: elem.text.strip()
+            )
+            journal_found = bool(journal_text)
+            if journal_found:
+                article_info.journal = journal_text
             
             journal_time = time.time() - journal_start
             
@@ -218,17 +325,13 @@ class LinkCollector:
                 "span[data-test='date']"
             ]
             
-            date_found = False
-            for selector in date_selectors:
-                try:
-                    date_elem = card.find_element(By.CSS_SELECTOR, selector)
-                    if date_elem and date_elem.text.strip():
-                        date_text = date_elem.text.strip()
-                        article_info["publication_date"] = self._parse_publication_date(date_text)
-                        date_found = True
-                        break
-                except:
-                    continue
+            date_text, _ = self.selectors.find(
+                card, "card.date", date_selectors,
+                extract=lambda elem: elem.text.strip()
+            )
+            date_found = bool(date_text)
+            if date_found:
+                article_info.publication_date = self._parse_publication_date(date_text)
             
             date_time = time.time() - date_start
             
@@ -241,24 +344,23 @@ class LinkCollector:
                 if author_elems:
                     authors = [elem.text.strip() for elem in author_elems if elem.text.strip()]
             except Exception as e:
-                print(f"[性能] 作者提取异常: {e}")
+                logger.debug("作者提取异常: %s", e, extra=_STAGE)
             author_time = time.time() - author_start
-            if authors:
-                article_info["authors"] = authors
+            article_info.authors = authors
             
             # 性能统计
             total_extract_time = time.time() - extract_start
             if total_extract_time > 0.1:
-                print(f"[性能] 卡片信息提取耗时: {total_extract_time:.3f}秒")
-                print(f"[性能]   - 标题提取: {title_time:.3f}秒 (选择器: {title_selector_used})")
-                print(f"[性能]   - 期刊提取: {journal_time:.3f}秒 (成功: {journal_found})")
-                print(f"[性能]   - 日期提取: {date_time:.3f}秒 (成功: {date_found})")
-                print(f"[性能]   - 作者提取: {author_time:.3f}秒 (选择器: {author_selector_used}, 作者数: {len(authors)})")
+                logger.debug(
+                    "卡片信息提取耗时%.3f秒：标题%.3f秒(%s) 期刊%.3f秒(%s) 日期%.3f秒(%s) 作者%.3f秒(%s, %d人)",
+                    total_extract_time, title_time, title_selector_used, journal_time, journal_found,
+                    date_time, date_found, author_time, author_selector_used, len(authors), extra=_STAGE
+                )
             
             return article_info
         except Exception as e:
             extract_time = time.time() - extract_start
-            print(f"[性能] 提取卡片信息失败，耗时: {extract_time:.3f}秒，错误: {e}")
+            logger.warning("提取卡片信息失败，耗时: %.3f秒，错误: %s", extract_time, e, extra=_STAGE)
             return None
     
     def _go_to_next_page(self):
@@ -266,12 +368,12 @@ class LinkCollector:
         try:
             next_btn = self.driver.find_element(By.CSS_SELECTOR, self.config.SELECTORS['next_page'])
             next_btn.click()
-            print("翻到下一页...")
+            logger.debug("翻到下一页...", extra=_STAGE)
             return True
         except NoSuchElementException:
             return False
         except Exception as e:
-            print(f"翻页异常：{e}")
+            logger.warning("翻页异常：%s", e, extra=_STAGE)
             return False
     
     def _extract_doi_from_url(self, url):
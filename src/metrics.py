@@ -0,0 +1,366 @@
+"""
+运行指标
+计数器（Counter）、仪表（Gauge）和延迟直方图（Histogram）统一登记在一个注册表中，
+可通过本地 /metrics 端点以Prometheus文本格式查看，也可周期性写成JSON快照文件。
+长时间无人值守运行时，用来随时查看时间花在了哪里（翻页、选择器、下载、数据库、验证码）。
+
+用法：
+    from src.metrics import get_metrics
+    metrics = get_metrics()
+    metrics.counter("crawler_captcha_total", "验证码/异常页次数").inc()
+    with metrics.histogram("crawler_page_load_seconds", "页面加载耗时").time(kind="detail"):
+        driver.get(url)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from .config import ScienceConfig
+
+# 默认直方图分桶（秒），覆盖选择器查找的毫秒级到页面加载的数十秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 下载速度分桶（字节/秒），16KB/s ~ 64MB/s
+RATE_BUCKETS = tuple(16384 * 4 ** i for i in range(7))
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = list(key) + list(extra or ())
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    """同名指标按标签组合区分多个序列"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str = ""):
+        super().__init__(name, help_text)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """可任意设置的当前值（队列积压、步骤耗时等）"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    """with语句计时，退出时记入直方图"""
+
+    def __init__(self, histogram: "Histogram", labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """分桶直方图：记录分布、总和与次数"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str = "", buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}  # key -> [各桶计数..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def summary(self, **labels) -> Dict:
+        """次数、总和、平均值与估算分位数（取所在桶上界）"""
+        with self._lock:
+            series = list(self._series.get(_label_key(labels)) or [0] * (len(self.buckets) + 2))
+        return self._summarize(series)
+
+    def _summarize(self, series) -> Dict:
+        count, total = series[-1], series[-2]
+        result = {"count": count, "sum": round(total, 6), "avg": round(total / count, 6) if count else 0}
+        for q in (0.5, 0.9, 0.99):
+            result[f"p{int(q * 100)}"] = self._quantile(series, q)
+        return result
+
+    def _quantile(self, series, q: float):
+        count = series[-1]
+        if not count:
+            return 0
+        target = q * count
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            seen += series[i]
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+            lines.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]))
+            lines.append((f"{self.name}_sum", key, series[-2]))
+            lines.append((f"{self.name}_count", key, series[-1]))
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表：按名字取指标，不存在时创建"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._snapshot_thread = None
+        self._snapshot_stop = threading.Event()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help_text, **kwargs)
+        if not isinstance(metric, cls):
+            raise TypeError(f"指标 {name} 已注册为 {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = "") -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def timed(self, name: str, help_text: str = "", **labels):
+        """装饰器：把函数耗时记入直方图"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.histogram(name, help_text).time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _sorted_metrics(self):
+        with self._lock:
+            return sorted(self._metrics.items())
+
+    def render_prometheus(self) -> str:
+        """Prometheus文本格式"""
+        lines = []
+        for name, metric in self._sorted_metrics():
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, key, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """JSON友好的快照：计数器/仪表取值，直方图取次数、总和与分位数"""
+        result = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "metrics": {}}
+        for name, metric in self._sorted_metrics():
+            series = {}
+            if isinstance(metric, Histogram):
+                with metric._lock:
+                    items = [(key, list(values)) for key, values in metric._series.items()]
+                for key, values in items:
+                    series[_format_labels(key) or "total"] = metric._summarize(values)
+            else:
+                for _, key, value in metric.samples():
+                    series[_format_labels(key) or "total"] = value
+            result["metrics"][name] = {"type": metric.kind, "series": series}
+        return result
+
+    def write_snapshot(self, path: str):
+        """原子写入JSON快照（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1"):
+        """后台线程提供 /metrics（Prometheus文本）和 /metrics.json"""
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                elif self.path.startswith("/metrics"):
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 抓取方拉取频繁，不打印访问日志
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def start_snapshots(self, path: str, interval: float):
+        """后台线程每隔interval秒写一次JSON快照"""
+        if self._snapshot_thread is not None:
+            return
+
+        def loop():
+            while not self._snapshot_stop.wait(interval):
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    print(f"[指标] 写入快照失败: {e}")
+
+        self._snapshot_stop.clear()
+        self._snapshot_thread = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def stop(self, snapshot_path: Optional[str] = None):
+        """停止HTTP服务和快照线程，可选地写最后一次快照"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._snapshot_thread is not None:
+            self._snapshot_stop.set()
+            self._snapshot_thread = None
+        if snapshot_path:
+            self.write_snapshot(snapshot_path)
+
+
+class StepTimes(OrderedDict):
+    """按步骤记录耗时的有序字典，赋值时同步到 crawler_step_seconds 仪表，运行中即可查看"""
+
+    def __setitem__(self, step, seconds):
+        super().__setitem__(step, seconds)
+        get_metrics().gauge("crawler_step_seconds", "主流程各步骤耗时").set(round(seconds, 3), step=step)
+
+
+def record_download(nbytes: int, seconds: float, success: bool):
+    """记录一次PDF下载：结果计数、字节数、耗时与速度"""
+    metrics = get_metrics()
+    metrics.counter("crawler_downloads_total", "PDF下载次数").inc(result="success" if success else "failed")
+    metrics.histogram("crawler_download_seconds", "PDF下载耗时").observe(seconds)
+    if success and nbytes:
+        metrics.counter("crawler_download_bytes_total", "PDF下载字节数").inc(nbytes)
+        metrics.histogram("crawler_download_bytes_per_second", "PDF下载速度（字节/秒）",
+                          buckets=RATE_BUCKETS).observe(nbytes / max(seconds, 1e-6))
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """进程内共享的指标注册表"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def start_metrics(port: Optional[int] = None, snapshot_file: Optional[str] = None,
+                  interval: Optional[float] = None) -> MetricsRegistry:
+    """
+    按配置启动 /metrics 端点和周期快照，脚本入口调用一次
+
+    Args:
+        port: HTTP端口，None表示使用 ScienceConfig.METRICS_PORT，0表示不启动
+        snapshot_file: 快照文件，None表示使用 ScienceConfig.METRICS_SNAPSHOT_FILE，空字符串表示不写
+        interval: 快照间隔（秒），None表示使用 ScienceConfig.METRICS_SNAPSHOT_INTERVAL
+    """
+    registry = get_metrics()
+    port = ScienceConfig.METRICS_PORT if port is None else port
+    snapshot_file = ScienceConfig.METRICS_SNAPSHOT_FILE if snapshot_file is None else snapshot_file
+    interval = interval or ScienceConfig.METRICS_SNAPSHOT_INTERVAL
+    if port:
+        try:
+            registry.start_http_server(port)
+            print(f"[指标] http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"[指标] 端口 {port} 无法监听，跳过HTTP端点: {e}")
+    if snapshot_file:
+        registry.start_snapshots(snapshot_file, interval)
+    return registry
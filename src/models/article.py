@@ -1,68 +1,235 @@
 """
 文章数据模型
+Article 是收集→解析→下载→入库各阶段之间传递的唯一记录类型：
+- 使用 __slots__，没有实例字典：记录对象本身约160字节，同样字段的dict约460字节
+- to_row()/from_row() 与 science 表的列一一对应，入库和读取待下载记录时不再逐键拼装
+- to_bytes()/from_bytes() 是紧凑的二进制序列化（按字段顺序的JSON数组），用于跨进程队列；
+  安装了 orjson 时使用 orjson，否则退回标准库 json
+- 保留 get()/[] 等字典式访问（含旧键名 detail_url、download_link），旧代码和断点文件可以直接使用
 """
 
-from dataclasses import dataclass
-from typing import List, Optional
-from datetime import datetime
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..config import ScienceConfig
+
+try:
+    import orjson  # 可选依赖，序列化速度约为json的5~10倍
+except ImportError:
+    orjson = None
+
+
+def _json_default(value):
+    """标准库json序列化datetime"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value)}")
+
+
+def dumps(value) -> bytes:
+    """序列化为UTF-8 JSON字节串，datetime写成ISO格式"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def loads(data):
+    """反序列化 dumps() 的结果"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _parse_date(value):
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _split(value) -> List[str]:
+    """数据库中逗号拼接的作者/关键词还原为列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return value.split(", ")
+    return list(value)
 
 
-@dataclass
 class Article:
-    """文章数据模型"""
-    
-    title: str
-    url: str
-    authors: List[str]
-    journal: str
-    abstract: str
-    doi: Optional[str] = None
-    publication_date: Optional[datetime] = None
-    keywords: Optional[List[str]] = None
-    pdf_url: Optional[str] = None
-    download_path: Optional[str] = None
-    original_url: Optional[str] = None  # 原始Nature URL，用于第三方镜像站点
-    
-    def __post_init__(self):
-        if self.keywords is None:
-            self.keywords = []
-    
+    """文章记录，包含流水线各阶段需要的全部字段"""
+
+    __slots__ = (
+        "title", "url", "authors", "journal", "abstract", "doi", "publication_date", "keywords",
+        "pdf_url", "download_path", "pdf_page_url", "pdf_resolved_at", "pdf_md5", "downloaded", "dl_attempts",
+        "dl_last_error", "id",
+    )
+
+    # INSERT 的列顺序，与 to_row() 一一对应
+    ROW_COLUMNS = ("doi", "title", "authors", "journal", "abstract", "keywords", "publication_date",
+                   "url", "pdf_url", "download_path", "pdf_md5", "downloaded", "dl_attempts", "dl_last_error",
+                   "pdf_page_url", "pdf_resolved_at")
+    # 旧代码使用的键名
+    ALIASES = {"detail_url": "url", "download_link": "pdf_url"}
+
+    def __init__(self, title: str = "", url: str = "", authors: Optional[List[str]] = None,
+                 journal: str = "Science", abstract: Optional[str] = None, doi: Optional[str] = None,
+                 publication_date: Optional[datetime] = None, keywords: Optional[List[str]] = None,
+                 pdf_url: Optional[str] = None, download_path: Optional[str] = None,
+                 pdf_page_url: Optional[str] = None, pdf_resolved_at: Optional[datetime] = None,
+                 pdf_md5: Optional[str] = None, downloaded: bool = False, dl_attempts: int = 0,
+                 dl_last_error: Optional[str] = None, id: Optional[int] = None):
+        self.title = title
+        self.url = url
+        self.authors = authors if authors is not None else []
+        self.journal = journal
+        self.abstract = abstract
+        self.doi = doi
+        self.publication_date = publication_date
+        self.keywords = keywords if keywords is not None else []
+        self.pdf_url = pdf_url
+        self.download_path = download_path
+        self.pdf_page_url = pdf_page_url
+        self.pdf_resolved_at = pdf_resolved_at  # pdf_url/pdf_page_url 的解析时间，重试时据此判断缓存链接是否过期
+        self.pdf_md5 = pdf_md5
+        self.downloaded = downloaded
+        self.dl_attempts = dl_attempts
+        self.dl_last_error = dl_last_error
+        self.id = id
+
+    def __repr__(self) -> str:
+        return f"Article(doi={self.doi!r}, title={self.title!r}, downloaded={self.downloaded!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    # ---- 字典式访问（兼容旧代码）----
+
+    @classmethod
+    def _field(cls, key: str) -> str:
+        key = cls.ALIASES.get(key, key)
+        if key not in cls.__slots__:
+            raise KeyError(key)
+        return key
+
+    def __getitem__(self, key: str):
+        return getattr(self, self._field(key))
+
+    def __setitem__(self, key: str, value):
+        setattr(self, self._field(key), value)
+
+    def __contains__(self, key) -> bool:
+        return self.ALIASES.get(key, key) in self.__slots__
+
+    def get(self, key: str, default=None):
+        """字段值为None（或字段不存在）时返回default"""
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def update(self, values: Dict[str, Any]):
+        """批量设置字段，忽略未知键"""
+        for key, value in values.items():
+            if key in self:
+                self[key] = value
+
+    # ---- 转换 ----
+
     def to_dict(self) -> dict:
-        """转换为字典"""
-        return {
-            "title": self.title,
-            "url": self.url,
-            "authors": self.authors,
-            "journal": self.journal,
-            "abstract": self.abstract,
-            "doi": self.doi,
-            "publication_date": self.publication_date.isoformat() if self.publication_date else None,
-            "keywords": self.keywords,
-            "pdf_url": self.pdf_url,
-            "download_path": self.download_path,
-            "original_url": self.original_url
-        }
-    
+        """转换为字典（日期为ISO字符串）"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        for name in ("publication_date", "pdf_resolved_at"):
+            if data[name]:
+                data[name] = data[name].isoformat()
+        return data
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Article':
-        """从字典创建对象"""
-        publication_date = None
-        if data.get('publication_date'):
-            try:
-                publication_date = datetime.fromisoformat(data['publication_date'])
-            except:
-                pass
-        
+        """从字典创建对象，支持旧键名，忽略未知键"""
+        article = cls()
+        article.update(data)
+        article.publication_date = _parse_date(article.publication_date)
+        article.pdf_resolved_at = _parse_date(article.pdf_resolved_at)
+        article.authors = _split(article.authors)
+        article.keywords = _split(article.keywords)
+        return article
+
+    @classmethod
+    def coerce(cls, value) -> 'Article':
+        """Article原样返回，dict转换为Article"""
+        return value if isinstance(value, Article) else cls.from_dict(value)
+
+    def to_row(self) -> tuple:
+        """按 ROW_COLUMNS 顺序生成INSERT参数，作者/关键词以逗号拼接"""
+        return (
+            self.doi,
+            self.title,
+            ", ".join(self.authors) if self.authors else None,
+            self.journal or "Science",
+            self.abstract,
+            ", ".join(self.keywords) if self.keywords else None,
+            self.publication_date,
+            self.url,
+            self.pdf_url,
+            self.download_path,
+            self.pdf_md5,
+            int(bool(self.downloaded)),
+            self.dl_attempts or 0,
+            self.dl_last_error,
+            self.pdf_page_url,
+            self.pdf_resolved_at,
+        )
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'Article':
+        """从数据库行（DictCursor）创建对象，缺少详情页URL时按DOI拼接"""
+        url = row.get("url")
+        doi = row.get("doi")
+        if not url and doi:
+            url = f"{ScienceConfig.BASE_URL}/doi/{doi}"
         return cls(
-            title=data['title'],
-            url=data['url'],
-            authors=data.get('authors', []),
-            journal=data.get('journal', ''),
-            abstract=data.get('abstract', ''),
-            doi=data.get('doi'),
-            publication_date=publication_date,
-            keywords=data.get('keywords', []),
-            pdf_url=data.get('pdf_url'),
-            download_path=data.get('download_path'),
-            original_url=data.get('original_url')
-        ) 
\ No newline at end of file
+            title=row.get("title") or "",
+            url=url or "",
+            authors=_split(row.get("authors")),
+            journal=row.get("journal") or "Science",
+            abstract=row.get("abstract"),
+            doi=doi,
+            publication_date=row.get("publication_date"),
+            keywords=_split(row.get("keywords")),
+            pdf_url=row.get("pdf_url"),
+            download_path=row.get("download_path"),
+            pdf_page_url=row.get("pdf_page_url"),
+            pdf_resolved_at=_parse_date(row.get("pdf_resolved_at")),
+            pdf_md5=row.get("pdf_md5"),
+            downloaded=bool(row.get("downloaded")),
+            dl_attempts=row.get("dl_attempts") or 0,
+            dl_last_error=row.get("dl_last_error"),
+            id=row.get("id"),
+        )
+
+    def to_bytes(self) -> bytes:
+        """序列化为按字段顺序的JSON数组字节串"""
+        return dumps([getattr(self, name) for name in self.__slots__])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Article':
+        article = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, loads(data)):
+            setattr(article, name, value)
+        article.publication_date = _parse_date(article.publication_date)
+        article.pdf_resolved_at = _parse_date(article.pdf_resolved_at)
+        return article
+
+
+def to_articles(items: Iterable) -> List[Article]:
+    """把dict或Article组成的序列统一为Article列表"""
+    return [Article.coerce(item) for item in items]
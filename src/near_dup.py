@@ -0,0 +1,361 @@
+"""
+标题近似重复索引（MinHash + LSH）
+精确标题查重漏掉的是大小写、标点、Unicode写法不同，或带 "Erratum:"、"Correction:" 等前缀的同一标题。
+这里把规范化后的标题切成字符n-gram，用MinHash压缩成定长签名，再按LSH分段放进桶里：
+- 查询只需计算一次签名并查 NEAR_DUP_BANDS 个桶，与索引规模无关（亚毫秒级）
+- 候选用签名估计的Jaccard相似度复核，不低于 NEAR_DUP_THRESHOLD 视为近似重复
+- 索引持久化在SQLite文件中（docs 签名表 + bands 桶表），可增量追加
+- 全表构建时签名计算在进程池中并行，按块读取，内存占用与表大小无关
+- 可选把摘要的词3-gram并入签名（构建时决定，写入索引元数据）
+
+取代 check_duplicates.py 中对硬编码标题两两比较的 O(n²) 做法。
+"""
+
+import hashlib
+import multiprocessing as mp
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "near_dup"}
+
+_NOTICE_PREFIX = re.compile(
+    r"^(?:(?:erratum|correction|corrigendum|retraction|retracted|addendum|editor'?s note|"
+    r"editorial expression of concern|expression of concern)(?:\s+(?:to|for|of|on))?\s*[:\-–—]\s*)+"
+)
+_NON_WORD = re.compile(r"[\W_]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, doi TEXT, title TEXT, sig BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_bands ON bands (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands (doc_id);
+"""
+
+
+def normalize_title(text: Optional[str]) -> str:
+    """去重音、统一大小写、去掉勘误/撤稿等前缀和标点，空白归一"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold().strip()
+    text = _NOTICE_PREFIX.sub("", text)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def shingles(title: Optional[str], abstract: Optional[str] = None, size: Optional[int] = None) -> Set[str]:
+    """标题的字符n-gram；传入摘要时并入摘要的词3-gram（加前缀避免与标题n-gram混淆）"""
+    size = size or ScienceConfig.NEAR_DUP_SHINGLE
+    text = normalize_title(title)
+    grams = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))} if text else set()
+    if abstract:
+        words = normalize_title(abstract).split()
+        grams.update("\x00" + " ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1)))
+    return grams
+
+
+class MinHasher:
+    """
+    单次置换MinHash（one permutation hashing）：每个n-gram只哈希一次，按哈希值分到 num_perm 个桶，
+    桶内取最小值；空桶借用右侧最近的非空桶并加上距离偏移（旋转致密化）。
+    与 num_perm 个独立哈希函数的MinHash有相同的相似度估计方式，计算量只与n-gram数成正比。
+    """
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        self.num_perm = num_perm
+        self.key = seed.to_bytes(8, "big")
+
+    def signature(self, grams: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        n = self.num_perm
+        key = self.key
+        slots = [None] * n
+        for gram in grams:
+            h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8, key=key).digest(), "big")
+            value = h >> 16
+            index = h % n
+            current = slots[index]
+            if current is None or value < current:
+                slots[index] = value
+        if not any(v is not None for v in slots):
+            return None
+        sig = list(slots)
+        for i in range(n):
+            if sig[i] is None:
+                distance = 1
+                while slots[(i + distance) % n] is None:
+                    distance += 1
+                sig[i] = slots[(i + distance) % n] + (distance << 48)
+        return tuple(sig)
+
+
+def band_keys(sig: Sequence[int], bands: int) -> List[int]:
+    """签名切成bands段，每段哈希成一个64位桶号"""
+    rows = len(sig) // bands
+    keys = []
+    for i in range(bands):
+        digest = hashlib.blake2b(array("Q", sig[i * rows:(i + 1) * rows]).tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """两个签名相同位置相等的比例，即Jaccard相似度的估计"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _pack(sig: Sequence[int]) -> bytes:
+    return array("Q", sig).tobytes()
+
+
+def _unpack(blob: bytes) -> array:
+    sig = array("Q")
+    sig.frombytes(blob)
+    return sig
+
+
+def _signature_chunk(params: Dict, rows: List[tuple]) -> List[tuple]:
+    """进程池任务：一块 (id, doi, title, abstract) 计算签名与桶号"""
+    hasher = MinHasher(params["num_perm"], params["seed"])
+    out = []
+    for doc_id, doi, title, abstract in rows:
+        sig = hasher.signature(shingles(title, abstract if params["use_abstract"] else None, params["shingle"]))
+        if sig:
+            out.append((doc_id, doi, title, sig, band_keys(sig, params["bands"])))
+    return out
+
+
+class NearDupIndex:
+    """持久化的MinHash/LSH索引，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, num_perm: Optional[int] = None, bands: Optional[int] = None,
+                 use_abstract: bool = False, threshold: Optional[float] = None):
+        """
+        Args:
+            path: 索引文件，None表示 NEAR_DUP_INDEX_FILE
+            num_perm/bands/use_abstract: 新建索引时的参数；打开已有索引时以文件中记录的为准
+            threshold: 估计相似度阈值，None表示 NEAR_DUP_THRESHOLD
+        """
+        self.path = path or ScienceConfig.NEAR_DUP_INDEX_FILE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.threshold = threshold or ScienceConfig.NEAR_DUP_THRESHOLD
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        if not meta:
+            meta = {
+                "num_perm": num_perm or ScienceConfig.NEAR_DUP_NUM_PERM,
+                "bands": bands or ScienceConfig.NEAR_DUP_BANDS,
+                "shingle": ScienceConfig.NEAR_DUP_SHINGLE,
+                "use_abstract": int(use_abstract),
+                "seed": 1,
+            }
+            if meta["num_perm"] % meta["bands"]:
+                raise ValueError("NEAR_DUP_NUM_PERM 必须是 NEAR_DUP_BANDS 的整数倍")
+            self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+            self.conn.commit()
+        self.params = {key: int(value) for key, value in meta.items()}
+        self.hasher = MinHasher(self.params["num_perm"], self.params["seed"])
+
+    @property
+    def use_abstract(self) -> bool:
+        return bool(self.params["use_abstract"])
+
+    def signature(self, title: str, abstract: Optional[str] = None) -> Optional[Tuple[int, ...]]:
+        grams = shingles(title, abstract if self.use_abstract else None, self.params["shingle"])
+        return self.hasher.signature(grams)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def max_id(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM docs").fetchone()[0]
+
+    def add_many(self, items: Iterable[tuple]):
+        """批量加入 (id, doi, title, sig, band_keys)，同一id重复加入时覆盖"""
+        items = list(items)
+        if not items:
+            return
+        with self._lock:
+            self.conn.executemany("DELETE FROM bands WHERE doc_id = ?", [(item[0],) for item in items])
+            self.conn.executemany("INSERT OR REPLACE INTO docs (id, doi, title, sig) VALUES (?, ?, ?, ?)",
+                                  [(doc_id, doi, title, _pack(sig)) for doc_id, doi, title, sig, _ in items])
+            self.conn.executemany("INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                                  [(band, key, item[0]) for item in items for band, key in enumerate(item[4])])
+            self.conn.commit()
+
+    def add(self, doc_id: int, title: str, doi: Optional[str] = None, abstract: Optional[str] = None):
+        sig = self.signature(title, abstract)
+        if sig:
+            self.add_many([(doc_id, doi, title, sig, band_keys(sig, self.params["bands"]))])
+
+    def query(self, title: str, abstract: Optional[str] = None, threshold: Optional[float] = None,
+              exclude: Optional[int] = None, limit: int = 5) -> List[Dict]:
+        """
+        查找近似重复的已索引文章
+
+        Returns:
+            [{"id", "doi", "title", "score"}]，按相似度从高到低，最多limit条
+        """
+        sig = self.signature(title, abstract)
+        if not sig:
+            return []
+        threshold = threshold or self.threshold
+        keys = band_keys(sig, self.params["bands"])
+        clause = " OR ".join(["(band = ? AND bucket = ?)"] * len(keys))
+        params = [value for pair in enumerate(keys) for value in pair]
+        with self._lock:
+            candidates = self.conn.execute(
+                f"SELECT id, doi, title, sig FROM docs WHERE id IN (SELECT doc_id FROM bands WHERE {clause})", params
+            ).fetchall()
+        matches = []
+        for doc_id, doi, doc_title, blob in candidates:
+            if doc_id == exclude:
+                continue
+            score = similarity(sig, _unpack(blob))
+            if score >= threshold:
+                matches.append({"id": doc_id, "doi": doi, "title": doc_title, "score": round(score, 3)})
+        matches.sort(key=lambda m: -m["score"])
+        return matches[:limit]
+
+    def clusters(self, threshold: Optional[float] = None, min_size: int = 2) -> List[List[Dict]]:
+        """同桶候选对复核后用并查集合并成簇，按簇大小从大到小返回"""
+        threshold = threshold or self.threshold
+        parent: Dict[int, int] = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        sigs: Dict[int, array] = {}
+        with self._lock:
+            groups = self.conn.execute(
+                "SELECT group_concat(doc_id) FROM bands GROUP BY band, bucket HAVING COUNT(*) > 1"
+            ).fetchall()
+            checked = set()
+            for (ids,) in groups:
+                members = sorted(int(x) for x in ids.split(","))
+                for doc_id in members:
+                    if doc_id not in sigs:
+                        row = self.conn.execute("SELECT sig FROM docs WHERE id = ?", (doc_id,)).fetchone()
+                        sigs[doc_id] = _unpack(row[0])
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        if (a, b) in checked:
+                            continue
+                        checked.add((a, b))
+                        if similarity(sigs[a], sigs[b]) >= threshold:
+                            parent[find(b)] = find(a)
+            grouped: Dict[int, List[int]] = {}
+            for doc_id in list(parent):
+                grouped.setdefault(find(doc_id), []).append(doc_id)
+            result = []
+            for members in grouped.values():
+                if len(members) < min_size:
+                    continue
+                rows = self.conn.execute(
+                    f"SELECT id, doi, title FROM docs WHERE id IN ({','.join('?' * len(members))}) ORDER BY id",
+                    members
+                ).fetchall()
+                result.append([{"id": r[0], "doi": r[1], "title": r[2]} for r in rows])
+        result.sort(key=lambda c: (-len(c), c[0]["id"]))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM bands")
+            self.conn.execute("DELETE FROM docs")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _iter_row_chunks(since_id: int, use_abstract: bool, chunk_rows: int) -> Iterator[List[tuple]]:
+    """用服务端游标按id顺序分块读取 science 表"""
+    abstract = "abstract" if use_abstract else "NULL"
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(f"SELECT id, doi, title, {abstract} FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE id > %s ORDER BY id", (since_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield list(rows)
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def build_index(index: NearDupIndex, workers: Optional[int] = None, since_id: int = 0,
+                chunk_rows: int = 2000, chunks: Optional[Iterable[List[tuple]]] = None) -> int:
+    """
+    把数据库中 id > since_id 的文章加入索引，签名计算在进程池中并行
+
+    Args:
+        workers: 进程数，None表示CPU核数，1表示在当前进程中计算
+        chunks: 自定义的行块来源（测试用），None表示从数据库读取
+
+    Returns:
+        加入索引的文章数
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunks if chunks is not None else _iter_row_chunks(since_id, index.use_abstract, chunk_rows)
+    added = 0
+    if workers == 1:
+        for rows in chunks:
+            items = _signature_chunk(index.params, rows)
+            index.add_many(items)
+            added += len(items)
+        return added
+    with mp.get_context("spawn").Pool(workers) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append(pool.apply_async(_signature_chunk, (index.params, rows)))
+            if len(pending) >= workers * 2:  # 限制在途块数，内存占用不随表大小增长
+                items = pending.popleft().get()
+                index.add_many(items)
+                added += len(items)
+                logger.info("已索引%d篇", added, extra={"stage": "near_dup", "indexed": added})
+        while pending:
+            items = pending.popleft().get()
+            index.add_many(items)
+            added += len(items)
+    return added
+
+
+_index: Optional[NearDupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_dup_index() -> Optional[NearDupIndex]:
+    """入库查重使用的共享索引；未开启 NEAR_DUP_CHECK_ON_SAVE 或索引文件尚未构建时返回None"""
+    global _index
+    if not ScienceConfig.NEAR_DUP_CHECK_ON_SAVE:
+        return None
+    with _index_lock:
+        if _index is None and os.path.exists(ScienceConfig.NEAR_DUP_INDEX_FILE):
+            _index = NearDupIndex(ScienceConfig.NEAR_DUP_INDEX_FILE)
+        return _index
@@ -1,9 +1,29 @@
+import logging
+import os
+import random
 import time
+from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
+from .browser_session import get_browser_session
 from .config import ScienceConfig
+from .selector_registry import get_selector_registry
+from .pdf_url_resolver import PDFUrlResolver
+from .metrics import get_metrics, record_download
+from .models.article import Article
+from .profiling import get_profiler
+from .retry_policy import NO_LINK, TRANSIENT, FetchError, classify, get_retry_engine
+from .utils import handle_captcha, is_captcha_or_abnormal
+from .utils.download_utils import PDF_ACCEPT, fetch_pdf
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_RESOLVE = {"stage": "resolve"}
+_DOWNLOAD = {"stage": "download"}
+# 这些状态码说明链接本身失效（过期、无权限或已移除），需要重新解析而不是原样重试
+LINK_REJECTED_STATUS = (401, 403, 404, 410)
 
 class PDFProcessor:
     """PDF处理器，负责处理单个详情页并获取PDF下载链接"""
@@ -12,92 +32,153 @@ class PDFProcessor:
         self.driver = driver
         from .config import ScienceConfig
         self.config = ScienceConfig()
+        self.selectors = get_selector_registry()  # 选择器命中率统计与排序
+        self.url_resolver = None  # PDF直链解析器，首次使用时创建
+        self.link_rejected = False  # 最近一次下载是否因链接失效失败（见 LINK_REJECTED_STATUS、非PDF响应）
+        self.last_error = None  # 最近一次下载失败的 FetchError
+        self.page_load = get_metrics().histogram("crawler_page_load_seconds", "页面加载耗时（driver.get）")
     
     def process_article(self, article_info, cookies_str=None, user_agent=None):
-        """处理单个文章，获取PDF下载链接并立即下载。支持外部传入cookie和user-agent。"""
-        title = article_info.get("title", "Unknown")
-        print(f"[{title}] 开始处理详情页...")
+        """
+        处理单个文章，获取PDF下载链接并立即下载。支持外部传入cookie和user-agent。
+        记录里带有 PDF_LINK_TTL 内解析出的链接时先直接下载（一次HTTP请求），链接失效时才重新解析。
+        """
+        article_info = Article.coerce(article_info)
+        title = article_info.title or "Unknown"
+        profiler = get_profiler()
+        if self._cached_link_fresh(article_info):
+            logger.info("[%s] 使用%s解析的PDF链接，跳过详情页", title, article_info.pdf_resolved_at, extra=_DOWNLOAD)
+            with profiler.stage("download"):
+                success, file_path = self._download_pdf_immediately(title, article_info.pdf_url, cookies_str, user_agent,
+                                                                    referer=article_info.pdf_page_url, pause=False)
+            if success or not self.link_rejected:
+                article_info.downloaded = success
+                article_info.download_path = file_path
+                return article_info
+            logger.info("[%s] 缓存的PDF链接已失效，重新解析", title, extra=_RESOLVE)
+            article_info.pdf_url = article_info.pdf_page_url = article_info.pdf_resolved_at = None
+        with profiler.stage("resolve"):
+            result = self.resolve_article(article_info)
+        if not result:
+            return None
+        logger.info("[%s] 获取到PDF下载链接，开始下载...", title, extra=_DOWNLOAD)
+        # 模拟阅读停顿只在真的浏览了详情页/ePDF页时需要；DOI模板直链（没有 pdf_page_url）与缓存链接一样直接下载
+        with profiler.stage("download"):
+            success, file_path = self._download_pdf_immediately(title, result.pdf_url, cookies_str, user_agent,
+                                                                referer=result.pdf_page_url,
+                                                                pause=result.pdf_page_url is not None)
+        result.downloaded = success
+        result.download_path = file_path
+        return result
+    
+    def failure_of(self, result):
+        """process_article 未下载成功时的 (失败类别, 错误信息)，用于跨运行的重新调度"""
+        if not result:
+            return NO_LINK, "下载失败或未找到链接"
+        if self.last_error is None:
+            return TRANSIENT, "下载失败"
+        return self.last_error.kind, f"下载失败: {self.last_error.reason}"
+    
+    def resolve_article(self, article_info):
+        """只解析PDF下载链接（不下载），填入 pdf_url/pdf_page_url 后返回同一Article，未找到链接时返回None"""
+        article_info = Article.coerce(article_info)
+        title = article_info.title or "Unknown"
         try:
-            self.driver.get(article_info.get("url"))
+            # 优先按DOI模板拼接PDF直链，命中则跳过详情页和ePDF页两次渲染
+            download_link = self._resolve_direct(article_info)
+            if download_link:
+                return self._build_result(article_info, download_link)
+            logger.info("[%s] 开始处理详情页...", title, extra=_RESOLVE)
+            with self.page_load.time(kind="detail"):
+                self.driver.get(article_info.url)
             time.sleep(self.config.SLEEP_TIME)
             try:
                 WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located(("css selector", "body"))
                 )
             except:
-                print(f"[{title}] 页面加载超时，继续处理...")
+                logger.warning("[%s] 页面加载超时，继续处理...", title, extra=_RESOLVE)
+            self._check_abnormal_page(title)
             # 只检查PDF按钮，不检查标题（标题已在搜索页获取）
             try:
                 self.driver.find_element(By.CSS_SELECTOR, "i.icon-pdf")
-                print(f"[{title}] PDF按钮已加载")
+                logger.debug("[%s] PDF按钮已加载", title, extra=_RESOLVE)
             except Exception as e:
-                print(f"[{title}] PDF按钮未找到: {e}")
+                logger.debug("[%s] PDF按钮未找到: %s", title, e, extra=_RESOLVE)
                 # 不立即抛出异常，继续尝试其他方法
             article_details = self._extract_article_details()
             pdf_page_url = self._find_pdf_page_url()
             if not pdf_page_url:
-                print(f"[{title}] 未找到PDF按钮，跳过")
+                logger.warning("[%s] 未找到PDF按钮，跳过", title, extra=_RESOLVE)
                 return None
-            self.driver.get(pdf_page_url)
+            with self.page_load.time(kind="epdf"):
+                self.driver.get(pdf_page_url)
             time.sleep(self.config.SLEEP_TIME)
+            self._check_abnormal_page(title)
             try:
                 self.driver.find_element(By.CSS_SELECTOR, "#app-navbar > div.btn-group.navbar-right > div.grouped.right > a > span, span.icon.material-icons")
-                print(f"[{title}] PDF页面下载按钮已加载")
+                logger.debug("[%s] PDF页面下载按钮已加载", title, extra=_RESOLVE)
             except Exception as e:
-                print(f"[{title}] PDF页面下载按钮未找到: {e}")
+                logger.warning("[%s] PDF页面下载按钮未找到: %s", title, e, extra=_RESOLVE)
                 raise
             download_link = self._get_pdf_download_link()
             if not download_link:
-                print(f"[{title}] 未找到PDF下载链接，跳过")
+                logger.warning("[%s] 未找到PDF下载链接，跳过", title, extra=_RESOLVE)
                 return None
-            print(f"[{title}] 获取到PDF下载链接，开始下载...")
-            success, file_path = self._download_pdf_immediately(title, download_link, cookies_str, user_agent)
-            result = {
-                "title": article_info.get("title"),
-                "url": article_info.get("url"),
-                "download_link": download_link,
-                "downloaded": success,
-                "download_path": file_path,
-                "doi": article_info.get("doi"),
-                "journal": article_info.get("journal"),
-                "publication_date": article_info.get("publication_date"),
-                "authors": article_info.get("authors", []),
-            }
+            result = self._build_result(article_info, download_link, pdf_page_url)
             if article_details:
                 result.update(article_details)
             return result
         except Exception as e:
-            print(f"[{title}] 处理异常，跳过：{e}")
+            logger.warning("[%s] 处理异常，跳过：%s", title, e, extra=_RESOLVE)
+            return None
+    
+    def _build_result(self, article, download_link, pdf_page_url=None):
+        """在文章记录上填入解析结果及解析时间（尚未下载），不复制记录"""
+        article.pdf_url = download_link
+        article.pdf_page_url = pdf_page_url
+        article.pdf_resolved_at = datetime.now().replace(microsecond=0)
+        article.downloaded = False
+        article.download_path = None
+        return article
+    
+    def _cached_link_fresh(self, article):
+        """记录中是否有仍在 PDF_LINK_TTL 内的已解析链接"""
+        if not (article.pdf_url and article.pdf_resolved_at and self.config.PDF_LINK_TTL):
+            return False
+        return (datetime.now() - article.pdf_resolved_at).total_seconds() < self.config.PDF_LINK_TTL
+    
+    def _check_abnormal_page(self, title):
+        """导航后用页面探测脚本检查验证码/异常页，发现时进入等待处理"""
+        if is_captcha_or_abnormal(self.driver):
+            logger.warning("[%s] 检测到验证码/异常页面，等待处理...", title, extra=_RESOLVE)
+            handle_captcha(self.driver)
+    
+    def _resolve_direct(self, article_info):
+        """尝试按DOI模板获取PDF直链，模板未命中时返回None以回退到页面导航"""
+        doi = article_info.doi
+        if not (self.config.DIRECT_PDF_URL and doi):
             return None
+        download_link = self._get_url_resolver().resolve(doi)
+        if not download_link:
+            logger.info("[%s] PDF直链未命中，回退到详情页导航", article_info.title or 'Unknown', extra=_RESOLVE)
+        return download_link
+    
+    def _get_url_resolver(self):
+        """懒加载PDF直链解析器，使用共享的浏览器会话（由持有浏览器的线程 attach，这里不再登记）"""
+        if self.url_resolver is None:
+            self.url_resolver = PDFUrlResolver(session=get_browser_session().session)
+        return self.url_resolver
     
     def _find_pdf_page_url(self):
-        """在详情页查找PDF页面URL - 使用确切的选择器"""
+        """在详情页查找PDF页面URL - 按历史命中率依次尝试选择器"""
         try:
-            print(f"[DEBUG] 开始查找PDF按钮，当前URL: {self.driver.current_url}")
-            
-            # 使用用户提供的确切选择器
-            main_selector = "#main > div.article-container > article > header > div > div.info-panel > div.info-panel__right-content > div.info-panel__formats.info-panel__item > a > i"
-            t_sel = time.time()
-            
-            try:
-                # 查找PDF图标
-                pdf_icon = self.driver.find_element(By.CSS_SELECTOR, main_selector)
-                print(f"[调试] PDF按钮选择器 {main_selector} 命中, 耗时: {time.time() - t_sel:.3f}秒")
-                
-                # 获取父级a元素
-                parent_a = pdf_icon.find_element(By.XPATH, "./parent::a")
-                pdf_page_href = parent_a.get_attribute("href")
-                
-                if pdf_page_href:
-                    # 确保URL完整
-                    pdf_page_url = pdf_page_href if pdf_page_href.startswith("http") else "https://www.science.org" + pdf_page_href
-                    print(f"[调试] 获取到PDF页面URL: {pdf_page_url}")
-                    return pdf_page_url
-            except NoSuchElementException:
-                print(f"[调试] 未找到确切的PDF按钮选择器: {main_selector}, 耗时: {time.time() - t_sel:.3f}秒")
+            if logger.isEnabledFor(logging.DEBUG):  # current_url 需要一次浏览器往返，只在DEBUG时取
+                logger.debug("开始查找PDF按钮，当前URL: %s", self.driver.current_url, extra=_RESOLVE)
             
-            # 备用选择器方案
             pdf_selectors = [
+                # 用户提供的确切选择器
+                "#main > div.article-container > article > header > div > div.info-panel > div.info-panel__right-content > div.info-panel__formats.info-panel__item > a > i",
                 "i.icon-pdf",
                 "#main > div.article-container > article > header > div > div.info-panel > div.info-panel__right-content > div.info-panel__formats.info-panel__item > a",
                 "a[href*='pdf']",
@@ -111,36 +192,16 @@ class PDFProcessor:
                 ".article-action-pdf a"
             ]
             
-            for selector in pdf_selectors:
-                t_sel = time.time()
-                try:
-                    # 特别处理icon元素
-                    if selector == "i.icon-pdf":
-                        pdf_icons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                        print(f"[调试] PDF按钮选择器 {selector} 查找{len(pdf_icons)}个icon, 耗时: {time.time() - t_sel:.3f}秒")
-                        for i, icon in enumerate(pdf_icons):
-                            try:
-                                parent_a = icon.find_element(By.XPATH, "./ancestor::a")
-                                pdf_page_href = parent_a.get_attribute("href")
-                                if pdf_page_href:
-                                    pdf_page_url = pdf_page_href if pdf_page_href.startswith("http") else "https://www.science.org" + pdf_page_href
-                                    print(f"[调试] PDF按钮选择器 {selector} 命中, 耗时: {time.time() - t_sel:.3f}秒")
-                                    return pdf_page_url
-                            except NoSuchElementException:
-                                continue
-                    else:
-                        pdf_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        pdf_page_href = pdf_elem.get_attribute("href")
-                        if pdf_page_href:
-                            pdf_page_url = pdf_page_href if pdf_page_href.startswith("http") else "https://www.science.org" + pdf_page_href
-                            print(f"[调试] PDF按钮选择器 {selector} 命中, 耗时: {time.time() - t_sel:.3f}秒")
-                            return pdf_page_url
-                except NoSuchElementException:
-                    print(f"[调试] PDF按钮选择器 {selector} 未命中, 耗时: {time.time() - t_sel:.3f}秒")
-                    continue
-                except Exception as e:
-                    print(f"[调试] PDF按钮选择器 {selector} 异常: {e}, 耗时: {time.time() - t_sel:.3f}秒")
-                    continue
+            t_sel = time.time()
+            pdf_page_href, selector = self.selectors.find(
+                self.driver, "detail.pdf_page", pdf_selectors, extract=self._pdf_href
+            )
+            if pdf_page_href:
+                # 确保URL完整
+                pdf_page_url = pdf_page_href if pdf_page_href.startswith("http") else self.config.BASE_URL + pdf_page_href
+                logger.debug("PDF按钮选择器 %s 命中, 耗时: %.3f秒", selector, time.time() - t_sel, extra=_RESOLVE)
+                return pdf_page_url
+            logger.debug("PDF按钮选择器全部未命中, 耗时: %.3f秒", time.time() - t_sel, extra=_RESOLVE)
             
             # 兜底方案: 查找包含"pdf"的所有链接
             t_sel = time.time()
@@ -152,32 +213,36 @@ class PDFProcessor:
                     if href and ("pdf" in href.lower() or "epdf" in href.lower()):
                         pdf_links.append(href)
                 if pdf_links:
-                    print(f"[调试] 兜底PDF链接查找命中, 耗时: {time.time() - t_sel:.3f}秒")
+                    logger.debug("兜底PDF链接查找命中, 耗时: %.3f秒", time.time() - t_sel, extra=_RESOLVE)
                     return pdf_links[0]
                 else:
-                    print(f"[调试] 兜底PDF链接查找未命中, 耗时: {time.time() - t_sel:.3f}秒")
+                    logger.debug("兜底PDF链接查找未命中, 耗时: %.3f秒", time.time() - t_sel, extra=_RESOLVE)
             except Exception as e:
-                print(f"[调试] 兜底PDF链接查找异常: {e}, 耗时: {time.time() - t_sel:.3f}秒")
+                logger.debug("兜底PDF链接查找异常: %s, 耗时: %.3f秒", e, time.time() - t_sel, extra=_RESOLVE)
                 
-            print("[DEBUG] 所有方法都未找到PDF按钮")
+            logger.debug("所有方法都未找到PDF按钮", extra=_RESOLVE)
             return None
         except Exception as e:
-            print(f"[DEBUG] 查找PDF按钮异常：{e}")
+            logger.warning("查找PDF按钮异常：%s", e, extra=_RESOLVE)
+            return None
+    
+    @staticmethod
+    def _pdf_href(elem):
+        """取元素的href；PDF图标(i)本身没有href时取其外层a元素的href"""
+        href = elem.get_attribute("href")
+        if href:
+            return href
+        try:
+            return elem.find_element(By.XPATH, "./ancestor::a").get_attribute("href")
+        except NoSuchElementException:
             return None
     
     def _get_pdf_download_link(self):
-        """在PDF页面获取下载链接 - 使用确切的选择器"""
+        """在PDF页面获取下载链接 - 按历史命中率依次尝试选择器"""
         try:
-            # 精确选择器
-            download_selector = "#app-navbar > div.btn-group.navbar-right > div.grouped.right > a"
-            a_elem = self.driver.find_element(By.CSS_SELECTOR, download_selector)
-            download_link = a_elem.get_attribute("href")
-            if download_link:
-                print(f"[调试] 精准选择器获取到下载链接: {download_link}")
-                return download_link
-            
-            # 备用选择器
-            backup_selectors = [
+            download_selectors = [
+                # 精确选择器
+                "#app-navbar > div.btn-group.navbar-right > div.grouped.right > a",
                 'a[href*="download=true"]',
                 '.download-button',
                 'a[data-test="pdf-download"]',
@@ -191,34 +256,49 @@ class PDFProcessor:
                 'a.download-link'
             ]
             
-            for selector in backup_selectors:
-                try:
-                    elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    href = elem.get_attribute("href")
-                    if href:
-                        print(f"[调试] 备用选择器 {selector} 获取到下载链接: {href}")
-                        return href
-                except Exception:
-                    continue
+            download_link, selector = self.selectors.find(
+                self.driver, "epdf.download", download_selectors,
+                extract=lambda elem: elem.get_attribute("href")
+            )
+            if download_link:
+                logger.debug("选择器 %s 获取到下载链接: %s", selector, download_link, extra=_RESOLVE)
+                return download_link
                     
-            print(f"[调试] 未能获取到PDF下载链接")
+            logger.debug("未能获取到PDF下载链接", extra=_RESOLVE)
             return None
         except Exception as e:
-            print(f"[调试] 获取PDF下载链接异常: {e}")
+            logger.warning("获取PDF下载链接异常: %s", e, extra=_RESOLVE)
             return None
     
-    def _download_pdf_immediately(self, title, download_link, cookies_str=None, user_agent=None):
-        """用requests+cookie下载PDF文件"""
-        try:
+    def _download_pdf_immediately(self, title, download_link, cookies_str=None, user_agent=None, referer=None,
+                                  pause=True):
+        """模拟阅读停顿后下载PDF，下载耗时与速度记入指标（不含停顿）"""
+        if pause:
             # 在真实用户行为中，用户从详情页到点击下载会有停顿，这里加入 20-30 秒的随机延迟
-            import random
             random_delay = random.uniform(20, 30)
-            print(f"[{title}] 模拟用户阅读，等待 {random_delay:.1f} 秒后开始下载...")
-            time.sleep(random_delay)
+            logger.debug("[%s] 模拟用户阅读，等待 %.1f 秒后开始下载...", title, random_delay, extra=_DOWNLOAD)
+        else:
+            # 直接使用缓存链接时没有浏览页面，只保留普通的下载间隔
+            random_delay = random.uniform(self.config.DOWNLOAD_DELAY_MIN, self.config.DOWNLOAD_DELAY_MAX)
+        time.sleep(random_delay)
 
+        start = time.perf_counter()
+        success, filepath = self._fetch_pdf(title, download_link, cookies_str, user_agent, referer)
+        nbytes = os.path.getsize(filepath) if success and filepath and os.path.exists(filepath) else 0
+        record_download(nbytes, time.perf_counter() - start, success)
+        return success, filepath
+    
+    def _fetch_pdf(self, title, download_link, cookies_str=None, user_agent=None, referer=None):
+        """
+        用共享的浏览器会话下载PDF文件；显式传入cookies_str/user_agent时按请求覆盖。
+        重试由共享的重试引擎决定（src/retry_policy.py）；因链接失效（LINK_REJECTED_STATUS
+        或响应不是PDF）失败时置 self.link_rejected
+        """
+        self.link_rejected = False
+        self.last_error = None
+        try:
             from .utils import sanitize_filename
             import os
-            import requests
             
             # 创建下载目录
             download_dir = self.config.DOWNLOAD_DIR
@@ -237,9 +317,9 @@ class PDFProcessor:
                 filepath = os.path.join(download_dir, new_filename)
                 counter += 1
                 if counter > 2:  # 只在第一次重命名时打印，避免日志过多
-                    print(f"[{title}] 文件名重复，使用新文件名: {new_filename}")
+                    logger.debug("[%s] 文件名重复，使用新文件名: %s", title, new_filename, extra=_DOWNLOAD)
                 
-            # 处理cookie
+            # 处理cookie（默认沿用共享会话中的浏览器cookie，不再每篇文章访问一次浏览器）
             def cookie_str_to_dict(cookie_str):
                 cookies = {}
                 for item in cookie_str.split(';'):
@@ -248,80 +328,31 @@ class PDFProcessor:
                         cookies[k] = v
                 return cookies
                 
-            cookies = cookie_str_to_dict(cookies_str) if cookies_str else {c['name']: c['value'] for c in self.driver.get_cookies()}
+            browser_session = get_browser_session()
+            cookies = cookie_str_to_dict(cookies_str) if cookies_str else None
             headers = {
-                'User-Agent': user_agent or self.driver.execute_script("return navigator.userAgent;"),
-                'Referer': self.driver.current_url,
-                'Accept': 'application/pdf,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept': PDF_ACCEPT,
                 'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
             }
+            if user_agent:
+                headers['User-Agent'] = user_agent
+            if referer:
+                headers['Referer'] = referer
             
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = requests.get(download_link, headers=headers, cookies=cookies, stream=True, timeout=30)
-                    
-                    # 改进的状态码处理
-                    if response.status_code == 200:
-                        content_type = response.headers.get('Content-Type', '').lower()
-                        
-                        # 检查内容类型
-                        if 'application/pdf' in content_type or 'octet-stream' in content_type:
-                            pass  # 内容类型正确，继续处理
-                        else:
-                            # 内容类型不匹配，检查文件头
-                            print(f"[{title}] 警告: 内容类型不是PDF ({content_type})，检查文件头")
-                            first_chunk = next(response.iter_content(chunk_size=8192), None)
-                            if not first_chunk or b'%PDF' not in first_chunk[:10]:
-                                print(f"[{title}] 下载失败: 文件头不是PDF标志 (尝试 {attempt + 1}/{max_retries})")
-                                if attempt < max_retries - 1:
-                                    time.sleep(2 ** attempt)
-                                continue  # 跳过当前重试，进入下一次循环
-                            print(f"[{title}] 文件头确认为PDF，继续下载")
-                            
-                        # 写入文件
-                        with open(filepath, 'wb') as f:
-                            # 如果已经读取了第一块，先写入
-                            if 'first_chunk' in locals() and first_chunk:
-                                f.write(first_chunk)
-                            # 继续读取和写入剩余内容
-                            for chunk in response.iter_content(chunk_size=8192):
-                                if chunk:
-                                    f.write(chunk)
-                                    
-                        # 下载后再次验证文件
-                        if os.path.getsize(filepath) < 1000:  # 小于1KB可能有问题
-                            with open(filepath, 'rb') as f:
-                                content = f.read(10)
-                                if b'%PDF' not in content:
-                                    print(f"[{title}] 下载的文件不是有效PDF，大小: {os.path.getsize(filepath)} 字节")
-                                    os.remove(filepath)  # 删除无效文件
-                                    if attempt < max_retries - 1:
-                                        time.sleep(2 ** attempt)
-                                    continue  # 尝试下一次重试
-                                    
-                        print(f"[{title}] 下载成功: {filepath}")
-                        print(f"[调试] PDFProcessor 实际下载绝对路径: {os.path.abspath(filepath)}")
-                        return True, filepath
-                    elif response.status_code == 403:
-                        print(f"[{title}] 下载失败: HTTP 403 (可能需要订阅权限)")
-                        return False, None
-                    else:
-                        print(f"[{title}] 下载失败: HTTP {response.status_code} (尝试 {attempt + 1}/{max_retries})")
-                        if attempt < max_retries - 1:
-                            time.sleep(2 ** attempt)
-                        else:
-                            return False, None
-                except Exception as e:
-                    print(f"[{title}] 下载异常 (尝试 {attempt + 1}/{max_retries}): {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
-                    else:
-                        return False, None
+            get_retry_engine().call(download_link, lambda: fetch_pdf(browser_session, download_link, filepath, 30,
+                                                                     headers, cookies))
+            logger.info("[%s] 下载成功: %s", title, filepath, extra=_DOWNLOAD)
+            logger.debug("PDFProcessor 实际下载绝对路径: %s", os.path.abspath(filepath), extra=_DOWNLOAD)
+            return True, filepath
+        except FetchError as e:
+            self.last_error = e
+            self.link_rejected = e.status in LINK_REJECTED_STATUS or e.reason == "not_pdf"
+            logger.warning("[%s] 下载失败（%s: %s）%s", title, e.kind, e.reason,
+                           "，链接失效或需要订阅权限" if self.link_rejected else "", extra=_DOWNLOAD)
             return False, None
         except Exception as e:
-            print(f"[{title}] 下载异常: {e}")
+            self.last_error = classify(e)
+            logger.warning("[%s] 下载异常: %s", title, e, extra=_DOWNLOAD)
             return False, None
     
     def _extract_article_details(self):
@@ -340,20 +371,16 @@ class PDFProcessor:
                 "section[data-test='abstract'] p",
                 "p[data-test='article-summary']"
             ]
-            for selector in abstract_selectors:
-                t_sel = time.time()
-                try:
-                    abstract_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if abstract_elem and abstract_elem.text.strip():
-                        details["abstract"] = abstract_elem.text.strip()
-                        print(f"[调试] 摘要选择器 {selector} 命中, 耗时: {time.time() - t_sel:.3f}秒")
-                        break
-                except NoSuchElementException:
-                    print(f"[调试] 摘要选择器 {selector} 未命中, 耗时: {time.time() - t_sel:.3f}秒")
-                    continue
-                except Exception as e:
-                    print(f"[调试] 摘要选择器 {selector} 异常: {e}, 耗时: {time.time() - t_sel:.3f}秒")
-                    continue
+            t_sel = time.time()
+            abstract, selector = self.selectors.find(
+                self.driver, "detail.abstract", abstract_selectors,
+                extract=lambda elem: elem.text.strip()
+            )
+            if abstract:
+                details["abstract"] = abstract
+                logger.debug("摘要选择器 %s 命中, 耗时: %.3f秒", selector, time.time() - t_sel, extra=_RESOLVE)
+            else:
+                logger.debug("摘要选择器全部未命中, 耗时: %.3f秒", time.time() - t_sel, extra=_RESOLVE)
         except Exception as e:
-            print(f"[DEBUG] 提取文章详情异常: {e}")
+            logger.warning("提取文章详情异常: %s", e, extra=_RESOLVE)
         return details 
\ No newline at end of file
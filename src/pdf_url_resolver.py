@@ -0,0 +1,100 @@
+"""
+PDF直链解析器
+根据DOI按URL模板直接拼出PDF下载地址，用HEAD或只取前1KB的GET验证，
+命中时可跳过详情页和ePDF页两次页面渲染；每个模板的成功率单独统计并持久化。
+"""
+
+import atexit
+import threading
+import time
+from typing import Optional
+from urllib.parse import quote
+
+import requests
+
+from .config import ScienceConfig
+from .selector_registry import SelectorRegistry
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "resolve"}
+
+TEMPLATE_GROUP = "pdf_url_template"
+
+
+class PDFUrlResolver:
+    """PDF直链解析器，负责按模板生成并验证PDF地址"""
+
+    def __init__(self, session: Optional[requests.Session] = None, templates=None, stats_file: Optional[str] = None):
+        """
+        Args:
+            session: 带cookie和User-Agent的requests会话，None时新建
+            templates: URL模板列表，None表示使用配置中的模板
+            stats_file: 模板成功率统计文件，None表示使用配置中的路径
+        """
+        self.config = ScienceConfig()
+        self.session = session or requests.Session()
+        self.templates = list(templates or self.config.PDF_URL_TEMPLATES)
+        # 复用选择器注册表的命中率统计与排序逻辑，按模板记录成功/失败
+        self.stats = SelectorRegistry(stats_file=stats_file, autosave_every=10) if stats_file else get_template_stats()
+
+    def resolve(self, doi: str) -> Optional[str]:
+        """按历史成功率依次尝试模板，返回第一个验证通过的PDF地址"""
+        if not doi:
+            return None
+        for template in self.stats.ordered(TEMPLATE_GROUP, self.templates):
+            url = template.format(doi=quote(doi, safe="/"))
+            start = time.time()
+            ok = self.verify(url)
+            self.stats.record(TEMPLATE_GROUP, template, ok, time.time() - start)
+            if ok:
+                logger.info("PDF直链模板命中: %s (%.3f秒)", url, time.time() - start, extra=_STAGE)
+                return url
+            logger.debug("PDF直链模板未命中: %s", url, extra=_STAGE)
+        return None
+
+    def verify(self, url: str) -> bool:
+        """廉价地验证URL是否返回PDF：先HEAD，不确定时再用Range请求读取文件头"""
+        timeout = self.config.PDF_VERIFY_TIMEOUT
+        try:
+            resp = self.session.head(url, allow_redirects=True, timeout=timeout)
+            content_type = resp.headers.get("Content-Type", "").lower()
+            if resp.status_code == 200 and "application/pdf" in content_type:
+                return True
+            if resp.status_code in (401, 403, 404, 410):
+                return False
+        except requests.RequestException as e:
+            logger.debug("PDF直链HEAD请求失败: %s", e, extra=_STAGE)
+
+        # 部分服务器不支持HEAD或返回通用类型，读取前1KB确认PDF文件头
+        try:
+            resp = self.session.get(url, headers={"Range": "bytes=0-1023"}, stream=True,
+                                    allow_redirects=True, timeout=timeout)
+            try:
+                if resp.status_code not in (200, 206):
+                    return False
+                head = next(resp.iter_content(chunk_size=1024), b"")
+                return b"%PDF" in head[:1024]
+            finally:
+                resp.close()
+        except requests.RequestException as e:
+            logger.debug("PDF直链Range请求失败: %s", e, extra=_STAGE)
+            return False
+
+    def save_stats(self):
+        """保存模板成功率统计"""
+        self.stats.save()
+
+
+_template_stats: Optional[SelectorRegistry] = None
+_template_stats_lock = threading.Lock()
+
+
+def get_template_stats() -> SelectorRegistry:
+    """进程内共享的模板成功率统计：各解析器共用一份，不会互相覆盖文件，退出时保存未落盘的记录"""
+    global _template_stats
+    with _template_stats_lock:
+        if _template_stats is None:
+            _template_stats = SelectorRegistry(stats_file=ScienceConfig.PDF_TEMPLATE_STATS_FILE, autosave_every=10)
+            atexit.register(_template_stats.save)
+        return _template_stats
@@ -0,0 +1,288 @@
+"""
+分阶段并发流水线
+各阶段之间用有界队列连接（队列满时上游阻塞，形成背压），每个阶段可独立配置并发数，
+并统计处理量、错误数和忙碌时间。总耗时趋近最慢阶段，而不是所有阶段之和。
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .metrics import get_metrics
+from .profiling import get_profiler
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()  # 结束信号
+
+
+class StageStats:
+    """单个阶段的吞吐统计"""
+
+    def __init__(self):
+        self.received = 0  # 从上游取到的条数
+        self.emitted = 0  # 向下游输出的条数
+        self.dropped = 0  # 处理后无输出（返回None）的条数
+        self.errors = 0  # 处理异常的条数
+        self.busy_time = 0.0  # 所有worker处理耗时之和（秒）
+        self._lock = threading.Lock()
+
+    def add(self, emitted: bool, error: bool, elapsed: float):
+        with self._lock:
+            self.received += 1
+            self.busy_time += elapsed
+            if error:
+                self.errors += 1
+            elif emitted:
+                self.emitted += 1
+            else:
+                self.dropped += 1
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, queue_size: int = 100,
+                 worker_init: Optional[Callable] = None, worker_close: Optional[Callable] = None):
+        """
+        Args:
+            name: 阶段名称
+            func: 处理函数 func(item, context)，返回下游条目，返回None表示不向下游输出
+            workers: 并发worker线程数
+            queue_size: 本阶段输入队列容量（背压上限）
+            worker_init: 每个worker启动时调用 worker_init(index)，返回值作为context传给func
+            worker_close: worker退出时调用 worker_close(context)
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.worker_init = worker_init
+        self.worker_close = worker_close
+        self.stats = StageStats()
+        self._alive = 0  # 尚未退出的worker数
+        self._healthy = 0  # 未初始化失败的worker数
+        self._alive_lock = threading.Lock()
+
+
+class Pipeline:
+    """流水线运行时：一个数据源 + 若干串联阶段"""
+
+    def __init__(self, source: Callable[[], Iterable], stages: List[Stage], source_name: str = "collect",
+                 report_interval: float = 0):
+        """
+        Args:
+            source: 返回可迭代对象的函数，在独立线程中迭代并送入第一个阶段
+            stages: 串联的阶段列表
+            source_name: 数据源阶段名称（用于统计输出）
+            report_interval: 运行中周期性打印统计的间隔（秒），0表示不打印
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.source = source
+        self.stages = stages
+        self.source_name = source_name
+        self.report_interval = report_interval
+        self.source_stats = StageStats()
+        self.results: List = []  # 最后一个阶段的输出
+        self._results_lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._start_time = None
+
+    def cancel(self):
+        """请求停止：数据源不再产生新条目，已入队的条目继续处理完"""
+        self._cancel.set()
+
+    def run(self) -> Dict:
+        """运行流水线直到所有条目处理完毕，返回各阶段统计"""
+        self._start_time = time.time()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage._alive = stage.workers
+            stage._healthy = stage.workers
+            for worker_index in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(stage, downstream, worker_index),
+                                     name=f"{stage.name}-{worker_index}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        source_thread = threading.Thread(target=self._feed, name=self.source_name, daemon=True)
+        source_thread.start()
+
+        reporter_stop = threading.Event()
+        if self.report_interval:
+            threading.Thread(target=self._report_loop, args=(reporter_stop,), daemon=True).start()
+
+        source_thread.join()
+        for t in threads:
+            t.join()
+        reporter_stop.set()
+        # 清掉残留的结束信号，使积压统计归零
+        for stage in self.stages:
+            while not stage.inbox.empty():
+                stage.inbox.get_nowait()
+        self.publish_metrics()
+        return self.stats()
+
+    @property
+    def complete(self) -> bool:
+        """
+        数据源产出的每一条都到达了最后一个阶段的输出：没有被取消、数据源没有出错，
+        也没有条目在中途被丢弃、处理出错或因阶段没有可用worker而被丢弃
+        """
+        return (not self._cancel.is_set() and self.source_stats.errors == 0
+                and self.stages[-1].stats.emitted == self.source_stats.emitted)
+
+    def _feed(self):
+        """数据源线程：迭代source并送入第一个阶段，队列满时阻塞"""
+        first = self.stages[0]
+        profiler = get_profiler()
+        iterator = None
+        try:
+            iterator = iter(self.source())
+            while not self._cancel.is_set():
+                start = time.time()
+                try:
+                    with profiler.stage(self.source_name):
+                        item = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    logger.exception("数据源 %s 异常: %s", self.source_name, e, extra={"stage": self.source_name})
+                    self.source_stats.add(False, True, time.time() - start)
+                    break
+                self.source_stats.add(True, False, time.time() - start)
+                first.inbox.put(item)
+        finally:
+            # 取消时关闭生成器型数据源，让其执行清理（如停止翻页）
+            close = getattr(iterator, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning("关闭数据源 %s 失败: %s", self.source_name, e,
+                                   extra={"stage": self.source_name})
+            first.inbox.put(_STOP)
+
+    def _worker(self, stage: Stage, downstream: Optional[Stage], worker_index: int):
+        """阶段worker线程"""
+        context = None
+        profiler = get_profiler()
+        try:
+            if stage.worker_init:
+                try:
+                    context = stage.worker_init(worker_index)
+                except Exception as e:
+                    logger.error("%s-%d 初始化失败: %s", stage.name, worker_index, e,
+                                 extra={"stage": stage.name, "worker": worker_index})
+                    self._drain(stage)
+                    return
+            while True:
+                item = stage.inbox.get()
+                if item is _STOP:
+                    # 放回结束信号，让同阶段其他worker也能收到
+                    stage.inbox.put(_STOP)
+                    break
+                start = time.time()
+                try:
+                    with profiler.stage(stage.name):
+                        output = stage.func(item, context)
+                except Exception as e:
+                    logger.exception("%s 处理异常: %s", stage.name, e,
+                                     extra={"stage": stage.name, "worker": worker_index})
+                    stage.stats.add(False, True, time.time() - start)
+                    continue
+                stage.stats.add(output is not None, False, time.time() - start)
+                if output is None:
+                    continue
+                if downstream:
+                    downstream.inbox.put(output)
+                else:
+                    with self._results_lock:
+                        self.results.append(output)
+        finally:
+            if stage.worker_close and context is not None:
+                try:
+                    stage.worker_close(context)
+                except Exception as e:
+                    logger.warning("%s-%d 关闭失败: %s", stage.name, worker_index, e,
+                                   extra={"stage": stage.name, "worker": worker_index})
+            with stage._alive_lock:
+                stage._alive -= 1
+                last = stage._alive == 0
+            # 本阶段最后一个worker退出时通知下游结束
+            if last and downstream:
+                downstream.inbox.put(_STOP)
+
+    def _drain(self, stage: Stage):
+        """worker初始化失败时：若同阶段已无可用worker，丢弃剩余输入避免上游永久阻塞"""
+        with stage._alive_lock:
+            stage._healthy -= 1
+            if stage._healthy > 0:
+                return
+        logger.error("%s 没有可用worker，丢弃剩余输入", stage.name, extra={"stage": stage.name})
+        while True:
+            item = stage.inbox.get()
+            if item is _STOP:
+                stage.inbox.put(_STOP)
+                return
+            stage.stats.add(False, True, 0.0)
+
+    def _report_loop(self, stop_event: threading.Event):
+        while not stop_event.wait(self.report_interval):
+            self.publish_metrics()
+            logger.info("%s", self.format_stats(), extra={"stage": "pipeline"})
+
+    def publish_metrics(self):
+        """把各阶段统计写入指标注册表（/metrics 与JSON快照可见）"""
+        metrics = get_metrics()
+        items = metrics.gauge("crawler_pipeline_items", "流水线各阶段累计条数")
+        backlog = metrics.gauge("crawler_pipeline_backlog", "流水线各阶段队列积压")
+        utilization = metrics.gauge("crawler_pipeline_utilization", "流水线各阶段忙碌率")
+        stats = self.stats()
+        stats.pop("_elapsed")
+        for name, s in stats.items():
+            for kind in ("emitted", "dropped", "errors"):
+                items.set(s[kind], stage=name, kind=kind)
+            backlog.set(s["backlog"], stage=name)
+            utilization.set(round(s["utilization"], 4), stage=name)
+
+    def stats(self) -> Dict:
+        """各阶段统计：处理量、错误数、忙碌时间、吞吐（条/分钟）与队列积压"""
+        elapsed = max(time.time() - (self._start_time or time.time()), 1e-9)
+
+        def row(stats: StageStats, workers: int, backlog: int):
+            return {
+                "received": stats.received,
+                "emitted": stats.emitted,
+                "dropped": stats.dropped,
+                "errors": stats.errors,
+                "workers": workers,
+                "busy_time": stats.busy_time,
+                # 忙碌率：所有worker忙碌时间占总可用时间的比例，接近1说明该阶段是瓶颈
+                "utilization": stats.busy_time / (elapsed * workers),
+                "per_minute": stats.emitted / elapsed * 60,
+                "backlog": backlog,
+            }
+
+        result = {self.source_name: row(self.source_stats, 1, 0)}
+        for stage in self.stages:
+            result[stage.name] = row(stage.stats, stage.workers, stage.inbox.qsize())
+        result["_elapsed"] = elapsed
+        return result
+
+    def format_stats(self) -> str:
+        """格式化统计为多行文本"""
+        stats = self.stats()
+        elapsed = stats.pop("_elapsed")
+        lines = [f"[流水线] 已运行 {elapsed:.1f}秒"]
+        for name, s in stats.items():
+            lines.append(
+                f"  {name:<10} 输出{s['emitted']:>6} 丢弃{s['dropped']:>5} 错误{s['errors']:>4} "
+                f"并发{s['workers']:>3} 忙碌率{s['utilization']:>7.1%} "
+                f"{s['per_minute']:>8.1f}条/分 积压{s['backlog']:>4}"
+            )
+        return "\n".join(lines)
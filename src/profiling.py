@@ -0,0 +1,285 @@
+"""
+按阶段的按需性能剖析
+脚本加 --profile 后，每个阶段（收集、解析、下载、入库……）各自累积cProfile数据，结束时写出
+<阶段>.prof（python -m pstats 或 snakeviz 查看）和按累计耗时排序的前N个函数 <阶段>.txt；
+加 --profile-memory 时同时开启tracemalloc，在主线程顶层阶段的进出边界拍快照，
+把新增内存最多的前N个分配位置追加写入 <阶段>.alloc.txt。
+
+运行中向进程发送 SIGUSR1（Windows 控制台按 Ctrl+Break）会在后台采样所有线程的调用栈若干秒，
+写出 live_<时间>.txt 实时热点报告，不需要改代码或重启进程：
+    kill -USR1 <pid>
+
+未开启时 get_profiler().stage(...) 返回空的上下文管理器，热路径上几乎没有开销。
+cProfile在 Python 3.12+ 同一时刻只允许一个线程启用，多线程阶段并发时只有先进入的线程被剖析。
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .config import ScienceConfig
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_NULL = nullcontext()
+
+
+class StackSampler:
+    """采样式剖析器：周期性读取所有线程的调用栈，统计各函数出现在栈顶（自身）和栈中（累计）的次数"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+
+    def run(self, seconds: float):
+        me = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.samples += 1
+                seen = set()
+                top = True
+                while frame is not None:
+                    code = frame.f_code
+                    key = f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+                    if top:
+                        self.self_counts[key] += 1
+                        top = False
+                    if key not in seen:  # 递归函数每个样本只计一次
+                        self.total_counts[key] += 1
+                        seen.add(key)
+                    frame = frame.f_back
+            time.sleep(self.interval)
+
+    def report(self, top_n: int) -> str:
+        lines = [f"样本数: {self.samples}（采样间隔 {self.interval * 1000:.0f}ms，跨所有线程）", "",
+                 "== 自身耗时（栈顶）前{} ==".format(top_n)]
+        for key, count in self.self_counts.most_common(top_n):
+            lines.append(f"{count / max(self.samples, 1):7.1%}  {key}")
+        lines += ["", f"== 累计耗时（在栈中）前{top_n} =="]
+        for key, count in self.total_counts.most_common(top_n):
+            lines.append(f"{count / max(self.samples, 1):7.1%}  {key}")
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """阶段剖析器：每个(阶段, 线程)一个cProfile.Profile，反复进出同一阶段时累积"""
+
+    def __init__(self, output_dir: Optional[str] = None, memory: bool = False, top_n: Optional[int] = None,
+                 enabled: bool = True):
+        """
+        Args:
+            output_dir: 报告输出目录
+            memory: 是否开启tracemalloc并在阶段边界拍快照
+            top_n: 文本报告中列出的函数/分配位置数
+            enabled: False时所有方法都是空操作
+        """
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.memory = memory and enabled
+        self.top_n = top_n or ScienceConfig.PROFILE_TOP_N
+        self._profiles: Dict[Tuple[str, int], cProfile.Profile] = {}
+        self._calls: Counter = Counter()
+        self._skipped: Counter = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._previous_handler = None
+        self._signal = None
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(ScienceConfig.PROFILE_TRACEMALLOC_FRAMES)
+
+    def stage(self, name: str):
+        """在with块内剖析阶段name；嵌套阶段的耗时只计入最内层阶段"""
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        key = (name, threading.get_ident())
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = cProfile.Profile()
+            self._calls[name] += 1
+        snapshot = None
+        if self.memory and not stack and threading.current_thread() is threading.main_thread():
+            snapshot = tracemalloc.take_snapshot()
+
+        outer = stack[-1] if stack else None
+        if outer is not None:
+            outer.disable()
+        try:
+            profile.enable()
+            active = profile
+        except ValueError:  # 其他线程已启用剖析（Python 3.12+ 全局只能有一个）
+            with self._lock:
+                self._skipped[name] += 1
+            active = None
+        stack.append(active)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if active is not None:
+                active.disable()
+            if outer is not None:
+                outer.enable()
+            if snapshot is not None:
+                self._write_allocations(name, snapshot)
+
+    def iter_stage(self, name: str, iterable: Iterable) -> Iterator:
+        """逐个取出iterable的元素，只把产生元素的耗时（如生成器翻页）计入阶段name"""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        try:
+            while True:
+                with self.stage(name):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    def _write_allocations(self, name: str, before):
+        after = tracemalloc.take_snapshot()
+        stats = after.compare_to(before, "lineno")
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# {time.strftime('%Y-%m-%d %H:%M:%S')} 阶段 {name} 结束，"
+                 f"当前 {current / 1048576:.1f}MB，峰值 {peak / 1048576:.1f}MB"]
+        lines += [str(stat) for stat in stats[:self.top_n]]
+        path = os.path.join(self.output_dir, f"{name}.alloc.txt")
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+
+    def dump_live(self, seconds: Optional[float] = None) -> threading.Thread:
+        """后台采样所有线程seconds秒并写出实时热点报告（信号处理函数中调用，立即返回）"""
+        seconds = seconds or ScienceConfig.PROFILE_SAMPLE_SECONDS
+
+        def run():
+            stamp = time.strftime("%Y%m%d_%H%M%S")
+            sampler = StackSampler(ScienceConfig.PROFILE_SAMPLE_INTERVAL)
+            sampler.run(seconds)
+            parts = [f"实时剖析 {stamp}，采样 {seconds} 秒", "", sampler.report(self.top_n)]
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                parts.append(f"== 当前内存分配前{self.top_n}（当前 {current / 1048576:.1f}MB，峰值 {peak / 1048576:.1f}MB）==")
+                stats = tracemalloc.take_snapshot().statistics("lineno")
+                parts += [str(stat) for stat in stats[:self.top_n]]
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"live_{stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(parts) + "\n")
+            logger.warning("实时剖析报告已写入 %s", path, extra={"stage": "profile"})
+
+        thread = threading.Thread(target=run, name="profile-live", daemon=True)
+        thread.start()
+        return thread
+
+    def install_signal_handler(self) -> bool:
+        """注册 SIGUSR1（Windows为SIGBREAK）触发 dump_live，只能在主线程调用"""
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is None or threading.current_thread() is not threading.main_thread():
+            return False
+        self._previous_handler = signal.signal(sig, lambda signum, frame: self.dump_live())
+        self._signal = sig
+        return True
+
+    def stats(self, name: str) -> Optional[pstats.Stats]:
+        """合并阶段name在所有线程中的剖析数据"""
+        with self._lock:
+            profiles = [p for (stage, _), p in self._profiles.items() if stage == name]
+        merged = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if merged is None:
+                merged = pstats.Stats(profile)
+            else:
+                merged.add(profile)
+        return merged
+
+    def finish(self) -> Optional[str]:
+        """写出各阶段的 .prof 与文本报告，停止tracemalloc并恢复信号处理，返回输出目录"""
+        if not self.enabled:
+            return None
+        if self._signal is not None:
+            signal.signal(self._signal, self._previous_handler or signal.SIG_DFL)
+            self._signal = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            names = sorted({stage for stage, _ in self._profiles})
+        summary = []
+        for name in names:
+            merged = self.stats(name)
+            if merged is None:
+                continue
+            merged.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+            buffer = io.StringIO()
+            merged.stream = buffer
+            merged.sort_stats("cumulative").print_stats(self.top_n)
+            with open(os.path.join(self.output_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+                f.write(buffer.getvalue())
+            skipped = f"，{self._skipped[name]}次未剖析" if self._skipped[name] else ""
+            summary.append(f"{name:<16}{self._calls[name]:>8}次  {merged.total_tt:>10.3f}秒{skipped}")
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            summary.append(f"tracemalloc 当前 {current / 1048576:.1f}MB，峰值 {peak / 1048576:.1f}MB")
+            tracemalloc.stop()
+        with open(os.path.join(self.output_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(summary) + "\n")
+        logger.info("剖析报告已写入 %s\n%s", self.output_dir, "\n".join(summary), extra={"stage": "profile"})
+        return self.output_dir
+
+
+_profiler = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    """获取进程内共享的剖析器，未调用 start_profiling 时为空操作"""
+    return _profiler
+
+
+def start_profiling(script: str, output_dir: Optional[str] = None, memory: bool = False,
+                    top_n: Optional[int] = None) -> Profiler:
+    """
+    开启按阶段剖析并注册实时剖析信号，脚本入口调用一次
+
+    Args:
+        script: 脚本名，用于默认输出目录 profiles/<脚本>_<时间>
+        output_dir: 输出目录，None表示使用默认目录
+        memory: 是否同时开启tracemalloc
+        top_n: 文本报告中列出的条目数
+    """
+    global _profiler
+    output_dir = output_dir or os.path.join(ScienceConfig.PROFILE_DIR, f"{script}_{time.strftime('%Y%m%d_%H%M%S')}")
+    _profiler = Profiler(output_dir=output_dir, memory=memory, top_n=top_n)
+    hint = ""
+    if _profiler.install_signal_handler():
+        hint = f"，kill -USR1 {os.getpid()} 可导出实时热点" if hasattr(signal, "SIGUSR1") else "，Ctrl+Break 可导出实时热点"
+    print(f"[剖析] 按阶段剖析已开启，报告目录 {output_dir}{hint}")
+    return _profiler
@@ -0,0 +1,226 @@
+"""
+查询分片规划
+把一个大的年份范围搜索拆成若干年份（必要时按月）分片：结果数超过阈值的分片继续对半拆分，
+各分片用多个浏览器并发抓取，最后按DOI去重合并。分片后每个查询都很浅，避开深翻页变慢和页数上限。
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from .config import ScienceConfig
+from .selector_registry import get_selector_registry
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "collect"}
+
+
+def shard_url(base_url: str, after_year: int, before_year: int,
+              after_month: Optional[int] = None, before_month: Optional[int] = None) -> str:
+    """生成限定年份（和月份）范围的搜索URL，并把页码重置为第一页"""
+    parsed = urlparse(base_url)
+    params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+              if k not in ("AfterYear", "BeforeYear", "AfterMonth", "BeforeMonth", "startPage")]
+    params += [("AfterYear", str(after_year)), ("BeforeYear", str(before_year))]
+    if after_month and before_month:
+        params += [("AfterMonth", str(after_month)), ("BeforeMonth", str(before_month))]
+    params.append(("startPage", "0"))
+    return urlunparse(parsed._replace(query=urlencode(params)))
+
+
+def year_range(url: str, default_after: int = 1880, default_before: Optional[int] = None):
+    """读取URL中的AfterYear/BeforeYear，缺省时使用默认范围"""
+    params = dict(parse_qsl(urlparse(url).query))
+    after = int(params.get("AfterYear") or default_after)
+    before = int(params.get("BeforeYear") or default_before or time.localtime().tm_year)
+    return after, before
+
+
+def parse_result_count(text: str) -> Optional[int]:
+    """从类似 "1,234 results" 的文本中解析结果数"""
+    match = re.search(r"([\d,]+)\s+results?", text or "", re.IGNORECASE)
+    if not match:
+        return None
+    return int(match.group(1).replace(",", ""))
+
+
+class QueryPlanner:
+    """查询分片规划器"""
+
+    # 搜索结果总数所在元素的候选选择器（按历史命中率排序尝试）
+    RESULT_COUNT_SELECTORS = [
+        ".search-result__info",
+        ".result__count",
+        ".search-result__count",
+        "span.hits",
+        ".search-result__meta",
+    ]
+
+    def __init__(self, driver=None, threshold: Optional[int] = None):
+        """
+        Args:
+            driver: 用于查询结果数的WebDriver
+            threshold: 单个分片允许的最大结果数，None表示使用配置值
+        """
+        self.driver = driver
+        self.config = ScienceConfig()
+        self.threshold = threshold or self.config.SHARD_MAX_RESULTS
+        self.selectors = get_selector_registry()
+
+    def count_results(self, url: str) -> Optional[int]:
+        """打开搜索页并读取结果总数，读取失败返回None"""
+        self.driver.get(url)
+        time.sleep(self.config.SLEEP_TIME)
+        count, _ = self.selectors.find(
+            self.driver, "search.result_count", self.RESULT_COUNT_SELECTORS,
+            extract=lambda elem: parse_result_count(elem.text)
+        )
+        if count is None and not self.driver.find_elements("css selector", self.config.SELECTORS['search_cards']):
+            return 0
+        return count
+
+    def plan(self, url: str) -> List[Dict]:
+        """
+        规划分片
+
+        Returns:
+            分片列表，每项为 {"url", "label", "count"}
+        """
+        after, before = year_range(url)
+        shards: List[Dict] = []
+        self._plan_years(url, after, before, shards)
+        total = sum(s["count"] or 0 for s in shards)
+        logger.info("共%d个分片，预计%d条结果", len(shards), total, extra=_STAGE)
+        return shards
+
+    def plan_path(self, url: str) -> str:
+        """分片计划的缓存文件路径（与抓取断点放在同一目录）"""
+        key = hashlib.md5(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.config.CHECKPOINT_DIR, f"shards_{key}.json")
+
+    def load_or_plan(self, url: str, reuse: bool = False) -> List[Dict]:
+        """reuse为True且有缓存时直接使用上次的分片计划，否则重新规划并缓存"""
+        path = self.plan_path(url)
+        if reuse and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                shards = json.load(f)
+            logger.info("使用上次的分片计划，共%d个分片", len(shards), extra=_STAGE)
+            return shards
+        shards = self.plan(url)
+        self.save_plan(url, shards)
+        return shards
+
+    def save_plan(self, url: str, shards: List[Dict]):
+        """缓存分片计划"""
+        os.makedirs(self.config.CHECKPOINT_DIR, exist_ok=True)
+        with open(self.plan_path(url), "w", encoding="utf-8") as f:
+            json.dump(shards, f, ensure_ascii=False, indent=2)
+
+    def clear_plan(self, url: str):
+        """删除分片计划缓存"""
+        path = self.plan_path(url)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _plan_years(self, base_url: str, after: int, before: int, shards: List[Dict]):
+        url = shard_url(base_url, after, before)
+        label = f"{after}" if after == before else f"{after}-{before}"
+        count = self.count_results(url)
+        logger.info("分片 %s: %s条", label, count if count is not None else "未知",
+                    extra={"stage": "collect", "shard": label})
+        if count == 0:
+            return
+        if count is None or count <= self.threshold:
+            shards.append({"url": url, "label": label, "count": count})
+        elif after < before:
+            middle = (after + before) // 2
+            self._plan_years(base_url, after, middle, shards)
+            self._plan_years(base_url, middle + 1, before, shards)
+        else:
+            self._plan_months(base_url, after, 1, 12, shards)
+
+    def _plan_months(self, base_url: str, year: int, first: int, last: int, shards: List[Dict]):
+        url = shard_url(base_url, year, year, first, last)
+        label = f"{year}-{first:02d}" if first == last else f"{year}-{first:02d}~{last:02d}"
+        count = self.count_results(url)
+        logger.info("分片 %s: %s条", label, count if count is not None else "未知",
+                    extra={"stage": "collect", "shard": label})
+        if count == 0:
+            return
+        if count is None or count <= self.threshold or first == last:
+            if count and count > self.threshold:
+                logger.warning("分片 %s 单月结果仍超过阈值 %d，无法继续拆分", label, self.threshold,
+                               extra={"stage": "collect", "shard": label})
+            shards.append({"url": url, "label": label, "count": count})
+            return
+        middle = (first + last) // 2
+        self._plan_months(base_url, year, first, middle, shards)
+        self._plan_months(base_url, year, middle + 1, last, shards)
+
+
+def crawl_shards(shards: List[Dict], drivers: List, resume: bool = False,
+                 max_count: Optional[int] = None, failed_shards: Optional[List[str]] = None) -> List[Dict]:
+    """
+    用多个浏览器并发抓取分片，按DOI（无DOI时按URL）去重合并
+
+    Args:
+        shards: QueryPlanner.plan 返回的分片
+        drivers: WebDriver列表，每个浏览器同一时间只抓一个分片
+        resume: 是否从各分片的断点继续
+        max_count: 合并后的最大条数，None表示使用配置值
+        failed_shards: 传入时追加抓取失败的分片label（这些分片的断点要保留给 --resume）
+    """
+    from .checkpoint import CrawlCheckpoint
+    from .link_collector import LinkCollector
+    from .profiling import get_profiler
+
+    max_count = max_count or ScienceConfig.MAX_COUNT
+    pending = list(shards)
+    pending_lock = threading.Lock()
+    merged: Dict[str, Dict] = {}
+    merged_lock = threading.Lock()
+    stop = threading.Event()
+
+    def run(driver):
+        while not stop.is_set():
+            with pending_lock:
+                if not pending:
+                    return
+                shard = pending.pop(0)
+            extra = {"stage": "collect", "shard": shard["label"]}
+            logger.info("开始抓取分片 %s", shard["label"], extra=extra)
+            checkpoint = CrawlCheckpoint(shard["url"])
+            shard_resume = resume and checkpoint.load() is not None
+            if not shard_resume:
+                driver.get(shard["url"])
+                time.sleep(ScienceConfig.SLEEP_TIME)
+            collector = LinkCollector(driver, max_count=max_count)
+            try:
+                with get_profiler().stage("collect"):
+                    articles = collector.collect_all_links(checkpoint=checkpoint, resume=shard_resume)
+            except Exception as e:
+                logger.exception("分片 %s 抓取失败: %s", shard["label"], e, extra=extra)
+                if failed_shards is not None:
+                    with merged_lock:
+                        failed_shards.append(shard["label"])
+                continue
+            with merged_lock:
+                for article in articles:
+                    merged.setdefault(article.get("doi") or article.get("url"), article)
+                if len(merged) >= max_count:
+                    stop.set()
+                logger.info("分片 %s 完成，%d条，合并后共%d条", shard["label"], len(articles), len(merged),
+                            extra=extra)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(drivers))) as executor:
+        for future in [executor.submit(run, driver) for driver in drivers]:
+            future.result()
+
+    return list(merged.values())[:max_count]
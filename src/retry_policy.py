@@ -0,0 +1,274 @@
+"""
+重试策略引擎
+所有HTTP下载共用一套重试规则，代替各处各写一份的 2 ** attempt 循环（外层再套一层循环时，
+一个坏链接会被请求9次以上）：
+- 失败分类：fatal（403付费墙、404、响应不是PDF等，重试无用）、transient（超时、连接中断、5xx）、
+  throttled（429/503，按 Retry-After 等待）
+- 退避：decorrelated jitter，sleep = min(上限, uniform(基数, 上次sleep * 3))，避免多个线程同步重试
+- 按主机熔断：同一主机连续 BREAKER_FAILURE_THRESHOLD 次可重试失败后熔断，冷却期内直接失败，
+  冷却结束后只放一个探测请求，成功才恢复
+- 全局重试预算：每个首次请求存入 RETRY_BUDGET_RATIO 个令牌，每次重试消耗1个，
+  源站整体变慢时重试量最多是正常流量的一个比例，不会放大成重试风暴
+- 跨运行的重新调度（reschedule_delay）：一篇文章本次彻底失败后，按失败类别和累计次数算出
+  下次尝试时间（science.next_attempt_at），次数用尽则转为 dead，见 DL_RETRY_SCHEDULE
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from .config import ScienceConfig
+from .metrics import get_metrics
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "download"}
+
+FATAL = "fatal"
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+
+NO_LINK = "no_link"  # 没有解析出PDF链接（只用于跨运行调度）
+
+THROTTLE_STATUS = (429, 503)
+
+
+class FetchError(RuntimeError):
+    """一次请求失败，kind 为 FATAL/TRANSIENT/THROTTLED 之一"""
+
+    def __init__(self, kind: str, reason: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.kind = kind
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind != FATAL
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 可以是秒数，也可以是HTTP日期"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def http_error(response) -> FetchError:
+    """按HTTP状态码分类：429/503 限流，其他5xx可重试，4xx不重试"""
+    status = response.status_code
+    if status in THROTTLE_STATUS:
+        return FetchError(THROTTLED, f"HTTP {status}", status,
+                          _parse_retry_after(response.headers.get("Retry-After")))
+    if status >= 500:
+        return FetchError(TRANSIENT, f"HTTP {status}", status)
+    return FetchError(FATAL, f"HTTP {status}", status)
+
+
+def classify(exc: BaseException) -> FetchError:
+    """把任意异常归类为 FetchError：超时、连接和传输中断可重试，其余（URL无效、写盘失败等）不重试"""
+    if isinstance(exc, FetchError):
+        return exc
+    if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)):
+        return FetchError(TRANSIENT, f"{type(exc).__name__}: {exc}")
+    return FetchError(FATAL, f"{type(exc).__name__}: {exc}")
+
+
+def reschedule_delay(attempts: int, kind: str) -> Optional[float]:
+    """
+    第 attempts 次失败（类别 kind）后距下次尝试的秒数，次数达到该类别上限时返回 None（转为 dead）
+
+    延迟 = 首次延迟 * DL_RETRY_BACKOFF ** (attempts - 1)，上限 DL_RETRY_MAX_DELAY，再加 ±20% 抖动，
+    避免同一批失败的文章在同一时刻一起到期
+    """
+    first_delay, max_attempts = ScienceConfig.DL_RETRY_SCHEDULE.get(kind, ScienceConfig.DL_RETRY_SCHEDULE[TRANSIENT])
+    if attempts >= max_attempts:
+        return None
+    delay = min(ScienceConfig.DL_RETRY_MAX_DELAY, first_delay * ScienceConfig.DL_RETRY_BACKOFF ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Backoff:
+    """decorrelated jitter 退避"""
+
+    def __init__(self, base: float, cap: float):
+        self.base = base
+        self.cap = cap
+        self.sleep = base
+
+    def next(self, retry_after: Optional[float] = None) -> float:
+        self.sleep = min(self.cap, random.uniform(self.base, self.sleep * 3))
+        if retry_after is not None:
+            return max(self.sleep, retry_after)
+        return self.sleep
+
+
+class CircuitBreaker:
+    """单个主机的熔断器：closed → open（冷却）→ half-open（一个探测请求）→ closed/open"""
+
+    def __init__(self, threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        """是否放行请求；半开状态下同一时间只放行一个探测请求"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次可重试失败，返回本次是否触发熔断"""
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = self.clock()
+                self.probing = False
+                return True
+            return False
+
+
+class RetryBudget:
+    """全局重试预算（令牌桶）：首次请求存入 ratio 个令牌，重试消耗1个，令牌最多 reserve 个"""
+
+    def __init__(self, ratio: float, reserve: float):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RetryEngine:
+    """重试引擎：按失败类别决定是否重试，结合退避、按主机熔断和全局预算"""
+
+    def __init__(self, max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, breaker_threshold: Optional[int] = None,
+                 breaker_cooldown: Optional[float] = None, budget: Optional[RetryBudget] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        config = ScienceConfig
+        self.max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else config.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else config.RETRY_MAX_DELAY
+        self.breaker_threshold = breaker_threshold or config.BREAKER_FAILURE_THRESHOLD
+        self.breaker_cooldown = breaker_cooldown if breaker_cooldown is not None else config.BREAKER_COOLDOWN
+        self.budget = budget or RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_RESERVE)
+        self.sleep = sleep
+        self.clock = clock
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        metrics = get_metrics()
+        self.retries = metrics.counter("crawler_retry_total", "按失败类别统计的重试次数")
+        self.giveups = metrics.counter("crawler_retry_giveup_total", "放弃重试的次数（按原因）")
+        self.trips = metrics.counter("crawler_circuit_open_total", "按主机统计的熔断次数")
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown, self.clock)
+            return self.breakers[host]
+
+    def call(self, url: str, func: Callable, max_attempts: Optional[int] = None):
+        """
+        执行 func()（一次尝试，失败时抛异常）直到成功，返回其结果
+
+        Raises:
+            FetchError: 失败不可重试、次数用尽、预算用尽或主机已熔断（reason 为 circuit_open）
+        """
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        backoff = Backoff(self.base_delay, self.max_delay)
+        attempts = max_attempts or self.max_attempts
+        self.budget.deposit()
+        for attempt in range(1, attempts + 1):
+            if not breaker.allow():
+                self.giveups.inc(reason="circuit_open")
+                raise FetchError(TRANSIENT, "circuit_open")
+            try:
+                result = func()
+            except Exception as exc:
+                error = classify(exc)
+            else:
+                breaker.record_success()
+                return result
+            if not error.retryable:
+                breaker.record_success()  # 主机有响应，只是这个请求没有意义
+                self.giveups.inc(reason=FATAL)
+                raise error
+            if breaker.record_failure():
+                self.trips.inc(host=host)
+                logger.warning("主机 %s 连续失败，熔断 %.0f 秒", host, self.breaker_cooldown,
+                               extra={"stage": "download", "host": host})
+            if attempt == attempts:
+                self.giveups.inc(reason="attempts")
+                raise error
+            delay = backoff.next(error.retry_after)
+            if delay > self.max_delay:  # 源站要求等待太久，留给下次调度
+                self.giveups.inc(reason="retry_after")
+                raise error
+            if not self.budget.withdraw():
+                self.giveups.inc(reason="budget")
+                raise error
+            self.retries.inc(kind=error.kind)
+            logger.debug("%s 失败（%s: %s），%.1f 秒后第%d次尝试", url, error.kind, error.reason, delay,
+                         attempt + 1, extra=_STAGE)
+            self.sleep(delay)
+        raise FetchError(FATAL, "no_attempts")
+
+
+_engine: Optional[RetryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_retry_engine() -> RetryEngine:
+    """进程内共享的重试引擎（熔断状态和重试预算在所有下载线程间共享）"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RetryEngine()
+        return _engine
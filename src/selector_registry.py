@@ -0,0 +1,213 @@
+"""
+选择器注册表
+记录每个CSS选择器的命中/未命中次数与耗时，跨运行持久化，
+查找时优先尝试历史命中率最高的选择器，并报告从未命中的“死”选择器。
+命中后不再尝试排在后面的选择器，因此每 SELECTOR_PROBE_EVERY 次命中额外试探一个本次没有
+尝试的选择器（尝试次数最少的），落后的选择器也能积累足够的尝试次数。
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from selenium.webdriver.common.by import By
+
+from .config import ScienceConfig
+from .metrics import get_metrics
+
+
+class SelectorRegistry:
+    """选择器注册表，负责选择器排序与命中率统计"""
+
+    def __init__(self, stats_file: Optional[str] = None, autosave_every: int = 50,
+                 probe_every: Optional[int] = None):
+        """
+        Args:
+            stats_file: 统计数据JSON文件路径，None表示使用配置中的路径
+            autosave_every: 每记录多少次查找自动保存一次
+            probe_every: 每个分组每命中多少次试探一次未尝试的选择器，None表示使用配置值，0表示不试探
+        """
+        self.stats_file = stats_file or ScienceConfig.SELECTOR_STATS_FILE
+        self.autosave_every = autosave_every
+        self.probe_every = ScienceConfig.SELECTOR_PROBE_EVERY if probe_every is None else probe_every
+        self._hits: Dict[str, int] = {}  # 本进程内各分组的命中次数，用于决定何时试探
+        # {分组: {选择器: {"hits": int, "misses": int, "total_time": float}}}
+        self.stats: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.load()
+
+    def load(self):
+        """从磁盘加载历史统计"""
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except Exception as e:
+            print(f"[选择器] 加载统计文件失败，将重新统计: {e}")
+            self.stats = {}
+
+    def save(self):
+        """将统计写回磁盘（先写临时文件再替换，避免中途崩溃损坏文件）"""
+        if not self.stats_file:
+            return
+        with self._lock:
+            data = json.dumps(self.stats, ensure_ascii=False, indent=2)
+            self._pending = 0
+        try:
+            directory = os.path.dirname(self.stats_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.stats_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.stats_file)
+        except Exception as e:
+            print(f"[选择器] 保存统计文件失败: {e}")
+
+    def record(self, group: str, selector: str, hit: bool, elapsed: float):
+        """记录一次选择器查找结果"""
+        with self._lock:
+            entry = self.stats.setdefault(group, {}).setdefault(
+                selector, {"hits": 0, "misses": 0, "total_time": 0.0}
+            )
+            entry["hits" if hit else "misses"] += 1
+            entry["total_time"] += elapsed
+            self._pending += 1
+            need_save = self.autosave_every and self._pending >= self.autosave_every
+        metrics = get_metrics()
+        metrics.histogram("crawler_selector_seconds", "选择器查找耗时").observe(elapsed, group=group)
+        metrics.counter("crawler_selector_lookups_total", "选择器查找次数").inc(
+            group=group, result="hit" if hit else "miss")
+        if need_save:
+            self.save()
+
+    def ordered(self, group: str, selectors: Sequence[str]) -> List[str]:
+        """
+        按历史命中率对选择器排序
+
+        使用拉普拉斯平滑 (hits+1)/(attempts+2)：未尝试过的选择器得分0.5，
+        持续命中的排到最前，持续未命中的排到最后；同分时保持原有顺序。
+        """
+        group_stats = self.stats.get(group, {})
+
+        def score(item):
+            index, selector = item
+            entry = group_stats.get(selector)
+            if not entry:
+                return (-0.5, index)
+            attempts = entry["hits"] + entry["misses"]
+            return (-(entry["hits"] + 1) / (attempts + 2), index)
+
+        return [selector for _, selector in sorted(enumerate(selectors), key=score)]
+
+    def find(self, context, group: str, selectors: Sequence[str],
+             extract: Optional[Callable] = None) -> Tuple[Optional[object], Optional[str]]:
+        """
+        按学习到的顺序在context（driver或元素）内查找第一个有效结果
+
+        Args:
+            context: WebDriver或WebElement
+            group: 选择器分组名，如 "card.title"
+            selectors: 候选CSS选择器
+            extract: 从元素中提取结果的函数，返回假值视为未命中；默认返回元素本身
+
+        Returns:
+            (提取结果, 命中的选择器)，全部未命中时返回 (None, None)
+        """
+        ordered = self.ordered(group, selectors)
+        for position, selector in enumerate(ordered):
+            value = self._try(context, group, selector, extract)
+            if value:
+                self._probe(context, group, ordered[position + 1:], extract)
+                return value, selector
+        return None, None
+
+    def _try(self, context, group: str, selector: str, extract: Optional[Callable]):
+        """尝试一个选择器并记录结果，未命中时返回None"""
+        start = time.time()
+        try:
+            elem = context.find_element(By.CSS_SELECTOR, selector)
+            value = extract(elem) if extract else elem
+        except Exception:
+            value = None
+        self.record(group, selector, bool(value), time.time() - start)
+        return value or None
+
+    def _probe(self, context, group: str, untried: Sequence[str], extract: Optional[Callable]):
+        """每 probe_every 次命中试探一个本次没有尝试的选择器，只记录统计，不影响查找结果"""
+        if not (self.probe_every and untried):
+            return
+        with self._lock:
+            self._hits[group] = self._hits.get(group, 0) + 1
+            if self._hits[group] % self.probe_every:
+                return
+            group_stats = self.stats.get(group, {})
+
+            def attempts(selector):
+                entry = group_stats.get(selector)
+                return entry["hits"] + entry["misses"] if entry else 0
+
+            selector = min(untried, key=attempts)
+        self._try(context, group, selector, extract)
+
+    def dead_selectors(self, min_attempts: int = 20) -> Dict[str, List[str]]:
+        """返回尝试次数不少于min_attempts且从未命中的选择器"""
+        dead = {}
+        for group, group_stats in self.stats.items():
+            never_hit = [
+                selector for selector, entry in group_stats.items()
+                if entry["hits"] == 0 and entry["misses"] >= min_attempts
+            ]
+            if never_hit:
+                dead[group] = never_hit
+        return dead
+
+    def report(self) -> List[Dict]:
+        """生成每个选择器的命中率与平均耗时报告"""
+        rows = []
+        for group, group_stats in sorted(self.stats.items()):
+            for selector in self.ordered(group, list(group_stats)):
+                entry = group_stats[selector]
+                attempts = entry["hits"] + entry["misses"]
+                rows.append({
+                    "group": group,
+                    "selector": selector,
+                    "hits": entry["hits"],
+                    "misses": entry["misses"],
+                    "hit_rate": entry["hits"] / attempts if attempts else 0.0,
+                    "avg_time": entry["total_time"] / attempts if attempts else 0.0,
+                })
+        return rows
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_selector_registry() -> SelectorRegistry:
+    """获取进程内共享的选择器注册表，退出时自动保存"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SelectorRegistry()
+            atexit.register(_registry.save)
+        return _registry
+
+
+if __name__ == "__main__":
+    registry = get_selector_registry()
+    print(f"{'分组':<24}{'命中率':>8}{'命中':>7}{'未命中':>8}{'平均耗时':>10}  选择器")
+    for row in registry.report():
+        print(f"{row['group']:<24}{row['hit_rate']:>8.1%}{row['hits']:>7}{row['misses']:>8}"
+              f"{row['avg_time']:>9.3f}s  {row['selector']}")
+    dead = registry.dead_selectors()
+    if dead:
+        print("\n从未命中的选择器（可考虑删除）：")
+        for group, selectors in dead.items():
+            for selector in selectors:
+                print(f"- [{group}] {selector}")
@@ -0,0 +1,417 @@
+"""
+相似文章索引（TF-IDF + 余弦相似度）
+给定DOI，在已收集的语料中找最相似的文章。标题+摘要（可选加上 extract_text.py 提取的正文）切词后得到
+稀疏词频矩阵，保存在 SIMILARITY_DIR 下的 .npy 文件中，查询时以内存映射方式打开：
+- 同时保存按行（CSR，取查询文章的向量）和按列（CSC，倒排表）两种布局，查询只读取查询词的倒排列，
+  多个查询合成一次稀疏矩阵乘法，10万篇规模在毫秒级
+- 矩阵中存的是亚线性词频 1+ln(tf)，IDF与行范数单独存放：增量追加新文章时只切分新文章，
+  再用向量化运算重算IDF和行范数，不必重新处理旧文章
+- 并入正文时每行记录拟合所用正文的 pdf_md5：PDF在文章入索引之后才下载、提取的，下次增量拟合时重新切分该行
+- 查询只用TF-IDF权重最高的 SIMILARITY_QUERY_TERMS 个词；出现在超过 SIMILARITY_MAX_DF 比例文章中的词忽略
+  （几乎不区分文章，却有最长的倒排列）
+- 新版本写入临时目录后整体替换，读者不会看到写了一半的索引
+
+需要 numpy 和 scipy（可选依赖：pip install numpy scipy）。
+"""
+
+import itertools
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .utils.log_utils import get_logger
+
+try:
+    import numpy as np
+    import scipy.sparse as sp
+except ImportError:  # 可选依赖，用到时再报错
+    np = sp = None
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "similarity"}
+
+_TOKEN = re.compile(r"[^\W_]+")
+STOP_WORDS = frozenset("""
+a about above after again against all also among an and any are as at be been before being below between both but by
+can could did do does doing down during each few for from further had has have having here how however i if in into
+is it its itself just may might more most much must no nor not of off on once only or other our out over own per same
+should so some such than that the their them then there these they this those through thus to too under until up upon
+using very via was we were what when where which while who whom why will with within without would yet
+""".split())
+
+_FILES = ("ids", "df", "norms", "row_data", "row_indices", "row_indptr", "col_data", "col_indices", "col_indptr")
+_MD5_DTYPE = "S32"  # 每行拟合所用正文的 pdf_md5，未并入正文时为空
+
+
+def _require():
+    if np is None:
+        raise RuntimeError("相似文章索引需要安装numpy和scipy：pip install numpy scipy")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """去重音、统一大小写后按字母数字切词，去掉停用词、纯数字和单字符"""
+    text = text or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _TOKEN.findall(text.casefold()) if len(t) > 1 and not t.isdigit() and t not in STOP_WORDS]
+
+
+def document_text(title: Optional[str], abstract: Optional[str], body: Optional[str] = None) -> str:
+    """标题重复一次以加权，再接摘要和正文"""
+    return " ".join(part for part in (title, title, abstract, body) if part)
+
+
+class SimilarityIndex:
+    """内存映射的TF-IDF索引；读操作线程安全，refit 在写入新版本后原地重新打开"""
+
+    def __init__(self, path: Optional[str] = None):
+        _require()
+        self.path = path or ScienceConfig.SIMILARITY_DIR
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load_empty(self):
+        """空索引；也用于替换目录前释放对旧文件的内存映射（Windows下文件映射未关闭时不能替换）"""
+        self.meta = {"use_fulltext": False, "n_docs": 0, "max_id": 0, "built_at": None}
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.df = np.zeros(0, dtype=np.int32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.md5s = np.zeros(0, dtype=_MD5_DTYPE)
+        self.rows = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.cols = sp.csc_matrix((0, 0), dtype=np.float32)
+
+    def _load(self):
+        meta_file = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_file):
+            self._load_empty()
+        else:
+            with open(meta_file, encoding="utf-8") as f:
+                self.meta = json.load(f)
+            with open(os.path.join(self.path, "vocab.json"), encoding="utf-8") as f:
+                self.terms = json.load(f)
+            self.vocab = {term: i for i, term in enumerate(self.terms)}
+            arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r") for name in _FILES}
+            self.ids, self.df, self.norms = arrays["ids"], arrays["df"], arrays["norms"]
+            md5_file = os.path.join(self.path, "md5s.npy")  # 旧版本索引没有这个文件
+            self.md5s = (np.load(md5_file, mmap_mode="r") if os.path.exists(md5_file)
+                         else np.zeros(len(self.ids), dtype=_MD5_DTYPE))
+            shape = (len(self.ids), len(self.terms))
+            self.rows = sp.csr_matrix((arrays["row_data"], arrays["row_indices"], arrays["row_indptr"]),
+                                      shape=shape, copy=False)
+            self.cols = sp.csc_matrix((arrays["col_data"], arrays["col_indices"], arrays["col_indptr"]),
+                                      shape=shape, copy=False)
+        self.idf = self._idf(self.df, len(self.ids))
+        self.max_df = max(int(ScienceConfig.SIMILARITY_MAX_DF * len(self.ids)), 1)
+
+    @staticmethod
+    def _idf(df, n_docs: int):
+        return (np.log((1.0 + n_docs) / (1.0 + np.asarray(df, dtype=np.float64))) + 1.0).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def use_fulltext(self) -> bool:
+        return bool(self.meta["use_fulltext"])
+
+    def row_of(self, doc_id: int) -> Optional[int]:
+        """science.id 对应的矩阵行号，未索引时返回None（ids按升序存放）"""
+        i = int(np.searchsorted(self.ids, doc_id))
+        return i if i < len(self.ids) and self.ids[i] == doc_id else None
+
+    def indexed_md5(self, doc_id: int) -> Optional[str]:
+        """该文章拟合时并入的正文的 pdf_md5，未索引或未并入正文时返回None"""
+        i = self.row_of(doc_id)
+        return (self.md5s[i].decode("ascii") or None) if i is not None else None
+
+    def vectorize(self, text: str):
+        """把任意文本转成与矩阵同一词表的 1×V 词频行向量（词表外的词丢弃）"""
+        counts = Counter(t for t in tokenize(text) if t in self.vocab)
+        cols = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        data = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        order = np.argsort(cols)
+        return sp.csr_matrix((data[order], cols[order], [0, len(cols)]), shape=(1, len(self.terms)))
+
+    def _prune(self, queries):
+        """每个查询只保留TF-IDF权重最高的 SIMILARITY_QUERY_TERMS 个词，并去掉过于常见的词"""
+        limit = ScienceConfig.SIMILARITY_QUERY_TERMS
+        df = np.asarray(self.df)
+        data, indices, indptr = [], [], [0]
+        for j in range(queries.shape[0]):
+            start, end = queries.indptr[j], queries.indptr[j + 1]
+            cols, tf = queries.indices[start:end], queries.data[start:end]
+            keep = df[cols] <= self.max_df
+            cols, tf = cols[keep], tf[keep]
+            if limit and len(cols) > limit:
+                top = np.sort(np.argpartition(-(tf * self.idf[cols]), limit - 1)[:limit])
+                cols, tf = cols[top], tf[top]
+            data.append(tf)
+            indices.append(cols)
+            indptr.append(indptr[-1] + len(cols))
+        return sp.csr_matrix((np.concatenate(data), np.concatenate(indices), indptr), shape=queries.shape)
+
+    def _top_k(self, queries, k: int, exclude: Sequence[Optional[int]]) -> List[List[Tuple[int, float]]]:
+        """queries 是 b×V 的词频矩阵；只取查询词的倒排列做一次矩阵乘法，再逐列取前k"""
+        queries = self._prune(sp.csr_matrix(queries, dtype=np.float32))
+        cols = np.unique(queries.indices)
+        if not len(cols):
+            return [[] for _ in range(queries.shape[0])]
+        idf = self.idf[cols]
+        # 查询侧乘 idf²：文档侧存的是词频，分子 Σ tf_d·idf · tf_q·idf 与完整TF-IDF点积相同
+        weights = queries[:, cols].multiply(idf * idf).T.toarray()
+        query_norms = np.sqrt(np.asarray(queries[:, cols].multiply(idf).power(2).sum(axis=1)).ravel())
+        scores = self.cols[:, cols] @ weights  # n×b 稠密
+        scores /= np.asarray(self.norms)[:, None] * query_norms[None, :] + 1e-12
+        results = []
+        for j in range(queries.shape[0]):
+            values = scores[:, j]
+            if exclude[j] is not None:
+                values[exclude[j]] = 0.0
+            take = min(k, len(values))
+            top = np.argpartition(-values, take - 1)[:take]
+            top = top[np.argsort(-values[top])]
+            results.append([(int(self.ids[i]), round(float(values[i]), 4)) for i in top if values[i] > 0])
+        return results
+
+    def similar_to_ids(self, doc_ids: Sequence[int], k: int = 10) -> List[List[Tuple[int, float]]]:
+        """
+        批量查询已索引文章的相似文章
+
+        Returns:
+            与 doc_ids 对应的列表，每项为 [(science.id, 余弦相似度)]，不含自身；未索引的id返回空列表
+        """
+        with self._lock:
+            positions = [self.row_of(doc_id) for doc_id in doc_ids]
+            found = [p for p in positions if p is not None]
+            if not found:
+                return [[] for _ in doc_ids]
+            hits = iter(self._top_k(self.rows[found], k, exclude=found))
+            return [next(hits) if p is not None else [] for p in positions]
+
+    def similar_to_text(self, text: str, k: int = 10, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """查询任意文本（如尚未索引的新文章的标题+摘要）"""
+        with self._lock:
+            if not len(self.ids):
+                return []
+            exclude = self.row_of(exclude_id) if exclude_id is not None else None
+            return self._top_k(self.vectorize(text), k, exclude=[exclude])[0]
+
+    def refit(self, docs: Iterable[Tuple[int, str, Optional[str]]], use_fulltext: Optional[bool] = None) -> int:
+        """
+        追加新文章、重新切分正文有变化的已索引文章并重写索引；IDF与行范数整体重算
+
+        Args:
+            docs: (science.id, 文本, 并入正文的pdf_md5或None)；id大于当前最大id的按升序追加，
+                已索引的id替换原来的行
+            use_fulltext: 记录到元数据中，None表示保持不变
+
+        Returns:
+            新增与更新的文章数
+        """
+        with self._lock:
+            terms = list(self.terms)
+            vocab = dict(self.vocab)
+            indexed_max = max_id = self.meta["max_id"]
+            new_ids, new_md5s, data, indices, indptr = [], [], [], [], [0]
+            replaced: Dict[int, Tuple[List[int], List[float], Optional[str]]] = {}
+            for doc_id, text, md5 in docs:
+                if doc_id <= indexed_max:
+                    position = self.row_of(doc_id)
+                    if position is None:
+                        continue
+                elif doc_id <= max_id:
+                    continue
+                counts = Counter(tokenize(text))
+                for term in counts:
+                    if term not in vocab:
+                        vocab[term] = len(terms)
+                        terms.append(term)
+                row = sorted((vocab[t], c) for t, c in counts.items())
+                row_indices = [col for col, _ in row]
+                row_data = [1.0 + math.log(c) for _, c in row]
+                if doc_id <= indexed_max:
+                    replaced[position] = (row_indices, row_data, md5)
+                    continue
+                indices.extend(row_indices)
+                data.extend(row_data)
+                indptr.append(len(indices))
+                new_ids.append(doc_id)
+                new_md5s.append(md5 or "")
+                max_id = doc_id
+            if not new_ids and not replaced:
+                return 0
+
+            old = self.rows.copy()
+            old.resize((old.shape[0], len(terms)))
+            md5s = np.concatenate([np.asarray(self.md5s), np.asarray(new_md5s, dtype=_MD5_DTYPE)])
+            if replaced:
+                # 清空被替换的行再加上新行
+                keep = np.ones(old.shape[0], dtype=np.float32)
+                keep[list(replaced)] = 0.0
+                positions = sorted(replaced)
+                lengths = [len(replaced[p][0]) for p in positions]
+                values = np.fromiter(itertools.chain.from_iterable(replaced[p][1] for p in positions),
+                                     dtype=np.float32, count=sum(lengths))
+                cols = np.fromiter(itertools.chain.from_iterable(replaced[p][0] for p in positions),
+                                   dtype=np.int64, count=sum(lengths))
+                updates = sp.csr_matrix((values, (np.repeat(positions, lengths), cols)), shape=old.shape)
+                old = (sp.diags(keep) @ old + updates).tocsr()
+                old.eliminate_zeros()
+                md5s[positions] = [replaced[p][2] or "" for p in positions]
+            added = sp.csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64),
+                                   np.asarray(indptr, dtype=np.int64)), shape=(len(new_ids), len(terms)))
+            rows = sp.vstack([old, added], format="csr", dtype=np.float32)
+            rows.sort_indices()
+            ids = np.concatenate([np.asarray(self.ids), np.asarray(new_ids, dtype=np.int64)])
+            df = np.bincount(rows.indices, minlength=len(terms)).astype(np.int32)
+            idf = self._idf(df, len(ids))
+            weighted = rows.multiply(idf).tocsr()
+            norms = np.sqrt(np.asarray(weighted.power(2).sum(axis=1)).ravel()).astype(np.float32)
+            meta = dict(self.meta, n_docs=len(ids), max_id=int(max_id), built_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+            if use_fulltext is not None:
+                meta["use_fulltext"] = bool(use_fulltext)
+            try:
+                self._write(meta, terms, ids, df, norms, md5s, rows, rows.tocsc())
+            finally:
+                self._load()
+            return len(new_ids) + len(replaced)
+
+    def _write(self, meta, terms, ids, df, norms, md5s, rows, cols):
+        """写入临时目录后替换旧目录（替换前释放对旧文件的内存映射）"""
+        tmp = self.path.rstrip("/\\") + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        index_dtype = np.int32 if rows.nnz < 2 ** 31 else np.int64  # 与scipy的索引类型一致才能零拷贝映射
+        arrays = {
+            "ids": ids, "df": df, "norms": norms, "md5s": md5s,
+            "row_data": rows.data, "row_indices": rows.indices.astype(index_dtype),
+            "row_indptr": rows.indptr.astype(index_dtype),
+            "col_data": cols.data, "col_indices": cols.indices.astype(index_dtype),
+            "col_indptr": cols.indptr.astype(index_dtype),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        old = self.path.rstrip("/\\") + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        self._load_empty()
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._load()
+
+
+def iter_documents(since_id: int = 0, use_fulltext: bool = False, chunk_rows: int = 2000,
+                   store=None) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """
+    用服务端游标按id顺序读取 id > since_id 的文章，产出 (id, 文本, 并入正文的pdf_md5或None)
+
+    Args:
+        use_fulltext: 并入文本库中的正文（需要先运行 extract_text.py）
+        store: 文本库（TextStore），None且use_fulltext时打开默认文本库
+    """
+    if use_fulltext and store is None:
+        from .text_extractor import TextStore
+        store = TextStore()
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(f"SELECT id, title, abstract, pdf_md5 FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE id > %s ORDER BY id", (since_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            for doc_id, title, abstract, md5 in rows:
+                body = store.get_text(md5) if use_fulltext and md5 else None
+                yield doc_id, document_text(title, abstract, body), md5 if body is not None else None
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def iter_changed_documents(index: SimilarityIndex, store=None,
+                           chunk_rows: int = 2000) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """
+    已索引的文章中，pdf_md5 与拟合时并入的正文不同且文本库里已有新正文的，产出 (id, 文本, pdf_md5)
+    （入索引时还没有PDF、之后才下载提取的文章，以及PDF重新下载后内容变化的文章）
+    """
+    if store is None:
+        from .text_extractor import TextStore
+        store = TextStore()
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(f"SELECT id, title, abstract, pdf_md5 FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE id <= %s AND pdf_md5 IS NOT NULL AND pdf_md5 != '' ORDER BY id",
+                       (index.meta["max_id"],))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            for doc_id, title, abstract, md5 in rows:
+                if index.row_of(doc_id) is None or index.indexed_md5(doc_id) == md5:
+                    continue
+                body = store.get_text(md5)
+                if body is not None:
+                    yield doc_id, document_text(title, abstract, body), md5
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def build_similarity_index(index: SimilarityIndex, use_fulltext: Optional[bool] = None, rebuild: bool = False,
+                           store=None) -> int:
+    """
+    从 science 表增量拟合（rebuild=True 时清空后全量拟合）；并入正文时，已索引文章的正文有变化的也重新切分
+
+    Returns:
+        新增与更新的文章数
+    """
+    if rebuild:
+        index.clear()
+    fulltext = index.use_fulltext if use_fulltext is None else use_fulltext
+    if fulltext and store is None:
+        from .text_extractor import TextStore
+        store = TextStore()
+    docs = iter_documents(index.meta["max_id"], fulltext, store=store)
+    if fulltext and len(index):
+        docs = itertools.chain(iter_changed_documents(index, store=store), docs)
+    added = index.refit(docs, use_fulltext=fulltext)
+    logger.info("相似文章索引新增或更新%d篇，共%d篇，词表%d", added, len(index), len(index.terms),
+                extra={"stage": "similarity", "added": added, "docs": len(index)})
+    return added
+
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """共享的只读索引；索引尚未构建时返回None（未安装numpy/scipy时抛RuntimeError）"""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(os.path.join(ScienceConfig.SIMILARITY_DIR, "meta.json")):
+            _index = SimilarityIndex(ScienceConfig.SIMILARITY_DIR)
+        return _index
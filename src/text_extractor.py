@@ -0,0 +1,355 @@
+"""
+PDF全文提取与文本库
+下载目录里的PDF只是文件，检索和统计每次都要重新解析。这里把已下载文章的PDF在进程池中提取成逐页文本，
+写进一个按 pdf_md5 为键的SQLite文本库（TEXT_STORE_FILE）：
+- 同一MD5的文件只提取一次；库中已有的MD5直接跳过，重复运行只处理新下载的文件
+- 页文本以换页符 \\f 连接后zlib压缩存储，同时记录页数、字符数、提取耗时和使用的解析库
+- 解析失败的文件记录错误原因，之后不再重试（--retry-failed 时重试）；让解析进程崩溃的文件
+  （解析库的C扩展段错误等）同样记为失败，不会让整个提取挂起
+- 解析库可选 PyMuPDF（快）或 pdfminer.six，均未安装时给出安装提示
+"""
+
+import multiprocessing as mp
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pymysql
+
+from .config import ScienceConfig
+from .metrics import get_metrics
+from .utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+_STAGE = {"stage": "extract"}
+
+PAGE_SEPARATOR = "\f"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    md5 TEXT PRIMARY KEY,
+    path TEXT,
+    pages INTEGER NOT NULL DEFAULT 0,
+    chars INTEGER NOT NULL DEFAULT 0,
+    text BLOB,
+    backend TEXT,
+    seconds REAL,
+    extracted_at TEXT,
+    error TEXT
+);
+"""
+
+
+def _pages_pymupdf(path: str) -> List[str]:
+    import fitz
+    with fitz.open(path) as doc:
+        return [page.get_text() for page in doc]
+
+
+def _pages_pdfminer(path: str) -> List[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    return ["".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            for page in extract_pages(path)]
+
+
+BACKENDS = {
+    "pymupdf": ("fitz", _pages_pymupdf),
+    "pdfminer": ("pdfminer.high_level", _pages_pdfminer),
+}
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """
+    确认解析库可用，返回实际使用的名字
+
+    Args:
+        name: pymupdf / pdfminer / auto，None表示 TEXT_EXTRACT_BACKEND
+    """
+    name = name or ScienceConfig.TEXT_EXTRACT_BACKEND
+    if name != "auto" and name not in BACKENDS:
+        raise ValueError(f"未知的PDF解析库: {name}（可选 auto/{'/'.join(BACKENDS)}）")
+    for candidate in (BACKENDS if name == "auto" else [name]):
+        try:
+            __import__(BACKENDS[candidate][0])
+            return candidate
+        except ImportError:
+            continue
+    raise RuntimeError("提取PDF文本需要安装 PyMuPDF 或 pdfminer.six：pip install pymupdf（或 pip install pdfminer.six）")
+
+
+def compress_pages(pages: List[str]) -> bytes:
+    return zlib.compress(PAGE_SEPARATOR.join(pages).encode("utf-8"), 6)
+
+
+def decompress_pages(blob: bytes) -> List[str]:
+    return zlib.decompress(blob).decode("utf-8").split(PAGE_SEPARATOR)
+
+
+def extract_file(backend: str, md5: str, path: str) -> Tuple:
+    """提取一个文件，返回可直接写入文本库的一行；解析失败时记录错误而不抛出"""
+    start = time.perf_counter()
+    try:
+        pages = BACKENDS[backend][1](path)
+    except Exception as e:
+        return (md5, path, 0, 0, None, backend, round(time.perf_counter() - start, 4),
+                f"{type(e).__name__}: {e}"[:500])
+    seconds = round(time.perf_counter() - start, 4)
+    chars = sum(len(page) for page in pages)
+    return md5, path, len(pages), chars, compress_pages(pages), backend, seconds, None
+
+
+def _extract_batch(backend: str, items: List[Tuple[str, str]]) -> List[Tuple]:
+    """进程池任务：提取一批 (md5, path)"""
+    return [extract_file(backend, md5, path) for md5, path in items]
+
+
+def _new_executor(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"))
+
+
+def _extract_in_pool(backend: str, batches: Iterable[List[Tuple[str, str]]], workers: int, record: Callable):
+    """
+    在进程池中提取，按提交顺序把结果交给 record
+
+    某个文件让worker进程崩溃时整个进程池失效，在途的批次都拿不到结果：已完成的照常记录，其余文件放进
+    待隔离队列，在新进程池里逐个重做；单独重做时仍然崩溃的就是坏文件，记为失败
+    """
+    executor = _new_executor(workers)
+    pending = deque()  # (future, batch)
+    suspects = deque()
+    source = iter(batches)
+    try:
+        while True:
+            if suspects:
+                md5, path = suspects.popleft()
+                try:
+                    record(executor.submit(_extract_batch, backend, [(md5, path)]).result())
+                except BrokenProcessPool:
+                    record([(md5, path, 0, 0, None, backend, 0.0, "提取进程崩溃")])
+                    executor.shutdown(wait=False)
+                    executor = _new_executor(workers)
+                continue
+            while len(pending) < workers * 2:  # 限制在途批次数
+                batch = next(source, None)
+                if batch is None:
+                    break
+                pending.append((executor.submit(_extract_batch, backend, batch), batch))
+            if not pending:
+                break
+            future, batch = pending.popleft()
+            try:
+                record(future.result())
+            except BrokenProcessPool:
+                logger.warning("提取进程崩溃，逐个重做在途的%d个批次以找出坏文件", len(pending) + 1, extra=_STAGE)
+                suspects.extend(batch)
+                for other, other_batch in pending:
+                    if other.done() and other.exception() is None:
+                        record(other.result())
+                    else:
+                        suspects.extend(other_batch)
+                pending.clear()
+                executor.shutdown(wait=False)
+                executor = _new_executor(workers)
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class TextStore:
+    """按 pdf_md5 存放压缩页文本的SQLite文本库，线程安全"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or ScienceConfig.TEXT_STORE_FILE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM texts WHERE error IS NULL").fetchone()[0]
+
+    def known(self, md5s: Iterable[str], include_failed: bool = True) -> Set[str]:
+        """返回其中已在库中的MD5；include_failed=False时提取失败的不算"""
+        md5s = list(md5s)
+        found = set()
+        condition = "" if include_failed else " AND error IS NULL"
+        with self._lock:
+            for i in range(0, len(md5s), 500):
+                part = md5s[i:i + 500]
+                found.update(row[0] for row in self.conn.execute(
+                    f"SELECT md5 FROM texts WHERE md5 IN ({','.join('?' * len(part))}){condition}", part))
+        return found
+
+    def put_many(self, rows: Iterable[Tuple]):
+        """写入 (md5, path, pages, chars, text, backend, seconds, error)，同一MD5覆盖"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO texts (md5, path, pages, chars, text, backend, seconds, extracted_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row[:7] + (now, row[7]) for row in rows]
+            )
+            self.conn.commit()
+
+    def get_pages(self, md5: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self.conn.execute("SELECT text FROM texts WHERE md5 = ? AND error IS NULL", (md5,)).fetchone()
+        return decompress_pages(row[0]) if row else None
+
+    def get_text(self, md5: str) -> Optional[str]:
+        pages = self.get_pages(md5)
+        return PAGE_SEPARATOR.join(pages) if pages is not None else None
+
+    def iter_texts(self, chunk_rows: int = 200) -> Iterator[Tuple[str, List[str]]]:
+        """按MD5顺序逐个产出 (md5, 页文本列表)，只解压当前块"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT md5, text FROM texts WHERE error IS NULL AND md5 > ? ORDER BY md5 LIMIT ?",
+                    (last, chunk_rows)
+                ).fetchall()
+            if not rows:
+                return
+            for md5, blob in rows:
+                yield md5, decompress_pages(blob)
+            last = rows[-1][0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            files, pages, chars, seconds, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(chars), 0), COALESCE(SUM(seconds), 0), "
+                "COALESCE(SUM(LENGTH(text)), 0) FROM texts WHERE error IS NULL"
+            ).fetchone()
+            failed = self.conn.execute("SELECT COUNT(*) FROM texts WHERE error IS NOT NULL").fetchone()[0]
+        return {"files": files, "failed": failed, "pages": pages, "chars": chars,
+                "seconds": round(seconds, 2), "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _iter_downloaded(chunk_rows: int) -> Iterator[List[Tuple[str, str]]]:
+    """用服务端游标按id顺序分块读取已下载文章的 (pdf_md5, download_path)"""
+    conn = pymysql.connect(**ScienceConfig.DB_CONFIG)
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(f"SELECT pdf_md5, download_path FROM {ScienceConfig.TABLE_NAME} "
+                       f"WHERE downloaded = 1 AND pdf_md5 IS NOT NULL AND download_path IS NOT NULL ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield list(rows)
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def pending_files(store: TextStore, retry_failed: bool = False, chunk_rows: int = 1000,
+                  rows: Optional[Iterable[List[Tuple[str, str]]]] = None,
+                  stats: Optional[Dict] = None) -> Iterator[Tuple[str, str]]:
+    """
+    产出需要提取的 (md5, path)：同一MD5只出现一次，跳过库中已有的和文件不存在的
+
+    Args:
+        rows: 自定义的 (md5, path) 行块来源（测试用），None表示从数据库读取
+        stats: 传入时累计 missing（文件不存在）与 skipped（已提取）计数
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("missing", 0)
+    stats.setdefault("skipped", 0)
+    seen: Set[str] = set()
+    for chunk in (rows if rows is not None else _iter_downloaded(chunk_rows)):
+        chunk = [(md5, path) for md5, path in chunk if md5 not in seen]
+        done = store.known({md5 for md5, _ in chunk}, include_failed=not retry_failed)
+        for md5, path in chunk:
+            if md5 in seen:
+                continue
+            seen.add(md5)
+            if md5 in done:
+                stats["skipped"] += 1
+            elif not os.path.isfile(path):
+                stats["missing"] += 1
+                logger.debug("PDF文件不存在: %s", path, extra={"stage": "extract", "pdf_md5": md5})
+            else:
+                yield md5, path
+
+
+def extract_texts(store: TextStore, workers: Optional[int] = None, backend: Optional[str] = None,
+                  retry_failed: bool = False, limit: Optional[int] = None, batch_files: int = 4,
+                  rows: Optional[Iterable[List[Tuple[str, str]]]] = None) -> Dict:
+    """
+    提取已下载但尚未入文本库的PDF
+
+    Args:
+        workers: 进程数，None表示CPU核数，1表示在当前进程中提取
+        backend: 解析库，None表示 TEXT_EXTRACT_BACKEND
+        retry_failed: 重试之前解析失败的文件
+        limit: 本次最多提取的文件数
+        batch_files: 每个进程池任务的文件数
+        rows: 自定义的 (md5, path) 行块来源（测试用）
+
+    Returns:
+        统计字典：extracted/failed/skipped/missing/pages/chars/seconds/elapsed/files_per_s
+    """
+    backend = resolve_backend(backend)
+    workers = workers or os.cpu_count() or 1
+    stats = {"extracted": 0, "failed": 0, "pages": 0, "chars": 0, "seconds": 0.0, "backend": backend}
+    histogram = get_metrics().histogram("crawler_text_extract_seconds", "单个PDF全文提取耗时")
+    start = time.time()
+
+    def batches() -> Iterator[List[Tuple[str, str]]]:
+        batch = []
+        for count, item in enumerate(pending_files(store, retry_failed, rows=rows, stats=stats), 1):
+            batch.append(item)
+            if len(batch) >= batch_files:
+                yield batch
+                batch = []
+            if limit and count >= limit:
+                break
+        if batch:
+            yield batch
+
+    def record(results: List[Tuple]):
+        store.put_many(results)
+        for md5, path, pages, chars, _, _, seconds, error in results:
+            stats["seconds"] += seconds
+            histogram.observe(seconds, backend=backend)
+            if error:
+                stats["failed"] += 1
+                logger.warning("PDF文本提取失败 %s: %s", path, error,
+                               extra={"stage": "extract", "pdf_md5": md5, "error": error})
+            else:
+                stats["extracted"] += 1
+                stats["pages"] += pages
+                stats["chars"] += chars
+        logger.info("已提取%d个PDF（失败%d）", stats["extracted"], stats["failed"],
+                    extra={"stage": "extract", "extracted": stats["extracted"], "failed": stats["failed"]})
+
+    if workers == 1:
+        for batch in batches():
+            record(_extract_batch(backend, batch))
+    else:
+        _extract_in_pool(backend, batches(), workers, record)
+
+    stats["seconds"] = round(stats["seconds"], 2)
+    stats["elapsed"] = round(time.time() - start, 2)
+    done = stats["extracted"] + stats["failed"]
+    stats["files_per_s"] = round(done / stats["elapsed"], 2) if stats["elapsed"] > 0 else float(done)
+    return stats
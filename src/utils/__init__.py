@@ -1,7 +1,7 @@
 # 工具模块 
 
 from .file_utils import FileUtils
-from .driver_utils import create_driver, handle_captcha, wait_for_element, safe_click
+from .driver_utils import create_driver, handle_captcha, wait_for_element, safe_click, probe_page, is_captcha_or_abnormal
 from .download_utils import download_file, get_file_size, format_file_size
 
 # 导出常用函数
@@ -2,6 +2,7 @@
 下载工具模块
 """
 
+import itertools
 import os
 import time
 import logging
@@ -10,100 +11,117 @@ from pathlib import Path
 from typing import Optional, Tuple
 from urllib.parse import urlparse
 
+from ..metrics import record_download
+
 logger = logging.getLogger(__name__)
 
+PDF_ACCEPT = "application/pdf,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
 
-def download_file(url: str, filepath: str, timeout: int = 30, max_retries: int = 3, cookies: Optional[str] = None, user_agent: Optional[str] = None) -> bool:
-    """下载文件到本地"""
-    import time
-    import os
-    import logging
-    
-    logger = logging.getLogger(__name__)
+
+def download_file(url: str, filepath: str, timeout: int = 30, max_retries: Optional[int] = None, cookies: Optional[str] = None, user_agent: Optional[str] = None) -> bool:
+    """下载文件到本地，下载次数、耗时与速度记入指标；max_retries 为最多尝试次数，None 表示 RETRY_MAX_ATTEMPTS"""
+    start = time.perf_counter()
+    success = _download_file(url, filepath, timeout, max_retries, cookies, user_agent)
+    nbytes = (get_file_size(filepath) or 0) if success else 0
+    record_download(nbytes, time.perf_counter() - start, success)
+    return success
+
+
+def _download_file(url: str, filepath: str, timeout: int, max_retries: Optional[int], cookies: Optional[str],
+                   user_agent: Optional[str]) -> bool:
+    """
+    下载文件到本地（重试交给 src/retry_policy.py 的共享引擎：失败分类、退避、熔断与重试预算）
+
+    默认使用共享的浏览器会话（src/browser_session.py：浏览器cookie/UA快照、keep-alive连接池、
+    401/403时刷新）；显式传入 cookies 字符串时按旧方式单独建会话。
+    """
+    from ..retry_policy import FetchError, get_retry_engine
     
-    # 创建session
-    session = requests.Session()
+    headers = {
+        "Accept": PDF_ACCEPT,
+    }
+    if user_agent:
+        headers["User-Agent"] = user_agent
     
-    # 处理cookie
     if isinstance(cookies, str):
+        from ..browser_session import DEFAULT_USER_AGENT
+        session = requests.Session()
+        session.headers["User-Agent"] = DEFAULT_USER_AGENT
         for item in cookies.split(";"):
             if "=" in item:
                 name, value = item.strip().split("=", 1)
                 session.cookies.set(name, value)
+    else:
+        from ..browser_session import get_browser_session
+        session = get_browser_session()
     
-    # 设置headers
-    headers = {
-        "User-Agent": user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Accept": "application/pdf,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-    }
+    logger.info(f"开始下载: {url}")
+    logger.info(f"保存到: {filepath}")
+    try:
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        get_retry_engine().call(url, lambda: fetch_pdf(session, url, filepath, timeout, headers),
+                                max_attempts=max_retries)
+    except FetchError as e:
+        logger.error(f"下载最终失败（{e.kind}: {e.reason}）: {url}")
+        return False
+    except OSError as e:
+        logger.error(f"下载时发生未知错误: {e}")
+        return False
+    logger.info(f"下载完成: {filepath}")
+    return True
+
+
+def fetch_pdf(session, url: str, filepath: str, timeout: int = 30, headers: Optional[dict] = None,
+              cookies: Optional[dict] = None) -> int:
+    """
+    单次下载PDF到filepath（不重试），返回写入的字节数
     
-    for attempt in range(max_retries):
+    Args:
+        session: requests.Session 或 BrowserSession
+        
+    Raises:
+        FetchError: HTTP错误或响应不是PDF（reason 为 not_pdf）
+        requests.exceptions.RequestException: 网络错误，由 retry_policy.classify 分类
+    """
+    from ..retry_policy import FATAL, FetchError, http_error
+    
+    response = session.get(url, headers=headers, cookies=cookies, timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            raise http_error(response)
+        chunks = response.iter_content(chunk_size=8192)
+        first_chunk = next(chunks, b"")
+        content_type = response.headers.get("Content-Type", "").lower()
+        # 内容类型不是PDF时检查文件头；过期链接通常返回登录页或ePDF阅读页
+        if "application/pdf" not in content_type and "octet-stream" not in content_type \
+                and b"%PDF" not in first_chunk[:10]:
+            raise FetchError(FATAL, "not_pdf", response.status_code)
+        nbytes = 0
         try:
-            logger.info(f"开始下载: {url}")
-            logger.info(f"保存到: {filepath}")
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            response = session.get(url, headers=headers, timeout=timeout, stream=True)
-            
-            # 改进的状态码处理
-            if response.status_code == 200:
-                content_type = response.headers.get('Content-Type', '').lower()
-                
-                # 检查内容类型
-                if 'application/pdf' in content_type or 'octet-stream' in content_type:
-                    pass  # 内容类型正确，继续处理
-                else:
-                    # 内容类型不匹配，检查文件头
-                    logger.warning(f"内容类型不是PDF: {content_type}，检查文件头")
-                    first_chunk = next(response.iter_content(chunk_size=8192), None)
-                    if not first_chunk or b'%PDF' not in first_chunk[:10]:
-                        logger.error("下载失败: 文件头不是PDF标志")
-                        if attempt < max_retries - 1:
-                            time.sleep(2 ** attempt)
-                        continue  # 跳过当前重试，进入下一次循环
-                    logger.info("文件头确认为PDF，继续下载")
-                    
-                # 写入文件
-                with open(filepath, 'wb') as f:
-                    # 如果已经读取了第一块，先写入
-                    if 'first_chunk' in locals() and first_chunk:
-                        f.write(first_chunk)
-                    # 继续读取和写入剩余内容
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            
-                # 下载后再次验证文件
-                if os.path.getsize(filepath) < 1000:  # 小于1KB可能有问题
-                    with open(filepath, 'rb') as f:
-                        content = f.read(10)
-                        if b'%PDF' not in content:
-                            logger.error(f"下载的文件不是有效PDF，大小: {os.path.getsize(filepath)} 字节")
-                            os.remove(filepath)  # 删除无效文件
-                            if attempt < max_retries - 1:
-                                time.sleep(2 ** attempt)
-                            continue  # 尝试下一次重试
-                            
-                logger.info(f"下载完成: {filepath}")
-                return True
-            else:
-                logger.warning(f"下载失败: HTTP {response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                else:
-                    logger.error(f"下载最终失败: {url}")
-                    return False
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"下载失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                logger.error(f"下载最终失败: {url}")
-                return False
-        except Exception as e:
-            logger.error(f"下载时发生未知错误: {e}")
-            return False
-            
-    return False
+            with open(filepath, "wb") as f:
+                for chunk in itertools.chain((first_chunk,), chunks):
+                    if chunk:
+                        f.write(chunk)
+                        nbytes += len(chunk)
+        except Exception:
+            _remove(filepath)  # 传输中断时不留下半个文件
+            raise
+        # 小于1KB且没有PDF标志，多半是错误页
+        if nbytes < 1000 and not first_chunk.startswith(b"%PDF"):
+            _remove(filepath)
+            raise FetchError(FATAL, "not_pdf", response.status_code)
+        return nbytes
+    finally:
+        response.close()
+
+
+def _remove(filepath: str):
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
 
 
 def get_file_size(filepath: str) -> Optional[int]:
@@ -12,6 +12,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
 from typing import Optional, Tuple
 
+from ..metrics import get_metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,95 +65,106 @@ def create_driver(headless: bool = False, debug_port: Optional[int] = None) -> w
         raise
 
 
-def is_page_normal(driver):
-    """判断页面是否为正常内容（如能否获取到论文卡片/标题等元素）"""
-    try:
-        current_url = driver.current_url
-        print(f"[DEBUG] 检查页面: {current_url}")
-        
-        # 检查搜索页面：能否找到论文卡片
-        articles = driver.find_elements(By.CSS_SELECTOR, ".card.pb-3.mb-4.border-bottom")
-        if articles and len(articles) > 0:
-            print(f"[DEBUG] 找到{len(articles)}个论文卡片，页面正常")
-            return True
+# 在浏览器内一次性完成异常页检测，只把很小的状态结构传回Python，
+# 避免拉取整页page_source再逐个find_elements
+PAGE_PROBE_SCRIPT = """
+var sel = arguments[0];
+var doc = document;
+var title = (doc.title || '').toLowerCase();
+var body = doc.body;
+var textLen = body ? body.textContent.length : 0;
+var markers = [];
+for (var i = 0; i < sel.challenge.length; i++) {
+    if (doc.querySelector(sel.challenge[i])) { markers.push(sel.challenge[i]); }
+}
+var titleHits = sel.titleKeywords.filter(function (kw) { return title.indexOf(kw) >= 0; });
+var textHits = [];
+if (body && textLen < sel.maxScanChars) {
+    var text = body.textContent.toLowerCase();
+    textHits = sel.textKeywords.filter(function (kw) { return text.indexOf(kw) >= 0; });
+}
+var titleElem = doc.querySelector(sel.articleTitle);
+var status = {
+    url: location.href,
+    title: doc.title || '',
+    cards: doc.querySelectorAll(sel.cards).length,
+    article_title: !!(titleElem && titleElem.textContent.trim()),
+    pdf_icons: doc.querySelectorAll(sel.pdfIcon).length,
+    download_button: !!doc.querySelector(sel.downloadButton),
+    text_length: textLen,
+    challenge_markers: markers,
+    keywords: titleHits.concat(textHits)
+};
+status.challenge = markers.length > 0 || titleHits.length > 0 || textHits.length > 0;
+status.normal = !status.challenge && (status.cards > 0 || status.article_title ||
+    status.pdf_icons > 0 || status.download_button || textLen > 100);
+return status;
+"""
+
+PROBE_SELECTORS = {
+    "cards": ".card.pb-3.mb-4.border-bottom",
+    "articleTitle": "h1.article-title",
+    "pdfIcon": "i.icon-pdf",
+    "downloadButton": "#app-navbar .btn-group.navbar-right .grouped.right a",
+    # 常见人机验证页面的DOM标记（Cloudflare、reCAPTCHA、hCaptcha、PerimeterX）
+    "challenge": [
+        "#challenge-form",
+        "#challenge-running",
+        "#cf-challenge-running",
+        ".cf-turnstile",
+        "iframe[src*='challenges.cloudflare.com']",
+        ".g-recaptcha",
+        "iframe[src*='recaptcha']",
+        ".h-captcha",
+        "#px-captcha",
+    ],
+    "titleKeywords": ["cloudflare", "captcha", "verify", "checking", "just a moment"],
+    "textKeywords": ["captcha", "verify you are human", "cloudflare", "robot", "人机验证", "滑块", "checking your browser"],
+    # 验证页面都很短，只对短页面做正文关键词扫描，长文章页不会误判也不耗时
+    "maxScanChars": 20000,
+}
+
+
+def probe_page(driver) -> Optional[dict]:
+    """
+    用一次execute_script检测当前页面状态
+    
+    Args:
+        driver: WebDriver实例
         
-        # 检查详情页：能否找到文章标题
-        try:
-            title = driver.find_element(By.CSS_SELECTOR, "h1.article-title")
-            if title and title.text.strip():
-                print(f"[DEBUG] 找到文章标题: {title.text[:50]}...，页面正常")
-                return True
-        except NoSuchElementException:
-            print("[DEBUG] 未找到文章标题")
-            pass
-            
-        # 检查详情页：能否找到PDF图标
-        try:
-            pdf_icons = driver.find_elements(By.CSS_SELECTOR, "i.icon-pdf")
-            if pdf_icons and len(pdf_icons) > 0:
-                print(f"[DEBUG] 找到{len(pdf_icons)}个PDF图标，页面正常")
-                return True
-        except NoSuchElementException:
-            print("[DEBUG] 未找到PDF图标")
-            pass
-            
-        # 检查PDF页面：能否找到下载按钮
-        try:
-            download_btn = driver.find_element(By.CSS_SELECTOR, "#app-navbar .btn-group.navbar-right .grouped.right a")
-            if download_btn:
-                print("[DEBUG] 找到下载按钮，页面正常")
-                return True
-        except NoSuchElementException:
-            print("[DEBUG] 未找到下载按钮")
-            pass
-            
-        # 检查是否有其他正常内容
-        try:
-            body_text = driver.find_element(By.TAG_NAME, "body").text
-            if len(body_text) > 100:  # 页面有足够的内容
-                print(f"[DEBUG] 页面有{len(body_text)}字符内容，可能正常")
-                return True
-        except:
-            pass
-            
-        print("[DEBUG] 页面内容检查失败，可能异常")
-        return False
-            
+    Returns:
+        状态字典（normal/challenge/cards/keywords等），脚本执行失败时返回None
+    """
+    try:
+        return driver.execute_script(PAGE_PROBE_SCRIPT, PROBE_SELECTORS)
     except Exception as e:
-        print(f"[DEBUG] 检查页面时异常: {e}")
+        logger.warning(f"页面探测脚本执行失败: {e}")
+        return None
+
+
+def is_page_normal(driver):
+    """判断页面是否为正常内容（如能否获取到论文卡片/标题等元素）"""
+    status = probe_page(driver)
+    if status is None:
+        logger.debug("页面探测失败，可能异常")
         return False
+    if status["normal"]:
+        logger.debug("页面正常: 卡片%d个, 标题%s, PDF图标%d个, 下载按钮%s", status["cards"], status["article_title"],
+                     status["pdf_icons"], status["download_button"])
+        return True
+    logger.debug("页面内容检查失败，可能异常: %s", status["url"])
+    return False
 
 def is_captcha_or_abnormal(driver):
-    """判断页面是否为验证码/异常页面（关键词检测）"""
-    try:
-        page_text = driver.page_source.lower()
-        title = driver.title.lower()
-        
-        print(f"[DEBUG] 页面标题: {title}")
-        
-        # 检查页面标题中的关键词
-        title_keywords = ["cloudflare", "captcha", "verify", "checking"]
-        if any(kw in title for kw in title_keywords):
-            print(f"[DEBUG] 页面标题包含异常关键词: {title}")
-            return True
-            
-        # 检查页面内容中的关键词
-        content_keywords = ["captcha", "verify you are human", "cloudflare", "robot", "人机验证", "滑块", "checking your browser"]
-        found_keywords = []
-        for kw in content_keywords:
-            if kw in page_text:
-                found_keywords.append(kw)
-                
-        if found_keywords:
-            print(f"[DEBUG] 页面内容包含异常关键词: {found_keywords}")
-            return True
-            
-        print("[DEBUG] 未检测到异常关键词")
-        return False
-            
-    except Exception as e:
-        print(f"[DEBUG] 检查异常页面时出错: {e}")
+    """判断页面是否为验证码/异常页面（标题、验证DOM标记和短页面关键词检测）"""
+    status = probe_page(driver)
+    if status is None:
         return False
+    if status["challenge"]:
+        logger.info("检测到验证/异常页面: 标题=%s, 标记=%s, 关键词=%s", status["title"],
+                    status["challenge_markers"], status["keywords"])
+        return True
+    return False
 
 def handle_captcha(driver, timeout=600):
     """
@@ -164,6 +177,17 @@ def handle_captcha(driver, timeout=600):
         print("[DEBUG] 页面正常，无需处理")
         return False
     
+    metrics = get_metrics()
+    metrics.counter("crawler_captcha_events_total", "检测到验证码/异常页的次数").inc()
+    start = time.perf_counter()
+    recovered = _wait_page_recovery(driver)
+    metrics.histogram("crawler_captcha_wait_seconds", "验证码/异常页等待恢复耗时").observe(
+        time.perf_counter() - start, result="recovered" if recovered else "failed")
+    return recovered
+
+
+def _wait_page_recovery(driver) -> bool:
+    """等待异常页恢复：重试3次，仍异常则刷新一次"""
     # 连续重试3次
     for attempt in range(3):
         print(f"[DEBUG] 第{attempt + 1}次重试，等待5秒...")
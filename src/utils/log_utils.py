@@ -0,0 +1,160 @@
+"""
+结构化日志
+所有日志先进入内存队列（QueueHandler），由后台线程（QueueListener）格式化并写控制台和JSON-lines文件，
+抓取线程只做一次入队，不做格式化和I/O。低于当前级别的日志（如逐卡片耗时的DEBUG）在调用处直接丢弃。
+
+用法：
+    from src.utils.log_utils import get_logger, setup_logging
+    setup_logging()                      # 脚本入口调用一次
+    logger = get_logger(__name__)
+    logger.info("第%d页收集到%d条", page, n, extra={"stage": "collect", "page": page})
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+from typing import Optional
+
+# LogRecord自带的属性，其余属性视为通过extra传入的结构化字段
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志一行JSON：时间、级别、来源、消息以及extra中的字段（如stage、page）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """控制台格式：保持原来print的观感，extra中的stage作为前缀"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        stage = getattr(record, "stage", None)
+        return f"[{stage}] {message}" if stage else message
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    入队时不格式化：标准QueueHandler会在调用线程里拼接消息，这里把拼接推迟到监听线程。
+    仅用于同进程的线程队列；跨进程队列（cluster）使用标准QueueHandler，见 setup_process_logging。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[str] = None,
+                  console: bool = True) -> logging.handlers.QueueListener:
+    """
+    配置根logger：一个非阻塞的队列handler + 后台监听线程（控制台文本 + JSON-lines文件）
+
+    重复调用会替换之前的配置，不会叠加handler。
+
+    Args:
+        level: 日志级别，None表示使用 ScienceConfig.LOG_LEVEL
+        log_file: JSON-lines日志文件，None表示使用 ScienceConfig.LOG_FILE，空字符串表示不写文件
+        console: 是否输出到控制台
+    """
+    global _listener, _queue_handler
+    from ..config import ScienceConfig
+
+    level = (level or ScienceConfig.LOG_LEVEL).upper()
+    log_file = ScienceConfig.LOG_FILE if log_file is None else log_file
+
+    shutdown_logging()
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(ConsoleFormatter("%(message)s"))
+        handlers.append(stream)
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _DeferredQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """停止监听线程并写完队列中剩余的日志"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_process_logging(log_queue, level: Optional[str] = None):
+    """
+    子进程入口调用：日志在子进程内格式化后经跨进程队列发给主进程，由主进程的 forward_logs 统一输出
+
+    Args:
+        log_queue: multiprocessing队列
+        level: 日志级别，None表示使用 ScienceConfig.LOG_LEVEL
+    """
+    from ..config import ScienceConfig
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel((level or ScienceConfig.LOG_LEVEL).upper())
+
+
+class _ForwardHandler(logging.Handler):
+    """把其他进程发来的日志记录交给本进程同名logger，走 setup_logging 配置的控制台和JSON-lines文件"""
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        logging.getLogger(record.name).handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        pass
+
+
+def forward_logs(log_queue) -> logging.handlers.QueueListener:
+    """主进程调用：启动后台线程转发子进程（setup_process_logging）的日志，返回的监听器需在结束时 stop()"""
+    listener = logging.handlers.QueueListener(log_queue, _ForwardHandler())
+    listener.start()
+    return listener
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取模块logger（命名空间 s_crawler.*）"""
+    return logging.getLogger(f"s_crawler.{name.rsplit('.', 1)[-1]}")
+
+
+atexit.register(shutdown_logging)
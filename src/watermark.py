@@ -0,0 +1,116 @@
+"""
+增量抓取高水位
+按查询记录最近见过的DOI和最新发表日期。增量模式按发表时间从新到旧翻页：
+- 是否已抓过只按DOI判断（发表日期早不代表已入库，晚收录的旧文章也会出现在结果里）
+- 发表日期只用作停止条件：整页都早于 最新日期 - WATERMARK_LOOKBACK_DAYS 时停止翻页
+- 最新日期只在某次运行翻到了结果末尾（或越过回看窗口）时才推进；因 MAX_COUNT 截断的运行
+  只记录DOI，下次仍会继续往后翻，不会把没抓到的旧文章永久跳过
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from .config import ScienceConfig
+
+
+def newest_first_url(url: str) -> str:
+    """把搜索URL改为按发表时间从新到旧排序，并从第一页开始"""
+    key, value = ScienceConfig.INCREMENTAL_SORT
+    parsed = urlparse(url)
+    params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+              if k not in (key, "startPage")]
+    params += [(key, value), ("startPage", "0")]
+    return urlunparse(parsed._replace(query=urlencode(params)))
+
+
+class QueryWatermark:
+    """单个查询的高水位，保存为JSON文件（先写临时文件再替换，避免写一半损坏）"""
+
+    def __init__(self, query_url: str, watermark_dir: Optional[str] = None, max_dois: Optional[int] = None):
+        """
+        Args:
+            query_url: 搜索查询URL（排序参数不影响高水位归属）
+            watermark_dir: 高水位文件目录，None表示使用配置中的目录
+            max_dois: 保留的最近DOI数量，None表示使用配置值
+        """
+        self.query_url = query_url
+        self.max_dois = max_dois or ScienceConfig.WATERMARK_MAX_DOIS
+        self.directory = watermark_dir or ScienceConfig.WATERMARK_DIR
+        key = hashlib.md5(query_url.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(self.directory, f"wm_{key}.json")
+        self.latest_date: Optional[datetime] = None  # 最近一次完整抓取时结果中的最新发表日期
+        self.newest_seen: Optional[datetime] = None  # 本次 update 见到的最新发表日期，save(reached_end=True) 时生效
+        self.dois: List[str] = []  # 最近见过的DOI，新的在前
+        self._doi_set = set()
+        self.load()
+
+    def load(self):
+        """读取高水位文件，不存在或损坏时视为首次抓取"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取高水位失败，按首次抓取处理: {e}")
+            return
+        if data.get("latest_date"):
+            self.latest_date = datetime.fromisoformat(data["latest_date"])
+        self.dois = list(data.get("dois") or [])
+        self._doi_set = set(self.dois)
+
+    @property
+    def empty(self) -> bool:
+        return self.latest_date is None and not self.dois
+
+    def is_known(self, article: Dict) -> bool:
+        """文章的DOI是否见过"""
+        doi = article.get("doi")
+        return bool(doi and doi in self._doi_set)
+
+    def before_lookback(self, article: Dict) -> bool:
+        """发表日期是否早于 最新日期 - 回看天数；没有完整抓取记录或没有发表日期时返回False"""
+        published = article.get("publication_date")
+        if self.latest_date is None or not isinstance(published, datetime):
+            return False
+        return published < self.latest_date - timedelta(days=ScienceConfig.WATERMARK_LOOKBACK_DAYS)
+
+    def update(self, articles: Iterable[Dict]):
+        """记录已入库文章的DOI和发表日期（日期在 save(reached_end=True) 时才推进高水位）"""
+        new_dois = []
+        for article in articles:
+            doi = article.get("doi")
+            if doi and doi not in self._doi_set:
+                new_dois.append(doi)
+                self._doi_set.add(doi)
+            published = article.get("publication_date")
+            if isinstance(published, datetime) and (self.newest_seen is None or published > self.newest_seen):
+                self.newest_seen = published
+        self.dois = (new_dois + self.dois)[:self.max_dois]
+        self._doi_set = set(self.dois)
+
+    def save(self, reached_end: bool = False):
+        """
+        写入高水位文件
+
+        Args:
+            reached_end: 本次运行是否翻到了结果末尾或越过了回看窗口；为False（如达到 MAX_COUNT 截断）时
+                         只保存DOI，不推进最新日期
+        """
+        if reached_end and self.newest_seen and (self.latest_date is None or self.newest_seen > self.latest_date):
+            self.latest_date = self.newest_seen
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            "query_url": self.query_url,
+            "latest_date": self.latest_date.isoformat() if self.latest_date else None,
+            "dois": self.dois,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -5,6 +5,7 @@
 import unittest
 import sys
 import os
+from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -51,6 +52,32 @@ class TestArticle(unittest.TestCase):
         self.assertEqual(article_dict["title"], "Test Article")
         self.assertEqual(article_dict["authors"], ["Author 1"])
         self.assertEqual(article_dict["doi"], "10.1038/test")
+    
+    def test_article_row_and_bytes(self):
+        """测试数据库行与二进制序列化的往返"""
+        article = Article(title="T", url="https://www.science.org/doi/10.1126/x", authors=["A", "B"],
+                          doi="10.1126/x", publication_date=datetime(2024, 5, 1), pdf_md5="abc", dl_attempts=2)
+        row = dict(zip(Article.ROW_COLUMNS, article.to_row()))
+        self.assertEqual(row["authors"], "A, B")
+        self.assertEqual(row["downloaded"], 0)
+        self.assertEqual(Article.from_row(row), article)
+        self.assertEqual(Article.from_row({"doi": "10.1126/y"}).url, "https://www.science.org/doi/10.1126/y")
+        
+        restored = Article.from_bytes(article.to_bytes())
+        self.assertEqual(restored, article)
+        self.assertEqual(restored.publication_date, datetime(2024, 5, 1))
+        self.assertFalse(hasattr(article, "__dict__"))
+    
+    def test_article_mapping_compat(self):
+        """测试字典式访问与旧键名"""
+        article = Article.from_dict({"title": "T", "detail_url": "u", "download_link": "p", "extra": 1})
+        self.assertEqual((article.url, article.pdf_url), ("u", "p"))
+        self.assertEqual(article["download_link"], "p")
+        self.assertEqual(article.get("abstract", ""), "")
+        article["abstract"] = "abs"
+        self.assertEqual(article.abstract, "abs")
+        with self.assertRaises(KeyError):
+            article["extra"]
 
 
 class TestFileUtils(unittest.TestCase):
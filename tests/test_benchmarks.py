@@ -0,0 +1,110 @@
+"""
+离线基准测试工具测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.common.exceptions import NoSuchElementException
+
+from benchmarks.fake_dom import FakeDriver
+from benchmarks.run import compare, main
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.database_manager import DatabaseManager
+
+HTML = """
+<div id="main"><ul class="list">
+  <li class="card item" data-doi="10.1/a"><a href="/doi/10.1/a">First <b>paper</b></a></li>
+  <li class="card" data-doi="10.1/b"><a href="https://x.org/doi/10.1/b">Second</a></li>
+  <li class="other"><span>not a card</span></li>
+</ul></div>
+"""
+
+
+class TestFakeDom(unittest.TestCase):
+    """测试FakeDriver的选择器子集"""
+
+    def setUp(self):
+        self.driver = FakeDriver(HTML, "https://www.science.org/action/doSearch")
+
+    def test_css_selectors(self):
+        """测试类、属性、子代与相邻兄弟选择器"""
+        self.assertEqual(len(self.driver.find_elements("css selector", "li.card")), 2)
+        self.assertEqual(len(self.driver.find_elements("css selector", "#main > ul > li")), 3)
+        self.assertEqual(self.driver.find_element("css selector", "li[data-doi$='/b'] a").text, "Second")
+        self.assertEqual(self.driver.find_element("css selector", "li.item + li a").text, "Second")
+        self.assertEqual(len(self.driver.find_elements("css selector", "li.item, li.other")), 2)
+
+    def test_text_and_absolute_href(self):
+        """测试文本拼接与href按页面地址补全"""
+        link = self.driver.find_element("css selector", "li.card a")
+        self.assertEqual(link.text, "First paper")
+        self.assertEqual(link.get_attribute("href"), "https://www.science.org/doi/10.1/a")
+        self.assertEqual(link.find_element("xpath", "./ancestor::li").get_attribute("data-doi"), "10.1/a")
+        with self.assertRaises(NoSuchElementException):
+            link.find_element("css selector", "span")
+
+
+class TestSqliteStandin(unittest.TestCase):
+    """测试DatabaseManager在SQLite替身上运行"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_save_and_dedup(self):
+        with sqlite_mysql(os.path.join(self.tmp_dir, "db.sqlite3")):
+            dm = DatabaseManager()
+            articles = [{"doi": "10.1/a", "title": "A", "url": "u1", "authors": ["X", "Y"]},
+                        {"doi": "10.1/b", "title": "B", "url": "u2"}]
+            self.assertTrue(dm.save_articles_to_database(articles))
+            self.assertTrue(dm.save_articles_to_database(articles[:1]))
+            self.assertEqual(dm.get_article_count(), 2)
+            self.assertTrue(dm.is_doi_exists("10.1/a"))
+            self.assertEqual(dm.existing_dois(["10.1/a", "10.1/c"]), {"10.1/a"})
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    """测试基准运行与基线对比"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_compare_respects_direction(self):
+        """测试越高越好与越低越好两种指标的退化判断"""
+        baseline = {"rate": {"value": 100.0}, "latency": {"value": 10.0}}
+        current = {"rate": {"value": 70.0, "unit": "rows/s", "higher_is_better": True},
+                   "latency": {"value": 11.0, "unit": "ms", "higher_is_better": False},
+                   "new": {"value": 1.0, "unit": "ms", "higher_is_better": False}}
+        rows = {row["name"]: row for row in compare(current, baseline, tolerance=0.25)}
+        self.assertTrue(rows["rate"]["regression"])
+        self.assertFalse(rows["latency"]["regression"])
+        self.assertIsNone(rows["new"]["baseline"])
+
+    def test_quick_run_writes_results(self):
+        """测试快速模式跑通全部基准并输出JSON"""
+        output = os.path.join(self.tmp_dir, "latest.json")
+        baseline = os.path.join(self.tmp_dir, "baseline.json")
+        self.assertEqual(main(["--quick", "--output", output, "--baseline", baseline, "--save-baseline"]), 0)
+        with open(output, encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertTrue(report["meta"]["quick"])
+        self.assertIn("card_extraction_page_ms", report["results"])
+        self.assertIn("insert_rows_per_s", report["results"])
+        self.assertTrue(os.path.exists(baseline))
+
+
+if __name__ == "__main__":
+    unittest.main()
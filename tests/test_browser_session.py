@@ -0,0 +1,145 @@
+"""
+浏览器会话缓存测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from src import browser_session
+from src.browser_session import BrowserSession
+from src.config import ScienceConfig
+
+
+def _driver(user_agent="TestBrowser/1.0"):
+    driver = mock.Mock()
+    now = time.time()
+    driver.get_cookies.return_value = [
+        {"name": "sid", "value": "abc", "domain": ".science.org", "path": "/", "expiry": int(now + 3600)},
+        {"name": "old", "value": "x", "domain": ".science.org", "path": "/", "expiry": int(now + 2)},
+    ]
+    driver.execute_script.return_value = user_agent
+    return driver
+
+
+def _response(status):
+    return mock.Mock(status_code=status)
+
+
+class TestBrowserSession(unittest.TestCase):
+    """测试快照、持久化与401/403刷新"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "session.json")
+        self.patches = [mock.patch.object(ScienceConfig, "SESSION_FILE", self.path),
+                        mock.patch.object(ScienceConfig, "SESSION_REFRESH_MIN_INTERVAL", 0),
+                        mock.patch.object(browser_session, "_session", None)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_attach_snapshots_once_and_persists(self):
+        driver = _driver()
+        session = BrowserSession().attach(driver)
+        session.attach(driver)
+        self.assertEqual(driver.get_cookies.call_count, 1)
+        self.assertEqual(session.user_agent, "TestBrowser/1.0")
+        self.assertEqual(session.cookie_dict(), {"sid": "abc", "old": "x"})
+        self.assertTrue(os.path.exists(self.path))
+
+        # 下次运行：从文件加载，快照未过期则不访问浏览器；已过期的cookie被跳过
+        with mock.patch.object(time, "time", return_value=time.time() + 60):
+            reloaded = BrowserSession()
+        fresh_driver = _driver("Other/2.0")
+        reloaded.attach(fresh_driver)
+        fresh_driver.get_cookies.assert_not_called()
+        self.assertEqual(reloaded.cookie_dict(), {"sid": "abc"})
+        self.assertEqual(reloaded.user_agent, "TestBrowser/1.0")
+
+        # 快照超过有效期后重新取
+        stale = BrowserSession(max_age=0)
+        stale.snapshot_at = time.time() - 1
+        stale.attach(fresh_driver)
+        self.assertEqual(fresh_driver.get_cookies.call_count, 1)
+        self.assertEqual(stale.user_agent, "Other/2.0")
+
+    def test_forbidden_refreshes_and_retries(self):
+        driver = _driver()
+        session = BrowserSession(path="").attach(driver)
+        with mock.patch.object(requests.Session, "request",
+                               side_effect=[_response(403), _response(200)]) as request:
+            self.assertEqual(session.get("https://www.science.org/doi/pdf/10.1/x").status_code, 200)
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(driver.get_cookies.call_count, 2)
+        self.assertFalse(os.path.exists(self.path))
+
+        # 刷新间隔未到时不回浏览器，直接返回403
+        with mock.patch.object(ScienceConfig, "SESSION_REFRESH_MIN_INTERVAL", 3600), \
+                mock.patch.object(requests.Session, "request", return_value=_response(403)) as request:
+            self.assertEqual(session.get("https://www.science.org/doi/pdf/10.1/x").status_code, 403)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(driver.get_cookies.call_count, 2)
+
+    def test_refresh_from_other_thread_runs_on_owner(self):
+        driver = _driver()
+        owner_ident = []
+        driver.get_cookies.side_effect = lambda: owner_ident.append(threading.get_ident()) or []
+        session = BrowserSession(path="").attach(driver)
+        driver.get_cookies.reset_mock()
+        owner_ident.clear()
+
+        results = []
+        with mock.patch.object(requests.Session, "request", side_effect=[_response(403), _response(200)]):
+            worker = threading.Thread(target=lambda: results.append(session.get("https://www.science.org/x")))
+            worker.start()
+            while session._pending is None:
+                time.sleep(0.01)
+            driver.get_cookies.assert_not_called()  # 下载线程不直接操作浏览器
+            self.assertTrue(session.serve_refresh())
+            worker.join(5)
+        self.assertEqual(results[0].status_code, 200)
+        self.assertEqual(owner_ident, [threading.get_ident()])
+
+        # 所有者释放浏览器后挂起的请求已执行，之后其他线程可以直接刷新
+        session.release()
+        worker = threading.Thread(target=lambda: results.append(session.refresh("manual")))
+        worker.start()
+        worker.join(5)
+        self.assertEqual((results[-1], driver.get_cookies.call_count), (True, 2))
+
+        # 所有者一直不处理时等待有上限
+        session.attach(driver)
+        with mock.patch.object(ScienceConfig, "SESSION_REFRESH_WAIT", 0.05):
+            worker = threading.Thread(target=lambda: results.append(session.refresh("manual")))
+            worker.start()
+            worker.join(5)
+        self.assertFalse(results[-1])
+
+    def test_without_driver_uses_saved_cookies(self):
+        BrowserSession().attach(_driver())
+        with mock.patch.object(browser_session.atexit, "register"):
+            session = browser_session.get_browser_session()
+        self.assertIs(session, browser_session.get_browser_session())
+        with mock.patch.object(requests.Session, "request", return_value=_response(401)) as request:
+            self.assertEqual(session.head("https://www.science.org/").status_code, 401)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(session.cookie_dict()["sid"], "abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+抓取断点测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.checkpoint import CrawlCheckpoint
+
+
+class TestCrawlCheckpoint(unittest.TestCase):
+    """测试CrawlCheckpoint类"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.query = "https://www.science.org/action/doSearch?AllField=test"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_resume_state(self):
+        """测试按页追加后恢复页码、游标和未入库记录"""
+        checkpoint = CrawlCheckpoint(self.query, checkpoint_dir=self.tmp_dir)
+        self.assertIsNone(checkpoint.load())
+
+        checkpoint.record_page(1, "https://example.org/?startPage=1", [{"doi": "10.1/a"}])
+        checkpoint.record_page(2, "https://example.org/?startPage=2", [
+            {"doi": "10.1/b", "publication_date": datetime(2023, 8, 10)}
+        ])
+
+        state = CrawlCheckpoint(self.query, checkpoint_dir=self.tmp_dir).load()
+        self.assertEqual(state["page_num"], 2)
+        self.assertEqual(state["next_url"], "https://example.org/?startPage=2")
+        self.assertEqual([r["doi"] for r in state["records"]], ["10.1/a", "10.1/b"])
+        self.assertEqual(state["records"][1]["publication_date"], datetime(2023, 8, 10))
+        self.assertFalse(state["done"])
+
+    def test_saved_and_done_events(self):
+        """测试入库标记清空未入库记录、结束标记与截断行容错"""
+        checkpoint = CrawlCheckpoint(self.query, checkpoint_dir=self.tmp_dir)
+        checkpoint.record_page(1, "https://example.org/?startPage=1", [{"doi": "10.1/a"}])
+        checkpoint.mark_saved()
+        checkpoint.record_page(2, None, [{"doi": "10.1/b"}])
+        checkpoint.mark_done()
+        with open(checkpoint.path, "a", encoding="utf-8") as f:
+            f.write('{"event": "page", "page_')
+
+        state = checkpoint.load()
+        self.assertEqual([r["doi"] for r in state["records"]], ["10.1/b"])
+        self.assertTrue(state["done"])
+
+        checkpoint.clear()
+        self.assertIsNone(checkpoint.load())
+
+
+if __name__ == "__main__":
+    unittest.main()
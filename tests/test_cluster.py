@@ -0,0 +1,158 @@
+"""
+下载集群监督逻辑测试（用线程模拟worker进程，不启动Chrome）
+"""
+
+import unittest
+import sys
+import os
+import queue
+import threading
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cluster import Cluster
+from src.models.article import Article
+
+
+class FakeChrome:
+    def __init__(self, restarts=0):
+        self.alive = True
+        self.restarts = restarts
+        self.port = 0
+
+    def is_alive(self):
+        return self.alive
+
+    def restart(self):
+        self.restarts += 1
+        self.alive = True
+        return True
+
+    def stop(self):
+        self.alive = False
+
+
+class FakeWorker:
+    """模拟worker进程；target 在线程中运行，返回即视为进程退出"""
+
+    def __init__(self, target=None):
+        self.alive = True
+        self.terminated = False
+        if target is not None:
+            self.thread = threading.Thread(target=self._run, args=(target,), daemon=True)
+            self.thread.start()
+
+    def _run(self, target):
+        try:
+            target()
+        finally:
+            self.alive = False
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+
+    def join(self, timeout=None):
+        pass
+
+
+def _rows(*ids):
+    return [Article(id=i, title=f"T{i}", url=f"u{i}", doi=f"10.1/{i}") for i in ids]
+
+
+class TestSupervise(unittest.TestCase):
+    """测试worker崩溃后的重新入队、失败记录与重启上限"""
+
+    def setUp(self):
+        self.cluster = Cluster(2, max_restarts=2)
+        self.cluster.task_queue = queue.Queue()
+        self.cluster.chromes = [FakeChrome(), FakeChrome()]
+        self.cluster.workers = [FakeWorker(), FakeWorker()]
+        self.recorded = []
+        self.patches = [mock.patch.object(Cluster, "_record", lambda _, result: self.recorded.append(result)),
+                        mock.patch.object(Cluster, "_start_worker", self._start_worker)]
+        for p in self.patches:
+            p.start()
+        self.started = []
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    def _start_worker(self, index):
+        self.started.append(index)
+        self.cluster.workers[index] = FakeWorker()
+
+    def test_requeue_once_then_fail(self):
+        rows = {row.id: row for row in _rows(7)}
+        self.cluster.in_flight[0] = {"id": 7}
+        self.cluster.workers[0].alive = False
+        self.assertEqual(self.cluster._supervise(rows), [])
+        self.assertEqual(Article.from_bytes(self.cluster.task_queue.get_nowait()).id, 7)
+        self.assertEqual((self.started, self.cluster.stats["worker_restarts"]), ([0], 1))
+
+        self.cluster.in_flight[0] = {"id": 7}
+        self.cluster.chromes[0].alive = False
+        self.assertEqual(self.cluster._supervise(rows), [7])
+        self.assertEqual(self.recorded[0]["id"], 7)
+        self.assertFalse(self.recorded[0]["success"])
+        self.assertTrue(self.cluster.task_queue.empty())
+        self.assertEqual(self.cluster.stats["chrome_restarts"], 1)
+        self.assertEqual(self.cluster.in_flight, {})
+
+    def test_restart_limit_still_requeues(self):
+        rows = {row.id: row for row in _rows(3)}
+        self.cluster.chromes[1].restarts = 2
+        self.cluster.in_flight[1] = {"id": 3}
+        self.cluster.chromes[1].alive = False
+        with self.assertLogs("s_crawler.cluster", level="ERROR") as logs:
+            self.assertEqual(self.cluster._supervise(rows), [])
+            self.cluster._supervise(rows)
+        self.assertEqual(len(logs.records), 1)  # 达到上限只记录一次
+        self.assertIsNone(self.cluster.workers[1])
+        self.assertEqual(self.started, [])
+        self.assertEqual(self.cluster.in_flight, {})
+        self.assertEqual(Article.from_bytes(self.cluster.task_queue.get_nowait()).id, 3)
+
+    def test_run_finishes_after_worker_gives_up(self):
+        """worker 0 处理中崩溃且不能再重启，记录交给worker 1，不必等到 CLUSTER_STALL_TIMEOUT"""
+        cluster = self.cluster
+        cluster.result_queue = queue.Queue()
+        cluster.chromes[0].restarts = cluster.max_restarts
+        taken = threading.Event()
+
+        def crash():
+            row = Article.from_bytes(cluster.task_queue.get(timeout=5))
+            cluster.result_queue.put(("start", 0, row.id))
+            taken.set()
+
+        def work():
+            taken.wait(5)
+            while True:
+                try:
+                    data = cluster.task_queue.get(timeout=0.2)
+                except queue.Empty:
+                    if cluster.workers[0] is None:
+                        return
+                    continue
+                row = Article.from_bytes(data)
+                cluster.result_queue.put(("start", 1, row.id))
+                cluster.result_queue.put(("done", 1, {"id": row.id, "success": True}))
+
+        cluster.workers = [None, None]
+        with mock.patch.object(cluster.config, "CLUSTER_STALL_TIMEOUT", 30):
+            cluster.workers[1] = FakeWorker(work)
+            cluster.workers[0] = FakeWorker(crash)
+            stats = cluster.run(_rows(5))
+        self.assertEqual(stats["unfinished"], 0)
+        self.assertEqual(self.recorded, [{"id": 5, "success": True}])
+        self.assertIsNone(cluster.workers[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+主程序顺序模式测试（浏览器和解析用替身，数据库用SQLite替身）
+"""
+
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import science_crawler_main
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.checkpoint import CrawlCheckpoint
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.utils.log_utils import shutdown_logging
+
+SEARCH_URL = "https://www.science.org/action/doSearch?AllField=test"
+
+
+class FakeCollector:
+    """返回固定文章并写入断点的收集器"""
+
+    def __init__(self, driver, max_count=None):
+        pass
+
+    def collect_all_links(self, checkpoint, resume=False):
+        articles = [Article(title=f"T{i}", url=f"u{i}", doi=f"10.1/{i}") for i in range(3)]
+        checkpoint.record_page(1, None, articles)
+        return articles
+
+
+class FakeDriverManager:
+    """不开浏览器：process_articles 把文章原样交给回调"""
+
+    def __init__(self):
+        self.driver = mock.Mock()
+
+    def create_driver(self):
+        return True
+
+    def process_articles(self, articles, callback=None):
+        for i, article in enumerate(articles, 1):
+            callback(article, i, len(articles))
+        return []
+
+    def close_driver(self):
+        pass
+
+
+class TestSequentialCheckpoint(unittest.TestCase):
+    """测试顺序模式只在每篇文章都入库后才清除断点"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.patches = [
+            mock.patch.object(ScienceConfig, "SEARCH_URL", SEARCH_URL),
+            mock.patch.object(ScienceConfig, "CHECKPOINT_DIR", os.path.join(self.tmp_dir, "checkpoints")),
+            mock.patch.object(ScienceConfig, "DOWNLOAD_DIR", os.path.join(self.tmp_dir, "downloads")),
+            mock.patch.object(ScienceConfig, "LOG_FILE", os.path.join(self.tmp_dir, "crawler.jsonl")),
+            mock.patch.object(ScienceConfig, "METRICS_SNAPSHOT_FILE", ""),
+            mock.patch.object(ScienceConfig, "SLEEP_TIME", 0),
+            mock.patch.object(science_crawler_main, "DriverManager", FakeDriverManager),
+            mock.patch.object(science_crawler_main, "LinkCollector", FakeCollector),
+            mock.patch.object(science_crawler_main, "get_browser_session"),
+            mock.patch.object(sys, "argv", ["science_crawler_main.py", "--metrics-port", "0"]),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        shutdown_logging()
+        for p in reversed(self.patches):
+            p.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self):
+        with redirect_stdout(io.StringIO()):
+            science_crawler_main.main()
+        return CrawlCheckpoint(SEARCH_URL).load()
+
+    def test_failed_save_keeps_checkpoint(self):
+        save = DatabaseManager.save_articles_to_database
+
+        def flaky(manager, articles, failed_articles=None):
+            if any(a.doi == "10.1/1" for a in articles):
+                return False
+            return save(manager, articles, failed_articles)
+
+        with mock.patch.object(DatabaseManager, "save_articles_to_database", flaky):
+            state = self._run()
+        self.assertIsNotNone(state)
+        self.assertEqual(DatabaseManager().get_article_count(), 2)
+
+        # 再次运行：已入库的两篇被DOI查重跳过，剩下一篇入库后断点清除；每篇文章一行INFO日志
+        with self.assertLogs("s_crawler.science_crawler_main", level="INFO") as logs:
+            self.assertIsNone(self._run())
+        self.assertEqual(DatabaseManager().get_article_count(), 3)
+        self.assertEqual([r.getMessage() for r in logs.records], ["[1/1] 已入库（无PDF）: T1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
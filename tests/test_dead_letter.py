@@ -0,0 +1,101 @@
+"""
+下载失败重新调度与死信测试
+"""
+
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dead_letter
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.config import ScienceConfig
+from src.retry_policy import FATAL, NO_LINK, TRANSIENT, reschedule_delay
+from src.utils.log_utils import shutdown_logging
+
+
+class TestRescheduleDelay(unittest.TestCase):
+    """测试按失败类别与次数计算的重排延迟"""
+
+    def test_growth_and_dead(self):
+        with mock.patch("src.retry_policy.random.uniform", return_value=1.0):
+            self.assertEqual(reschedule_delay(1, TRANSIENT), 15 * 60)
+            self.assertEqual(reschedule_delay(2, TRANSIENT), 60 * 60)
+            self.assertEqual(reschedule_delay(7, TRANSIENT), 7 * 24 * 3600)
+            self.assertEqual(reschedule_delay(1, "unknown"), 15 * 60)
+        self.assertIsNone(reschedule_delay(8, TRANSIENT))
+        self.assertIsNotNone(reschedule_delay(2, FATAL))
+        self.assertIsNone(reschedule_delay(3, FATAL))
+
+
+class TestDownloadScheduling(unittest.TestCase):
+    """在SQLite替身上测试到期查询、死信与重新排队"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.log_patch = mock.patch.object(ScienceConfig, "LOG_FILE", os.path.join(self.tmp_dir, "crawler.jsonl"))
+        self.log_patch.start()
+        self.manager = DatabaseManager()
+        self.manager.save_articles_to_database([Article(title=f"T{i}", url=f"u{i}", doi=f"10.1/{i}")
+                                                for i in range(1, 5)])
+
+    def tearDown(self):
+        shutdown_logging()  # main() 打开的日志文件在临时目录里
+        self.log_patch.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _pending(self):
+        return [a.id for a in self.manager.fetch_pending_articles(limit=10)]
+
+    def test_failures_are_deferred_then_dead(self):
+        self.manager.update_download_status(1, False, last_error="HTTP 500", error_class=TRANSIENT)
+        self.manager.update_download_status(2, True, "2.pdf", "m2")
+        self.assertEqual(self._pending(), [3, 4])  # 失败的记录推迟，不再占据队首
+
+        later = datetime.now() + timedelta(hours=1)
+        with mock.patch("src.database_manager.datetime", wraps=datetime) as fake:
+            fake.now.return_value = later
+            self.assertEqual(self._pending(), [3, 4, 1])
+
+        for _ in range(3):
+            self.manager.update_download_status(3, False, last_error="HTTP 403", error_class=FATAL)
+        self.manager.update_download_status(4, False, last_error="下载失败或未找到链接", error_class=NO_LINK)
+        with mock.patch("src.database_manager.datetime", wraps=datetime) as fake:
+            fake.now.return_value = datetime.now() + timedelta(days=30)
+            self.assertEqual(self._pending(), [1, 4])
+        self.assertEqual(self.manager.dead_letter_summary(), {FATAL: 1})
+        row = self.manager.fetch_dead_articles()[0]
+        self.assertEqual((row["id"], row["dl_attempts"], row["dl_last_error"]), (3, 3, "HTTP 403"))
+
+    def test_requeue_command(self):
+        for _ in range(3):
+            self.manager.update_download_status(1, False, last_error="HTTP 403", error_class=FATAL)
+            self.manager.update_download_status(2, False, last_error="HTTP 404", error_class=FATAL)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(dead_letter.main(["list"]), 0)
+            self.assertEqual(dead_letter.main(["requeue"]), 2)
+            self.assertEqual(dead_letter.main(["requeue", "--error-like", "403"]), 0)
+        self.assertIn("fatal 2", out.getvalue())
+        self.assertIn("已重新排队 1 条", out.getvalue())
+        self.assertEqual(self._pending(), [1, 3, 4])
+        self.assertEqual(self.manager.dead_letter_summary(), {FATAL: 1})
+        self.assertEqual(self.manager.requeue_dead_articles(ids=[2]), 1)
+        self.assertEqual(self._pending(), [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
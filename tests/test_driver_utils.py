@@ -0,0 +1,90 @@
+"""
+页面探测（验证码/异常页检测）测试
+"""
+
+import unittest
+import sys
+import os
+import urllib.request
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_dom import FakeDriver
+from benchmarks.mock_science import FaultInjector, MockScienceServer, SyntheticCorpus
+from src.utils.driver_utils import PROBE_SELECTORS, is_captcha_or_abnormal, is_page_normal, probe_page
+
+SHORT_CHECK_PAGE = """<!DOCTYPE html><html><head><title>Access check</title></head><body>
+<p>Please verify you are human. We need to make sure you are not a robot.</p></body></html>"""
+
+
+class TestProbePage(unittest.TestCase):
+    """在模拟站点返回的页面上测试一次脚本完成的页面探测"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockScienceServer(SyntheticCorpus(size=50)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.faults = FaultInjector()
+
+    def _driver(self, path):
+        url = self.server.base_url + path
+        with urllib.request.urlopen(url) as resp:
+            return FakeDriver(resp.read().decode("utf-8"), url)
+
+    def test_normal_pages(self):
+        detail = self._driver(f"/doi/{self.server.corpus.doi(1)}")
+        status = probe_page(detail)
+        self.assertTrue(status["normal"])
+        self.assertFalse(status["challenge"])
+        self.assertTrue(status["article_title"])
+        self.assertEqual(status["pdf_icons"], 1)
+        self.assertFalse(is_captcha_or_abnormal(detail))
+        self.assertTrue(is_page_normal(detail))
+
+        epdf = self._driver(f"/doi/epdf/{self.server.corpus.doi(1)}")
+        self.assertTrue(probe_page(epdf)["download_button"])
+        self.assertFalse(is_captcha_or_abnormal(epdf))
+
+    def test_challenge_page(self):
+        self.server.faults = FaultInjector(captcha_rate=1.0)
+        driver = self._driver(f"/doi/{self.server.corpus.doi(2)}")
+        status = probe_page(driver)
+        self.assertTrue(status["challenge"])
+        self.assertFalse(status["normal"])
+        self.assertEqual(status["challenge_markers"], ["#challenge-form", "#challenge-running", ".cf-turnstile"])
+        self.assertIn("just a moment", status["keywords"])
+        self.assertTrue(is_captcha_or_abnormal(driver))
+        self.assertFalse(is_page_normal(driver))
+
+    def test_short_page_keywords(self):
+        driver = FakeDriver(SHORT_CHECK_PAGE)
+        status = probe_page(driver)
+        self.assertEqual(status["challenge_markers"], [])
+        self.assertEqual(status["keywords"], ["verify you are human", "robot"])
+        self.assertTrue(is_captcha_or_abnormal(driver))
+
+        # 长文章页只是提到这些词，不扫描正文，不会误判
+        filler = "Graphene moire superlattices host correlated states. " * 500
+        article = FakeDriver(f"<html><head><title>Robots | Science</title></head><body>"
+                             f"<h1 class=\"article-title\">Soft robots</h1><p>{filler} verify robot</p></body></html>")
+        self.assertGreater(len(filler), PROBE_SELECTORS["maxScanChars"])
+        self.assertFalse(is_captcha_or_abnormal(article))
+        self.assertTrue(probe_page(article)["normal"])
+
+    def test_script_failure(self):
+        driver = FakeDriver(SHORT_CHECK_PAGE)
+        with mock.patch.object(driver, "execute_script", side_effect=RuntimeError("no session")):
+            self.assertIsNone(probe_page(driver))
+            self.assertFalse(is_captcha_or_abnormal(driver))
+            self.assertFalse(is_page_normal(driver))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+语料流式导出测试
+"""
+
+import unittest
+import sys
+import os
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.database_manager import DatabaseManager
+from src.exporter import build_query, export_corpus, infer_format
+from src.models.article import Article
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class TestExporter(unittest.TestCase):
+    """在SQLite替身上测试导出的过滤、选择列、分块与压缩"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        DatabaseManager().save_articles_to_database([
+            Article(title=f"T{i}", url=f"u{i}", doi=f"10.1/{i}", authors=["A", "B"],
+                    journal="Science" if i % 2 else "Science Advances", abstract="x, \"y\"\nz",
+                    publication_date=datetime(2020 + i % 5, 1, 1), downloaded=i < 3)
+            for i in range(10)
+        ])
+
+    def tearDown(self):
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_query_and_format(self):
+        sql, params = build_query("science", ["doi", "title"], since="2021-01-01", downloaded=False)
+        self.assertIn("SELECT doi, title FROM science WHERE publication_date >= %s AND downloaded = %s", sql)
+        self.assertEqual(params, ["2021-01-01", 0])
+        with self.assertRaises(ValueError):
+            build_query("science", ["doi; DROP TABLE science"])
+        self.assertEqual(infer_format("a/b.jsonl.gz"), ("jsonl", "gzip"))
+        self.assertEqual(infer_format("b.parquet"), ("parquet", None))
+
+    def test_csv_gzip_with_filters(self):
+        path = os.path.join(self.tmp_dir, "out", "science.csv.gz")
+        stats = export_corpus(path, columns=["doi", "journal", "abstract"], journal="Science", chunk_rows=2)
+        self.assertEqual((stats["rows"], stats["chunks"]), (5, 3))
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["doi", "journal", "abstract"])
+        self.assertEqual(rows[1], ["10.1/1", "Science", "x, \"y\"\nz"])
+
+    def test_jsonl_date_range(self):
+        path = os.path.join(self.tmp_dir, "science.jsonl")
+        stats = export_corpus(path, since="2021-01-01", until="2023-01-01", downloaded=False)
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(stats["rows"], len(records))
+        self.assertEqual(sorted(r["doi"] for r in records), ["10.1/6", "10.1/7"])
+        self.assertEqual(records[0]["authors"], "A, B")
+
+    @unittest.skipIf(pq is None, "未安装pyarrow")
+    def test_parquet_row_groups(self):
+        path = os.path.join(self.tmp_dir, "science.parquet")
+        export_corpus(path, columns=["id", "doi", "publication_date"], chunk_rows=4)
+        parquet = pq.ParquetFile(path)
+        self.assertEqual(parquet.metadata.num_rows, 10)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+
+    def test_parquet_requires_pyarrow(self):
+        if pq is not None:
+            self.skipTest("已安装pyarrow")
+        with self.assertRaises(RuntimeError):
+            export_corpus(os.path.join(self.tmp_dir, "science.parquet"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+FTS5全文检索测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.fulltext_search import FullTextIndex, to_match_query, update_index
+from src.models.article import Article
+from src.text_extractor import TextStore, compress_pages
+
+BODIES = {
+    "m1": ["Twisted bilayer graphene shows correlated insulators.", "Superconductivity near the magic angle."],
+    "m2": ["We study strain profiles in transition metal dichalcogenides."],
+    "m3": ["Graphene plasmonics without any twist."],
+}
+
+
+class TestFullTextSearch(unittest.TestCase):
+    """在SQLite替身上测试增量索引与BM25检索"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.manager = DatabaseManager()
+        self.manager.save_articles_to_database([
+            Article(title="Magic-angle graphene", url="u1", doi="10.1/1", abstract="Moiré flat bands."),
+            Article(title="Strain engineering", url="u2", doi="10.1/2"),
+            Article(title="Plasmonics", url="u3", doi="10.1/3"),
+            Article(title="Not downloaded", url="u4", doi="10.1/4"),
+        ])
+        self.store = TextStore(os.path.join(self.tmp_dir, "text.sqlite"))
+        self.store.put_many([(md5, f"{md5}.pdf", len(pages), 0, compress_pages(pages), "fake", 0.1, None)
+                             for md5, pages in BODIES.items()])
+        for doc_id, md5 in ((1, "m1"), (2, "m2"), (3, "m3")):
+            self.manager.update_download_status(doc_id, True, f"{md5}.pdf", md5)
+        self.index = FullTextIndex(os.path.join(self.tmp_dir, "fts.sqlite"))
+
+    def tearDown(self):
+        self.index.close()
+        self.store.close()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_match_query(self):
+        self.assertEqual(to_match_query('magic-angle  super* "x'), '"magic-angle" "super"* """x"')
+        self.assertEqual(to_match_query("  "), "")
+
+    def test_incremental_update_and_search(self):
+        stats = update_index(self.index, self.store)
+        self.assertEqual((stats["indexed"], stats["unchanged"], stats["no_text"]), (3, 0, 0))
+        self.assertEqual(update_index(self.index, self.store)["indexed"], 0)
+
+        results = self.index.search("graphene")
+        self.assertEqual([r["id"] for r in results], [1, 3])  # 标题命中权重更高
+        self.assertEqual(results[0]["doi"], "10.1/1")
+        self.assertIn("[graphene]", results[0]["snippet"].lower())
+        self.assertEqual([r["id"] for r in self.index.search("superconduct*")], [1])
+        self.assertEqual([r["id"] for r in self.index.search("moire")], [1])
+        self.assertEqual(self.index.search("graphene strain"), [])
+        self.assertEqual(sorted(r["id"] for r in self.index.search("graphene OR strain", raw=True)), [1, 2, 3])
+        with self.assertRaises(ValueError):
+            self.index.match("AND (", raw=True)
+
+        self.store.put_many([("m9", "m9.pdf", 1, 0, compress_pages(["Strained graphene"]), "fake", 0.1, None)])
+        self.manager.update_download_status(2, True, "m9.pdf", "m9")
+        stats = update_index(self.index, self.store)
+        self.assertEqual((stats["indexed"], stats["unchanged"]), (1, 2))
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual([r["id"] for r in self.index.search("dichalcogenides")], [])
+
+    def test_manager_search_fulltext(self):
+        update_index(self.index, self.store)
+        with mock.patch.object(ScienceConfig, "FULLTEXT_INDEX_FILE", self.index.path):
+            self.assertEqual([r["id"] for r in self.manager.search_fulltext("correlated insulators")], [1])
+        with mock.patch.object(ScienceConfig, "FULLTEXT_INDEX_FILE", os.path.join(self.tmp_dir, "none.sqlite")):
+            with mock.patch.object(DatabaseManager, "get_articles_by_keyword", return_value=["fallback"]):
+                self.assertEqual(self.manager.search_fulltext("x"), ["fallback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
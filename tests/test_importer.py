@@ -0,0 +1,102 @@
+"""
+元数据批量导入测试
+"""
+
+import unittest
+import sys
+import os
+import csv
+import json
+import shutil
+import tempfile
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.database_manager import DatabaseManager
+from src.exporter import export_corpus
+from src.importer import CorpusImporter, RejectedRow, normalize_doi, normalize_list, normalize_record
+from src.models.article import Article
+
+
+class TestNormalize(unittest.TestCase):
+    """测试DOI、作者与整行规范化"""
+
+    def test_doi_and_lists(self):
+        self.assertEqual(normalize_doi(" https://doi.org/10.1126/Science.ABC1 "), "10.1126/science.abc1")
+        self.assertEqual(normalize_doi("doi:10.1/x"), "10.1/x")
+        self.assertIsNone(normalize_doi(""))
+        with self.assertRaises(RejectedRow):
+            normalize_doi("science.abc")
+        self.assertEqual(normalize_list("A  B; C D,a b"), "A B, C D")
+        self.assertEqual(normalize_list(["X", " Y "]), "X, Y")
+
+    def test_record(self):
+        record = normalize_record({"title": " T\n1 ", "doi": "10.1/X", "publication_date": "2025-03-28"})
+        self.assertEqual(record[:2], ("10.1/x", "T 1"))
+        self.assertEqual(record[6], datetime(2025, 3, 28))
+        self.assertTrue(record[7].endswith("/doi/10.1/x"))
+        for raw in ({"doi": "10.1/x"}, {"title": "T"}, {"title": "T", "url": "u", "publication_date": "soon"}):
+            with self.assertRaises(RejectedRow):
+                normalize_record(raw)
+
+
+class TestImporter(unittest.TestCase):
+    """在SQLite替身上测试暂存表导入与合并"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        DatabaseManager().save_articles_to_database([Article(title="Old", url="u0", doi="10.1/0")])
+
+    def tearDown(self):
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write_csv(self, rows):
+        path = os.path.join(self.tmp_dir, "dump.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "doi", "title", "authors", "url", "pdf_md5", "publication_date"])
+            writer.writerows(rows)
+        return path
+
+    def test_csv_merge_dedup_and_rejects(self):
+        path = self._write_csv([
+            [1, "10.1/0", "Old again", "A", "u", "NULL", "NULL"],       # 库中已存在
+            [2, "10.1/1", "New", "A, B", "u1", "NULL", "2024-01-01"],
+            [3, "https://doi.org/10.1/1", "Dup", "", "u1b", "NULL", ""],  # 文件内重复
+            [4, "NULL", "No DOI", "", "u2", "ABCDEF", ""],
+            [5, "NULL", "", "", "u3", "NULL", ""],                     # 缺标题
+            [6, "bad", "Bad DOI", "", "u4", "NULL", ""],
+        ])
+        rejects = os.path.join(self.tmp_dir, "rejects.jsonl")
+        stats = CorpusImporter(batch_rows=2, rejects_path=rejects).run(path)
+        self.assertEqual((stats["read"], stats["staged"], stats["inserted"], stats["existing"]), (6, 3, 2, 1))
+        self.assertEqual((stats["duplicates"], stats["rejected"]), (1, 2))
+        self.assertEqual(stats["reasons"], {"缺少标题": 1, "DOI格式错误": 1})
+        with open(rejects, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["line"] for line in f], [6, 7])
+        self.assertEqual(DatabaseManager().get_article_count(), 3)
+        self.assertEqual(CorpusImporter().run(path)["inserted"], 0)
+
+    def test_jsonl_round_trip(self):
+        path = self._write_csv([[1, "10.1/1", "New", "A; B", "u1", "", "2024-01-01"]])
+        CorpusImporter().run(path)
+        exported = os.path.join(self.tmp_dir, "out.jsonl.gz")
+        export_corpus(exported)
+
+        self.db.__exit__(None, None, None)
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "copy.db"))
+        self.db.__enter__()
+        stats = CorpusImporter().run(exported)
+        self.assertEqual(stats["inserted"], 2)
+        article = DatabaseManager().fetch_pending_articles(limit=5)[1]
+        self.assertEqual((article.doi, article.authors), ("10.1/1", ["A", "B"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
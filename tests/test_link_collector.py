@@ -0,0 +1,96 @@
+"""
+链接收集器流式接口测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.link_collector import LinkCollector
+from src.models.article import Article
+from src import selector_registry
+from src.selector_registry import SelectorRegistry
+
+
+def setUpModule():
+    # 共享的选择器注册表改用临时文件，测试结束时不在仓库根目录写 selector_stats.json
+    global _stats_dir, _registry_patch
+    _stats_dir = tempfile.mkdtemp()
+    _registry_patch = mock.patch.object(selector_registry, "_registry",
+                                        SelectorRegistry(stats_file=os.path.join(_stats_dir, "selector_stats.json")))
+    _registry_patch.start()
+
+
+def tearDownModule():
+    _registry_patch.stop()
+    shutil.rmtree(_stats_dir, ignore_errors=True)
+
+
+class TestIterLinks(unittest.TestCase):
+    """测试LinkCollector.iter_links"""
+
+    def setUp(self):
+        self.pages = [
+            [Article(title=f"p{p}-{i}", doi=f"10.1/{p}.{i}") for i in range(3)]
+            for p in range(4)
+        ]
+        self.parsed = []
+        self.collector = LinkCollector(mock.Mock(), max_count=100)
+        db = mock.Mock()
+        db.existing_dois.return_value = set()
+
+        def parse_page():
+            self.parsed.append(len(self.parsed))
+            return self.pages[len(self.parsed) - 1]
+
+        self.patches = [
+            mock.patch("src.link_collector.DatabaseManager", return_value=db),
+            mock.patch("src.link_collector.is_captcha_or_abnormal", return_value=False),
+            mock.patch("src.link_collector.time.sleep"),
+            mock.patch.object(self.collector, "_collect_page_links", side_effect=parse_page),
+            mock.patch.object(self.collector, "_go_to_next_page",
+                              side_effect=lambda: len(self.parsed) < len(self.pages)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_yields_before_next_page_is_parsed(self):
+        """测试第一页的记录在解析后续页之前就产出"""
+        links = self.collector.iter_links()
+        first = next(links)
+        self.assertEqual(first["doi"], "10.1/0.0")
+        self.assertEqual(self.parsed, [0])
+        self.assertEqual(len(list(links)), 11)
+
+    def test_batch_and_cancel(self):
+        """测试按页产出与取消后在页与页之间停止"""
+        cancel = threading.Event()
+        batches = []
+        for batch in self.collector.iter_links(cancel_event=cancel, batch=True):
+            batches.append(batch)
+            if len(batches) == 2:
+                cancel.set()
+        self.assertEqual([len(b) for b in batches], [3, 3])
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_collect_all_links_respects_max_count(self):
+        """测试列表接口是生成器的薄封装，并在达到最大数量时停止"""
+        self.collector.max_count = 5
+        links = self.collector.collect_all_links()
+        self.assertEqual(len(links), 5)
+        self.assertEqual(len(self.parsed), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+结构化日志测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import logging
+import logging.handlers
+import queue
+import shutil
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.log_utils import JsonLinesFormatter, forward_logs, get_logger, setup_logging, shutdown_logging
+
+
+class SlowHandler(logging.Handler):
+    """每条日志耗时1毫秒的handler，模拟慢速控制台"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(0.001)
+        self.messages.append(record.getMessage())
+
+
+class TestLogUtils(unittest.TestCase):
+    """测试setup_logging与JSON-lines输出"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp_dir, "crawler.jsonl")
+        self.root_level = logging.getLogger().level
+
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger().setLevel(self.root_level)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_json_lines_with_extra_fields(self):
+        """测试JSON行包含级别、消息和extra字段，DEBUG在INFO级别下被丢弃"""
+        setup_logging("INFO", log_file=self.log_file, console=False)
+        logger = get_logger("src.link_collector")
+        logger.debug("不应输出")
+        logger.info("第%d页收集到%d条链接", 3, 20, extra={"stage": "collect", "page": 3})
+        shutdown_logging()
+
+        with open(self.log_file, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["msg"], "第3页收集到20条链接")
+        self.assertEqual(entries[0]["level"], "INFO")
+        self.assertEqual(entries[0]["logger"], "s_crawler.link_collector")
+        self.assertEqual(entries[0]["stage"], "collect")
+        self.assertEqual(entries[0]["page"], 3)
+
+    def test_setup_is_idempotent(self):
+        """测试重复配置不会叠加handler"""
+        root = logging.getLogger()
+        before = len(root.handlers)
+        setup_logging("INFO", log_file="", console=False)
+        setup_logging("INFO", log_file="", console=False)
+        self.assertEqual(len(root.handlers), before + 1)
+
+    def test_slow_handler_does_not_block_caller(self):
+        """测试慢速输出在后台线程完成，调用方只做入队"""
+        listener = setup_logging("INFO", log_file="", console=False)
+        slow = SlowHandler()
+        listener.handlers = (slow,)
+        logger = get_logger("bench")
+
+        start = time.perf_counter()
+        for i in range(100):
+            logger.info("card %d", i, extra={"stage": "collect"})
+        elapsed = time.perf_counter() - start
+        shutdown_logging()
+
+        self.assertLess(elapsed, 0.05)
+        self.assertEqual(len(slow.messages), 100)
+
+    def test_forward_logs_from_worker_queue(self):
+        """测试子进程经队列发来的日志写入主进程的JSON-lines文件，extra字段保留"""
+        setup_logging("INFO", log_file=self.log_file, console=False)
+        log_queue = queue.Queue()
+        listener = forward_logs(log_queue)
+        worker_handler = logging.handlers.QueueHandler(log_queue)  # 相当于子进程里 setup_process_logging 的handler
+        record = get_logger("src.cluster").makeRecord("s_crawler.cluster", logging.INFO, __file__, 1,
+                                                      "worker[%d] 已连接", (2,), None,
+                                                      extra={"stage": "cluster", "worker": 2})
+        worker_handler.handle(record)
+        listener.stop()
+        shutdown_logging()
+
+        with open(self.log_file, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual((entries[0]["msg"], entries[0]["logger"]), ("worker[2] 已连接", "s_crawler.cluster"))
+        self.assertEqual((entries[0]["stage"], entries[0]["worker"]), ("cluster", 2))
+
+    def test_formatter_includes_exception(self):
+        """测试异常堆栈写入exc字段"""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.getLogger("x").makeRecord("x", logging.ERROR, __file__, 1, "失败", None, sys.exc_info())
+        entry = json.loads(JsonLinesFormatter().format(record))
+        self.assertIn("ValueError: boom", entry["exc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+运行指标测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import urllib.request
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """测试MetricsRegistry类"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.registry.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_counter_gauge_histogram(self):
+        """测试计数、设置与直方图分位数"""
+        captcha = self.registry.counter("crawler_captcha_events_total")
+        captcha.inc()
+        captcha.inc(2)
+        self.assertEqual(captcha.value(), 3)
+
+        backlog = self.registry.gauge("crawler_pipeline_backlog")
+        backlog.set(7, stage="download")
+        self.assertEqual(backlog.value(stage="download"), 7)
+
+        hist = self.registry.histogram("crawler_page_load_seconds", buckets=(0.1, 1, 10))
+        for value in (0.05, 0.5, 0.5, 5):
+            hist.observe(value, kind="detail")
+        summary = hist.summary(kind="detail")
+        self.assertEqual(summary["count"], 4)
+        self.assertEqual(summary["p50"], 1)
+        self.assertEqual(summary["p99"], 10)
+
+        with self.assertRaises(TypeError):
+            self.registry.gauge("crawler_captcha_events_total")
+
+    def test_prometheus_text(self):
+        """测试Prometheus文本格式：累计分桶、+Inf、sum与count"""
+        self.registry.counter("crawler_downloads_total", "PDF下载次数").inc(result="success")
+        hist = self.registry.histogram("crawler_db_query_seconds", buckets=(0.01, 0.1))
+
+        @self.registry.timed("crawler_db_query_seconds", op="save")
+        def save():
+            return "ok"
+
+        self.assertEqual(save(), "ok")
+        hist.observe(0.05, op="save")
+        text = self.registry.render_prometheus()
+        self.assertIn("# TYPE crawler_downloads_total counter", text)
+        self.assertIn('crawler_downloads_total{result="success"} 1', text)
+        self.assertIn('crawler_db_query_seconds_bucket{op="save",le="0.1"} 2', text)
+        self.assertIn('crawler_db_query_seconds_bucket{op="save",le="+Inf"} 2', text)
+        self.assertIn('crawler_db_query_seconds_count{op="save"} 2', text)
+
+    def test_http_endpoint_and_snapshot(self):
+        """测试 /metrics 端点与JSON快照文件"""
+        self.registry.counter("crawler_cards_total").inc(100)
+        server = self.registry.start_http_server(0)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            self.assertIn("crawler_cards_total 100", resp.read().decode("utf-8"))
+
+        path = os.path.join(self.tmp_dir, "metrics.json")
+        self.registry.write_snapshot(path)
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["metrics"]["crawler_cards_total"]["series"]["total"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
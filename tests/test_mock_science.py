@@ -0,0 +1,212 @@
+"""
+模拟站点与站点根地址切换测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import requests
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_dom import FakeDriver
+from benchmarks.load_harness import script_command, summarize
+from benchmarks.mock_science import FaultInjector, MockScienceServer, SyntheticCorpus
+from benchmarks.sqlite_standin import sqlite_mysql
+from src import browser_session, pdf_processor, pdf_url_resolver, selector_registry
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.link_collector import LinkCollector
+from src.models.article import Article
+from src.pdf_processor import PDFProcessor
+from src.selector_registry import SelectorRegistry
+
+
+def setUpModule():
+    # 共享的选择器/直链模板统计改用临时文件，测试结束时不在仓库根目录写统计文件
+    global _stats_dir, _registry_patches
+    _stats_dir = tempfile.mkdtemp()
+    _registry_patches = [
+        mock.patch.object(selector_registry, "_registry",
+                          SelectorRegistry(stats_file=os.path.join(_stats_dir, "selector_stats.json"))),
+        mock.patch.object(pdf_url_resolver, "_template_stats",
+                          SelectorRegistry(stats_file=os.path.join(_stats_dir, "pdf_template_stats.json"))),
+    ]
+    for p in _registry_patches:
+        p.start()
+
+
+def tearDownModule():
+    for p in _registry_patches:
+        p.stop()
+    shutil.rmtree(_stats_dir, ignore_errors=True)
+
+
+class TestBaseUrl(unittest.TestCase):
+    """测试ScienceConfig站点根地址切换"""
+
+    def setUp(self):
+        self.saved = (ScienceConfig.BASE_URL, ScienceConfig.SEARCH_URL, list(ScienceConfig.PDF_URL_TEMPLATES))
+
+    def tearDown(self):
+        ScienceConfig.BASE_URL, ScienceConfig.SEARCH_URL, ScienceConfig.PDF_URL_TEMPLATES = self.saved
+
+    def test_set_base_url_rewrites_urls(self):
+        ScienceConfig.set_base_url("http://127.0.0.1:8800/")
+        self.assertEqual(ScienceConfig.BASE_URL, "http://127.0.0.1:8800")
+        self.assertTrue(ScienceConfig.SEARCH_URL.startswith("http://127.0.0.1:8800/action/doSearch?AllField="))
+        self.assertEqual(ScienceConfig.PDF_URL_TEMPLATES[0], "http://127.0.0.1:8800/doi/pdf/{doi}?download=true")
+
+
+class TestMockScience(unittest.TestCase):
+    """测试模拟站点页面可被真实解析代码处理，故障按配置注入"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = MockScienceServer(SyntheticCorpus(size=1000, pdf_size=4096)).start()
+        self.base = self.server.base_url
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _driver(self, url):
+        return FakeDriver(requests.get(url, timeout=5).text, url)
+
+    def test_search_page_matches_selectors(self):
+        """测试搜索页卡片、翻页按钮与结果数"""
+        url = f"{self.base}/action/doSearch?AllField=x&AfterYear=2012&BeforeYear=2013&startPage=0&pageSize=50"
+        driver = self._driver(url)
+        collector = LinkCollector(driver)
+        collector.selectors = SelectorRegistry(stats_file=os.path.join(self.tmp_dir, "stats.json"))
+        links = collector._collect_page_links()
+        self.assertEqual(len(links), 50)
+        self.assertTrue(links[0]["url"].startswith(self.base + "/doi/10.1126/science.mock"))
+        self.assertEqual(links[0]["publication_date"].year, 2012)
+        next_href = driver.find_element("css selector", ScienceConfig.SELECTORS["next_page"]).get_attribute("href")
+        self.assertIn("startPage=1", next_href)
+        self.assertIn("results", driver.find_element("css selector", ".search-result__info").text)
+
+        newest = self._driver(url + "&sortBy=EPubDate")
+        title = newest.find_element("css selector", ScienceConfig.SELECTORS["title_link"]).text
+        self.assertTrue(title.endswith(f"({self.server.corpus.search({'BeforeYear': '2013'})[-1]})"))
+
+    def test_detail_epdf_and_pdf(self):
+        """测试详情页→ePDF页→PDF下载链路"""
+        doi = self.server.corpus.doi(7)
+        processor = PDFProcessor(self._driver(f"{self.base}/doi/{doi}"))
+        processor.selectors = SelectorRegistry(stats_file=os.path.join(self.tmp_dir, "stats.json"))
+        epdf_url = processor._find_pdf_page_url()
+        self.assertEqual(epdf_url, f"{self.base}/doi/epdf/{doi}")
+        processor.driver = self._driver(epdf_url)
+        pdf_url = processor._get_pdf_download_link()
+        resp = requests.get(pdf_url, timeout=5)
+        self.assertEqual(resp.headers["Content-Type"], "application/pdf")
+        self.assertTrue(resp.content.startswith(b"%PDF"))
+        self.assertEqual(self.server.stats.snapshot()["requests"]["pdf"]["ok"], 1)
+
+    def test_cached_link_retry(self):
+        """测试重试时先用保存的PDF链接，链接失效或过期时才重新解析"""
+        doi = self.server.corpus.doi(3)
+        patches = [mock.patch.object(ScienceConfig, "DOWNLOAD_DIR", self.tmp_dir),
+                   mock.patch.object(ScienceConfig, "DOWNLOAD_DELAY_MIN", 0),
+                   mock.patch.object(ScienceConfig, "DOWNLOAD_DELAY_MAX", 0),
+                   mock.patch.object(ScienceConfig, "SESSION_FILE", ""),
+                   mock.patch.object(browser_session, "_session", None)]
+        for p in patches:
+            p.start()
+        self.addCleanup(lambda: [p.stop() for p in reversed(patches)])
+        with sqlite_mysql(os.path.join(self.tmp_dir, "science.db")):
+            dbm = DatabaseManager()
+            dbm.save_articles_to_database([Article(title="Cached", url=f"{self.base}/doi/{doi}", doi=doi)])
+            resolved_at = datetime.now().replace(microsecond=0)
+            dbm.save_pdf_link(1, f"{self.base}/doi/pdf/{doi}?download=true", f"{self.base}/doi/epdf/{doi}", resolved_at)
+            article = dbm.fetch_pending_articles()[0]
+        self.assertEqual((article.pdf_page_url, article.pdf_resolved_at), (f"{self.base}/doi/epdf/{doi}", resolved_at))
+
+        processor = PDFProcessor(self._driver(f"{self.base}/doi/{doi}"))
+        with mock.patch.object(processor, "resolve_article") as resolve:
+            result = processor.process_article(article)
+            resolve.assert_not_called()
+            self.assertTrue(result.downloaded and os.path.exists(result.download_path))
+            self.assertEqual(self.server.stats.snapshot()["requests"]["pdf"]["ok"], 1)
+
+            resolve.return_value = None
+            article.downloaded = False
+            self.server.faults = FaultInjector(forbidden_rate=1.0)
+            self.assertIsNone(processor.process_article(article))
+            resolve.assert_called_once()
+            self.assertEqual((article.pdf_url, article.pdf_resolved_at), (None, None))
+
+            article.pdf_url = f"{self.base}/doi/pdf/{doi}"
+            article.pdf_resolved_at = datetime.now() - timedelta(seconds=ScienceConfig.PDF_LINK_TTL + 1)
+            self.assertIsNone(processor.process_article(article))
+            self.assertEqual(resolve.call_count, 2)
+        self.assertEqual(self.server.stats.snapshot()["requests"]["pdf"]["forbidden"], 1)
+
+    def test_template_link_skips_reading_pause(self):
+        """测试DOI模板直链验证通过后直接下载，不做浏览页面后的20-30秒停顿"""
+        doi = self.server.corpus.doi(5)
+        patches = [mock.patch.object(ScienceConfig, "DOWNLOAD_DIR", self.tmp_dir),
+                   mock.patch.object(ScienceConfig, "DOWNLOAD_DELAY_MIN", 0),
+                   mock.patch.object(ScienceConfig, "DOWNLOAD_DELAY_MAX", 0),
+                   mock.patch.object(ScienceConfig, "DIRECT_PDF_URL", True),
+                   mock.patch.object(ScienceConfig, "PDF_URL_TEMPLATES", [f"{self.base}/doi/pdf/{{doi}}"]),
+                   mock.patch.object(ScienceConfig, "SESSION_FILE", ""),
+                   mock.patch.object(browser_session, "_session", None),
+                   mock.patch("src.pdf_processor.time", wraps=time)]
+        for p in patches:
+            p.start()
+        self.addCleanup(lambda: [p.stop() for p in reversed(patches)])
+        processor = PDFProcessor(self._driver(f"{self.base}/"))
+        result = processor.process_article(Article(title="Direct", url=f"{self.base}/doi/{doi}", doi=doi))
+        self.assertTrue(result.downloaded and os.path.exists(result.download_path))
+        self.assertIsNone(result.pdf_page_url)
+        sleeps = [call.args[0] for call in pdf_processor.time.sleep.call_args_list]
+        self.assertTrue(all(seconds < 1 for seconds in sleeps), sleeps)
+        self.assertEqual(self.server.stats.snapshot()["requests"].get("detail"), None)  # 没有打开详情页
+
+    def test_fault_injection(self):
+        """测试403、验证码（刷新后恢复）与截断响应"""
+        url = f"{self.base}/doi/{self.server.corpus.doi(1)}"
+        self.server.faults = FaultInjector(captcha_rate=1.0)
+        self.assertIn("challenge-form", requests.get(url, timeout=5).text)
+        self.assertIn("info-panel", requests.get(url, timeout=5).text)
+
+        self.server.faults = FaultInjector(forbidden_rate=1.0)
+        self.assertEqual(requests.get(url, timeout=5).status_code, 403)
+
+        self.server.faults = FaultInjector(truncate_rate=1.0)
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            requests.get(f"{self.base}/doi/pdf/{self.server.corpus.doi(1)}", timeout=5)
+        faults = self.server.stats.snapshot()["faults"]
+        self.assertEqual(faults, {"captcha": 1, "forbidden": 1, "truncated": 1})
+
+
+class TestLoadHarness(unittest.TestCase):
+    """测试压测命令行与报告汇总"""
+
+    def test_command_and_summary(self):
+        args = type("Args", (), {"log_level": "WARNING", "max": 50, "main_args": "--pipeline"})()
+        cmd = script_command("collect_meta", "http://127.0.0.1:8800", args)
+        self.assertIn("--base-url", cmd)
+        self.assertTrue(cmd[cmd.index("--query") + 1].startswith("http://127.0.0.1:8800/action/doSearch"))
+        self.assertEqual(script_command("science_crawler_main", "http://x", args)[-1], "--pipeline")
+
+        snapshot = {"crawler_downloads_total": {"series": {'{result="success"}': 30, '{result="failed"}': 2}},
+                    "crawler_captcha_events_total": {"series": {"total": 3}}}
+        report = summarize("pdf_downloader", 0, 60.0, {"faults": {}}, snapshot)
+        self.assertEqual(report["articles_per_min"], 30)
+        self.assertEqual(report["client"]["downloads_failed"], 2)
+        self.assertEqual(report["client"]["captcha_events"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
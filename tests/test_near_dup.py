@@ -0,0 +1,124 @@
+"""
+标题近似重复索引测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import check_duplicates
+from benchmarks.sqlite_standin import sqlite_mysql
+from src import near_dup
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.near_dup import NearDupIndex, build_index, normalize_title, shingles
+from src.utils.log_utils import shutdown_logging
+
+TITLES = [
+    "Ferromagnetism in magic-angle graphene",
+    "Mapping twist-tuned multiband topology in bilayer WSe2",
+    "Moiré photonics and optoelectronics",
+    "Programming twist angle and strain profiles in 2D materials",
+    "Abnormal conductivity in low-angle twisted bilayer graphene",
+]
+
+
+class TestNormalize(unittest.TestCase):
+    """测试标题规范化与n-gram"""
+
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title("Erratum: Ferromagnetism in Magic-Angle Graphène!"),
+                         "ferromagnetism in magic angle graphene")
+        self.assertEqual(normalize_title("Correction to: Moiré photonics"), "moire photonics")
+        self.assertEqual(normalize_title(None), "")
+
+    def test_shingles(self):
+        self.assertEqual(shingles("Ab CD", size=4), {"ab c", "b cd"})
+        self.assertEqual(shingles("", size=4), set())
+        self.assertTrue(any(g.startswith("\x00") for g in shingles("t", "one two three four", size=4)))
+
+
+class TestNearDupIndex(unittest.TestCase):
+    """测试索引的构建、查询与簇报告"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = NearDupIndex(os.path.join(self.tmp_dir, "near_dup.sqlite"))
+        rows = [(i, None, title, None) for i, title in enumerate(TITLES, 1)]
+        self.assertEqual(build_index(self.index, workers=1, chunks=[rows[:3], rows[3:]]), len(TITLES))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_query_variants(self):
+        matches = self.index.query("ERRATUM: Ferromagnetism in Magic Angle Graphene.")
+        self.assertEqual([m["id"] for m in matches], [1])
+        self.assertEqual(matches[0]["score"], 1.0)
+        self.assertEqual(self.index.query("MOIRE PHOTONICS AND OPTOELECTRONIC")[0]["id"], 3)
+        self.assertEqual(self.index.query("Ferromagnetism in magic-angle graphene", exclude=1), [])
+        self.assertEqual(self.index.query("Superconductivity in twisted cuprates"), [])
+
+    def test_reopen_and_update(self):
+        self.index.add(10, "Ferromagnetism in magic angle graphene", doi="10.1/x")
+        self.index.add(10, "Ferromagnetism in magic angle graphene", doi="10.1/x")
+        self.index.close()
+        self.index = NearDupIndex(self.index.path, num_perm=128)
+        self.assertEqual(self.index.params["num_perm"], ScienceConfig.NEAR_DUP_NUM_PERM)
+        self.assertEqual((len(self.index), self.index.max_id()), (len(TITLES) + 1, 10))
+        clusters = self.index.clusters()
+        self.assertEqual([[d["id"] for d in c] for c in clusters], [[1, 10]])
+        self.assertEqual(clusters[0][1]["doi"], "10.1/x")
+
+
+class TestSaveIntegration(unittest.TestCase):
+    """测试入库时的近似重复检查与索引同步"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.index_path = os.path.join(self.tmp_dir, "near_dup.sqlite")
+        self.patches = [mock.patch.object(ScienceConfig, "NEAR_DUP_INDEX_FILE", self.index_path),
+                        mock.patch.object(ScienceConfig, "LOG_FILE", os.path.join(self.tmp_dir, "crawler.jsonl")),
+                        mock.patch.object(near_dup, "_index", None)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        if near_dup._index is not None:
+            near_dup._index.close()
+        shutdown_logging()  # main() 打开的日志文件在临时目录里
+        for p in reversed(self.patches):
+            p.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_cli_build_and_save(self):
+        manager = DatabaseManager()
+        manager.save_articles_to_database([Article(title=t, url=f"u{i}") for i, t in enumerate(TITLES)])
+        self.assertEqual(check_duplicates.main(["build", "--workers", "1"]), 0)
+        self.assertEqual(check_duplicates.main(["build", "--workers", "1"]), 2)
+        manager.save_articles_to_database([
+            Article(title="Erratum: Ferromagnetism in Magic-Angle Graphene", url="u9"),
+            Article(title="Moiré Photonics and Optoelectronics", url="u10", doi="10.1/m"),
+            Article(title="Superconductivity in twisted cuprates", url="u11"),
+        ])
+        self.assertEqual(manager.get_article_count(), len(TITLES) + 2)
+        index = near_dup.get_near_dup_index()
+        self.assertEqual(len(index), len(TITLES) + 2)
+        self.assertEqual(index.query("superconductivity in twisted cuprates")[0]["id"], len(TITLES) + 2)
+        output = os.path.join(self.tmp_dir, "report.json")
+        self.assertEqual(check_duplicates.main(["report", "--output", output]), 0)
+        self.assertEqual(check_duplicates.main(["update", "--workers", "1"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
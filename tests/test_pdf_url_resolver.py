@@ -0,0 +1,88 @@
+"""
+PDF直链解析器测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.mock_science import FaultInjector, MockScienceServer, SyntheticCorpus
+from src import pdf_url_resolver
+from src.config import ScienceConfig
+from src.pdf_url_resolver import TEMPLATE_GROUP, PDFUrlResolver
+
+
+class TestPDFUrlResolver(unittest.TestCase):
+    """在模拟站点上测试模板解析与HEAD/Range验证"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.stats_file = os.path.join(self.tmp_dir, "pdf_template_stats.json")
+        self.server = MockScienceServer(SyntheticCorpus(size=20, pdf_size=4096)).start()
+        self.base = self.server.base_url
+        self.templates = [f"{self.base}/doi/{{doi}}", f"{self.base}/doi/pdf/{{doi}}"]
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _resolver(self):
+        return PDFUrlResolver(templates=self.templates, stats_file=self.stats_file)
+
+    def _requests(self, kind):
+        return self.server.stats.snapshot()["requests"].get(kind, {})
+
+    def test_resolve_hit_and_learned_order(self):
+        resolver = self._resolver()
+        doi = self.server.corpus.doi(1)
+        # 详情页是HTML：HEAD类型不符，Range读到的文件头不是%PDF，落到第二个模板
+        self.assertEqual(resolver.resolve(doi), f"{self.base}/doi/pdf/{doi}")
+        self.assertEqual(resolver.stats.stats[TEMPLATE_GROUP][self.templates[0]]["misses"], 1)
+        self.assertEqual(self._requests("pdf"), {"ok": 1})  # PDF只发了一次HEAD
+
+        # 成功的模板排到前面，下一篇只请求一次
+        resolver.resolve(self.server.corpus.doi(2))
+        self.assertEqual(sum(self._requests("detail").values()), 2)
+
+    def test_miss_and_forbidden(self):
+        resolver = self._resolver()
+        self.assertIsNone(resolver.resolve("10.1126/science.unknown"))
+        self.assertIsNone(resolver.resolve(""))
+
+        self.server.faults = FaultInjector(forbidden_rate=1.0)
+        url = f"{self.base}/doi/pdf/{self.server.corpus.doi(3)}"
+        self.assertFalse(resolver.verify(url))
+        self.assertEqual(self._requests("pdf"), {"forbidden": 1})  # 403 不再发Range请求
+
+    def test_ranged_get_when_head_unavailable(self):
+        resolver = self._resolver()
+        url = f"{self.base}/doi/pdf/{self.server.corpus.doi(4)}"
+        with mock.patch.object(resolver.session, "head", side_effect=requests.ConnectionError("no HEAD")):
+            self.assertTrue(resolver.verify(url))
+            self.assertFalse(resolver.verify(f"{self.base}/doi/{self.server.corpus.doi(4)}"))
+        self.assertEqual(self._requests("pdf"), {"partial": 1})
+
+    def test_shared_stats_saved_at_exit(self):
+        with mock.patch.object(pdf_url_resolver, "_template_stats", None), \
+                mock.patch.object(ScienceConfig, "PDF_TEMPLATE_STATS_FILE", self.stats_file), \
+                mock.patch.object(pdf_url_resolver.atexit, "register") as register:
+            first = PDFUrlResolver(templates=self.templates)
+            second = PDFUrlResolver(templates=self.templates)
+            self.assertIs(first.stats, second.stats)
+            register.assert_called_once_with(first.stats.save)
+            first.resolve(self.server.corpus.doi(5))
+            self.assertFalse(os.path.exists(self.stats_file))  # 不足 autosave_every 条，只能靠退出时保存
+            register.call_args[0][0]()
+        self.assertTrue(os.path.exists(self.stats_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
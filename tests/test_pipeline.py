@@ -0,0 +1,93 @@
+"""
+分阶段流水线测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    """测试Pipeline类"""
+
+    def test_stages_process_all_items(self):
+        """测试所有条目依次经过各阶段，返回None的条目被丢弃"""
+        pipeline = Pipeline(
+            source=lambda: range(20),
+            stages=[
+                Stage("double", lambda x, ctx: x * 2, workers=3, queue_size=2),
+                Stage("filter", lambda x, ctx: x if x % 4 == 0 else None, workers=2, queue_size=1),
+            ],
+        )
+        stats = pipeline.run()
+        self.assertEqual(sorted(pipeline.results), [x for x in range(0, 40, 4)])
+        self.assertEqual(stats["collect"]["emitted"], 20)
+        self.assertEqual(stats["filter"]["dropped"], 10)
+        self.assertEqual(stats["filter"]["backlog"], 0)
+        self.assertFalse(pipeline.complete)
+
+        pipeline = Pipeline(source=lambda: range(5), stages=[Stage("double", lambda x, ctx: x * 2, workers=2)])
+        pipeline.run()
+        self.assertTrue(pipeline.complete)
+
+    def test_stage_concurrency_overlaps(self):
+        """测试阶段内多个worker并发执行"""
+        def slow(x, ctx):
+            time.sleep(0.05)
+            return x
+
+        pipeline = Pipeline(source=lambda: range(8), stages=[Stage("slow", slow, workers=8)])
+        start = time.time()
+        pipeline.run()
+        self.assertEqual(len(pipeline.results), 8)
+        self.assertLess(time.time() - start, 0.3)
+
+    def test_worker_context_and_errors(self):
+        """测试worker上下文初始化/关闭与异常计数"""
+        closed = []
+        lock = threading.Lock()
+
+        def close(ctx):
+            with lock:
+                closed.append(ctx)
+
+        def process(x, ctx):
+            if x == 3:
+                raise ValueError("bad item")
+            return (ctx, x)
+
+        pipeline = Pipeline(
+            source=lambda: range(5),
+            stages=[Stage("work", process, workers=2, worker_init=lambda i: f"w{i}", worker_close=close)],
+        )
+        stats = pipeline.run()
+        self.assertEqual(stats["work"]["errors"], 1)
+        self.assertFalse(pipeline.complete)
+        self.assertEqual(sorted(x for _, x in pipeline.results), [0, 1, 2, 4])
+        self.assertEqual(sorted(closed), ["w0", "w1"])
+
+    def test_failed_init_does_not_block(self):
+        """测试所有worker初始化失败时流水线仍能结束"""
+        def fail(index):
+            raise RuntimeError("no browser")
+
+        pipeline = Pipeline(
+            source=lambda: range(10),
+            stages=[Stage("resolve", lambda x, ctx: x, workers=2, queue_size=1, worker_init=fail),
+                    Stage("persist", lambda x, ctx: x)],
+        )
+        stats = pipeline.run()
+        self.assertEqual(pipeline.results, [])
+        self.assertEqual(stats["resolve"]["errors"], 10)
+        self.assertFalse(pipeline.complete)  # 输入被丢弃，调用方不应清除断点
+
+
+if __name__ == "__main__":
+    unittest.main()
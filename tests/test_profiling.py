@@ -0,0 +1,157 @@
+"""
+按阶段剖析测试
+"""
+
+import unittest
+import sys
+import os
+import glob
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import profiling
+from src.pipeline import Pipeline, Stage
+from src.profiling import Profiler, StackSampler
+
+
+def parse_work():
+    return sum(i * i for i in range(20000))
+
+
+def save_work():
+    return sorted(str(i) for i in range(5000))
+
+
+def functions(stats: pstats.Stats):
+    return {func[2] for func in stats.stats}
+
+
+class TestProfiler(unittest.TestCase):
+    """测试Profiler的阶段累积、嵌套与报告输出"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_nested_stages_and_reports(self):
+        """测试嵌套阶段的耗时只计入内层，多次进入同一阶段累积"""
+        profiler = Profiler(output_dir=self.tmp_dir, top_n=5)
+        for _ in range(3):
+            with profiler.stage("collect"):
+                parse_work()
+                with profiler.stage("persist"):
+                    save_work()
+        self.assertIn("parse_work", functions(profiler.stats("collect")))
+        self.assertNotIn("save_work", functions(profiler.stats("collect")))
+        self.assertIn("save_work", functions(profiler.stats("persist")))
+
+        profiler.finish()
+        for name in ("collect.prof", "collect.txt", "persist.prof", "persist.txt", "summary.txt"):
+            self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, name)), name)
+        loaded = pstats.Stats(os.path.join(self.tmp_dir, "persist.prof"))
+        self.assertIn("save_work", functions(loaded))
+        with open(os.path.join(self.tmp_dir, "summary.txt"), encoding="utf-8") as f:
+            self.assertIn("3次", f.read())
+
+    def test_threads_merge_and_iter_stage(self):
+        """测试多个worker线程的同名阶段合并，iter_stage只计产生元素的耗时"""
+        profiler = Profiler(output_dir=self.tmp_dir)
+
+        def worker():
+            with profiler.stage("download"):
+                save_work()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertIn("save_work", functions(profiler.stats("download")))
+
+        def pages():
+            for _ in range(2):
+                parse_work()
+                yield []
+
+        for _ in profiler.iter_stage("collect", pages()):
+            save_work()
+        self.assertIn("parse_work", functions(profiler.stats("collect")))
+        self.assertNotIn("save_work", functions(profiler.stats("collect")))
+
+    def test_memory_snapshots(self):
+        """测试主线程顶层阶段边界写出分配报告"""
+        profiler = Profiler(output_dir=self.tmp_dir, memory=True)
+        with profiler.stage("persist"):
+            data = [bytearray(1024) for _ in range(200)]
+        self.assertEqual(len(data), 200)
+        profiler.finish()
+        with open(os.path.join(self.tmp_dir, "persist.alloc.txt"), encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("阶段 persist 结束", report)
+        self.assertIn("test_profiling.py", report)
+
+    def test_disabled_is_noop(self):
+        profiler = Profiler(enabled=False)
+        with profiler.stage("collect"):
+            pass
+        self.assertEqual(list(profiler.iter_stage("collect", [1, 2])), [1, 2])
+        self.assertIsNone(profiler.finish())
+
+    def test_live_dump_samples_other_threads(self):
+        """测试实时采样能看到其他线程中正在运行的函数"""
+        stop = threading.Event()
+
+        def busy_loop():
+            while not stop.is_set():
+                parse_work()
+
+        thread = threading.Thread(target=busy_loop)
+        thread.start()
+        try:
+            sampler = StackSampler(interval=0.001)
+            sampler.run(0.2)
+            self.assertIn("busy_loop", sampler.report(10))
+
+            profiler = Profiler(output_dir=self.tmp_dir)
+            profiler.dump_live(seconds=0.1).join()
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp_dir, "live_*.txt"))), 1)
+
+
+class TestPipelineProfiling(unittest.TestCase):
+    """测试流水线各阶段自动按阶段名剖析"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.saved = profiling._profiler
+        profiling._profiler = Profiler(output_dir=self.tmp_dir)
+
+    def tearDown(self):
+        profiling._profiler = self.saved
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_stage_names(self):
+        def source():
+            for i in range(3):
+                parse_work()
+                yield i
+
+        pipeline = Pipeline(source, [Stage("persist", lambda item, ctx: save_work() and item, workers=2)])
+        pipeline.run()
+        profiler = profiling.get_profiler()
+        self.assertIn("parse_work", functions(profiler.stats("collect")))
+        self.assertIn("save_work", functions(profiler.stats("persist")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+查询分片规划测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from argparse import Namespace
+from urllib.parse import parse_qs, urlparse
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collect_meta
+from src.checkpoint import CrawlCheckpoint
+from src.config import ScienceConfig
+from src.models.article import Article
+from src.query_planner import QueryPlanner, crawl_shards, parse_result_count, shard_url, year_range
+from src import selector_registry
+from src.selector_registry import SelectorRegistry
+
+
+def setUpModule():
+    # 共享的选择器注册表改用临时文件，测试结束时不在仓库根目录写 selector_stats.json
+    global _stats_dir, _registry_patch
+    _stats_dir = tempfile.mkdtemp()
+    _registry_patch = mock.patch.object(selector_registry, "_registry",
+                                        SelectorRegistry(stats_file=os.path.join(_stats_dir, "selector_stats.json")))
+    _registry_patch.start()
+
+
+def tearDownModule():
+    _registry_patch.stop()
+    shutil.rmtree(_stats_dir, ignore_errors=True)
+
+
+class FakePlanner(QueryPlanner):
+    """按年份/月份返回预设结果数的规划器，不打开浏览器"""
+
+    def __init__(self, per_year, threshold):
+        super().__init__(driver=None, threshold=threshold)
+        self.per_year = per_year
+
+    def count_results(self, url):
+        params = {k: int(v[0]) for k, v in parse_qs(urlparse(url).query).items()
+                  if k in ("AfterYear", "BeforeYear", "AfterMonth", "BeforeMonth")}
+        total = sum(self.per_year.get(y, 0) for y in range(params["AfterYear"], params["BeforeYear"] + 1))
+        if "AfterMonth" in params:
+            months = params["BeforeMonth"] - params["AfterMonth"] + 1
+            total = total * months // 12
+        return total
+
+
+class TestQueryPlanner(unittest.TestCase):
+    """测试分片规划"""
+
+    BASE = "https://www.science.org/action/doSearch?AllField=quantum&AfterYear=2015&BeforeYear=2022&startPage=3"
+
+    def test_shard_url(self):
+        """测试分片URL替换年份范围并重置页码"""
+        params = parse_qs(urlparse(shard_url(self.BASE, 2018, 2019, 1, 6)).query)
+        self.assertEqual(params["AllField"], ["quantum"])
+        self.assertEqual(params["AfterYear"], ["2018"])
+        self.assertEqual(params["BeforeYear"], ["2019"])
+        self.assertEqual(params["AfterMonth"], ["1"])
+        self.assertEqual(params["startPage"], ["0"])
+        self.assertEqual(year_range(self.BASE), (2015, 2022))
+
+    def test_parse_result_count(self):
+        """测试结果数解析"""
+        self.assertEqual(parse_result_count("Showing 1-20 of 12,345 results"), 12345)
+        self.assertEqual(parse_result_count("1 result"), 1)
+        self.assertIsNone(parse_result_count("no match"))
+
+    def test_plan_splits_until_under_threshold(self):
+        """测试超阈值的范围被对半拆分，单年超阈值时按月拆分，空范围被跳过"""
+        per_year = {2015: 100, 2016: 100, 2017: 0, 2018: 300, 2019: 1200, 2020: 50, 2021: 50, 2022: 50}
+        shards = FakePlanner(per_year, threshold=500).plan(self.BASE)
+
+        labels = [s["label"] for s in shards]
+        self.assertIn("2019-01~03", labels)
+        self.assertNotIn("2017", labels)
+        self.assertTrue(all(s["count"] <= 500 for s in shards))
+        self.assertEqual(sum(s["count"] for s in shards), sum(per_year.values()))
+
+
+class FakeCollector:
+    """按分片返回预设文章的收集器；2019分片翻完第1页后抛异常（验证码、浏览器崩溃等）"""
+
+    def __init__(self, driver, max_count=None):
+        pass
+
+    def collect_all_links(self, checkpoint, resume=False):
+        year = parse_qs(urlparse(checkpoint.query_url).query)["AfterYear"][0]
+        records = [Article(title=f"T{year}", url=f"u{year}", doi=f"10.1/{year}")]
+        checkpoint.record_page(1, checkpoint.query_url + "&startPage=1", records)
+        if year == "2019":
+            raise RuntimeError("captcha")
+        return [r.to_dict() for r in records]
+
+
+class TestCrawlShards(unittest.TestCase):
+    """测试分片失败时保留其断点和分片计划"""
+
+    BASE = "https://www.science.org/action/doSearch?AllField=quantum&AfterYear=2018&BeforeYear=2020"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.shards = [{"url": shard_url(self.BASE, y, y), "label": str(y), "count": 10} for y in (2018, 2019, 2020)]
+        self.patches = [mock.patch.object(ScienceConfig, "CHECKPOINT_DIR", self.tmp_dir),
+                        mock.patch.object(ScienceConfig, "SEARCH_URL", self.BASE),
+                        mock.patch.object(ScienceConfig, "SLEEP_TIME", 0),
+                        mock.patch("src.link_collector.LinkCollector", FakeCollector),
+                        mock.patch.object(QueryPlanner, "plan", return_value=self.shards)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_failed_shard_reported(self):
+        failed = []
+        articles = crawl_shards(self.shards, [mock.Mock()], failed_shards=failed)
+        self.assertEqual(failed, ["2019"])
+        self.assertEqual(sorted(a["doi"] for a in articles), ["10.1/2018", "10.1/2020"])
+
+    def test_clear_progress_keeps_failed_shard(self):
+        args = Namespace(shard_threshold=None, resume=False, shard_workers=1)
+        articles, clear_progress, _, failed = collect_meta.collect_sharded(args, mock.Mock())
+        self.assertEqual((len(articles), failed), (2, ["2019"]))
+        clear_progress()
+        self.assertEqual([CrawlCheckpoint(s["url"]).load() is not None for s in self.shards], [False, True, False])
+        planner = QueryPlanner(driver=None)
+        self.assertTrue(os.path.exists(planner.plan_path(self.BASE)))
+        # --resume 只续爬失败的分片，并从它的断点继续
+        remaining = planner.load_or_plan(self.BASE, reuse=True)
+        self.assertEqual([s["label"] for s in remaining], ["2019"])
+        self.assertEqual(CrawlCheckpoint(remaining[0]["url"]).load()["records"][0].doi, "10.1/2019")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+重试策略引擎测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.mock_science import FaultInjector, MockScienceServer, SyntheticCorpus
+from src import browser_session, retry_policy
+from src.config import ScienceConfig
+from src.retry_policy import (FATAL, THROTTLED, TRANSIENT, FetchError, RetryBudget, RetryEngine, classify,
+                              http_error)
+from src.utils.download_utils import download_file
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _failing(*errors):
+    """依次抛出给定异常，之后返回 "ok" """
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return func, calls
+
+
+class TestRetryEngine(unittest.TestCase):
+    """测试失败分类、退避、熔断与重试预算"""
+
+    def setUp(self):
+        self.sleeps = []
+        self.clock = FakeClock()
+
+    def _engine(self, **kwargs):
+        kwargs.setdefault("budget", RetryBudget(ratio=0.2, reserve=10))
+        return RetryEngine(base_delay=1, max_delay=10, sleep=self.sleeps.append, clock=self.clock, **kwargs)
+
+    def test_classify(self):
+        response = mock.Mock(status_code=429, headers={"Retry-After": "7"})
+        self.assertEqual((http_error(response).kind, http_error(response).retry_after), (THROTTLED, 7.0))
+        self.assertEqual(http_error(mock.Mock(status_code=502, headers={})).kind, TRANSIENT)
+        self.assertEqual(http_error(mock.Mock(status_code=403, headers={})).kind, FATAL)
+        self.assertEqual(classify(requests.exceptions.ReadTimeout("slow")).kind, TRANSIENT)
+        self.assertEqual(classify(requests.exceptions.InvalidURL("x")).kind, FATAL)
+
+    def test_fatal_not_retried_transient_backs_off(self):
+        engine = self._engine(max_attempts=4)
+        func, calls = _failing(FetchError(FATAL, "HTTP 403", 403))
+        with self.assertRaises(FetchError):
+            engine.call("https://a.example/x", func)
+        self.assertEqual((len(calls), self.sleeps), (1, []))
+
+        func, calls = _failing(requests.exceptions.ConnectionError("reset"), FetchError(TRANSIENT, "HTTP 502"))
+        self.assertEqual(engine.call("https://a.example/x", func), "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(all(1 <= s <= 10 for s in self.sleeps))
+
+        func, calls = _failing(*[FetchError(TRANSIENT, "HTTP 500")] * 9)
+        with self.assertRaises(FetchError):
+            engine.call("https://a.example/x", func)
+        self.assertEqual(len(calls), 4)
+
+        # Retry-After 超过退避上限时交给下次调度
+        func, calls = _failing(FetchError(THROTTLED, "HTTP 429", 429, retry_after=60))
+        with self.assertRaises(FetchError):
+            engine.call("https://a.example/x", func)
+        self.assertEqual(len(calls), 1)
+
+    def test_circuit_breaker(self):
+        engine = self._engine(max_attempts=1, breaker_threshold=2, breaker_cooldown=30)
+        for _ in range(2):
+            with self.assertRaises(FetchError):
+                engine.call("https://down.example/x", _failing(FetchError(TRANSIENT, "HTTP 503"))[0])
+        func, calls = _failing()
+        with self.assertRaises(FetchError) as ctx:
+            engine.call("https://down.example/y", func)
+        self.assertEqual((ctx.exception.reason, calls), ("circuit_open", []))
+        self.assertEqual(engine.call("https://up.example/y", func), "ok")  # 其他主机不受影响
+
+        self.clock.now = 31  # 冷却结束：放行一个探测请求，失败则重新熔断
+        with self.assertRaises(FetchError):
+            engine.call("https://down.example/x", _failing(FetchError(TRANSIENT, "HTTP 503"))[0])
+        self.assertEqual(engine.breaker("down.example").state, "open")
+        self.clock.now = 62
+        self.assertEqual(engine.call("https://down.example/x", _failing()[0]), "ok")
+        self.assertEqual(engine.breaker("down.example").state, "closed")
+
+    def test_retry_budget(self):
+        engine = self._engine(max_attempts=3, budget=RetryBudget(ratio=0, reserve=1))
+        func, calls = _failing(*[FetchError(TRANSIENT, "timeout")] * 9)
+        with self.assertRaises(FetchError):
+            engine.call("https://a.example/x", func)
+        self.assertEqual(len(calls), 2)  # 预算只够一次重试
+        with self.assertRaises(FetchError):
+            engine.call("https://a.example/x", func)
+        self.assertEqual(len(calls), 3)
+
+
+class TestDownloadRetries(unittest.TestCase):
+    """在模拟站点上测试下载函数的请求次数"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = MockScienceServer(SyntheticCorpus(size=100, pdf_size=4096)).start()
+        engine = RetryEngine(max_attempts=3, breaker_threshold=1000, budget=RetryBudget(ratio=0.2, reserve=2),
+                             sleep=lambda seconds: None)
+        self.patches = [mock.patch.object(retry_policy, "_engine", engine),
+                        mock.patch.object(ScienceConfig, "SESSION_FILE", ""),
+                        mock.patch.object(browser_session, "_session", None)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _download(self, index):
+        url = f"{self.server.base_url}/doi/pdf/{self.server.corpus.doi(index)}"
+        return download_file(url, os.path.join(self.tmp_dir, f"{index}.pdf"))
+
+    def _pdf_requests(self):
+        return sum(self.server.stats.snapshot()["requests"]["pdf"].values())
+
+    def test_paywall_requested_once(self):
+        self.server.faults = FaultInjector(forbidden_rate=1.0)
+        self.assertFalse(self._download(1))
+        self.assertEqual(self._pdf_requests(), 1)
+
+    def test_degraded_origin_bounded_by_budget(self):
+        self.server.faults = FaultInjector(truncate_rate=1.0)
+        for i in range(20):
+            self.assertFalse(self._download(i))
+            self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, f"{i}.pdf")))
+        # 每篇3次尝试会是60个请求；预算把重试限制在 2 + 20 * 0.2 次以内
+        self.assertLessEqual(self._pdf_requests(), 20 + 2 + 4)
+
+        self.server.faults = FaultInjector()
+        self.assertTrue(self._download(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
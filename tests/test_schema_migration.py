@@ -0,0 +1,90 @@
+"""
+表结构升级测试
+"""
+
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dead_letter
+import migrate_db
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.config import ScienceConfig
+from src.database_manager import UPGRADE_COLUMNS, DatabaseManager
+from src.models.article import Article
+from src.utils.log_utils import shutdown_logging
+
+# 加入下载状态、PDF链接缓存和重新调度之前的表结构
+LEGACY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS science (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doi VARCHAR(100) UNIQUE,
+    title VARCHAR(500) NOT NULL,
+    authors TEXT,
+    journal VARCHAR(100) DEFAULT 'Science',
+    journal_info VARCHAR(255),
+    abstract TEXT,
+    keywords TEXT,
+    publication_date DATETIME,
+    url VARCHAR(500) NOT NULL,
+    pdf_url VARCHAR(500),
+    download_path VARCHAR(500),
+    pdf_md5 VARCHAR(32),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+class TestSchemaMigration(unittest.TestCase):
+    """在SQLite替身上测试旧表的检查与升级"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"), schema=LEGACY_SCHEMA)
+        self.db.__enter__()
+        self.manager = DatabaseManager()
+        self.log_patch = mock.patch.object(ScienceConfig, "LOG_FILE", os.path.join(self.tmp_dir, "crawler.jsonl"))
+        self.log_patch.start()
+
+    def tearDown(self):
+        shutdown_logging()  # main() 打开的日志文件在临时目录里
+        self.log_patch.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_legacy_table_is_detected_and_upgraded(self):
+        self.assertEqual(self.manager.missing_columns(), [name for name, _ in UPGRADE_COLUMNS])
+        with self.assertLogs("s_crawler.database_manager", level="ERROR") as logs:
+            self.assertFalse(self.manager.check_schema())
+        self.assertIn("migrate_db.py", logs.output[0])
+        self.assertFalse(self.manager.save_articles_to_database([Article(title="T", url="u", doi="10.1/1")]))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(dead_letter.main(["list"]), 1)
+        self.assertIn("migrate_db.py", out.getvalue())
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(migrate_db.main(["--check"]), 1)
+            self.assertEqual(migrate_db.main([]), 0)
+            self.assertEqual(migrate_db.main([]), 0)  # 可重复执行
+            self.assertEqual(migrate_db.main(["--check"]), 0)
+        self.assertIn("已新增列：downloaded", out.getvalue())
+        self.assertIn("无需升级", out.getvalue())
+
+        self.assertTrue(self.manager.check_schema())
+        self.assertTrue(self.manager.save_articles_to_database([Article(title="T", url="u", doi="10.1/1")]))
+        self.assertEqual([a.doi for a in self.manager.fetch_pending_articles()], ["10.1/1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
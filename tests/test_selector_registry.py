@@ -0,0 +1,105 @@
+"""
+选择器注册表测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.common.exceptions import NoSuchElementException
+
+from src.selector_registry import SelectorRegistry
+
+
+class FakeElement:
+    """模拟WebElement"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeContext:
+    """模拟driver/元素，只有指定的选择器能找到元素"""
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.calls = []
+
+    def find_element(self, by, selector):
+        self.calls.append(selector)
+        if selector in self.elements:
+            return self.elements[selector]
+        raise NoSuchElementException(selector)
+
+
+class TestSelectorRegistry(unittest.TestCase):
+    """测试SelectorRegistry类"""
+
+    def setUp(self):
+        fd, self.stats_file = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.remove(self.stats_file)
+
+    def tearDown(self):
+        if os.path.exists(self.stats_file):
+            os.remove(self.stats_file)
+
+    def test_winning_selector_tried_first(self):
+        """测试历史命中的选择器被优先尝试"""
+        registry = SelectorRegistry(stats_file=self.stats_file)
+        selectors = ["a.old", "a.missing", "a.new"]
+        context = FakeContext({"a.new": FakeElement("Title")})
+
+        value, selector = registry.find(context, "title", selectors, extract=lambda e: e.text)
+        self.assertEqual(value, "Title")
+        self.assertEqual(selector, "a.new")
+        self.assertEqual(context.calls, ["a.old", "a.missing", "a.new"])
+
+        context.calls.clear()
+        registry.find(context, "title", selectors, extract=lambda e: e.text)
+        self.assertEqual(context.calls, ["a.new"])
+
+    def test_empty_extract_counts_as_miss(self):
+        """测试提取结果为空时记为未命中"""
+        registry = SelectorRegistry(stats_file=self.stats_file)
+        context = FakeContext({"a.blank": FakeElement("  ")})
+
+        value, selector = registry.find(context, "title", ["a.blank"], extract=lambda e: e.text.strip())
+        self.assertIsNone(value)
+        self.assertIsNone(selector)
+        self.assertEqual(registry.stats["title"]["a.blank"]["misses"], 1)
+
+    def test_persist_and_dead_selectors(self):
+        """测试统计持久化与死选择器报告"""
+        registry = SelectorRegistry(stats_file=self.stats_file)
+        context = FakeContext({"a.ok": FakeElement("x")})
+        for _ in range(3):
+            registry.find(context, "title", ["a.dead", "a.ok"])
+        registry.save()
+
+        reloaded = SelectorRegistry(stats_file=self.stats_file)
+        self.assertEqual(reloaded.ordered("title", ["a.dead", "a.ok"]), ["a.ok", "a.dead"])
+        self.assertEqual(reloaded.dead_selectors(min_attempts=1), {"title": ["a.dead"]})
+
+    def test_losing_selectors_are_probed_until_reported_dead(self):
+        """测试胜出的选择器之后的选择器仍被定期试探，默认阈值下能报告死选择器"""
+        registry = SelectorRegistry(stats_file=self.stats_file)
+        selectors = ["a.dead", "a.ok", "a.gone"]
+        context = FakeContext({"a.ok": FakeElement("x")})
+        for _ in range(1000):
+            self.assertEqual(registry.find(context, "title", selectors)[1], "a.ok")
+        self.assertLess(len(context.calls), 1000 * 1.1)  # 试探只增加少量查找
+        self.assertEqual(sorted(registry.dead_selectors()["title"]), ["a.dead", "a.gone"])
+
+        quiet = SelectorRegistry(stats_file=self.stats_file + ".quiet", autosave_every=0, probe_every=0)
+        for _ in range(100):
+            quiet.find(context, "title", selectors)
+        self.assertEqual(quiet.dead_selectors(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+TF-IDF相似文章索引测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sqlite_standin import sqlite_mysql
+from src import similarity
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.similarity import tokenize
+from src.text_extractor import TextStore, compress_pages
+
+try:
+    import numpy
+    import scipy  # noqa: F401
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+
+def _is_mapped(array) -> bool:
+    """数组是否以内存映射文件为底层存储（scipy会在外面包一层视图）"""
+    while array is not None:
+        if isinstance(array, numpy.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+ARTICLES = [
+    ("Magic-angle twisted bilayer graphene", "Correlated insulators and superconductivity in twisted graphene."),
+    ("Superconductivity in magic-angle graphene", "Twisted bilayer graphene hosts unconventional superconductivity."),
+    ("Strain engineering of transition metal dichalcogenides", "Uniaxial strain tunes excitons in WSe2."),
+    ("Excitons in strained WSe2 monolayers", "Strain shifts exciton energies in dichalcogenide monolayers."),
+    ("Ocean carbon uptake", "Marine ecosystems absorb atmospheric carbon."),
+]
+
+
+class TestTokenize(unittest.TestCase):
+    """测试切词"""
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("The Moiré-pattern in 2D WSe2, 2024"), ["moire", "pattern", "2d", "wse2"])
+        self.assertEqual(tokenize(None), [])
+
+
+@unittest.skipUnless(HAS_SCIPY, "未安装numpy/scipy")
+class TestSimilarityIndex(unittest.TestCase):
+    """在SQLite替身上测试拟合、增量追加与查询"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.manager = DatabaseManager()
+        self.manager.save_articles_to_database([Article(title=t, abstract=a, url=f"u{i}", doi=f"10.1/{i}")
+                                                for i, (t, a) in enumerate(ARTICLES[:4])])
+        self.path = os.path.join(self.tmp_dir, "similarity")
+        self.patches = [mock.patch.object(ScienceConfig, "SIMILARITY_DIR", self.path),
+                        mock.patch.object(similarity, "_index", None)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_build_incremental_and_query(self):
+        index = similarity.SimilarityIndex()
+        self.assertEqual(similarity.build_similarity_index(index), 4)
+        self.assertEqual(similarity.build_similarity_index(index), 0)
+        self.assertTrue(_is_mapped(index.cols.data) and _is_mapped(index.rows.indices))
+
+        hits = index.similar_to_ids([1, 3, 99], k=2)
+        self.assertEqual(hits[0][0][0], 2)
+        self.assertEqual(hits[1][0][0], 4)
+        self.assertEqual(hits[2], [])
+        self.assertTrue(0 < hits[0][0][1] <= 1)
+
+        self.manager.save_articles_to_database([Article(title=ARTICLES[4][0], abstract=ARTICLES[4][1], url="u4",
+                                                        doi="10.1/4")])
+        self.assertEqual(similarity.build_similarity_index(index), 1)
+        reopened = similarity.SimilarityIndex()
+        self.assertEqual((len(reopened), reopened.meta["max_id"]), (5, 5))
+        self.assertEqual(reopened.similar_to_text("carbon in the ocean", k=3)[0][0], 5)
+        self.assertEqual(reopened.similar_to_text("unrelated words only", k=3), [])
+
+    def test_fulltext_refits_rows_downloaded_later(self):
+        """入索引时还没有PDF的文章，提取正文后再次拟合会重新切分该行"""
+        store = TextStore(os.path.join(self.tmp_dir, "text.sqlite"))
+        body = "Phytoplankton sequester carbon in the deep ocean."
+        index = similarity.SimilarityIndex()
+        self.assertEqual(similarity.build_similarity_index(index, use_fulltext=True, store=store), 4)
+        self.assertEqual(index.similar_to_text("phytoplankton sequester", k=3), [])
+
+        self.manager.update_download_status(3, True, "3.pdf", "m3")
+        self.assertEqual(similarity.build_similarity_index(index, store=store), 0)  # 正文尚未提取
+        store.put_many([("m3", "3.pdf", 1, len(body), compress_pages([body]), "test", 0.1, None)])
+        self.assertEqual(similarity.build_similarity_index(index, store=store), 1)
+        self.assertEqual(similarity.build_similarity_index(index, store=store), 0)
+
+        reopened = similarity.SimilarityIndex()
+        self.assertEqual((len(reopened), reopened.indexed_md5(3), reopened.indexed_md5(1)), (4, "m3", None))
+        self.assertEqual(reopened.similar_to_text("phytoplankton sequester", k=3)[0][0], 3)
+        self.assertEqual(reopened.similar_to_ids([1], k=1)[0][0][0], 2)  # 其他行不受影响
+        store.close()
+
+    def test_manager_similar_articles(self):
+        self.assertEqual(self.manager.get_similar_articles("10.1/2"), [])  # 索引尚未构建
+        similarity.build_similarity_index(similarity.SimilarityIndex())
+        rows = self.manager.get_similar_articles("10.1/2", limit=1)
+        self.assertEqual([(r["doi"], r["title"]) for r in rows], [("10.1/3", ARTICLES[3][0])])
+        self.assertGreater(rows[0]["score"], 0)
+        self.manager.save_articles_to_database([Article(title="Twisted graphene superconductivity",
+                                                        url="u9", doi="10.1/9")])
+        self.assertIn(self.manager.get_similar_articles("10.1/9", limit=1)[0]["id"], (1, 2))
+        self.assertEqual(self.manager.get_similar_articles("10.1/none"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+PDF全文提取与文本库测试
+"""
+
+import unittest
+import sys
+import os
+import multiprocessing as mp
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sqlite_standin import sqlite_mysql
+from src import text_extractor
+from src.database_manager import DatabaseManager
+from src.models.article import Article
+from src.text_extractor import TextStore, extract_texts, resolve_backend
+
+
+def _fake_pages(path):
+    """测试用解析库：文件内容按换页符分页，内容为BAD时模拟解析失败"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text == "BAD":
+        raise ValueError("broken xref")
+    if text == "CRASH":
+        os._exit(1)  # 模拟解析库C扩展段错误
+    return text.split("\f")
+
+
+class TestTextExtractor(unittest.TestCase):
+    """用替身解析库测试增量提取与文本库"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = TextStore(os.path.join(self.tmp_dir, "fulltext.sqlite"))
+        self.backend = mock.patch.dict(text_extractor.BACKENDS, {"fake": ("json", _fake_pages)})
+        self.backend.start()
+
+    def tearDown(self):
+        self.backend.stop()
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _pdf(self, name, text):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_incremental_by_md5(self):
+        a = self._pdf("a.pdf", "page one\fpage two")
+        rows = [[("m1", a), ("m1", a), ("m2", self._pdf("b.pdf", "BAD"))], [("m3", "missing.pdf")]]
+        stats = extract_texts(self.store, workers=1, backend="fake", rows=rows)
+        self.assertEqual((stats["extracted"], stats["failed"], stats["missing"], stats["pages"]), (1, 1, 1, 2))
+        self.assertEqual(self.store.get_pages("m1"), ["page one", "page two"])
+        self.assertIsNone(self.store.get_pages("m2"))
+        self.assertEqual(len(self.store), 1)
+
+        stats = extract_texts(self.store, workers=1, backend="fake", rows=rows)
+        self.assertEqual((stats["extracted"], stats["failed"], stats["skipped"]), (0, 0, 2))
+        self._pdf("b.pdf", "fixed")
+        stats = extract_texts(self.store, workers=1, backend="fake", rows=rows, retry_failed=True)
+        self.assertEqual((stats["extracted"], stats["skipped"]), (1, 1))
+        self.assertEqual([md5 for md5, _ in self.store.iter_texts(chunk_rows=1)], ["m1", "m2"])
+        self.assertEqual(self.store.stats()["files"], 2)
+
+    def test_downloaded_rows_from_database(self):
+        with sqlite_mysql(os.path.join(self.tmp_dir, "science.db")):
+            manager = DatabaseManager()
+            manager.save_articles_to_database([Article(title=f"T{i}", url=f"u{i}", doi=f"10.1/{i}") for i in range(3)])
+            manager.update_download_status(1, True, self._pdf("1.pdf", "x"), "m1")
+            manager.update_download_status(2, True, self._pdf("2.pdf", "y\fz"), "m2")
+            stats = extract_texts(self.store, workers=1, backend="fake", limit=1)
+            self.assertEqual(stats["extracted"], 1)
+            stats = extract_texts(self.store, workers=1, backend="fake")
+            self.assertEqual((stats["extracted"], stats["skipped"], stats["pages"]), (1, 1, 2))
+
+    @unittest.skipUnless("fork" in mp.get_all_start_methods(), "需要fork启动方式")
+    def test_crashing_file_does_not_hang_pool(self):
+        """某个文件让worker进程崩溃时，该文件记为失败，同批和在途的其他文件照常提取"""
+        rows = [[(f"m{i}", self._pdf(f"{i}.pdf", "CRASH" if i == 3 else f"page {i}")) for i in range(8)]]
+        fork = mock.patch.object(text_extractor, "_new_executor",  # fork出的子进程能看到替身解析库
+                                 lambda workers: ProcessPoolExecutor(workers, mp_context=mp.get_context("fork")))
+        with fork, self.assertLogs("s_crawler.text_extractor", level="WARNING"):
+            stats = extract_texts(self.store, workers=2, backend="fake", rows=rows, batch_files=2)
+        self.assertEqual((stats["extracted"], stats["failed"]), (7, 1))
+        self.assertIsNone(self.store.get_pages("m3"))
+        self.assertEqual(self.store.get_pages("m2"), ["page 2"])
+        self.assertEqual(self.store.known(["m3"]), {"m3"})  # 记为失败，之后不再重试
+
+    def test_backend_selection(self):
+        with self.assertRaises(ValueError):
+            resolve_backend("tesseract")
+        self.assertEqual(resolve_backend("fake"), "fake")
+        with mock.patch.dict(text_extractor.BACKENDS, {"pymupdf": ("no_such_module", None),
+                                                       "pdfminer": ("no_such_module", None)}, clear=True):
+            with self.assertRaises(RuntimeError):
+                resolve_backend("auto")
+
+
+if __name__ == "__main__":
+    unittest.main()
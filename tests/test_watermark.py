@@ -0,0 +1,185 @@
+"""
+增量抓取高水位测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collect_meta
+from benchmarks.sqlite_standin import sqlite_mysql
+from src.config import ScienceConfig
+from src.database_manager import DatabaseManager
+from src.watermark import QueryWatermark, newest_first_url
+from src.link_collector import LinkCollector
+from src.models.article import Article
+from src import selector_registry
+from src.selector_registry import SelectorRegistry
+
+
+def setUpModule():
+    # 共享的选择器注册表改用临时文件，测试结束时不在仓库根目录写 selector_stats.json
+    global _stats_dir, _registry_patch
+    _stats_dir = tempfile.mkdtemp()
+    _registry_patch = mock.patch.object(selector_registry, "_registry",
+                                        SelectorRegistry(stats_file=os.path.join(_stats_dir, "selector_stats.json")))
+    _registry_patch.start()
+
+
+def tearDownModule():
+    _registry_patch.stop()
+    shutil.rmtree(_stats_dir, ignore_errors=True)
+
+
+class TestQueryWatermark(unittest.TestCase):
+    """测试QueryWatermark类"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.query = "https://www.science.org/action/doSearch?AllField=test&startPage=4"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_newest_first_url(self):
+        """测试排序参数与页码重置"""
+        params = parse_qs(urlparse(newest_first_url(self.query)).query)
+        self.assertEqual(params["AllField"], ["test"])
+        self.assertEqual(params["sortBy"], ["EPubDate"])
+        self.assertEqual(params["startPage"], ["0"])
+
+    def test_update_and_reload(self):
+        """测试DOI数量上限、持久化，以及最新日期只在翻到结果末尾时推进"""
+        watermark = QueryWatermark(self.query, watermark_dir=self.tmp_dir, max_dois=2)
+        self.assertTrue(watermark.empty)
+        watermark.update([
+            {"doi": "10.1/a", "publication_date": datetime(2024, 1, 1)},
+            {"doi": "10.1/b", "publication_date": datetime(2024, 3, 1)},
+            {"doi": "10.1/c"},
+        ])
+        watermark.save()
+
+        capped = QueryWatermark(self.query, watermark_dir=self.tmp_dir, max_dois=2)
+        self.assertIsNone(capped.latest_date)
+        self.assertEqual(capped.dois, ["10.1/a", "10.1/b"])
+        capped.update([{"doi": "10.1/a", "publication_date": datetime(2024, 3, 1)}])
+        capped.save(reached_end=True)
+
+        reloaded = QueryWatermark(self.query, watermark_dir=self.tmp_dir, max_dois=2)
+        self.assertEqual(reloaded.latest_date, datetime(2024, 3, 1))
+        self.assertTrue(reloaded.is_known({"doi": "10.1/a"}))
+        # 发表日期早不代表已入库（晚收录的旧文章）
+        self.assertFalse(reloaded.is_known({"doi": "10.1/x", "publication_date": datetime(2024, 2, 1)}))
+        with mock.patch.object(ScienceConfig, "WATERMARK_LOOKBACK_DAYS", 30):
+            self.assertFalse(reloaded.before_lookback({"doi": "10.1/x", "publication_date": datetime(2024, 2, 1)}))
+            self.assertTrue(reloaded.before_lookback({"doi": "10.1/x", "publication_date": datetime(2024, 1, 1)}))
+            self.assertFalse(reloaded.before_lookback({"doi": "10.1/x"}))
+
+
+class TestIncrementalCollect(unittest.TestCase):
+    """测试增量模式按DOI跳过、越过回看窗口才停止翻页"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.watermark = QueryWatermark("q", watermark_dir=self.tmp_dir)
+        self.watermark.latest_date = datetime(2024, 3, 1)
+        self.watermark.update([{"doi": "10.1/a"}, {"doi": "10.1/b"}])
+        self.patch = mock.patch.object(ScienceConfig, "WATERMARK_LOOKBACK_DAYS", 10)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _collect(self, pages, max_count=100, has_next=True):
+        db = mock.Mock()
+        db.existing_dois.side_effect = lambda dois: {d for d in dois if d == "10.1/c"}
+        collector = LinkCollector(mock.Mock(), max_count=max_count)
+        with mock.patch("src.link_collector.DatabaseManager", return_value=db), \
+                mock.patch("src.link_collector.is_captcha_or_abnormal", return_value=False), \
+                mock.patch("src.link_collector.time.sleep"), \
+                mock.patch.object(collector, "_collect_page_links", side_effect=pages), \
+                mock.patch.object(collector, "_go_to_next_page", return_value=has_next) as next_page:
+            links = collector.collect_all_links(watermark=self.watermark)
+        return [a["doi"] for a in links], next_page.call_count, collector.reached_end
+
+    def test_stops_past_lookback_window(self):
+        pages = [
+            [Article(title="new", doi="10.1/new", publication_date=datetime(2024, 3, 5)),
+             Article(title="a", doi="10.1/a", publication_date=datetime(2024, 3, 1))],
+            # 整页已知但仍在回看窗口内：继续翻页，晚收录的旧文章不会被跳过
+            [Article(title="b", doi="10.1/b", publication_date=datetime(2024, 2, 25)),
+             Article(title="c", doi="10.1/c", publication_date=datetime(2024, 2, 24))],
+            [Article(title="late", doi="10.1/late", publication_date=datetime(2024, 2, 22)),
+             Article(title="old", doi="10.1/old", publication_date=datetime(2024, 1, 1))],
+            [Article(title="older", doi="10.1/older", publication_date=datetime(2023, 12, 1))],
+            [Article(title="oldest", doi="10.1/oldest", publication_date=datetime(2023, 1, 1))],
+        ]
+        dois, next_calls, reached_end = self._collect(pages)
+        self.assertEqual(dois, ["10.1/new", "10.1/late", "10.1/old", "10.1/older"])
+        self.assertEqual((next_calls, reached_end), (3, True))
+
+    def test_cap_is_not_end_of_results(self):
+        pages = [[Article(title="new", doi="10.1/new", publication_date=datetime(2024, 3, 5)),
+                  Article(title="x", doi="10.1/x", publication_date=datetime(2024, 3, 4))]]
+        self.assertEqual(self._collect(pages, max_count=1), (["10.1/new"], 0, False))
+        self.assertEqual(self._collect(pages, has_next=False)[2], True)
+
+
+class TestCollectStreaming(unittest.TestCase):
+    """测试入库失败的文章不推进断点和高水位"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = sqlite_mysql(os.path.join(self.tmp_dir, "science.db"))
+        self.db.__enter__()
+        self.patch = mock.patch.object(ScienceConfig, "WATERMARK_DIR", os.path.join(self.tmp_dir, "wm"))
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.db.__exit__(None, None, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self, pages, reached_end=True):
+        collector = mock.Mock(reached_end=reached_end)
+        collector.iter_links.return_value = iter(pages)
+        with mock.patch("collect_meta.LinkCollector", return_value=collector):
+            collect_meta.collect_streaming(SimpleNamespace(incremental=True, resume=False), mock.Mock())
+        return QueryWatermark(ScienceConfig.SEARCH_URL)
+
+    def test_failed_rows_not_marked(self):
+        failed = []
+        manager = DatabaseManager()
+        self.assertFalse(manager.save_articles_to_database([Article(title=None, doi="10.1/none")], failed))
+        self.assertEqual([a.doi for a in failed], ["10.1/none"])
+
+        pages = [[Article(title="ok", doi="10.1/ok", publication_date=datetime(2024, 3, 1)),
+                  Article(title=None, doi="10.1/bad", publication_date=datetime(2024, 3, 2))]]
+        with mock.patch("collect_meta.CrawlCheckpoint") as checkpoint:
+            watermark = self._run(pages)
+        checkpoint.return_value.mark_saved.assert_not_called()
+        checkpoint.return_value.clear.assert_not_called()
+        self.assertEqual((watermark.dois, watermark.latest_date), (["10.1/ok"], None))
+
+        pages = [[Article(title="ok2", doi="10.1/ok2", publication_date=datetime(2024, 3, 3))]]
+        with mock.patch("collect_meta.CrawlCheckpoint") as checkpoint:
+            watermark = self._run(pages, reached_end=False)
+        checkpoint.return_value.clear.assert_called_once()
+        self.assertIsNone(watermark.latest_date)
+        with mock.patch("collect_meta.CrawlCheckpoint"):
+            watermark = self._run([[Article(title="ok", doi="10.1/ok", publication_date=datetime(2024, 3, 1))]])
+        self.assertEqual(watermark.latest_date, datetime(2024, 3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()